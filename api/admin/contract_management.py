@@ -6,7 +6,6 @@ Handles contract templates, document uploads, and automated contract generation
 
 import os
 import json
-import uuid
 from datetime import datetime, date
 from flask import Blueprint, request, jsonify, send_file
 from werkzeug.utils import secure_filename
@@ -17,6 +16,9 @@ from decimal import Decimal
 # Import your database utilities
 from utils.database import get_db_manager, execute_query
 from auth.user_auth import token_required, role_required
+from services.contract_template_registry import (
+    get_compiled_template, invalidate_template, generate_contract_record, get_template_registry_stats
+)
 
 # Create blueprint for contract management
 contract_bp = Blueprint('contract_management', __name__)
@@ -45,6 +47,7 @@ def contract_management_health():
         'success': True,
         'message': 'Contract management API is healthy',
         'features': ['Template Management', 'Contract Generation', 'File Upload', 'Bulk Export'],
+        'template_cache': get_template_registry_stats(),
         'timestamp': datetime.now().isoformat()
     })
 
@@ -230,6 +233,7 @@ def create_contract_template():
         ), 'one')
 
         if insert_result['success'] and insert_result['data']:
+            invalidate_template(template_id)
             template = insert_result['data']
             template_dict = {
                 'id': template['id'],
@@ -321,6 +325,7 @@ def update_contract_template(template_id):
         result = execute_query(query, tuple(params), 'one')
 
         if result['success'] and result['data']:
+            invalidate_template(template_id)
             template = result['data']
             template_dict = {
                 'id': template['id'],
@@ -373,6 +378,7 @@ def toggle_template_status(template_id):
         ''', (template_id,), 'one')
 
         if result['success'] and result['data']:
+            invalidate_template(template_id)
             template = result['data']
             template_dict = {
                 'id': template['id'],
@@ -492,6 +498,7 @@ def upload_contract_template():
                     SET template_file = %s, updated_at = CURRENT_TIMESTAMP
                     WHERE id = %s
                 ''', (filename, template_uuid))
+                invalidate_template(template_id)
 
             return jsonify({
                 'success': True,
@@ -538,88 +545,42 @@ def generate_contract():
                 'error': 'Database not available'
             }), 503
 
-        # Get template
-        template_result = execute_query('''
-            SELECT id, template_id, name, fields, active
-            FROM contract_templates 
-            WHERE template_id = %s
-        ''', (template_id,), 'one')
-
-        if not template_result['success'] or not template_result['data']:
-            return jsonify({
-                'success': False,
-                'error': 'Template not found'
-            }), 404
-
-        template = template_result['data']
-        
-        if not template['active']:
-            return jsonify({
-                'success': False,
-                'error': 'Template is not active'
-            }), 400
-
-        # Validate customer data against template fields
-        template_fields = template['fields'] if template['fields'] else []
-        missing_fields = []
-        
-        for field in template_fields:
-            if field.get('required') and field['name'] not in customer_data:
-                missing_fields.append(field['name'])
-
-        if missing_fields:
-            return jsonify({
-                'success': False,
-                'error': f'Missing required customer data: {", ".join(missing_fields)}'
-            }), 400
-
-        # Get reseller ID if user is a reseller
-        reseller_id = None
-        reseller_result = execute_query(
-            'SELECT user_id FROM resellers WHERE user_id = %s',
-            (user_id,), 'one'
-        )
-        if reseller_result['success'] and reseller_result['data']:
-            reseller_id = user_id
+        # Compiled template from the registry; if it changed since it was
+        # cached, the insert matches nothing and the template is reloaded once
+        contract = None
+        for refresh in (False, True):
+            template = get_compiled_template(template_id, refresh=refresh)
+            if template is None:
+                return jsonify({
+                    'success': False,
+                    'error': 'Template not found'
+                }), 404
 
-        # Generate contract number
-        contract_number = f"CON-{datetime.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}"
+            if not template.active:
+                return jsonify({
+                    'success': False,
+                    'error': 'Template is not active'
+                }), 400
 
-        # Insert generated contract
-        insert_result = execute_query('''
-            INSERT INTO generated_contracts 
-            (contract_number, template_id, customer_id, reseller_id, customer_data, status, created_by)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-            RETURNING id, contract_number, generated_date, status
-        ''', (
-            contract_number,
-            template['id'],
-            customer_id,
-            reseller_id,
-            json.dumps(customer_data),
-            'generated',
-            user_id
-        ), 'one')
+            # Validate customer data against template fields
+            validation_error = template.validate(customer_data)
+            if validation_error:
+                return jsonify({
+                    'success': False,
+                    'error': validation_error
+                }), 400
 
-        if insert_result['success'] and insert_result['data']:
-            contract = insert_result['data']
-            
-            # Log activity
-            execute_query('''
-                INSERT INTO contract_activities (contract_id, activity_type, description, performed_by)
-                VALUES (%s, %s, %s, %s)
-            ''', (
-                contract['id'],
-                'created',
-                f'Contract generated from template {template_id}',
-                user_id
-            ))
+            # Contract, reseller lookup and activity log in one round trip
+            contract = generate_contract_record(template, customer_data, customer_id, user_id)
+            if contract:
+                break
 
+        if contract:
             contract_dict = {
                 'id': contract['id'],
                 'contract_number': contract['contract_number'],
                 'template_id': template_id,
-                'template_name': template['name'],
+                'template_name': template.name,
                 'customer_data': customer_data,
                 'generated_date': contract['generated_date'].isoformat(),
                 'status': contract['status'],
@@ -634,8 +595,8 @@ def generate_contract():
         else:
             return jsonify({
                 'success': False,
-                'error': 'Failed to generate contract'
-            }), 500
+                'error': 'Template was modified during generation, please retry'
+            }), 409
 
     except Exception as e:
         return jsonify({
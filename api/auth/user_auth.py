@@ -10,6 +10,7 @@ import uuid
 from functools import wraps
 from flask import request, jsonify, current_app
 from utils.database import get_db_manager, execute_query
+from utils.prepared_statements import execute_prepared
 
 class DatabaseUserAuth:
     """Authentication system integrated with your actual database"""
@@ -157,11 +158,7 @@ class DatabaseUserAuth:
             if user_id:
                 db_manager = get_db_manager()
                 if db_manager.available:
-                    result = execute_query('''
-                        SELECT id, email, role, status 
-                        FROM users 
-                        WHERE id = %s AND status = 'active'
-                    ''', (user_id,), 'one')
+                    result = execute_prepared('user_by_id', (user_id,))
                     
                     if result['success'] and result['data']:
                         # Update payload with fresh data from database
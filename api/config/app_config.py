@@ -16,6 +16,7 @@ class AppConfig:
         
         # Vercel Blob Storage
         self.VERCEL_BLOB_READ_WRITE_TOKEN = os.environ.get('BLOB_READ_WRITE_TOKEN')
+        self.VERCEL_BLOB_API_URL = os.environ.get('VERCEL_BLOB_API_URL', 'https://blob.vercel-storage.com').rstrip('/')
         print(f"Vercel Blob Read/Write Token: {self.VERCEL_BLOB_READ_WRITE_TOKEN}")
         
         # File upload settings
@@ -6,6 +6,11 @@ Smart fallback from database to hardcoded pricing
 
 import os
 
+try:
+    from data.pricing_snapshot import get_active_snapshot
+except ImportError:
+    def get_active_snapshot(): return None
+
 # Updated Hero Products Pricing Configuration (July 2025) - FALLBACK DATA
 HERO_PRODUCTS_PRICING = {
     'home_protection': {
@@ -92,6 +97,22 @@ def get_price_from_db_or_fallback(product_code, term_years, customer_type='retai
     Smart pricing: Try database first, fallback to hardcoded pricing
     This is the main function to use for all pricing calculations
     """
+    # Shipped pricing snapshot answers without a database round trip
+    snapshot = get_active_snapshot()
+    if snapshot is not None:
+        snapshot_price = snapshot.get_hero_price(product_code, term_years, customer_type)
+        if snapshot_price is not None:
+            base_price, multiplier = snapshot_price
+            return {
+                'success': True,
+                'base_price': float(base_price),
+                'multiplier': float(multiplier),
+                'final_price': round(float(base_price) * float(multiplier), 2),
+                'data_source': 'snapshot',
+                'customer_type': customer_type,
+                'term_years': term_years
+            }
+
     try:
         # Try database first
         database_url = os.environ.get('DATABASE_URL')
@@ -222,6 +243,30 @@ def calculate_hero_price(product_type, term_years, coverage_limit=500, customer_
 
 def get_all_products_pricing():
     """Get pricing for all products - tries database first"""
+    snapshot = get_active_snapshot()
+    if snapshot is not None and snapshot.hero_rows:
+        products = {}
+        for code, name, base_price, term, multiplier, cust_type in snapshot.hero_rows:
+            if cust_type != 'retail':
+                continue
+            if code not in products:
+                products[code] = {
+                    'product_code': code,
+                    'product_name': name,
+                    'base_price': float(base_price),
+                    'pricing': {}
+                }
+            products[code]['pricing'][term] = {
+                'multiplier': float(multiplier),
+                'price': round(float(base_price) * float(multiplier), 2)
+            }
+
+        return {
+            'success': True,
+            'products': list(products.values()),
+            'data_source': 'snapshot'
+        }
+
     try:
         database_url = os.environ.get('DATABASE_URL')
         if database_url:
@@ -0,0 +1,609 @@
+#!/usr/bin/env python3
+"""
+Pricing Snapshot - Build-time pricing artifact
+Exports all pricing state (VSC rate tables, Hero pricing, admin fees) into a
+single versioned file shipped with the deployment, and loads it at startup so
+cold instances can quote without rebuilding state from the database.
+
+Every write to a source table bumps a single version row (statement triggers
+installed by the migrate command). The snapshot records that version at export,
+so checking whether it is still current is a one-row read.
+
+Usage:
+    python api/data/pricing_snapshot.py migrate
+    python api/data/pricing_snapshot.py export [output_path]
+    python api/data/pricing_snapshot.py check [snapshot_path]
+"""
+
+import os
+import sys
+import json
+import mmap
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone, date
+from decimal import Decimal
+from typing import Dict, Any, List, Optional
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import get_db_manager, execute_query
+
+SNAPSHOT_FORMAT_VERSION = 2
+
+# A warm instance re-checks the snapshot against the database this often, so an
+# admin price change made on another instance is picked up within the same
+# window as the 5 minute rate cache (VSCRateManager._cache_ttl)
+SNAPSHOT_RECHECK_SECONDS = min(int(os.environ.get('PRICING_SNAPSHOT_RECHECK_SECONDS', 300)), 300)
+
+DEFAULT_SNAPSHOT_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'pricing_snapshot.json'
+)
+
+# Admin settings categories that feed quote pricing
+SNAPSHOT_SETTINGS_CATEGORIES = ('fees', 'discounts', 'taxes', 'markups', 'pricing')
+
+# Tables whose contents make up the snapshot; any write to them bumps the version row
+SNAPSHOT_SOURCE_TABLES = (
+    'vsc_vehicle_classes',
+    'vsc_coverage_levels',
+    'vsc_term_multipliers',
+    'vsc_deductible_multipliers',
+    'vsc_mileage_multipliers',
+    'vsc_age_multipliers',
+    'vsc_rate_matrix',
+    'vsc_base_rates',
+    'products',
+    'pricing',
+    'admin_settings'
+)
+
+VERSION_TRIGGER_NAME = 'pricing_snapshot_version_bump'
+VERSION_TRIGGER_LOCK_TIMEOUT = os.environ.get('PRICING_SNAPSHOT_LOCK_TIMEOUT', '5s')
+
+PRICING_VERSION_SQL = '''
+    CREATE TABLE IF NOT EXISTS pricing_snapshot_version (
+        id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+        version BIGINT NOT NULL DEFAULT 1,
+        changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    );
+    INSERT INTO pricing_snapshot_version (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+
+    CREATE OR REPLACE FUNCTION bump_pricing_snapshot_version() RETURNS trigger AS $$
+    BEGIN
+        UPDATE pricing_snapshot_version SET version = version + 1, changed_at = NOW() WHERE id = 1;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+'''
+
+VERSION_TRIGGER_SQL = '''
+    DROP TRIGGER IF EXISTS {trigger} ON {table};
+    CREATE TRIGGER {trigger}
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+        FOR EACH STATEMENT EXECUTE FUNCTION bump_pricing_snapshot_version();
+'''
+
+PRICING_VERSION_QUERY = "SELECT version FROM pricing_snapshot_version WHERE id = 1;"
+
+
+def _json_default(value):
+    """Serialize database types that json does not handle natively"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _get_database_url():
+    return os.environ.get('DATABASE_URL')
+
+
+def _missing_version_triggers(cursor) -> List[str]:
+    cursor.execute('''
+        SELECT t.name FROM unnest(%s::text[]) AS t(name)
+        WHERE to_regclass(t.name) IS NOT NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM pg_trigger
+              WHERE tgname = %s AND tgrelid = to_regclass(t.name)
+          )
+    ''', (list(SNAPSHOT_SOURCE_TABLES), VERSION_TRIGGER_NAME))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def install_version_triggers() -> Dict[str, Any]:
+    """Create the version row and the triggers that bump it on every pricing write"""
+    db = get_db_manager()
+    if not db.available:
+        return {'success': False, 'error': 'Database not available'}
+    try:
+        with db.get_cursor() as (cursor, conn):
+            cursor.execute('SET LOCAL lock_timeout = %s;', (VERSION_TRIGGER_LOCK_TIMEOUT,))
+            cursor.execute(PRICING_VERSION_SQL)
+            installed = _missing_version_triggers(cursor)
+            for table in installed:
+                cursor.execute(VERSION_TRIGGER_SQL.format(trigger=VERSION_TRIGGER_NAME, table=table))
+            conn.commit()
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+    return {'success': True, 'trigger': VERSION_TRIGGER_NAME, 'installed_on': installed}
+
+
+def _read_source_version(cursor) -> Optional[int]:
+    cursor.execute("SELECT to_regclass('pricing_snapshot_version') IS NOT NULL;")
+    if not cursor.fetchone()[0]:
+        return None
+    cursor.execute(PRICING_VERSION_QUERY)
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _fetch_rows(cursor, query: str) -> List[tuple]:
+    try:
+        cursor.execute(query)
+        return cursor.fetchall()
+    except Exception as e:
+        # Optional table missing in this database - leave the section empty
+        cursor.connection.rollback()
+        print(f"⚠️ Snapshot section skipped: {e}")
+        return []
+
+
+def build_snapshot(database_url: str = None) -> Dict[str, Any]:
+    """
+    Read all pricing state from the database into a snapshot dictionary
+
+    Args:
+        database_url: Database connection string (defaults to DATABASE_URL)
+
+    Returns:
+        dict: Snapshot payload ready to be written with write_snapshot()
+    """
+    import psycopg2
+
+    database_url = database_url or _get_database_url()
+    if not database_url:
+        raise RuntimeError("DATABASE_URL is required to export a pricing snapshot")
+
+    conn = psycopg2.connect(database_url)
+    try:
+        cursor = conn.cursor()
+
+        # Read the version first: a write that lands mid-export bumps it past this
+        # value, so the snapshot is reported stale rather than silently mixed
+        source_version = _read_source_version(cursor)
+
+        vehicle_classification = {
+            make.lower().strip(): vehicle_class
+            for make, vehicle_class in _fetch_rows(cursor, """
+                SELECT make, vehicle_class FROM vsc_vehicle_classes
+                WHERE active = TRUE ORDER BY make;
+            """)
+        }
+
+        coverage_levels = {
+            level_code: {'name': level_name, 'description': description}
+            for level_code, level_name, description in _fetch_rows(cursor, """
+                SELECT level_code, level_name, description FROM vsc_coverage_levels
+                WHERE active = TRUE ORDER BY display_order;
+            """)
+        }
+
+        term_multipliers = [
+            [term_months, float(multiplier)]
+            for term_months, multiplier in _fetch_rows(cursor, """
+                SELECT term_months, multiplier FROM vsc_term_multipliers
+                WHERE active = TRUE ORDER BY term_months;
+            """)
+        ]
+
+        deductible_multipliers = [
+            [deductible_amount, float(multiplier)]
+            for deductible_amount, multiplier in _fetch_rows(cursor, """
+                SELECT deductible_amount, multiplier FROM vsc_deductible_multipliers
+                WHERE active = TRUE ORDER BY deductible_amount;
+            """)
+        ]
+
+        mileage_multipliers = [
+            {
+                'category': category,
+                'min_mileage': min_mileage,
+                'max_mileage': max_mileage,
+                'multiplier': float(multiplier),
+                'description': description
+            }
+            for category, min_mileage, max_mileage, multiplier, description in _fetch_rows(cursor, """
+                SELECT category, min_mileage, max_mileage, multiplier, description
+                FROM vsc_mileage_multipliers WHERE active = TRUE ORDER BY display_order;
+            """)
+        ]
+
+        age_multipliers = [
+            {
+                'category': category,
+                'min_age': min_age,
+                'max_age': max_age,
+                'multiplier': float(multiplier),
+                'description': description
+            }
+            for category, min_age, max_age, multiplier, description in _fetch_rows(cursor, """
+                SELECT category, min_age, max_age, multiplier, description
+                FROM vsc_age_multipliers WHERE active = TRUE ORDER BY display_order;
+            """)
+        ]
+
+        # Rate matrix rows newest-first so the loader can keep the first match
+        rate_matrix = [
+            [vehicle_class, coverage_level, term_months, min_mileage, max_mileage, float(rate_amount)]
+            for vehicle_class, coverage_level, term_months, min_mileage, max_mileage, rate_amount in _fetch_rows(cursor, """
+                SELECT vehicle_class, coverage_level, term_months, min_mileage, max_mileage, rate_amount
+                FROM vsc_rate_matrix WHERE active = TRUE
+                ORDER BY vehicle_class, coverage_level, term_months, effective_date DESC, min_mileage;
+            """)
+        ]
+
+        base_rates = {}
+        for vehicle_class, coverage_level, base_rate in _fetch_rows(cursor, """
+            SELECT vehicle_class, coverage_level, base_rate FROM vsc_base_rates
+            WHERE active = TRUE ORDER BY effective_date DESC;
+        """):
+            base_rates.setdefault(f"{vehicle_class}:{coverage_level}", float(base_rate))
+
+        hero_pricing = [
+            [code, name, float(base_price), term_years, float(multiplier), customer_type]
+            for code, name, base_price, term_years, multiplier, customer_type in _fetch_rows(cursor, """
+                SELECT p.product_code, p.product_name, p.base_price,
+                       pr.term_years, pr.multiplier, pr.customer_type
+                FROM products p
+                JOIN pricing pr ON p.product_code = pr.product_code
+                ORDER BY p.product_code, pr.term_years, pr.customer_type;
+            """)
+        ]
+
+        admin_settings = {}
+        for category, key, value in _fetch_rows(cursor, f"""
+            SELECT category, key, value FROM admin_settings
+            WHERE category IN ({', '.join(repr(c) for c in SNAPSHOT_SETTINGS_CATEGORIES)});
+        """):
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    pass
+            admin_settings[f"{category}.{key}"] = value
+
+        cursor.close()
+    finally:
+        conn.close()
+
+    return {
+        'format_version': SNAPSHOT_FORMAT_VERSION,
+        'version': str(source_version) if source_version is not None else 'unversioned',
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'source_version': source_version,
+        'vsc': {
+            'vehicle_classification': vehicle_classification,
+            'coverage_levels': coverage_levels,
+            'term_multipliers': term_multipliers,
+            'deductible_multipliers': deductible_multipliers,
+            'mileage_multipliers': mileage_multipliers,
+            'age_multipliers': age_multipliers,
+            'rate_matrix': rate_matrix,
+            'base_rates': base_rates
+        },
+        'hero': {
+            'pricing': hero_pricing
+        },
+        'admin_settings': admin_settings
+    }
+
+
+def write_snapshot(snapshot: Dict[str, Any], path: str = None) -> str:
+    """Write snapshot atomically in compact JSON form"""
+    path = path or DEFAULT_SNAPSHOT_PATH
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, separators=(',', ':'), sort_keys=True, default=_json_default)
+    os.replace(tmp_path, path)
+    return path
+
+
+def export_pricing_snapshot(path: str = None, database_url: str = None) -> Dict[str, Any]:
+    """Build and write the pricing snapshot artifact"""
+    try:
+        snapshot = build_snapshot(database_url)
+        if snapshot['source_version'] is None:
+            return {
+                'success': False,
+                'error': 'pricing_snapshot_version not found - run: python api/data/pricing_snapshot.py migrate'
+            }
+        written_path = write_snapshot(snapshot, path)
+        return {
+            'success': True,
+            'path': written_path,
+            'version': snapshot['version'],
+            'size_bytes': os.path.getsize(written_path),
+            'rate_matrix_rows': len(snapshot['vsc']['rate_matrix']),
+            'hero_pricing_rows': len(snapshot['hero']['pricing'])
+        }
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+
+class PricingSnapshot:
+    """In-memory view of a loaded pricing snapshot with O(1) lookups"""
+
+    def __init__(self, payload: Dict[str, Any], path: str = None):
+        self.path = path
+        self.version = payload['version']
+        self.generated_at = payload.get('generated_at')
+        self.source_version = payload.get('source_version')
+
+        vsc = payload.get('vsc', {})
+        # Shapes below match what VSCRateManager's getters return
+        self.tables = {
+            'vehicle_classification': vsc.get('vehicle_classification', {}),
+            'coverage_levels': vsc.get('coverage_levels', {}),
+            'term_multipliers': {int(k): v for k, v in vsc.get('term_multipliers', [])},
+            'deductible_multipliers': {int(k): v for k, v in vsc.get('deductible_multipliers', [])},
+            'mileage_multipliers': vsc.get('mileage_multipliers', []),
+            'age_multipliers': vsc.get('age_multipliers', [])
+        }
+        # Drop empty sections so callers fall through to their own defaults
+        self.tables = {key: value for key, value in self.tables.items() if value}
+
+        self._rate_matrix = {}
+        for vehicle_class, coverage_level, term_months, min_mileage, max_mileage, rate in vsc.get('rate_matrix', []):
+            self._rate_matrix.setdefault((vehicle_class, coverage_level, int(term_months)), []).append(
+                (min_mileage, max_mileage, rate)
+            )
+        self._base_rates = vsc.get('base_rates', {})
+
+        self._hero_pricing = {}
+        self.hero_rows = payload.get('hero', {}).get('pricing', [])
+        for code, name, base_price, term_years, multiplier, customer_type in self.hero_rows:
+            self._hero_pricing[(code, int(term_years), customer_type)] = (base_price, multiplier)
+
+        self._admin_settings = payload.get('admin_settings', {})
+
+    def get_table(self, key: str):
+        return self.tables.get(key)
+
+    def get_exact_rate(self, vehicle_class: str, coverage_level: str, term_months: int, mileage: int) -> Optional[float]:
+        """Return the newest matching rate matrix entry, or None if no row covers the mileage"""
+        for min_mileage, max_mileage, rate in self._rate_matrix.get((vehicle_class, coverage_level, int(term_months)), ()):
+            if min_mileage <= mileage <= max_mileage:
+                return rate
+        return None
+
+    def get_base_rate(self, vehicle_class: str, coverage_level: str) -> Optional[float]:
+        return self._base_rates.get(f"{vehicle_class}:{coverage_level}")
+
+    def get_hero_price(self, product_code: str, term_years: int, customer_type: str = 'retail'):
+        """Return (base_price, multiplier) for a Hero product term, or None"""
+        return self._hero_pricing.get((product_code, int(term_years), customer_type))
+
+    def has_admin_setting(self, category: str, key: str) -> bool:
+        return f"{category}.{key}" in self._admin_settings
+
+    def get_admin_setting(self, category: str, key: str, default_value: Any = None) -> Any:
+        return self._admin_settings.get(f"{category}.{key}", default_value)
+
+    def get_settings_by_category(self, category: str) -> Dict[str, Any]:
+        prefix = f"{category}."
+        return {
+            key[len(prefix):]: value
+            for key, value in self._admin_settings.items()
+            if key.startswith(prefix)
+        }
+
+
+def load_snapshot(path: str = None) -> Optional[PricingSnapshot]:
+    """
+    Memory-map and parse a snapshot file
+
+    Returns:
+        PricingSnapshot or None if the file is missing or unreadable
+    """
+    path = path or os.environ.get('PRICING_SNAPSHOT_PATH') or DEFAULT_SNAPSHOT_PATH
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                payload = json.loads(mapped[:])
+
+        if payload.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+            print(f"⚠️ Pricing snapshot format {payload.get('format_version')} not supported - ignoring")
+            return None
+
+        return PricingSnapshot(payload, path)
+
+    except Exception as e:
+        print(f"⚠️ Failed to load pricing snapshot {path}: {e}")
+        return None
+
+
+def verify_snapshot(snapshot: PricingSnapshot) -> Dict[str, Any]:
+    """
+    Compare the snapshot version against the live version row
+
+    This one-row read over the shared pool is the only database access the
+    snapshot path needs.
+    """
+    result = execute_query(PRICING_VERSION_QUERY, fetch='one')
+    if not result.get('success'):
+        return {'success': False, 'error': result.get('error')}
+    if not result.get('data'):
+        return {'success': False, 'error': 'pricing_snapshot_version row missing'}
+
+    live_version = result['data']['version']
+    return {
+        'success': True,
+        'current': live_version == snapshot.source_version,
+        'snapshot_version': snapshot.source_version,
+        'live_version': live_version
+    }
+
+
+# Process-wide snapshot state
+_active_snapshot = None
+_snapshot_status = {'state': 'not_loaded', 'checked_at': None, 'details': None}
+_snapshot_lock = threading.Lock()
+_snapshot_initialized = False
+_next_check_at = 0.0
+_check_running = False
+
+# Job-scoped override (see pinned_snapshot); takes precedence over the process snapshot
+_pinned_snapshot: ContextVar[Optional[PricingSnapshot]] = ContextVar('pinned_pricing_snapshot', default=None)
+
+
+def _verify_in_background(snapshot: PricingSnapshot):
+    global _active_snapshot, _next_check_at, _check_running
+    result = verify_snapshot(snapshot)
+    with _snapshot_lock:
+        _check_running = False
+        _next_check_at = time.monotonic() + SNAPSHOT_RECHECK_SECONDS
+        _snapshot_status['checked_at'] = datetime.now(timezone.utc).isoformat()
+        _snapshot_status['details'] = result
+        if _active_snapshot is not snapshot:
+            return
+        if result.get('success') and not result.get('current'):
+            _active_snapshot = None
+            _snapshot_status['state'] = 'stale'
+            print(f"⚠️ Pricing snapshot {snapshot.version} is stale (live version {result['live_version']}) - using database")
+        elif result.get('success'):
+            _snapshot_status['state'] = 'verified'
+        else:
+            # Could not reach the database; the shipped snapshot is the best data available
+            _snapshot_status['state'] = 'unverified'
+
+
+def initialize_snapshot(path: str = None, verify: bool = True) -> Optional[PricingSnapshot]:
+    """Load the shipped snapshot once and kick off a background version check"""
+    global _active_snapshot, _snapshot_initialized
+
+    with _snapshot_lock:
+        if _snapshot_initialized:
+            return _active_snapshot
+        _snapshot_initialized = True
+
+        if os.environ.get('PRICING_SNAPSHOT_DISABLED', '').lower() == 'true':
+            _snapshot_status['state'] = 'disabled'
+            return None
+
+        snapshot = load_snapshot(path)
+        if snapshot is None:
+            _snapshot_status['state'] = 'missing'
+            return None
+
+        _active_snapshot = snapshot
+        _snapshot_status['state'] = 'loaded'
+        print(f"✅ Pricing snapshot {snapshot.version} loaded ({snapshot.generated_at})")
+
+    if verify:
+        _start_verify(snapshot)
+
+    return snapshot
+
+
+def _start_verify(snapshot: PricingSnapshot):
+    global _check_running
+    with _snapshot_lock:
+        if _check_running:
+            return
+        _check_running = True
+    threading.Thread(
+        target=_verify_in_background, args=(snapshot,), name='pricing-snapshot-verify', daemon=True
+    ).start()
+
+
+def get_active_snapshot() -> Optional[PricingSnapshot]:
+    """Return the current snapshot, or None when pricing must come from the database"""
+    pinned = _pinned_snapshot.get()
+    if pinned is not None:
+        return pinned
+    if not _snapshot_initialized:
+        initialize_snapshot()
+    snapshot = _active_snapshot
+    if snapshot is not None and not _check_running and time.monotonic() >= _next_check_at:
+        # Other instances may have changed prices since the last check
+        _start_verify(snapshot)
+    return snapshot
+
+
+@contextmanager
+def pinned_snapshot(snapshot: Optional[PricingSnapshot]):
+    """
+    Price from snapshot for the current context only
+
+    Long-running jobs pin one consistent view of the rate tables instead of
+    opening a connection per rate lookup. Threads started inside the block
+    must run under contextvars.copy_context() to see it.
+    """
+    token = _pinned_snapshot.set(snapshot)
+    try:
+        yield snapshot
+    finally:
+        _pinned_snapshot.reset(token)
+
+
+def invalidate_snapshot(reason: str = 'invalidated'):
+    """Stop serving the snapshot in this process (called after admin pricing writes)"""
+    global _active_snapshot, _snapshot_initialized
+    with _snapshot_lock:
+        _snapshot_initialized = True
+        if _active_snapshot is not None:
+            print(f"🔄 Pricing snapshot {_active_snapshot.version} {reason} - using database")
+        _active_snapshot = None
+        _snapshot_status['state'] = reason
+
+
+def get_snapshot_status() -> Dict[str, Any]:
+    snapshot = _active_snapshot
+    return {
+        'state': _snapshot_status['state'],
+        'active': snapshot is not None,
+        'version': snapshot.version if snapshot else None,
+        'generated_at': snapshot.generated_at if snapshot else None,
+        'checked_at': _snapshot_status['checked_at'],
+        'details': _snapshot_status['details']
+    }
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'export'
+    target_path = sys.argv[2] if len(sys.argv) > 2 else None
+
+    if command == 'migrate':
+        result = install_version_triggers()
+        print(json.dumps(result, indent=2, default=str))
+        sys.exit(0 if result['success'] else 1)
+
+    elif command == 'export':
+        result = export_pricing_snapshot(target_path)
+        if result['success']:
+            print(f"✅ Pricing snapshot {result['version']} written to {result['path']} "
+                  f"({result['size_bytes']} bytes, {result['rate_matrix_rows']} rate rows)")
+        else:
+            print(f"❌ Snapshot export failed: {result['error']}")
+            sys.exit(1)
+
+    elif command == 'check':
+        snapshot = load_snapshot(target_path)
+        if snapshot is None:
+            print("❌ No pricing snapshot found")
+            sys.exit(1)
+        result = verify_snapshot(snapshot)
+        print(json.dumps(result, indent=2, default=str))
+        sys.exit(0 if result.get('current') else 1)
+
+    else:
+        print(f"Unknown command: {command}. Use 'migrate', 'export' or 'check'.")
+        sys.exit(2)
@@ -13,6 +13,21 @@ from typing import Dict, Optional, List, Tuple
 from functools import lru_cache
 import threading
 
+try:
+    from data.pricing_snapshot import get_active_snapshot
+except ImportError:
+    def get_active_snapshot(): return None
+
+try:
+    from utils.single_flight import coalesce
+except ImportError:
+    def coalesce(group, key_func, timeout=None): return lambda func: func
+
+try:
+    from utils.prepared_statements import execute_prepared, uses_shared_pool
+except ImportError:
+    def uses_shared_pool(database_url): return False
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -73,7 +88,13 @@ class VSCRateManager:
         self._cache_timestamps[key] = datetime.now().timestamp()
     
     def _get_cache(self, key: str):
-        """Get cached data if valid"""
+        """Get cached data if valid, preferring the shipped pricing snapshot"""
+        snapshot = get_active_snapshot()
+        if snapshot is not None:
+            snapshot_data = snapshot.get_table(key)
+            if snapshot_data is not None:
+                return snapshot_data
+        
         if self._is_cache_valid(key):
             return self._cached_data[key]
         return None
@@ -350,6 +371,17 @@ class VSCRateManager:
         Returns:
             float: Exact rate if found, None otherwise
         """
+        snapshot = get_active_snapshot()
+        if snapshot is not None:
+            return snapshot.get_exact_rate(vehicle_class, coverage_level, term_months, mileage)
+        
+        if uses_shared_pool(self.database_url):
+            result = execute_prepared('vsc_exact_rate', (vehicle_class, coverage_level, term_months, mileage, mileage))
+            if not result['success']:
+                logger.warning(f"Failed to get exact rate from database: {result['error']}")
+                return None
+            return float(result['data']['rate_amount']) if result['data'] else None
+        
         try:
             with self._get_fresh_connection() as conn:
                 with conn.cursor() as cursor:
@@ -384,6 +416,12 @@ class VSCRateManager:
         Returns:
             float: Base rate
         """
+        snapshot = get_active_snapshot()
+        if snapshot is not None:
+            snapshot_rate = snapshot.get_base_rate(vehicle_class, coverage_level)
+            if snapshot_rate is not None:
+                return snapshot_rate
+        
         try:
             with self._get_fresh_connection() as conn:
                 with conn.cursor() as cursor:
@@ -532,6 +570,17 @@ def get_vsc_coverage_options() -> Dict:
         }
     }
 
+def _price_flight_key(make, year, mileage, coverage_level='gold', term_months=36, deductible=100,
+                      customer_type='retail'):
+    # Prices differ per snapshot, so a pinned snapshot never shares a result with the live one
+    snapshot = get_active_snapshot()
+    return (
+        str(make).strip().lower(), int(year), int(mileage), str(coverage_level).strip().lower(),
+        int(term_months), int(deductible), str(customer_type).strip().lower(),
+        snapshot.version if snapshot else None
+    )
+
+@coalesce('vsc_price', _price_flight_key)
 def calculate_vsc_price(make: str, year: int, mileage: int, coverage_level: str = 'gold', 
                        term_months: int = 36, deductible: int = 100, customer_type: str = 'retail') -> Dict:
     """
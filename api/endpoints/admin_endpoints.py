@@ -10,9 +10,19 @@ import uuid
 import os
 from utils.database import get_db_manager, execute_query
 from utils.service_availability import ServiceChecker
+from utils.http_cache import register_cache_invalidation
+from utils.generated_columns import get_generated_column_status
+from services.search_service import check_search_schema, user_search_condition, global_search, get_search_status
+
+try:
+    from data.pricing_snapshot import invalidate_snapshot
+except ImportError:
+    def invalidate_snapshot(reason='invalidated'): pass
 
 # Initialize blueprint
 admin_bp = Blueprint('admin', __name__)
+# Admin writes touch pricing, settings and the landing page media
+register_cache_invalidation(admin_bp, 'pricing', 'settings', 'landing_video')
 
 # Import admin services with error handling
 try:
@@ -65,6 +75,9 @@ def admin_health():
                 'security_monitoring': True
             },
             'database_integration': service_checker.database_settings_available,
+            'search': get_search_status(),
+            'generated_columns': get_generated_column_status(),
+            'read_replica': get_db_manager().get_replica_status(),
             'timestamp': datetime.now(timezone.utc).isoformat() + "Z"
         })
     except Exception as e:
@@ -101,7 +114,11 @@ def get_all_users():
                 where_conditions.append("status = %s")
                 params.append(status_filter)
             
-            if search_term:
+            if search_term and check_search_schema():
+                condition, search_params = user_search_condition(search_term)
+                where_conditions.append(condition)
+                params.extend(search_params)
+            elif search_term:
                 where_conditions.append("""
                     (LOWER(email) LIKE LOWER(%s) 
                      OR LOWER(profile::text) LIKE LOWER(%s))
@@ -178,6 +195,25 @@ def get_all_users():
         traceback.print_exc()
         return jsonify({'error': f'Failed to get users: {str(e)}'}), 500
 
+@admin_bp.route('/search', methods=['GET'])
+@token_required
+@role_required('admin')
+def search_all():
+    """Ranked search across customers, users, quotes and contracts"""
+    try:
+        types = request.args.get('types')
+        result = global_search(
+            request.args.get('q', ''),
+            entity_types=[t.strip() for t in types.split(',') if t.strip()] if types else None,
+            limit=request.args.get('limit', 20, type=int)
+        )
+        if not result['success']:
+            return jsonify({'error': result['error']}), 400
+        return jsonify(result)
+
+    except Exception as e:
+        return jsonify({'error': f'Search failed: {str(e)}'}), 500
+
 @admin_bp.route('/users/<user_id>', methods=['GET'])
 @token_required
 @role_required('admin')
@@ -1194,6 +1230,151 @@ def get_security_events():
         print(f"Error in get_security_events: {e}")
         return jsonify({'error': f'Failed to get security events: {str(e)}'}), 500
 
+@admin_bp.route('/database/queries', methods=['GET'])
+@token_required
+@role_required('admin')
+def get_query_instrumentation():
+    """Get per-statement and per-request database statistics for this instance"""
+    try:
+        from utils.query_instrumentation import query_stats, instrumentation_installed
+        
+        limit = request.args.get('limit', 20, type=int)
+        order_by = request.args.get('order_by', 'total_ms')
+        report = query_stats.report(limit=min(limit, 200), order_by=order_by)
+        
+        # pg_stat_statements covers all instances, but only after the fact
+        if request.args.get('include_pg_stat', 'false').lower() == 'true':
+            report['pg_stat_statements'] = get_db_manager().get_slow_queries(limit=min(limit, 200))
+        
+        return jsonify({
+            'instrumentation_enabled': instrumentation_installed(),
+            'report': report,
+            'timestamp': datetime.now(timezone.utc).isoformat() + 'Z'
+        })
+        
+    except Exception as e:
+        print(f"Error in get_query_instrumentation: {e}")
+        return jsonify({'error': f'Failed to get query statistics: {str(e)}'}), 500
+
+@admin_bp.route('/database/queries/reset', methods=['POST'])
+@token_required
+@role_required('admin')
+def reset_query_instrumentation():
+    """Reset the collected database statistics for this instance"""
+    try:
+        from utils.query_instrumentation import query_stats
+        query_stats.reset()
+        return jsonify({
+            'message': 'Query statistics reset',
+            'timestamp': datetime.now(timezone.utc).isoformat() + 'Z'
+        })
+    except Exception as e:
+        return jsonify({'error': f'Failed to reset query statistics: {str(e)}'}), 500
+
+@admin_bp.route('/jobs', methods=['GET'])
+@token_required
+@role_required('admin')
+def get_background_jobs():
+    """Get queue statistics and recent background jobs"""
+    try:
+        from services.job_queue_service import get_queue_stats, JOB_STATUSES
+
+        stats = get_queue_stats()
+        if not stats['success']:
+            return jsonify({'error': stats['error']}), 503
+
+        status = request.args.get('status')
+        limit = min(request.args.get('limit', 50, type=int), 500)
+        conditions, params = [], []
+        if status in JOB_STATUSES:
+            conditions.append('status = %s')
+            params.append(status)
+        if request.args.get('job_type'):
+            conditions.append('job_type = %s')
+            params.append(request.args['job_type'])
+
+        jobs_result = execute_query(f'''
+            SELECT id, job_type, status, priority, attempts, max_attempts, run_at,
+                   locked_by, last_error, created_at, completed_at
+            FROM background_jobs
+            {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+            ORDER BY created_at DESC
+            LIMIT %s
+        ''', (*params, limit))
+
+        from services.webhook_inbox_service import get_webhook_inbox_stats
+        return jsonify({
+            'stats': stats,
+            'jobs': jobs_result['data'] if jobs_result['success'] else [],
+            'webhook_inbox': get_webhook_inbox_stats(),
+            'timestamp': datetime.now(timezone.utc).isoformat() + 'Z'
+        })
+
+    except Exception as e:
+        print(f"Error in get_background_jobs: {e}")
+        return jsonify({'error': f'Failed to get background jobs: {str(e)}'}), 500
+
+@admin_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@token_required
+@role_required('admin')
+def get_background_job(job_id):
+    """Get one background job including its payload and result"""
+    try:
+        from services.job_queue_service import get_job
+        job = get_job(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job)
+    except Exception as e:
+        return jsonify({'error': f'Failed to get job: {str(e)}'}), 500
+
+@admin_bp.route('/jobs/<int:job_id>/retry', methods=['POST'])
+@token_required
+@role_required('admin')
+def retry_background_job(job_id):
+    """Requeue a failed or cancelled job"""
+    try:
+        from services.job_queue_service import retry_job
+        if not retry_job(job_id):
+            return jsonify({'error': 'Job not found or not in a retryable state'}), 409
+        return jsonify({'message': 'Job requeued', 'job_id': job_id})
+    except Exception as e:
+        return jsonify({'error': f'Failed to retry job: {str(e)}'}), 500
+
+@admin_bp.route('/jobs/run', methods=['POST'])
+@token_required
+@role_required('admin')
+def run_background_jobs():
+    """Run ready jobs in this function invocation (for deployments without a worker process)"""
+    try:
+        from services.job_queue_service import run_pending_jobs
+        data = request.get_json(silent=True) or {}
+        result = run_pending_jobs(
+            max_jobs=min(int(data.get('max_jobs', 25)), 200),
+            time_budget_seconds=min(float(data.get('time_budget_seconds', 45)), 280),
+            job_types=data.get('job_types')
+        )
+        if not result['success']:
+            return jsonify({'error': result['error']}), 503
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': f'Failed to run jobs: {str(e)}'}), 500
+
+@admin_bp.route('/jobs/cron', methods=['GET'])
+def run_background_jobs_cron():
+    """Vercel Cron entry point: drain ready jobs, authenticated by CRON_SECRET instead of an admin token"""
+    from services.job_queue_service import run_pending_jobs, cron_request_authorized, JOB_CRON_TIME_BUDGET_SECONDS
+    if not cron_request_authorized(request.headers.get('Authorization')):
+        return jsonify({'error': 'Unauthorized'}), 401
+    try:
+        result = run_pending_jobs(max_jobs=200, time_budget_seconds=JOB_CRON_TIME_BUDGET_SECONDS)
+        if not result['success']:
+            return jsonify({'error': result['error']}), 503
+        # Per-job detail stays in background_jobs; the cron log only needs the totals
+        return jsonify({key: value for key, value in result.items() if key != 'jobs'})
+    except Exception as e:
+        return jsonify({'error': f'Failed to run jobs: {str(e)}'}), 500
+
 @admin_bp.route('/maintenance', methods=['POST'])
 @token_required
 @role_required('admin')
@@ -1204,7 +1385,7 @@ def trigger_maintenance():
         task = data.get('task')
         admin_id = request.current_user.get('user_id')
         
-        valid_tasks = ['clear_cache', 'cleanup_logs', 'backup_database', 'refresh_settings']
+        valid_tasks = ['clear_cache', 'cleanup_logs', 'backup_database', 'refresh_settings', 'maintain_partitions']
         
         if task not in valid_tasks:
             return jsonify({'error': f'Invalid task. Must be one of: {", ".join(valid_tasks)}'}), 400
@@ -1233,6 +1414,14 @@ def trigger_maintenance():
             else:
                 maintenance_result['details']['message'] = 'Database not available for cleanup'
         
+        elif task == 'maintain_partitions':
+            # Premake monthly partitions and drop expired ones
+            from utils.partitioning import maintain_partitions, get_partition_status
+            maintenance_result['details'] = {
+                'maintenance': maintain_partitions(),
+                'status': get_partition_status()
+            }
+        
         elif task == 'backup_database':
             # Create database backup
             maintenance_result['details']['message'] = 'Backup functionality would be implemented here'
@@ -1330,6 +1519,7 @@ def update_product_pricing(product_code):
                     ''', (product_code, term, float(multiplier), customer_type))
 
         conn.commit()
+        invalidate_snapshot('invalidated by admin rate update')
         cursor.close()
         conn.close()
 
@@ -1583,6 +1773,7 @@ def update_base_rate(rate_id):
             return jsonify({'error': 'Failed to update base rate'}), 500
             
         conn.commit()
+        invalidate_snapshot('invalidated by admin rate update')
         
         # Convert to dictionary format
         rate_data = {
@@ -1899,6 +2090,7 @@ def create_coverage_level():
 
         level_id, created_at = cursor.fetchone()
         conn.commit()
+        invalidate_snapshot('invalidated by admin rate update')
         cursor.close()
         conn.close()
 
@@ -1991,6 +2183,7 @@ def update_coverage_level(level_id):
             return jsonify({'error': 'Failed to update coverage level'}), 500
             
         conn.commit()
+        invalidate_snapshot('invalidated by admin rate update')
         
         # Convert to dictionary format
         level_data = {
@@ -2062,6 +2255,7 @@ def create_vehicle_classification():
 
         class_id, created_at = cursor.fetchone()
         conn.commit()
+        invalidate_snapshot('invalidated by admin rate update')
         cursor.close()
         conn.close()
 
@@ -2201,6 +2395,7 @@ def update_vsc_rate(rate_id):
             return jsonify({'error': 'Failed to update rate'}), 500
             
         conn.commit()
+        invalidate_snapshot('invalidated by admin rate update')
         
         # Convert to dictionary format
         rate_data = {
@@ -2327,6 +2522,7 @@ def update_term_multiplier(multiplier_id):
             return jsonify({'error': 'Failed to update term multiplier'}), 500
             
         conn.commit()
+        invalidate_snapshot('invalidated by admin rate update')
         
         # Convert to dictionary format
         multiplier_data = {
@@ -2439,6 +2635,7 @@ def update_vehicle_class(class_id):
             return jsonify({'error': 'Failed to update vehicle classification'}), 500
             
         conn.commit()
+        invalidate_snapshot('invalidated by admin rate update')
         
         # Convert to dictionary format
         class_data = {
@@ -2476,60 +2673,118 @@ def calculate_reseller_commission(reseller_id):
         period_start = datetime.fromisoformat(data['period_start'].replace('Z', '+00:00'))
         period_end = datetime.fromisoformat(data['period_end'].replace('Z', '+00:00'))
         
-        # Get all sales for the period
-        sales_result = execute_query('''
-            SELECT id, gross_amount, commission_amount, commission_status
-            FROM reseller_sales
-            WHERE reseller_id = %s 
-            AND sale_date >= %s 
-            AND sale_date <= %s
-            ORDER BY sale_date
-        ''', (reseller_id, period_start.date(), period_end.date()), 'all')
-        
-        if not sales_result['success']:
-            return jsonify('Failed to fetch sales data'), 500
-        
-        sales_data = sales_result['data'] or []
-        total_sales = sum(sale[1] for sale in sales_data)
-        total_commission = sum(sale[2] for sale in sales_data)
-        
-        # Create or update commission record
-        commission_result = execute_query('''
-            INSERT INTO reseller_commissions (
-                reseller_id, period_start, period_end, total_sales_amount,
-                total_commission_amount, status, commission_details
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (reseller_id, period_start, period_end) 
-            DO UPDATE SET
-                total_sales_amount = EXCLUDED.total_sales_amount,
-                total_commission_amount = EXCLUDED.total_commission_amount,
-                commission_details = EXCLUDED.commission_details,
-                updated_at = CURRENT_TIMESTAMP
-            RETURNING id
-        ''', (
-            reseller_id, period_start.date(), period_end.date(),
-            total_sales, total_commission, 'ready',
-            json.dumps([{
-                'sale_id': str(sale[0]),
-                'gross_amount': float(sale[1]),
-                'commission_amount': float(sale[2]),
-                'status': sale[3]
-            } for sale in sales_data])
-        ), 'one')
-        
-        return jsonify({
-            'success': True,
-            'total_sales': float(total_sales),
-            'total_commission': float(total_commission),
-            'sales_count': len(sales_data),
-            'commission_id': str(commission_result['data'][0]) if commission_result['success'] else None
-        })
+        if data.get('async'):
+            from services.job_queue_service import enqueue_job
+            queued = enqueue_job('commission.calculate', {
+                'reseller_id': reseller_id,
+                'period_start': period_start.date().isoformat(),
+                'period_end': period_end.date().isoformat()
+            }, dedupe_key=f"commission:{reseller_id}:{period_start.date()}:{period_end.date()}")
+            if queued['success']:
+                return jsonify({'success': True, 'queued': True, 'job_id': queued['job_id']}), 202
+        
+        result = calculate_commission_period(reseller_id, period_start.date(), period_end.date())
+        if not result['success']:
+            return jsonify(result['error']), 500
+        return jsonify(result)
         
     except Exception as e:
         return jsonify(f'Failed to calculate commission: {str(e)}'), 500
 
 
+def calculate_commission_period(reseller_id, period_start, period_end):
+    """
+    Roll a reseller's sales for the period into a reseller_commissions row
+
+    status tells the outcomes apart: 'calculated', 'already_paid' (the paid row
+    is left as it was and its amounts are returned) or 'no_sales' (an unpaid
+    row from an earlier run is zeroed and its id returned).
+    """
+    from services.commission_service import run_commission_batch
+    result = run_commission_batch(period_start, period_end, [reseller_id])
+    if not result['success']:
+        return {'success': False, 'error': 'Failed to calculate commission'}
+
+    if result['commissions']:
+        commission = result['commissions'][0]
+        return {
+            'success': True,
+            'status': 'calculated' if commission['sales_count'] else 'no_sales',
+            'total_sales': commission['total_sales'],
+            'total_commission': commission['total_commission'],
+            'sales_count': commission['sales_count'],
+            'commission_id': commission['commission_id']
+        }
+
+    # Nothing was upserted: either the period is already paid or there were no sales
+    paid = execute_query('''
+        SELECT id, total_sales_amount, total_commission_amount, commission_details
+        FROM reseller_commissions
+        WHERE reseller_id = %s AND period_start = %s AND period_end = %s AND status = 'paid'
+    ''', (reseller_id, period_start, period_end), 'one')
+    if not paid['success']:
+        return {'success': False, 'error': 'Failed to calculate commission'}
+
+    if paid['data']:
+        row = paid['data']
+        details = row['commission_details'] if isinstance(row['commission_details'], dict) else {}
+        return {
+            'success': True,
+            'status': 'already_paid',
+            'total_sales': float(row['total_sales_amount'] or 0),
+            'total_commission': float(row['total_commission_amount'] or 0),
+            'sales_count': details.get('sales_count', 0),
+            'commission_id': str(row['id'])
+        }
+
+    return {
+        'success': True,
+        'status': 'no_sales',
+        'total_sales': 0.0,
+        'total_commission': 0.0,
+        'sales_count': 0,
+        'commission_id': None
+    }
+
+
+@admin_bp.route('/commissions/run', methods=['POST'])
+@token_required
+@role_required('admin')
+def run_commissions():
+    """Calculate commissions for every reseller for a period (defaults to last month)"""
+    try:
+        from services.commission_service import run_commission_batch, previous_month
+        data = request.get_json(silent=True) or {}
+        if data.get('period_start') and data.get('period_end'):
+            period_start = datetime.fromisoformat(data['period_start'].replace('Z', '+00:00')).date()
+            period_end = datetime.fromisoformat(data['period_end'].replace('Z', '+00:00')).date()
+        else:
+            period_start, period_end = previous_month()
+        if period_end < period_start:
+            return jsonify('period_end must not be before period_start'), 400
+        reseller_ids = data.get('reseller_ids')
+
+        if data.get('async'):
+            from services.job_queue_service import enqueue_job
+            queued = enqueue_job('commission.batch', {
+                'period_start': period_start.isoformat(),
+                'period_end': period_end.isoformat(),
+                'reseller_ids': reseller_ids
+            }, dedupe_key=None if reseller_ids else f"commission-batch:{period_start}:{period_end}")
+            if queued['success']:
+                return jsonify({'success': True, 'queued': True, 'job_id': queued['job_id']}), 202
+
+        result = run_commission_batch(period_start, period_end, reseller_ids)
+        if not result['success']:
+            return jsonify(result['error']), 500
+        return jsonify(result)
+
+    except ValueError as e:
+        return jsonify(f'Invalid period: {str(e)}'), 400
+    except Exception as e:
+        return jsonify(f'Failed to run commissions: {str(e)}'), 500
+
+
 @admin_bp.route('/resellers/<reseller_id>/commissions/<commission_id>/pay', methods=['POST'])
 @token_required
 @role_required('admin')
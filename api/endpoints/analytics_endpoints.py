@@ -3,10 +3,14 @@ Analytics & Reporting Endpoints
 KPI dashboards, business reports, and data analytics
 """
 
-from flask import Blueprint, request, jsonify, make_response
+from flask import Blueprint, request, jsonify, make_response, Response, stream_with_context
 from datetime import datetime, timezone, timedelta
 from auth.user_auth import token_required, role_required
 from utils.database import get_db_manager, execute_query, paginate_query
+from utils.generated_columns import generated_column
+from services.dashboard_snapshot_service import get_dashboard_snapshot, get_dashboard_snapshot_stats
+from services.revenue_rollup_service import get_revenue_series
+from services.metrics_stream_service import stream_real_time_metrics, get_metrics_stream_stats
 
 # Initialize blueprint
 analytics_bp = Blueprint('analytics', __name__)
@@ -61,12 +65,24 @@ def analytics_health():
             'report_generation': analytics_services_available,
             'data_export': analytics_services_available,
             'kpi_calculations': analytics_services_available,
-            'real_time_metrics': False
+            'real_time_metrics': True
         },
+        'dashboard_snapshots': get_dashboard_snapshot_stats(),
+        'metrics_stream': get_metrics_stream_stats(),
         'timestamp': datetime.now(timezone.utc).isoformat() + "Z"
     })
 
 
+def _snapshot_response(snapshot, snapshot_status):
+    """Serve a pre-serialized dashboard snapshot with its age"""
+    response = make_response(snapshot.body)
+    response.mimetype = 'application/json'
+    response.headers['X-Snapshot-Status'] = snapshot_status
+    response.headers['X-Snapshot-Age'] = str(int(snapshot.age()))
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
 """
 Enhanced Analytics Dashboard - Updated to include contract data
 """
@@ -78,238 +94,37 @@ Enhanced Analytics Dashboard - Updated to include contract data
 def get_dashboard():
     """Get analytics dashboard data including contract metrics"""
     try:
-        user_id = request.current_user.get('user_id')
-        user_role = request.current_user.get('role')
         date_range = request.args.get('date_range', '30')  # days
 
-        # Calculate date range
-        end_date = datetime.now(timezone.utc)
-        start_date = end_date - timedelta(days=int(date_range))
-
-        db_manager = get_db_manager()
-
-        if db_manager.available:
-            # Get combined transaction and contract data
-
-            # 1. Traditional transaction metrics
-            transactions_result = execute_query('''
-                                                SELECT COUNT(*)                                                                as total_transactions,
-                                                       COUNT(CASE WHEN status = 'completed' THEN 1 END)                        as completed_transactions,
-                                                       COUNT(CASE WHEN status = 'failed' THEN 1 END)                           as failed_transactions,
-                                                       COALESCE(SUM(CASE WHEN status = 'completed' THEN amount ELSE 0 END), 0) as total_revenue,
-                                                       COALESCE(
-                                                               AVG(CASE WHEN status = 'completed' THEN amount ELSE NULL END),
-                                                               0)                                                              as avg_transaction_amount
-                                                FROM transactions
-                                                WHERE created_at >= %s
-                                                  AND created_at <= %s
-                                                ''', (start_date, end_date), 'one')
-
-            # 2. Contract metrics
-            contract_metrics_result = execute_query('''
-                                                    SELECT COUNT(*)                                         as total_contracts,
-                                                           COUNT(CASE WHEN status = 'active' THEN 1 END)    as active_contracts,
-                                                           COUNT(CASE WHEN status = 'signed' THEN 1 END)    as signed_contracts,
-                                                           COUNT(CASE WHEN generated_date >= %s THEN 1 END) as contracts_this_period
-                                                    FROM generated_contracts
-                                                    WHERE generated_date >= %s - INTERVAL '90 days'
-                                                    ''', (start_date, start_date), 'one')
-
-            # 3. Revenue from contracts (if contract_value exists)
-            contract_revenue_result = execute_query('''
-                                                    SELECT COALESCE(SUM(contract_value), 0) as contract_revenue,
-                                                           COUNT(*)                         as revenue_generating_contracts
-                                                    FROM generated_contracts
-                                                    WHERE generated_date >= %s
-                                                      AND generated_date <= %s
-                                                      AND contract_value IS NOT NULL
-                                                      AND contract_value > 0
-                                                    ''', (start_date, end_date), 'one')
-
-            # 4. Daily trends combining both sources
-            daily_trends_result = execute_query('''
-                                                WITH transaction_daily AS (SELECT
-                                                    DATE (created_at) as date
-                                                   , COUNT (*) as transaction_count
-                                                   , COALESCE (SUM (CASE WHEN status = 'completed' THEN amount ELSE 0 END)
-                                                   , 0) as transaction_revenue
-                                                FROM transactions
-                                                WHERE created_at >= %s
-                                                  AND created_at <= %s
-                                                GROUP BY DATE (created_at)
-                                                    ),
-                                                    contract_daily AS (
-                                                SELECT
-                                                    DATE (generated_date) as date, COUNT (*) as contract_count, COALESCE (SUM (contract_value), 0) as contract_revenue
-                                                FROM generated_contracts
-                                                WHERE generated_date >= %s
-                                                  AND generated_date <= %s
-                                                GROUP BY DATE (generated_date)
-                                                    )
-                                                SELECT COALESCE(t.date, c.date) as date,
-                    COALESCE(t.transaction_count, 0) as transaction_count,
-                    COALESCE(t.transaction_revenue, 0) as transaction_revenue,
-                    COALESCE(c.contract_count, 0) as contract_count,
-                    COALESCE(c.contract_revenue, 0) as contract_revenue,
-                    COALESCE(t.transaction_revenue, 0) + COALESCE(c.contract_revenue, 0) as total_daily_revenue
-                                                FROM transaction_daily t
-                                                    FULL OUTER JOIN contract_daily c
-                                                ON t.date = c.date
-                                                ORDER BY date
-                                                ''', (start_date, end_date, start_date, end_date))
-
-            # 5. Product performance including contracts
-            product_performance_result = execute_query('''
-                                                       WITH transaction_products
-                                                                AS (SELECT COALESCE(metadata ->>'product_type', 'unknown')                         as product_type,
-                                                                           COUNT(*)                                                                as quote_count,
-                                                                           COUNT(CASE WHEN status = 'completed' THEN 1 END)                        as conversion_count,
-                                                                           COALESCE(SUM(CASE WHEN status = 'completed' THEN amount ELSE 0 END), 0) as revenue
-                                                                    FROM transactions
-                                                                    WHERE created_at >= %s
-                                                                      AND created_at <= %s
-                                                                      AND metadata ->>'product_type' IS NOT NULL
-                                                       GROUP BY metadata->>'product_type'
-                                                           ),
-                                                           contract_products AS (
-                                                       SELECT
-                                                           COALESCE (product_type, 'contract') as product_type, COUNT (*) as contract_count, COUNT (CASE WHEN status IN ('active', 'signed') THEN 1 END) as active_contracts, COALESCE (SUM (contract_value), 0) as contract_revenue
-                                                       FROM generated_contracts gc
-                                                           JOIN contract_templates ct
-                                                       ON gc.template_id = ct.template_id
-                                                       WHERE gc.generated_date >= %s
-                                                         AND gc.generated_date <= %s
-                                                       GROUP BY ct.product_type
-                                                           )
-                                                       SELECT COALESCE(tp.product_type, cp.product_type)                 as product_type,
-                                                              COALESCE(tp.quote_count, 0)                                as quote_count,
-                                                              COALESCE(tp.conversion_count, 0)                           as conversion_count,
-                                                              COALESCE(tp.revenue, 0)                                    as transaction_revenue,
-                                                              COALESCE(cp.contract_count, 0)                             as contract_count,
-                                                              COALESCE(cp.active_contracts, 0)                           as active_contracts,
-                                                              COALESCE(cp.contract_revenue, 0)                           as contract_revenue,
-                                                              COALESCE(tp.revenue, 0) + COALESCE(cp.contract_revenue, 0) as total_revenue
-                                                       FROM transaction_products tp
-                                                                FULL OUTER JOIN contract_products cp ON tp.product_type = cp.product_type
-                                                       ORDER BY total_revenue DESC
-                                                       ''', (start_date, end_date, start_date, end_date))
-
-            # Build comprehensive dashboard data
-            dashboard_data = {
-                'period': {
-                    'start_date': start_date.isoformat(),
-                    'end_date': end_date.isoformat(),
-                    'days': int(date_range)
-                },
-                'revenue_metrics': {
-                    'total_revenue': 0,
-                    'current_period_revenue': 0,
-                    'average_transaction_value': 0,
-                    'growth_rate': 0,
-                    'revenue_by_period': {}
-                },
-                'customer_metrics': {
-                    'total_customers': 0,
-                    'new_customers_this_month': 0,
-                    'retention_rate': 85.0  # Default value
-                },
-                'product_metrics': {
-                    'product_metrics': {}
-                },
-                'operational_metrics': {
-                    'active_policies': 0,
-                    'total_transactions': 0,
-                    'policies_expiring_soon': 0
-                }
-            }
-
-            # Process transaction metrics
-            if transactions_result['success'] and transactions_result['data']:
-                txn_data = transactions_result['data']
-                dashboard_data['revenue_metrics']['current_period_revenue'] = float(txn_data['total_revenue'] or 0)
-                dashboard_data['revenue_metrics']['average_transaction_value'] = float(
-                    txn_data['avg_transaction_amount'] or 0)
-                dashboard_data['operational_metrics']['total_transactions'] = txn_data['total_transactions'] or 0
-
-            # Process contract metrics
-            if contract_metrics_result['success'] and contract_metrics_result['data']:
-                contract_data = contract_metrics_result['data']
-                dashboard_data['operational_metrics']['active_policies'] = contract_data['active_contracts'] or 0
-                dashboard_data['operational_metrics']['policies_expiring_soon'] = 0  # Would need expiration date logic
-
-            # Add contract revenue to total revenue
-            if contract_revenue_result['success'] and contract_revenue_result['data']:
-                contract_rev = float(contract_revenue_result['data']['contract_revenue'] or 0)
-                dashboard_data['revenue_metrics']['current_period_revenue'] += contract_rev
-                dashboard_data['revenue_metrics']['total_revenue'] = dashboard_data['revenue_metrics'][
-                    'current_period_revenue']
-
-            # Process daily trends
-            if daily_trends_result['success'] and daily_trends_result['data']:
-                for row in daily_trends_result['data']:
-                    date_key = row['date'].strftime('%Y-%m')
-                    if date_key not in dashboard_data['revenue_metrics']['revenue_by_period']:
-                        dashboard_data['revenue_metrics']['revenue_by_period'][date_key] = 0
-                    dashboard_data['revenue_metrics']['revenue_by_period'][date_key] += float(
-                        row['total_daily_revenue'])
-
-            # Process product performance
-            if product_performance_result['success'] and product_performance_result['data']:
-                for row in product_performance_result['data']:
-                    product_type = row['product_type']
-                    dashboard_data['product_metrics']['product_metrics'][product_type] = {
-                        'total_revenue': float(row['total_revenue']),
-                        'sales_count': (row['conversion_count'] or 0) + (row['active_contracts'] or 0),
-                        'quote_count': row['quote_count'] or 0,
-                        'contract_count': row['contract_count'] or 0
-                    }
-
-            # Calculate estimated customer count (would be better with proper customer table)
-            try:
-                customer_count_result = execute_query('''
-                                                      SELECT COUNT(DISTINCT customer_id) as total_customers
-                                                      FROM (SELECT customer_id
-                                                            FROM transactions
-                                                            WHERE customer_id IS NOT NULL
-                                                            UNION
-                                                            SELECT customer_data ->>'customer_id' as customer_id
-                                                            FROM generated_contracts
-                                                            WHERE customer_data->>'customer_id' IS NOT NULL) combined_customers
-                                                      ''', (), 'one')
-
-                if customer_count_result['success'] and customer_count_result['data']:
-                    dashboard_data['customer_metrics']['total_customers'] = customer_count_result['data'][
-                                                                                'total_customers'] or 0
-            except:
-                dashboard_data['customer_metrics']['total_customers'] = 0
-
-            return jsonify(dashboard_data)
-
-        else:
-            # Enhanced fallback data that matches the expected structure
-            return jsonify({
-                'revenue_metrics': {
-                    'total_revenue': 0,
-                    'current_period_revenue': 0,
-                    'average_transaction_value': 0,
-                    'growth_rate': 0,
-                    'revenue_by_period': {}
-                },
-                'customer_metrics': {
-                    'total_customers': 0,
-                    'new_customers_this_month': 0,
-                    'retention_rate': 0
-                },
-                'product_metrics': {
-                    'product_metrics': {}
-                },
-                'operational_metrics': {
-                    'active_policies': 0,
-                    'total_transactions': 0,
-                    'policies_expiring_soon': 0
-                },
-                'message': 'Database not available - showing placeholder data'
-            })
+        # Every admin shares one snapshot per date range
+        snapshot, snapshot_status = get_dashboard_snapshot('dashboard', int(date_range))
+        if snapshot is not None:
+            return _snapshot_response(snapshot, snapshot_status)
+
+        # Enhanced fallback data that matches the expected structure
+        return jsonify({
+            'revenue_metrics': {
+                'total_revenue': 0,
+                'current_period_revenue': 0,
+                'average_transaction_value': 0,
+                'growth_rate': 0,
+                'revenue_by_period': {}
+            },
+            'customer_metrics': {
+                'total_customers': 0,
+                'new_customers_this_month': 0,
+                'retention_rate': 0
+            },
+            'product_metrics': {
+                'product_metrics': {}
+            },
+            'operational_metrics': {
+                'active_policies': 0,
+                'total_transactions': 0,
+                'policies_expiring_soon': 0
+            },
+            'message': 'Database not available - showing placeholder data'
+        })
 
     except Exception as e:
         return jsonify({'error': f'Failed to generate dashboard: {str(e)}'}), 500
@@ -455,9 +270,10 @@ def generate_report(report_type):
         
         elif report_type == 'product_performance':
             # Product performance report
-            result = execute_query('''
+            product_type = generated_column('transactions', 'product_type')
+            result = execute_query(f'''
                 SELECT 
-                    COALESCE(metadata->>'product_type', 'unknown') as product_type,
+                    COALESCE({product_type}, 'unknown') as product_type,
                     COUNT(*) as total_quotes,
                     COUNT(CASE WHEN status = 'completed' THEN 1 END) as conversions,
                     ROUND((COUNT(CASE WHEN status = 'completed' THEN 1 END) * 100.0 / COUNT(*)), 2) as conversion_rate,
@@ -465,7 +281,7 @@ def generate_report(report_type):
                     COALESCE(AVG(CASE WHEN status = 'completed' THEN amount ELSE NULL END), 0) as avg_revenue_per_sale
                 FROM transactions 
                 WHERE created_at >= %s AND created_at <= %s
-                GROUP BY metadata->>'product_type'
+                GROUP BY {product_type}
                 ORDER BY revenue DESC
             ''', (start_date, end_date))
             
@@ -561,7 +377,7 @@ def generate_report(report_type):
             page = request.args.get('page', 1, type=int)
             per_page = request.args.get('per_page', 100, type=int)
             
-            base_query = '''
+            base_query = f'''
                 SELECT 
                     t.transaction_number,
                     t.customer_id,
@@ -571,7 +387,7 @@ def generate_report(report_type):
                     t.type,
                     t.created_at,
                     t.processed_at,
-                    t.metadata->>'product_type' as product_type,
+                    {generated_column('transactions', 'product_type', 't')} as product_type,
                     c.email as customer_email
                 FROM transactions t
                 LEFT JOIN customers c ON t.customer_id = c.customer_id
@@ -704,65 +520,30 @@ def export_report(report_type):
 def get_real_time_metrics():
     """Get real-time metrics for live dashboard"""
     try:
-        db_manager = get_db_manager()
-        
-        if not db_manager.available:
+        snapshot, snapshot_status = get_dashboard_snapshot('real_time')
+        if snapshot is None:
             return jsonify('Database not available for real-time metrics'), 503
-        
-        # Get metrics for the last 24 hours
-        last_24h = datetime.now(timezone.utc) - timedelta(hours=24)
-        
-        # Recent transactions
-        recent_transactions = execute_query('''
-            SELECT COUNT(*) as count
-            FROM transactions 
-            WHERE created_at >= %s
-        ''', (last_24h,), 'one')
-        
-        # Recent revenue
-        recent_revenue = execute_query('''
-            SELECT COALESCE(SUM(CASE WHEN status = 'completed' THEN amount ELSE 0 END), 0) as revenue
-            FROM transactions 
-            WHERE created_at >= %s
-        ''', (last_24h,), 'one')
-        
-        # Active sessions (would require session tracking in production)
-        active_sessions = 0  # Placeholder
-        
-        # Recent quotes by hour
-        hourly_quotes = execute_query('''
-            SELECT 
-                EXTRACT(hour from created_at) as hour,
-                COUNT(*) as quote_count
-            FROM transactions 
-            WHERE created_at >= %s
-            GROUP BY EXTRACT(hour from created_at)
-            ORDER BY hour
-        ''', (last_24h,))
-        
-        real_time_metrics = {
-            'last_24_hours': {
-                'transactions': recent_transactions['data']['count'] if recent_transactions['success'] else 0,
-                'revenue': float(recent_revenue['data']['revenue']) if recent_revenue['success'] else 0.0,
-                'active_sessions': active_sessions
-            },
-            'hourly_distribution': []
-        }
-        
-        if hourly_quotes['success']:
-            for row in hourly_quotes['data']:
-                real_time_metrics['hourly_distribution'].append({
-                    'hour': int(row['hour']),
-                    'quote_count': row['quote_count']
-                })
-        
-        real_time_metrics['updated_at'] = datetime.now(timezone.utc).isoformat() + 'Z'
-        
-        return jsonify(real_time_metrics)
+
+        return _snapshot_response(snapshot, snapshot_status)
 
     except Exception as e:
         return jsonify(f'Failed to get real-time metrics: {str(e)}'), 500
 
+@analytics_bp.route('/metrics/stream', methods=['GET'])
+@token_required
+@role_required('wholesale_reseller')
+def stream_metrics():
+    """Server-Sent Events stream of real-time metrics: a snapshot, then deltas as they change"""
+    if not get_db_manager().available:
+        return jsonify('Database not available for real-time metrics'), 503
+
+    last_event_id = request.headers.get('Last-Event-ID')
+    response = Response(stream_with_context(stream_real_time_metrics(last_event_id)),
+                        mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-store'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @analytics_bp.route('/kpi-summary', methods=['GET'])
 @token_required
 @role_required('wholesale_reseller')
@@ -771,88 +552,43 @@ def get_kpi_summary():
     try:
         date_range = request.args.get('period', '30')  # days
         compare_previous = request.args.get('compare', 'true').lower() == 'true'
-        
-        # Current period
-        end_date = datetime.now(timezone.utc)
-        start_date = end_date - timedelta(days=int(date_range))
-        
-        # Previous period for comparison
-        prev_end_date = start_date
-        prev_start_date = prev_end_date - timedelta(days=int(date_range))
-        
-        db_manager = get_db_manager()
-        
-        if not db_manager.available:
+
+        snapshot, snapshot_status = get_dashboard_snapshot('kpi_summary', int(date_range), compare_previous)
+        if snapshot is None:
             return jsonify('Database not available for KPI calculation'), 503
-        
-        # Current period KPIs
-        current_kpis = execute_query('''
-            SELECT 
-                COUNT(*) as total_quotes,
-                COUNT(CASE WHEN status = 'completed' THEN 1 END) as conversions,
-                COALESCE(SUM(CASE WHEN status = 'completed' THEN amount ELSE 0 END), 0) as revenue,
-                COUNT(DISTINCT customer_id) as unique_customers,
-                COALESCE(AVG(CASE WHEN status = 'completed' THEN amount ELSE NULL END), 0) as avg_order_value
-            FROM transactions 
-            WHERE created_at >= %s AND created_at <= %s
-        ''', (start_date, end_date), 'one')
-        
-        kpi_summary = {
-            'period': {
-                'start_date': start_date.isoformat(),
-                'end_date': end_date.isoformat(),
-                'days': int(date_range)
-            },
-            'kpis': {}
-        }
-        
-        if current_kpis['success'] and current_kpis['data']:
-            current_data = current_kpis['data']
-            conversion_rate = (current_data['conversions'] / current_data['total_quotes'] * 100) if current_data['total_quotes'] > 0 else 0
-            
-            kpi_summary['kpis'] = {
-                'total_quotes': current_data['total_quotes'],
-                'conversions': current_data['conversions'],
-                'conversion_rate': round(conversion_rate, 2),
-                'revenue': float(current_data['revenue']),
-                'unique_customers': current_data['unique_customers'],
-                'avg_order_value': float(current_data['avg_order_value'])
-            }
-            
-            # Calculate growth rates if comparison is requested
-            if compare_previous:
-                prev_kpis = execute_query('''
-                    SELECT 
-                        COUNT(*) as total_quotes,
-                        COUNT(CASE WHEN status = 'completed' THEN 1 END) as conversions,
-                        COALESCE(SUM(CASE WHEN status = 'completed' THEN amount ELSE 0 END), 0) as revenue,
-                        COUNT(DISTINCT customer_id) as unique_customers,
-                        COALESCE(AVG(CASE WHEN status = 'completed' THEN amount ELSE NULL END), 0) as avg_order_value
-                    FROM transactions 
-                    WHERE created_at >= %s AND created_at <= %s
-                ''', (prev_start_date, prev_end_date), 'one')
-                
-                if prev_kpis['success'] and prev_kpis['data']:
-                    prev_data = prev_kpis['data']
-                    
-                    growth_rates = {}
-                    for key in ['total_quotes', 'conversions', 'revenue', 'unique_customers', 'avg_order_value']:
-                        current_val = float(current_data[key]) if current_data[key] else 0
-                        prev_val = float(prev_data[key]) if prev_data[key] else 0
-                        
-                        if prev_val > 0:
-                            growth_rate = ((current_val - prev_val) / prev_val) * 100
-                            growth_rates[f'{key}_growth'] = round(growth_rate, 2)
-                        else:
-                            growth_rates[f'{key}_growth'] = 0 if current_val == 0 else 100
-                    
-                    kpi_summary['growth_rates'] = growth_rates
-                    kpi_summary['comparison_period'] = {
-                        'start_date': prev_start_date.isoformat(),
-                        'end_date': prev_end_date.isoformat()
-                    }
-        
-        return jsonify(kpi_summary)
+
+        return _snapshot_response(snapshot, snapshot_status)
+
+    except Exception as e:
+        return jsonify(f'Failed to calculate KPIs: {str(e)}'), 500
+
+
+@analytics_bp.route('/revenue/series', methods=['GET'])
+@token_required
+@role_required('wholesale_reseller')
+def get_revenue_series_endpoint():
+    """Gap-filled hourly or daily revenue series from the rollup tables"""
+    try:
+        granularity = request.args.get('granularity', 'day')
+        end_date = datetime.fromisoformat(request.args['end']) if request.args.get('end') else datetime.now(timezone.utc)
+        if request.args.get('start'):
+            start_date = datetime.fromisoformat(request.args['start'])
+        else:
+            start_date = end_date - timedelta(days=int(request.args.get('days', 30)))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid range: {str(e)}'}), 400
+
+    try:
+        result = get_revenue_series(
+            start_date, end_date, granularity,
+            product_type=request.args.get('product_type'),
+            reseller_id=request.args.get('reseller_id')
+        )
+        if not result['success']:
+            status = 503 if result['error'] == 'Database not available' else 400
+            return jsonify({'error': result['error']}), status
+
+        return jsonify(result)
 
     except Exception as e:
-        return jsonify(f'Failed to calculate KPIs: {str(e)}'), 500
\ No newline at end of file
+        return jsonify({'error': f'Failed to get revenue series: {str(e)}'}), 500
@@ -7,23 +7,26 @@ from flask import Blueprint, jsonify, request
 from datetime import datetime, timezone
 from utils.database import get_db_manager, execute_query
 from auth.user_auth import token_required, role_required
+from utils.http_cache import cached_response, register_cache_invalidation, uncacheable
 
 # Initialize blueprint
 contact_bp = Blueprint('contact', __name__)
+register_cache_invalidation(contact_bp, 'contact')
 
 @contact_bp.route('/', methods=['GET'])
+@cached_response(ttl=300, tags=('contact',))
 def get_contact_info():
     """Get current contact information"""
     try:
         db_manager = get_db_manager()
         if not db_manager.available:
             # Fallback to default values if database is not available
-            return jsonify({
+            return uncacheable(jsonify({
                 'phone': '1-(866) 660-7003',
                 'email': 'support@connectedautocare.com',
                 'support_hours': '24/7',
                 'data_source': 'fallback'
-            })
+            }))
 
         # Get contact info from database
         contact_result = execute_query('''
@@ -8,6 +8,7 @@ from datetime import datetime, timezone
 import uuid
 import json
 from utils.database import get_db_manager, execute_query
+from utils.prepared_statements import execute_prepared
 from utils.service_availability import ServiceChecker
 
 # Initialize blueprint
@@ -403,11 +404,7 @@ def get_customer_dashboard():
         
         if db_manager.available:
             # Get customer ID
-            customer_result = execute_query(
-                'SELECT customer_id FROM customers WHERE user_id = %s',
-                (user_id,),
-                'one'
-            )
+            customer_result = execute_prepared('customer_id_by_user_id', (user_id,))
             
             if customer_result['success'] and customer_result['data']:
                 customer_id = customer_result['data'][0]
@@ -543,11 +540,7 @@ def get_customer_quotes():
         
         if db_manager.available:
             # Get customer ID
-            customer_result = execute_query(
-                'SELECT customer_id FROM customers WHERE user_id = %s',
-                (user_id,),
-                'one'
-            )
+            customer_result = execute_prepared('customer_id_by_user_id', (user_id,))
             
             if customer_result['success'] and customer_result['data']:
                 customer_id = customer_result['data'][0]
@@ -683,11 +676,7 @@ def get_customer_policies():
         
         if db_manager.available:
             # Get customer ID
-            customer_result = execute_query(
-                'SELECT customer_id FROM customers WHERE user_id = %s',
-                (user_id,),
-                'one'
-            )
+            customer_result = execute_prepared('customer_id_by_user_id', (user_id,))
             
             if customer_result['success'] and customer_result['data']:
                 customer_id = customer_result['data'][0]
@@ -873,11 +862,7 @@ def get_customer_transactions():
         
         if db_manager.available:
             # Get customer ID
-            customer_result = execute_query(
-                'SELECT customer_id FROM customers WHERE user_id = %s',
-                (user_id,),
-                'one'
-            )
+            customer_result = execute_prepared('customer_id_by_user_id', (user_id,))
             
             if customer_result['success'] and customer_result['data']:
                 customer_id = customer_result['data'][0]
@@ -1035,11 +1020,7 @@ def get_customer_documents():
         
         if db_manager.available:
             # Get customer ID
-            customer_result = execute_query(
-                'SELECT customer_id FROM customers WHERE user_id = %s',
-                (user_id,),
-                'one'
-            )
+            customer_result = execute_prepared('customer_id_by_user_id', (user_id,))
             
             if customer_result['success'] and customer_result['data']:
                 customer_id = customer_result['data'][0]
@@ -1183,11 +1164,7 @@ def get_support_tickets():
         
         if db_manager.available:
             # Get customer ID
-            customer_result = execute_query(
-                'SELECT customer_id FROM customers WHERE user_id = %s',
-                (user_id,),
-                'one'
-            )
+            customer_result = execute_prepared('customer_id_by_user_id', (user_id,))
             
             if customer_result['success'] and customer_result['data']:
                 customer_id = customer_result['data'][0]
@@ -1264,11 +1241,7 @@ def create_support_ticket():
         
         if db_manager.available:
             # Get customer ID
-            customer_result = execute_query(
-                'SELECT customer_id FROM customers WHERE user_id = %s',
-                (user_id,),
-                'one'
-            )
+            customer_result = execute_prepared('customer_id_by_user_id', (user_id,))
             
             if customer_result['success'] and customer_result['data']:
                 customer_id = customer_result['data'][0]
@@ -1337,11 +1310,7 @@ def get_customer_claims():
         
         if db_manager.available:
             # Get customer ID
-            customer_result = execute_query(
-                'SELECT customer_id FROM customers WHERE user_id = %s',
-                (user_id,),
-                'one'
-            )
+            customer_result = execute_prepared('customer_id_by_user_id', (user_id,))
             
             if customer_result['success'] and customer_result['data']:
                 customer_id = customer_result['data'][0]
@@ -1537,11 +1506,7 @@ def get_customer_analytics():
         
         if db_manager.available:
             # Get customer ID
-            customer_result = execute_query(
-                'SELECT customer_id FROM customers WHERE user_id = %s',
-                (user_id,),
-                'one'
-            )
+            customer_result = execute_prepared('customer_id_by_user_id', (user_id,))
             
             if customer_result['success'] and customer_result['data']:
                 customer_id = customer_result['data'][0]
@@ -6,6 +6,7 @@ Home and auto protection plan quotes and products
 from flask import Blueprint, request, jsonify
 from datetime import datetime, timezone
 from utils.service_availability import ServiceChecker
+from utils.http_cache import cached_response
 
 # Initialize blueprint
 hero_bp = Blueprint('hero', __name__)
@@ -59,6 +60,7 @@ def hero_health():
         return jsonify({"error": f"Hero service error: {str(e)}"}), 500
 
 @hero_bp.route('/products')
+@cached_response(ttl=300, tags=('pricing', 'settings'))
 def get_all_hero_products():
     """Get all Hero products with pricing information"""
     service_checker = ServiceChecker()
@@ -182,6 +184,7 @@ def get_hero_pricing(product_type):
         return jsonify(f"Pricing error: {str(e)}"), 500
 
 @hero_bp.route('/coverage-options')
+@cached_response(ttl=300, tags=('settings',))
 def get_hero_coverage_options():
     """Get available Hero coverage options and limits"""
     service_checker = ServiceChecker()
@@ -217,6 +220,7 @@ def get_hero_coverage_options():
         return jsonify(f"Failed to get coverage options: {str(e)}"), 500
 
 @hero_bp.route('/states')
+@cached_response(ttl=300, tags=('settings',))
 def get_available_states():
     """Get states where Hero products are available"""
     try:
@@ -3,11 +3,12 @@ Payment Processing Endpoints
 Helcim integration, financing, and payment management
 """
 
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, redirect
 from datetime import datetime, timezone, timedelta
+import io
 import json
 import time
-from auth.user_auth import token_required
+from auth.user_auth import token_required, DatabaseUserAuth
 
 # Initialize blueprint
 payment_bp = Blueprint('payment', __name__)
@@ -276,6 +277,13 @@ def save_helcim_transaction(transaction_data):
         if not client_ip or client_ip == '127.0.0.1':
             client_ip = '192.168.1.1'
 
+        from utils.generated_columns import generated_column
+        from utils.database import pin_to_primary
+        contact_email = generated_column('customers', 'contact_email')
+
+        # Checkout writes to the primary; the rest of the request reads its own writes there
+        pin_to_primary()
+
         # Connect to database
         conn = psycopg2.connect(DATABASE_URL)
         cursor = conn.cursor()
@@ -285,10 +293,10 @@ def save_helcim_transaction(transaction_data):
             customer_email = customer_info.get('email', '')
 
             # Check if customer exists by email
-            cursor.execute('''
+            cursor.execute(f'''
                            SELECT id
                            FROM customers
-                           WHERE contact_info ->>'email' = %s
+                           WHERE {contact_email} = %s
                                LIMIT 1;
                            ''', (customer_email,))
 
@@ -401,6 +409,13 @@ def save_helcim_transaction(transaction_data):
             cursor.close()
             conn.close()
 
+            # The quote is paid, so its Helcim invoice must not be offered again
+            try:
+                from services.helcim_customer_cache_service import close_quote_invoices
+                close_quote_invoices(quote_data.get('quote_id'))
+            except ImportError:
+                pass
+
             # Return success response
             return jsonify({
                 'success': True,
@@ -730,6 +745,14 @@ def get_payment_history():
     except Exception as e:
         return jsonify(f"Failed to get payment history: {str(e)}"), 500
 
+def authenticated_user_id():
+    """User id from a valid bearer token, or None; never taken from the request body"""
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return None
+    valid, payload = DatabaseUserAuth.verify_token(auth_header.split(' ', 1)[1])
+    return payload.get('user_id') if valid else None
+
 @payment_bp.route('/create-helcim-session', methods=['POST'])
 def create_helcim_payment_session():
     """Create HelcimPay.js checkout session - enhanced for verify type with proper province handling"""
@@ -744,8 +767,9 @@ def create_helcim_payment_session():
             }), 400
         
         try:
-            from helcim_integration import HelcimPaymentProcessor, CustomerInfo, Address, Currency
-            processor = HelcimPaymentProcessor()
+            from helcim_integration import get_helcim_processor, CustomerInfo, Address, Currency
+            from services.helcim_customer_cache_service import create_checkout_with_reuse, get_or_create_helcim_customer
+            processor = get_helcim_processor()
         except ImportError:
             return jsonify({
                 'success': False,
@@ -798,7 +822,7 @@ def create_helcim_payment_session():
             # FOR VERIFY (TOKENIZATION) - Create customer and minimal session
             print(f"🔍 Creating VERIFY session for tokenization...")
             
-            customer_result = processor.create_customer(customer_info)
+            customer_result = get_or_create_helcim_customer(processor, customer_info, authenticated_user_id())
             if not customer_result['success']:
                 return jsonify({
                     'success': False,
@@ -806,7 +830,7 @@ def create_helcim_payment_session():
                 }), 400
             
             customer_id = customer_result['customer_id']
-            print(f"✅ Customer created successfully: {customer_id}")
+            print(f"✅ Customer {'reused' if customer_result.get('reused') else 'created'} successfully: {customer_id}")
             
             verify_session_result = processor.create_helcimpay_checkout_session(
                 amount=float(data['amount']),
@@ -837,11 +861,15 @@ def create_helcim_payment_session():
             # FOR PURCHASE/PREAUTH - Full customer + invoice flow
             print(f"🛒 Creating {payment_type.upper()} session for payment...")
             
-            result = processor.create_complete_checkout_flow(
+            # Signed-in buyers reuse their Helcim customer and the quote's open invoice
+            result = create_checkout_with_reuse(
+                processor,
                 amount=float(data['amount']),
                 currency=currency,
                 customer_info=customer_info,
-                description=data.get('description', 'ConnectedAutoCare Payment')
+                description=data.get('description', 'ConnectedAutoCare Payment'),
+                user_id=authenticated_user_id(),
+                quote_id=data.get('quote_id')
             )
             
             if result['success']:
@@ -940,8 +968,8 @@ def helcim_webhook():
         
     try:
         try:
-            from helcim_integration import HelcimPaymentProcessor
-            processor = HelcimPaymentProcessor()
+            from helcim_integration import get_helcim_processor
+            processor = get_helcim_processor()
         except ImportError:
             return jsonify({'error': 'Helcim integration not available'}), 503
         
@@ -965,52 +993,23 @@ def helcim_webhook():
         if not transaction_id:
             return jsonify({'error': 'Missing transaction ID'}), 400
         
-        # Update transaction in database
-        conn = psycopg2.connect(DATABASE_URL)
-        cursor = conn.cursor()
+        # Redeliveries keep their webhook-id, so the unique key drops them
+        from services.webhook_inbox_service import record_webhook, process_webhook_inbox, WEBHOOK_APPLY_INLINE
+        event_key = request.headers.get('webhook-id') or f"{transaction_id}:{webhook_type}"
+        # The signature check has already bounded the timestamp to a few minutes of now
+        sent_at = request.headers.get('webhook-timestamp', '')
+        event_at = datetime.fromtimestamp(int(sent_at), timezone.utc) if sent_at.isdigit() else None
+        stored = record_webhook('helcim', event_key, webhook_type, transaction_id, webhook_data, event_at)
+        if not stored['success']:
+            raise Exception(stored.get('error'))
         
-        try:
-            # Find transaction by processor transaction ID
-            cursor.execute('''
-                SELECT id, transaction_number, status
-                FROM transactions 
-                WHERE processor_response->>'transaction_id' = %s;
-            ''', (transaction_id,))
-            
-            transaction = cursor.fetchone()
-            
-            if transaction:
-                # Update transaction status based on webhook
-                new_status = 'completed' if webhook_type == 'transaction.approved' else 'failed'
-                
-                cursor.execute('''
-                    UPDATE transactions 
-                    SET status = %s, 
-                        processed_at = CURRENT_TIMESTAMP,
-                        processor_response = processor_response || %s
-                    WHERE id = %s;
-                ''', (
-                    new_status,
-                    json.dumps({'webhook_received': True, 'webhook_type': webhook_type}),
-                    transaction[0]
-                ))
-                
-                conn.commit()
-                
-                print(f"✅ Webhook processed: {webhook_type} for transaction {transaction[1]}")
-            else:
-                print(f"⚠️ Webhook received for unknown transaction: {transaction_id}")
-            
-            cursor.close()
-            conn.close()
-            
-            return jsonify({'received': True}), 200
-            
-        except Exception as db_error:
-            conn.rollback()
-            cursor.close()
-            conn.close()
-            raise db_error
+        # The webhook.inbox job applies it; inline application is opt-in
+        if WEBHOOK_APPLY_INLINE and not stored['duplicate']:
+            applied = process_webhook_inbox(inbox_id=stored['inbox_id'])
+            if not applied['success']:
+                print(f"⚠️ Webhook {event_key} stored, applying later: {applied.get('error')}")
+        
+        return jsonify({'received': True, 'duplicate': stored['duplicate']}), 200
         
     except Exception as e:
         print(f"❌ Webhook processing error: {str(e)}")
@@ -1154,7 +1153,7 @@ def generate_contract_for_transaction(transaction_id):
                            transaction['created_by']  # Who created this
                        ))
 
-        contract_id = cursor.fetchone()[0]
+        contract_id = cursor.fetchone()['id']
 
         # Log activity in contract_activities table
         cursor.execute('''
@@ -1206,6 +1205,11 @@ def generate_contract_for_transaction(transaction_id):
         cursor.close()
         conn.close()
 
+        # Render the PDF ahead of the first download
+        from services.job_queue_service import enqueue_job
+        enqueue_job('contract_pdf.generate', {'transaction_number': transaction['transaction_number']},
+                    dedupe_key=f"contract_pdf:{transaction['transaction_number']}")
+
         return jsonify({
             'success': True,
             'contract_id': str(contract_id),
@@ -1226,21 +1230,39 @@ def download_contract_pdf(transaction_id):
     """Download contract PDF using the PDF generator"""
     try:
         # Import your PDF generation functions
-        from api.generate_contract_pdf import get_contract_by_transaction, create_contract_pdf
+        from api.generate_contract_pdf import get_contract_by_transaction, render_contract_pdf, current_pdf_url
 
         # Get contract data
         contract = get_contract_by_transaction(transaction_id)
         if not contract:
             return jsonify({'error': 'Contract not found'}), 404
 
-        # Generate PDF
-        pdf_path = create_contract_pdf(contract)
-        if not pdf_path:
+        # Serve the copy a worker rendered to blob storage, unless the contract changed since
+        stored_url = current_pdf_url(contract)
+        if stored_url:
+            return redirect(stored_url)
+
+        stale = (contract.get('file_path') or '').startswith('http')
+        if stale or request.args.get('async', 'false').lower() == 'true':
+            from services.job_queue_service import enqueue_job
+            queued = enqueue_job('contract_pdf.generate', {'transaction_number': transaction_id},
+                                 dedupe_key=f'contract_pdf:{transaction_id}')
+            # A stale copy is re-rendered in the background and this request is served inline
+            if queued['success'] and not stale:
+                return jsonify({
+                    'queued': True,
+                    'job_id': queued['job_id'],
+                    'message': 'PDF is being generated; download again once the job completes'
+                }), 202
+
+        # Render in memory; nothing is written to the (read-only) filesystem
+        pdf_data = render_contract_pdf(contract)
+        if not pdf_data:
             return jsonify({'error': 'Failed to generate PDF'}), 500
 
         # Return PDF file
         return send_file(
-            pdf_path,
+            io.BytesIO(pdf_data),
             as_attachment=True,
             download_name=f'Contract-{contract["contract_number"]}.pdf',
             mimetype='application/pdf'
@@ -1261,170 +1283,184 @@ def backfill_contracts():
         dry_run = data.get('dry_run', False)
         limit = data.get('limit', 100)
 
-        conn = psycopg2.connect(DATABASE_URL)
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-
-        # Find completed transactions without contracts
-        cursor.execute('''
-                       SELECT t.id,
-                              t.transaction_number,
-                              t.customer_id,
-                              t.amount,
-                              t.status,
-                              t.payment_method,
-                              t.processor_response,
-                              t.metadata,
-                              t.created_at,
-                              c.first_name,
-                              c.last_name,
-                              c.email,
-                              c.phone,
-                              c.address,
-                              c.billing_address
-                       FROM transactions t
-                                LEFT JOIN customers c ON t.customer_id = c.id
-                       WHERE t.status IN ('completed', 'approved')
-                         AND NOT EXISTS (SELECT 1
-                                         FROM generated_contracts gc
-                                         WHERE gc.transaction_id = t.transaction_number)
-                       ORDER BY t.created_at DESC
-                           LIMIT %s
-                       ''', (limit,))
+        if data.get('async') and not dry_run:
+            # Large backfills run on a worker; falls through to inline when the queue is down
+            from services.job_queue_service import enqueue_job
+            queued = enqueue_job('contracts.backfill', {'limit': limit}, dedupe_key='contracts.backfill')
+            if queued['success']:
+                return jsonify({
+                    'success': True,
+                    'queued': True,
+                    'job_id': queued['job_id'],
+                    'duplicate': queued['duplicate']
+                }), 202
 
-        transactions = cursor.fetchall()
+        return jsonify({
+            'success': True,
+            'data': run_contract_backfill(limit, dry_run)
+        })
 
-        results = {
-            'total_found': len(transactions),
-            'processed': 0,
-            'errors': 0,
-            'contracts_created': [],
-            'errors_list': [],
-            'dry_run': dry_run
-        }
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Failed to backfill contracts: {str(e)}'
+        }), 500
 
-        if dry_run:
-            results['preview'] = []
-            for txn in transactions:
-                metadata = txn['metadata'] if txn['metadata'] else {}
-                results['preview'].append({
-                    'transaction_number': txn['transaction_number'],
-                    'customer_name': f"{txn['first_name']} {txn['last_name']}",
-                    'amount': float(txn['amount']),
-                    'product_type': metadata.get('product_type', 'unknown'),
-                    'created_at': txn['created_at'].isoformat() if txn['created_at'] else None
-                })
 
-            cursor.close()
-            conn.close()
-            return jsonify({
-                'success': True,
-                'data': results
+def run_contract_backfill(limit=100, dry_run=False):
+    """Create contracts for up to limit completed transactions that have none"""
+    conn = psycopg2.connect(DATABASE_URL)
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+    # Find completed transactions without contracts
+    cursor.execute('''
+                   SELECT t.id,
+                          t.transaction_number,
+                          t.customer_id,
+                          t.amount,
+                          t.status,
+                          t.payment_method,
+                          t.processor_response,
+                          t.metadata,
+                          t.created_at,
+                          c.first_name,
+                          c.last_name,
+                          c.email,
+                          c.phone,
+                          c.address,
+                          c.billing_address
+                   FROM transactions t
+                            LEFT JOIN customers c ON t.customer_id = c.id
+                   WHERE t.status IN ('completed', 'approved')
+                     AND NOT EXISTS (SELECT 1
+                                     FROM generated_contracts gc
+                                     WHERE gc.transaction_id = t.transaction_number)
+                   ORDER BY t.created_at DESC
+                       LIMIT %s
+                   ''', (limit,))
+
+    transactions = cursor.fetchall()
+
+    results = {
+        'total_found': len(transactions),
+        'processed': 0,
+        'errors': 0,
+        'contracts_created': [],
+        'errors_list': [],
+        'dry_run': dry_run
+    }
+
+    if dry_run:
+        results['preview'] = []
+        for txn in transactions:
+            metadata = txn['metadata'] if txn['metadata'] else {}
+            results['preview'].append({
+                'transaction_number': txn['transaction_number'],
+                'customer_name': f"{txn['first_name']} {txn['last_name']}",
+                'amount': float(txn['amount']),
+                'product_type': metadata.get('product_type', 'unknown'),
+                'created_at': txn['created_at'].isoformat() if txn['created_at'] else None
             })
 
-        # Process each transaction
-        for txn in transactions:
-            try:
-                metadata = txn['metadata'] if txn['metadata'] else {}
-                product_type = metadata.get('product_type', 'protection_plan')
-                contract_number = f"CAC-{product_type.upper()}-{txn['transaction_number']}"
+        cursor.close()
+        conn.close()
+        return results
 
-                # Get template
-                cursor.execute('''
-                               SELECT id
-                               FROM contract_templates
-                               WHERE product_type = %s
-                                 AND active = true
-                               ORDER BY created_at DESC LIMIT 1
-                               ''', (product_type,))
-
-                template = cursor.fetchone()
-                template_id = template['id'] if template else None
-
-                # Prepare data
-                customer_data = {
-                    'first_name': txn['first_name'],
-                    'last_name': txn['last_name'],
-                    'email': txn['email'],
-                    'phone': txn['phone'],
-                    'address': txn['address'],
-                    'billing_address': txn['billing_address']
-                }
+    # Process each transaction
+    for txn in transactions:
+        try:
+            metadata = txn['metadata'] if txn['metadata'] else {}
+            product_type = metadata.get('product_type', 'protection_plan')
+            contract_number = f"CAC-{product_type.upper()}-{txn['transaction_number']}"
 
-                contract_data = {
-                    'transaction_info': {
-                        'transaction_number': txn['transaction_number'],
-                        'amount': float(txn['amount']),
-                        'payment_method': txn['payment_method'],
-                        'transaction_date': txn['created_at'].isoformat() if txn['created_at'] else None
-                    },
-                    'product_info': {
-                        'product_type': product_type,
-                        'metadata': metadata
-                    },
-                    'backfilled': True,
-                    'backfilled_at': datetime.now(timezone.utc).isoformat()
-                }
+            # Get template
+            cursor.execute('''
+                           SELECT id
+                           FROM contract_templates
+                           WHERE product_type = %s
+                             AND active = true
+                           ORDER BY created_at DESC LIMIT 1
+                           ''', (product_type,))
+
+            template = cursor.fetchone()
+            template_id = template['id'] if template else None
+
+            # Prepare data
+            customer_data = {
+                'first_name': txn['first_name'],
+                'last_name': txn['last_name'],
+                'email': txn['email'],
+                'phone': txn['phone'],
+                'address': txn['address'],
+                'billing_address': txn['billing_address']
+            }
 
-                # Insert contract
-                cursor.execute('''
-                               INSERT INTO generated_contracts
-                               (contract_number, transaction_id, template_id, customer_id,
-                                customer_data, contract_data, status, generated_date)
-                               VALUES (%s, %s, %s, %s, %s, %s, %s, %s) RETURNING id
-                               ''', (
-                                   contract_number,
-                                   txn['transaction_number'],
-                                   template_id,
-                                   txn['customer_id'],
-                                   json.dumps(customer_data),
-                                   json.dumps(contract_data),
-                                   'completed',
-                                   txn['created_at']  # Use original transaction date
-                               ))
+            contract_data = {
+                'transaction_info': {
+                    'transaction_number': txn['transaction_number'],
+                    'amount': float(txn['amount']),
+                    'payment_method': txn['payment_method'],
+                    'transaction_date': txn['created_at'].isoformat() if txn['created_at'] else None
+                },
+                'product_info': {
+                    'product_type': product_type,
+                    'metadata': metadata
+                },
+                'backfilled': True,
+                'backfilled_at': datetime.now(timezone.utc).isoformat()
+            }
 
-                contract_id = cursor.fetchone()[0]
+            # Insert contract
+            cursor.execute('''
+                           INSERT INTO generated_contracts
+                           (contract_number, transaction_id, template_id, customer_id,
+                            customer_data, contract_data, status, generated_date)
+                           VALUES (%s, %s, %s, %s, %s, %s, %s, %s) RETURNING id
+                           ''', (
+                               contract_number,
+                               txn['transaction_number'],
+                               template_id,
+                               txn['customer_id'],
+                               json.dumps(customer_data),
+                               json.dumps(contract_data),
+                               'completed',
+                               txn['created_at']  # Use original transaction date
+                           ))
 
-                # Log activity
-                cursor.execute('''
-                               INSERT INTO contract_activities
-                                   (contract_id, activity_type, description, performed_at)
-                               VALUES (%s, %s, %s, %s)
-                               ''', (
-                                   contract_id,
-                                   'generated',
-                                   f'Contract backfilled for transaction {txn["transaction_number"]}',
-                                   datetime.now(timezone.utc)
-                               ))
+            contract_id = cursor.fetchone()['id']
 
-                results['contracts_created'].append({
-                    'transaction_number': txn['transaction_number'],
-                    'contract_number': contract_number,
-                    'contract_id': str(contract_id),
-                    'customer_name': f"{txn['first_name']} {txn['last_name']}",
-                    'amount': float(txn['amount']),
-                    'product_type': product_type
-                })
+            # Log activity
+            cursor.execute('''
+                           INSERT INTO contract_activities
+                               (contract_id, activity_type, description, performed_at)
+                           VALUES (%s, %s, %s, %s)
+                           ''', (
+                               contract_id,
+                               'generated',
+                               f'Contract backfilled for transaction {txn["transaction_number"]}',
+                               datetime.now(timezone.utc)
+                           ))
 
-                results['processed'] += 1
+            results['contracts_created'].append({
+                'transaction_number': txn['transaction_number'],
+                'contract_number': contract_number,
+                'contract_id': str(contract_id),
+                'customer_name': f"{txn['first_name']} {txn['last_name']}",
+                'amount': float(txn['amount']),
+                'product_type': product_type
+            })
 
-            except Exception as e:
-                results['errors'] += 1
-                results['errors_list'].append({
-                    'transaction_number': txn['transaction_number'],
-                    'error': str(e)
-                })
+            results['processed'] += 1
 
-        conn.commit()
-        cursor.close()
-        conn.close()
+        except Exception as e:
+            results['errors'] += 1
+            results['errors_list'].append({
+                'transaction_number': txn['transaction_number'],
+                'error': str(e)
+            })
 
-        return jsonify({
-            'success': True,
-            'data': results
-        })
+    conn.commit()
+    cursor.close()
+    conn.close()
 
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': f'Failed to backfill contracts: {str(e)}'
-        }), 500
+    return results
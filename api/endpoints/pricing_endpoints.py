@@ -7,14 +7,17 @@ from flask import Blueprint, request, jsonify
 from datetime import datetime, timezone
 from auth.user_auth import token_required, role_required
 from utils.database import get_db_manager, execute_query
+from utils.http_cache import register_cache_invalidation
 
 # Initialize blueprint
 pricing_bp = Blueprint('pricing', __name__)
+register_cache_invalidation(pricing_bp, 'pricing', 'settings')
 
 # Import pricing services with error handling
 try:
     from data.hero_products_data import get_price_from_db_or_fallback, get_all_products_pricing, calculate_hero_price
     from services.database_settings_service import get_admin_fee, get_wholesale_discount, get_tax_rate, get_processing_fee, get_dealer_fee, settings_service
+    from data.pricing_snapshot import invalidate_snapshot
     import psycopg2
     pricing_services_available = True
 except ImportError as e:
@@ -37,6 +40,8 @@ except ImportError as e:
     def get_processing_fee(): return 15.00
     def get_dealer_fee(): return 50.00
     
+    def invalidate_snapshot(reason='invalidated'): pass
+    
     class DummySettingsService:
         connection_available = False
     settings_service = DummySettingsService()
@@ -208,6 +213,8 @@ def update_product_pricing(product_code):
                     if not insert_result['success']:
                         return jsonify(f"Failed to insert pricing for {term} year {customer_type}"), 500
 
+        invalidate_snapshot('invalidated by product pricing update')
+
         return jsonify({
             'message': 'Pricing updated successfully',
             'product_code': product_code,
@@ -508,6 +515,8 @@ def create_product():
                     'created_at': datetime.now(timezone.utc)
                 })
 
+        invalidate_snapshot('invalidated by product creation')
+
         return jsonify({
             'message': 'Product created successfully',
             'product': {
@@ -627,6 +636,7 @@ def delete_product(product_code):
         product_delete = db_manager.delete_record('products', 'product_code = %s', (product_code,))
         
         if product_delete['success']:
+            invalidate_snapshot('invalidated by product deletion')
             return jsonify({
                 'message': f'Product "{product_name}" and its pricing deleted successfully',
                 'deleted_product_code': product_code
@@ -706,6 +716,8 @@ def bulk_update_pricing():
                 })
         
         successful_updates = len([r for r in results if r['success']])
+        if successful_updates:
+            invalidate_snapshot('invalidated by bulk pricing update')
         
         return jsonify({
             'message': f'Bulk update completed: {successful_updates}/{len(results)} successful',
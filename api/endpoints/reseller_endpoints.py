@@ -5,7 +5,10 @@ import uuid
 import json
 from auth.user_auth import token_required, role_required, SecurityUtils, UserAuth
 from utils.database import get_db_manager, execute_query
+from utils.prepared_statements import execute_prepared
 from utils.service_availability import ServiceChecker
+from services.search_service import check_search_schema, customer_search_condition, global_search
+from utils.generated_columns import generated_column
 import re
 import os
 
@@ -457,11 +460,7 @@ def get_reseller_dashboard():
         
         if db_manager.available:
             # Get reseller ID
-            reseller_result = execute_query(
-                'SELECT reseller_id, commission_rate FROM resellers WHERE user_id = %s',
-                (user_id,),
-                'one'
-            )
+            reseller_result = execute_prepared('reseller_by_user_id', (user_id,))
             
             if reseller_result['success'] and reseller_result['data']:
                 reseller_id, commission_rate = reseller_result['data']
@@ -626,7 +625,12 @@ def get_reseller_customers():
         search_condition = ""
         params = [user_id]
 
-        if search:
+        if search and check_search_schema():
+            # Matches the trigram-indexed search document instead of four JSONB ILIKEs
+            condition, search_params = customer_search_condition(search)
+            search_condition = f'AND {condition}'
+            params.extend(search_params)
+        elif search:
             search_condition = '''AND (
                 c.personal_info->>'first_name' ILIKE %s OR
                 c.personal_info->>'last_name' ILIKE %s OR
@@ -710,6 +714,37 @@ def get_reseller_customers():
         }), 500
 
 
+@reseller_bp.route('/search', methods=['GET'])
+@token_required
+@role_required('wholesale_reseller')
+def search_reseller_records():
+    """Ranked search across this reseller's customers, quotes and contracts"""
+    try:
+        user_id = request.current_user.get('user_id')
+        if not user_id:
+            return jsonify({
+                'success': False,
+                'error': 'User ID not found in token'
+            }), 401
+
+        types = request.args.get('types')
+        result = global_search(
+            request.args.get('q', ''),
+            entity_types=[t.strip() for t in types.split(',') if t.strip()] if types else None,
+            reseller_id=user_id,
+            limit=request.args.get('limit', 20, type=int)
+        )
+        if not result['success']:
+            return jsonify(result), 400
+        return jsonify(result)
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Search failed: {str(e)}'
+        }), 500
+
+
 @reseller_bp.route('/customers', methods=['POST'])
 @token_required
 @role_required('wholesale_reseller')
@@ -896,11 +931,7 @@ def add_lead():
         
         if db_manager.available:
             # Get reseller ID
-            reseller_result = execute_query(
-                'SELECT reseller_id FROM resellers WHERE user_id = %s',
-                (user_id,),
-                'one'
-            )
+            reseller_result = execute_prepared('reseller_by_user_id', (user_id,))
             
             if reseller_result['success'] and reseller_result['data']:
                 reseller_id = reseller_result['data'][0]
@@ -1038,10 +1069,10 @@ def generate_quote_for_customer():
                 hero_product_type = re.sub(coverage_pattern, '', hero_product_type)  # Remove _XXX from end
 
             # Check if customer exists by email
-            existing_customer = execute_query('''
+            existing_customer = execute_query(f'''
                                               SELECT id
                                               FROM customers
-                                              WHERE contact_info ->>'email' = %s
+                                              WHERE {generated_column('customers', 'contact_email')} = %s
                                                 AND assigned_reseller_id = %s
                                               ''', (customer_info['email'].lower(), assigned_reseller_id), 'one')
 
@@ -1274,7 +1305,10 @@ def create_shareable_quote(quote_id):
         if not quote_result['success'] or not quote_result['data']:
             return jsonify('Quote not found or access denied'), 404
         
-        quote_uuid, existing_token, is_shareable = quote_result['data']
+        quote_row = quote_result['data']
+        quote_uuid = quote_row['id']
+        existing_token = quote_row['share_token']
+        is_shareable = quote_row['is_shareable']
         
         if is_shareable and existing_token:
             # Already shareable, return existing info
@@ -1285,7 +1319,7 @@ def create_shareable_quote(quote_id):
             return jsonify({
                 'success': True,
                 'share_token': existing_token,
-                'share_url': share_url_result['data'][0] if share_url_result['success'] else None,
+                'share_url': share_url_result['data']['share_url'] if share_url_result['success'] and share_url_result['data'] else None,
                 'message': 'Quote is already shareable'
             })
         
@@ -1294,7 +1328,7 @@ def create_shareable_quote(quote_id):
         if not share_token_result['success']:
             return jsonify('Failed to generate share token'), 500
         
-        share_token = share_token_result['data'][0]
+        share_token = share_token_result['data']['generate_quote_share_token']
         
         # Update quote to make it shareable
         update_result = execute_query('''
@@ -1307,7 +1341,7 @@ def create_shareable_quote(quote_id):
         if not update_result['success']:
             return jsonify('Failed to update quote'), 500
         
-        share_url = update_result['data'][0]
+        share_url = update_result['data']['share_url']
         
         # Log sharing activity
         execute_query('''
@@ -1635,11 +1669,7 @@ def get_commissions():
         
         if db_manager.available:
             # Get reseller info
-            reseller_result = execute_query(
-                'SELECT reseller_id, commission_rate FROM resellers WHERE user_id = %s',
-                (user_id,),
-                'one'
-            )
+            reseller_result = execute_prepared('reseller_by_user_id', (user_id,))
             
             if reseller_result['success'] and reseller_result['data']:
                 reseller_id, commission_rate = reseller_result['data']
@@ -1774,11 +1804,7 @@ def get_commission_summary():
         
         if db_manager.available:
             # Get reseller info
-            reseller_result = execute_query(
-                'SELECT reseller_id, commission_rate FROM resellers WHERE user_id = %s',
-                (user_id,),
-                'one'
-            )
+            reseller_result = execute_prepared('reseller_by_user_id', (user_id,))
             
             if reseller_result['success'] and reseller_result['data']:
                 reseller_id, commission_rate = reseller_result['data']
@@ -1862,11 +1888,7 @@ def get_reseller_analytics():
         
         if db_manager.available:
             # Get reseller info
-            reseller_result = execute_query(
-                'SELECT reseller_id, commission_rate FROM resellers WHERE user_id = %s',
-                (user_id,),
-                'one'
-            )
+            reseller_result = execute_prepared('reseller_by_user_id', (user_id,))
             
             if reseller_result['success'] and reseller_result['data']:
                 reseller_id, commission_rate = reseller_result['data']
@@ -7,6 +7,8 @@ from datetime import datetime, timezone
 import json
 import uuid
 import os
+from concurrent.futures import ThreadPoolExecutor, wait
+from utils.http_cache import register_cache_invalidation
 
 # Import utilities with proper error handling
 try:
@@ -18,18 +20,22 @@ except ImportError as e:
 
 # Initialize blueprint
 video_bp = Blueprint('video_admin', __name__)
+register_cache_invalidation(video_bp, 'landing_video')
 
 # Import video services with error handling
 try:
     from config.app_config import AppConfig
     config = AppConfig()
     VERCEL_BLOB_READ_WRITE_TOKEN = config.VERCEL_BLOB_READ_WRITE_TOKEN
+    VERCEL_BLOB_API_URL = config.VERCEL_BLOB_API_URL
     video_services_available = bool(VERCEL_BLOB_READ_WRITE_TOKEN)
     
     # File handling imports
     from PIL import Image
     import io
-    import requests
+    from services.blob_storage_service import BlobStorageClient, BlobUploadError, BlobSizeLimitExceeded
+    from services.image_rendition_service import render_renditions, build_srcsets
+    blob_client = BlobStorageClient(VERCEL_BLOB_READ_WRITE_TOKEN, VERCEL_BLOB_API_URL)
     PIL_AVAILABLE = True
     
 except ImportError as e:
@@ -37,7 +43,12 @@ except ImportError as e:
     video_services_available = False
     PIL_AVAILABLE = False
     VERCEL_BLOB_READ_WRITE_TOKEN = None
+    VERCEL_BLOB_API_URL = 'https://blob.vercel-storage.com'
     config = None
+    blob_client = None
+
+    class BlobUploadError(Exception): pass
+    class BlobSizeLimitExceeded(BlobUploadError): pass
 
 # File upload settings - use config if available, otherwise fallback
 if config:
@@ -90,39 +101,83 @@ def validate_file_size(file, file_type):
 
     return True, "File size OK"
 
-def optimize_image(file):
-    """Optimize image for web delivery"""
-    if not PIL_AVAILABLE:
-        file.seek(0)
-        return file
-        
-    try:
-        image = Image.open(file)
-
-        # Convert to RGB if necessary
-        if image.mode in ('RGBA', 'P'):
-            image = image.convert('RGB')
-
-        # Resize if too large (max 1920x1080 for thumbnails)
-        max_width, max_height = 1920, 1080
-        if image.width > max_width or image.height > max_height:
-            image.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
+def upload_thumbnail_renditions(file, filename_prefix="hero"):
+    """
+    Render the thumbnail at every responsive width in WebP and JPEG and upload
+    the renditions to Vercel Blob concurrently
 
-        # Save optimized version
-        output = io.BytesIO()
-        image.save(output, format='JPEG', quality=85, optimize=True)
-        output.seek(0)
-
-        return output
-    except Exception as e:
-        print(f"Image optimization failed: {e}")
-        file.seek(0)
-        return file
+    Returns:
+        dict with success, url/filename/size of the largest JPEG (the legacy
+        single thumbnail) and renditions ({'webp': {width: url}, 'jpeg': ..., 'srcset': ...})
+    """
+    renditions = render_renditions(file.read())
+    file.seek(0)
 
-def upload_to_vercel_blob(file, file_type, filename_prefix="hero"):
-    """Upload file to Vercel Blob Storage"""
+    timestamp = datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')
+    unique_id = str(uuid.uuid4())[:8]
+
+    def upload(rendition):
+        filename = f"{filename_prefix}_thumbnail_{timestamp}_{unique_id}_{rendition.width}w.{rendition.extension}"
+        result = blob_client.put(filename, rendition.data, rendition.content_type)
+        return rendition, filename, result.get('url', f"{VERCEL_BLOB_API_URL}/{filename}")
+
+    # Every upload is waited on, so a failure can't leave later renditions in storage unreferenced
+    with ThreadPoolExecutor(max_workers=4, thread_name_prefix='rendition-upload') as pool:
+        futures = [pool.submit(upload, rendition) for rendition in renditions]
+        wait(futures)
+
+    uploaded = [future.result() for future in futures if future.exception() is None]
+    errors = [future.exception() for future in futures if future.exception() is not None]
+    if errors:
+        for _, _, url in uploaded:
+            delete_from_vercel_blob(url)
+        if isinstance(errors[0], BlobUploadError):
+            return {'success': False, 'error': f'Upload failed: {errors[0]}'}
+        raise errors[0]
+
+    urls = {}
+    for rendition, _, url in uploaded:
+        urls.setdefault(rendition.format, {})[str(rendition.width)] = url
+
+    primary, primary_filename, primary_url = max(
+        (item for item in uploaded if item[0].format == 'jpeg'), key=lambda item: item[0].width
+    )
+    return {
+        'success': True,
+        'url': primary_url,
+        'filename': primary_filename,
+        'size': primary.size,
+        'total_size': sum(rendition.size for rendition, _, _ in uploaded),
+        'renditions': {**urls, 'widths': sorted({r.width for r, _, _ in uploaded}), 'srcset': build_srcsets(urls)}
+    }
+
+def rendition_urls(value):
+    """Blob URLs stored in a landing_page_thumbnail_renditions setting"""
     try:
-        if not VERCEL_BLOB_READ_WRITE_TOKEN:
+        renditions = json.loads(value) if isinstance(value, str) else (value or {})
+    except (json.JSONDecodeError, TypeError):
+        return []
+    if not isinstance(renditions, dict):
+        return []
+    return [url for format_name, urls in renditions.items()
+            if format_name not in ('widths', 'srcset') and isinstance(urls, dict)
+            for url in urls.values() if url]
+
+def upload_to_vercel_blob(file, file_type, filename_prefix="hero", max_size=None):
+    """
+    Stream a file to Vercel Blob Storage in chunks (multipart above one chunk)
+
+    Args:
+        file: Uploaded file or wrapper with read(size)
+        file_type: 'video' or 'thumbnail'
+        filename_prefix: Blob filename prefix
+        max_size: Reject the upload once more than this many bytes are read
+
+    Returns:
+        dict with success, url, filename, size and sha256 (error and too_large on failure)
+    """
+    try:
+        if not VERCEL_BLOB_READ_WRITE_TOKEN or blob_client is None:
             return {'success': False, 'error': 'Vercel Blob token not configured'}
 
         # Generate unique filename
@@ -137,9 +192,6 @@ def upload_to_vercel_blob(file, file_type, filename_prefix="hero"):
 
         filename = f"{filename_prefix}_{file_type}_{timestamp}_{unique_id}.{file_extension}"
 
-        # Vercel Blob API endpoint
-        url = f"https://blob.vercel-storage.com/{filename}"
-
         # Get content type
         content_type = getattr(file, 'content_type', None)
         if not content_type:
@@ -148,34 +200,22 @@ def upload_to_vercel_blob(file, file_type, filename_prefix="hero"):
             else:
                 content_type = f'image/{file_extension}'
 
-        # Prepare headers
-        headers = {
-            'Authorization': f'Bearer {VERCEL_BLOB_READ_WRITE_TOKEN}',
-            'X-Content-Type': content_type
-        }
-
-        # Read file content
-        file_content = file.read()
+        # Size and checksum are computed while streaming; the file is read once
+        result = blob_client.stream_upload(file, filename, content_type, max_size=max_size)
         file.seek(0)  # Reset file pointer
 
-        # Upload to Vercel Blob
-        response = requests.put(url, data=file_content,
-                                headers=headers, timeout=60)
-
-        if response.status_code in [200, 201]:
-            result = response.json()
-            return {
-                'success': True,
-                'url': result.get('url', url),
-                'filename': filename,
-                'size': len(file_content)
-            }
-        else:
-            return {
-                'success': False,
-                'error': f'Upload failed: HTTP {response.status_code} - {response.text}'
-            }
+        return {
+            'success': True,
+            'url': result['url'],
+            'filename': filename,
+            'size': result['size'],
+            'sha256': result['sha256']
+        }
 
+    except BlobSizeLimitExceeded as e:
+        return {'success': False, 'error': str(e), 'too_large': True}
+    except BlobUploadError as e:
+        return {'success': False, 'error': f'Upload failed: {e}'}
     except Exception as e:
         import traceback
         print(f"Vercel Blob upload error: {str(e)}")
@@ -188,11 +228,7 @@ def delete_from_vercel_blob(file_url):
         if not VERCEL_BLOB_READ_WRITE_TOKEN:
             return {'success': False, 'error': 'Vercel Blob token not configured'}
 
-        headers = {
-            'Authorization': f'Bearer {VERCEL_BLOB_READ_WRITE_TOKEN}'
-        }
-
-        response = requests.delete(file_url, headers=headers)
+        response = blob_client.delete(file_url)
 
         return {
             'success': response.status_code in [200, 204],
@@ -234,18 +270,21 @@ def upload_video():
             if not allowed_file(video_file.filename, 'video'):
                 return jsonify({'error': 'Invalid video file type. Allowed: mp4, webm, mov, avi'}), 400
 
-            # Validate file size
-            size_valid, size_message = validate_file_size(video_file, 'video')
-            if not size_valid:
-                return jsonify({'error': size_message}), 400
+            # Reject obviously oversized requests up front; the exact size is
+            # enforced while streaming instead of seeking through the file first
+            if request.content_length and request.content_length > MAX_VIDEO_SIZE + MAX_IMAGE_SIZE + 1024 * 1024:
+                return jsonify({'error': f"File too large. Maximum size: {MAX_VIDEO_SIZE / (1024 * 1024)}MB"}), 400
 
-            # Upload to Vercel Blob
-            upload_result = upload_to_vercel_blob(video_file, 'video')
+            # Stream to Vercel Blob
+            upload_result = upload_to_vercel_blob(video_file, 'video', max_size=MAX_VIDEO_SIZE)
 
             if upload_result['success']:
                 uploaded_files['video_url'] = upload_result['url']
                 uploaded_files['video_filename'] = upload_result['filename']
                 uploaded_files['video_size'] = upload_result['size']
+                uploaded_files['video_sha256'] = upload_result['sha256']
+            elif upload_result.get('too_large'):
+                return jsonify({'error': upload_result['error']}), 400
             else:
                 return jsonify({'error': f"Video upload failed: {upload_result['error']}"}), 500
 
@@ -259,29 +298,23 @@ def upload_video():
             if not size_valid:
                 return jsonify({'error': size_message}), 400
 
-            # Optimize image
-            optimized_file = optimize_image(thumbnail_file)
-
-            # Create FileWrapper for upload
-            class FileWrapper:
-                def __init__(self, file_obj, filename, content_type):
-                    self.file_obj = file_obj
-                    self.filename = filename
-                    self.content_type = content_type
-
-                def read(self):
-                    return self.file_obj.read()
-
-                def seek(self, pos):
-                    return self.file_obj.seek(pos)
-
-            wrapped_file = FileWrapper(optimized_file, thumbnail_file.filename, 'image/jpeg')
-            upload_result = upload_to_vercel_blob(wrapped_file, 'thumbnail')
+            # Responsive WebP/JPEG renditions; fall back to the original file if it can't be decoded
+            upload_result = None
+            if PIL_AVAILABLE:
+                try:
+                    upload_result = upload_thumbnail_renditions(thumbnail_file)
+                except Exception as e:
+                    print(f"⚠️ Thumbnail rendition failed, uploading original: {e}")
+                    thumbnail_file.seek(0)
+            if upload_result is None:
+                upload_result = upload_to_vercel_blob(thumbnail_file, 'thumbnail', max_size=MAX_IMAGE_SIZE)
 
             if upload_result['success']:
                 uploaded_files['thumbnail_url'] = upload_result['url']
                 uploaded_files['thumbnail_filename'] = upload_result['filename']
                 uploaded_files['thumbnail_size'] = upload_result['size']
+                if upload_result.get('renditions'):
+                    uploaded_files['thumbnail_renditions'] = upload_result['renditions']
             else:
                 return jsonify({'error': f"Thumbnail upload failed: {upload_result['error']}"}), 500
 
@@ -292,7 +325,8 @@ def upload_video():
                 old_files_query = '''
                     SELECT key, value
                     FROM admin_settings
-                    WHERE category = 'video' AND key IN ('landing_page_url', 'landing_page_thumbnail');
+                    WHERE category = 'video' AND key IN ('landing_page_url', 'landing_page_thumbnail',
+                                                         'landing_page_thumbnail_renditions');
                 '''
                 
                 old_files_result = execute_query(old_files_query)
@@ -325,6 +359,10 @@ def upload_video():
                                 if isinstance(value, str) and 'blob.vercel-storage.com' in value:
                                     old_files_to_delete.append(value.strip('"'))
 
+                    # Superseded renditions (the largest JPEG is also the old landing_page_thumbnail)
+                    if key == 'landing_page_thumbnail_renditions' and 'thumbnail_url' in uploaded_files:
+                        old_files_to_delete.extend(rendition_urls(value))
+
                 # Get form metadata
                 title = request.form.get('title', 'ConnectedAutoCare Hero Video')
                 description = request.form.get('description', 'Hero protection video')
@@ -345,6 +383,7 @@ def upload_video():
                 if 'thumbnail_url' in uploaded_files:
                     updates.append(('landing_page_thumbnail', uploaded_files['thumbnail_url']))
                     updates.append(('thumbnail_filename', uploaded_files['thumbnail_filename']))
+                    updates.append(('landing_page_thumbnail_renditions', uploaded_files.get('thumbnail_renditions', {})))
 
                 # Insert/update each setting
                 for key, value in updates:
@@ -369,24 +408,22 @@ def upload_video():
             except Exception as db_error:
                 print(f"Database update error: {db_error}")
                 # If database update fails but files were uploaded, we should clean them up
-                for file_key in ['video_url', 'thumbnail_url']:
-                    if file_key in uploaded_files:
-                        try:
-                            delete_from_vercel_blob(uploaded_files[file_key])
-                        except:
-                            pass
+                orphaned = [uploaded_files[k] for k in ['video_url', 'thumbnail_url'] if k in uploaded_files]
+                orphaned += rendition_urls(uploaded_files.get('thumbnail_renditions'))
+                for file_url in set(orphaned):
+                    try:
+                        delete_from_vercel_blob(file_url)
+                    except:
+                        pass
                 raise db_error
 
-            # Clean up old files after successful database update
-            for old_file_url in old_files_to_delete:
+            # Clean up old files after successful database update, off the request path
+            if old_files_to_delete:
                 try:
-                    delete_result = delete_from_vercel_blob(old_file_url)
-                    if delete_result['success']:
-                        print(f"Deleted old file: {old_file_url}")
-                    else:
-                        print(f"Failed to delete old file: {old_file_url}")
+                    from services.job_queue_service import enqueue_or_run
+                    enqueue_or_run('blob.delete', {'urls': list(dict.fromkeys(old_files_to_delete))})
                 except Exception as e:
-                    print(f"Error deleting old file {old_file_url}: {e}")
+                    print(f"Error deleting old files: {e}")
 
         response_data = {
             'message': 'Upload successful',
@@ -394,6 +431,7 @@ def upload_video():
             'video_info': {
                 'video_url': uploaded_files.get('video_url'),
                 'thumbnail_url': uploaded_files.get('thumbnail_url'),
+                'thumbnail_renditions': uploaded_files.get('thumbnail_renditions', {}),
                 'title': request.form.get('title', 'ConnectedAutoCare Hero Video'),
                 'description': request.form.get('description', 'Hero protection video'),
                 'duration': request.form.get('duration', '0:00'),
@@ -431,7 +469,8 @@ def delete_video():
             get_urls_query = '''
                 SELECT key, value
                 FROM admin_settings
-                WHERE category = 'video' AND key IN ('landing_page_url', 'landing_page_thumbnail');
+                WHERE category = 'video' AND key IN ('landing_page_url', 'landing_page_thumbnail',
+                                                     'landing_page_thumbnail_renditions');
             '''
             
             url_results = execute_query(get_urls_query)
@@ -464,9 +503,12 @@ def delete_video():
                             if isinstance(value, str) and 'blob.vercel-storage.com' in value:
                                 files_to_delete.append(value.strip('"'))
 
+                if key == 'landing_page_thumbnail_renditions':
+                    files_to_delete.extend(rendition_urls(value))
+
         # Delete files from Vercel Blob
         deletion_results = []
-        for file_url in files_to_delete:
+        for file_url in dict.fromkeys(files_to_delete):
             result = delete_from_vercel_blob(file_url)
             deletion_results.append({
                 'url': file_url,
@@ -483,6 +525,7 @@ def delete_video():
                     WHERE category = 'video' AND key = %s;
                 '''
                 execute_query(clear_query, ('""', 'admin', key))
+            execute_query(clear_query, ('{}', 'admin', 'landing_page_thumbnail_renditions'))
 
             # Update last_updated timestamp
             timestamp_json = json.dumps(datetime.now(timezone.utc).isoformat() + 'Z')
@@ -528,6 +571,8 @@ def video_service_health():
             'allowed_image_formats': list(ALLOWED_IMAGE_EXTENSIONS),
             'features': {
                 'image_optimization': PIL_AVAILABLE,
+                'responsive_thumbnail_renditions': PIL_AVAILABLE,
+                'streaming_multipart_upload': blob_client is not None,
                 'automatic_cleanup': True,
                 'global_cdn': True,
                 'secure_upload': True
@@ -620,6 +665,7 @@ def get_admin_landing_video():
         video_info = {
             'video_url': video_settings.get('landing_page_url', ''),
             'thumbnail_url': video_settings.get('landing_page_thumbnail', ''),
+            'thumbnail_renditions': video_settings.get('landing_page_thumbnail_renditions') or {},
             'title': video_settings.get('landing_page_title', 'ConnectedAutoCare Hero Protection 2025'),
             'description': video_settings.get('landing_page_description', 'Showcase of our comprehensive protection plans'),
             'duration': video_settings.get('landing_page_duration', '2:30'),
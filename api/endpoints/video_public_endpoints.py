@@ -14,6 +14,8 @@ except ImportError as e:
     print(f"Warning: Database utilities not available: {e}")
     DATABASE_AVAILABLE = False
 
+from utils.http_cache import cached_response, uncacheable
+
 # Initialize public video blueprint
 video_public_bp = Blueprint('video_public', __name__)
 
@@ -22,6 +24,7 @@ video_public_bp = Blueprint('video_public', __name__)
 # ================================
 
 @video_public_bp.route('/landing/video', methods=['GET'])
+@cached_response(ttl=300, tags=('landing_video',))
 def get_current_landing_video():
     """Get current landing page video for public display"""
     try:
@@ -35,7 +38,7 @@ def get_current_landing_video():
                 'duration': '2:30',
                 'updated_at': datetime.now(timezone.utc).isoformat() + 'Z'
             }
-            return jsonify(video_info)
+            return uncacheable(jsonify(video_info))
             
         # Query to get video settings from database
         get_video_query = '''
@@ -46,31 +49,25 @@ def get_current_landing_video():
         '''
         
         video_results = execute_query(get_video_query)
-        
-        # Debug: Print what we're getting from the database
-        print(f"Database query returned: {video_results}")
-        print(f"Type: {type(video_results)}")
-        
+
         # Handle different response formats from execute_query
         actual_rows = []
+        query_failed = False
         if isinstance(video_results, dict):
             # If it's a dict with success/data/rowcount structure
             if 'data' in video_results and video_results.get('success'):
                 actual_rows = video_results['data']
-                print(f"Extracted {len(actual_rows)} rows from data field")
             else:
                 print("Warning: Query result dict doesn't have expected structure")
                 actual_rows = []
+                query_failed = True
         elif isinstance(video_results, list):
             # If it's already a list of rows
             actual_rows = video_results
         else:
             print(f"Warning: Unexpected query result type: {type(video_results)}")
             actual_rows = []
-
-        # Debug: Print the actual rows
-        for i, row in enumerate(actual_rows):
-            print(f"Actual Row {i}: {row} (length: {len(row) if hasattr(row, '__len__') else 'unknown'})")
+            query_failed = True
 
         video_settings = {}
         for row in actual_rows:
@@ -107,13 +104,17 @@ def get_current_landing_video():
         video_info = {
             'video_url': video_settings.get('landing_page_url', ''),
             'thumbnail_url': video_settings.get('landing_page_thumbnail', ''),
+            # {'webp': {width: url}, 'jpeg': {...}, 'widths': [...], 'srcset': {'webp': ..., 'jpeg': ...}}
+            'thumbnail_renditions': video_settings.get('landing_page_thumbnail_renditions') or {},
             'title': video_settings.get('landing_page_title', 'ConnectedAutoCare Hero Protection'),
             'description': video_settings.get('landing_page_description', 'Comprehensive protection plans'),
             'duration': video_settings.get('landing_page_duration', '2:30'),
             'updated_at': video_settings.get('last_updated', datetime.now(timezone.utc).isoformat() + 'Z')
         }
 
-        print(f"Returning video info: {video_info}")
+        # Defaults standing in for a failed query must not be cached
+        if query_failed:
+            return uncacheable(jsonify(video_info))
         return jsonify(video_info)
 
     except Exception as e:
@@ -130,7 +131,7 @@ def get_current_landing_video():
             'duration': '2:30',
             'updated_at': datetime.now(timezone.utc).isoformat() + 'Z'
         }
-        return jsonify(video_info)
+        return uncacheable(jsonify(video_info))
 
 @video_public_bp.route('/health', methods=['GET'])
 def public_video_health():
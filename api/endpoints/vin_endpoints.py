@@ -3,6 +3,7 @@ VIN Decoder Endpoints
 Enhanced VIN decoding with NHTSA integration and eligibility checking
 """
 
+import os
 from flask import Blueprint, request, jsonify
 from datetime import datetime, timezone
 from utils.service_availability import ServiceChecker
@@ -298,7 +299,8 @@ def test_vin_decode():
             print("🌐 Testing NHTSA API...")
             import requests
             
-            url = f"https://vpic.nhtsa.dot.gov/api/vehicles/DecodeVin/{vin}"
+            nhtsa_base_url = os.environ.get('NHTSA_API_BASE_URL', 'https://vpic.nhtsa.dot.gov/api').rstrip('/')
+            url = f"{nhtsa_base_url}/vehicles/DecodeVin/{vin}"
             params = {'format': 'json'}
             if model_year:
                 params['modelyear'] = model_year
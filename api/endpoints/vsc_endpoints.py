@@ -3,9 +3,11 @@ VSC (Vehicle Service Contract) Rating Endpoints
 Database-driven VSC pricing with VIN auto-detection
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from datetime import datetime, timezone, timedelta
 from utils.service_availability import ServiceChecker
+from utils.http_cache import cached_response
+from auth.user_auth import token_required
 
 # Initialize blueprint
 vsc_bp = Blueprint('vsc', __name__)
@@ -19,6 +21,9 @@ try:
     VSC_SERVICE_AVAILABLE = True
     enhanced_vin_service = EnhancedVINDecoderService()
     enhanced_vin_available = True
+    from services.inventory_pricing_service import (
+        InventoryPricingJob, InventoryFileError, iter_inventory_rows, detect_format, to_ndjson, INVENTORY_MAX_ROWS
+    )
 except ImportError as e:
     print(f"Warning: VSC service not available: {e}")
     VSC_SERVICE_AVAILABLE = False
@@ -68,6 +73,12 @@ def vsc_health():
         except Exception as db_error:
             database_status = f"error: {str(db_error)}"
         
+        try:
+            from data.pricing_snapshot import get_snapshot_status
+            snapshot_status = get_snapshot_status()
+        except ImportError:
+            snapshot_status = {'state': 'unavailable', 'active': False}
+        
         return jsonify({
             "service": "VSC Rating API with Database Integration",
             "status": "healthy",
@@ -76,12 +87,14 @@ def vsc_health():
                 "pdf_rates_available": database_status == "connected",
                 "exact_rate_lookup": database_status == "connected"
             },
+            "pricing_snapshot": snapshot_status,
             "coverage_levels": list(coverage_options.get('coverage_levels', {}).keys()) if coverage_options else [],
             "enhanced_features": {
                 "vin_auto_detection": enhanced_vin_available,
                 "eligibility_checking": enhanced_vin_available,
                 "auto_population": enhanced_vin_available,
-                "database_rates": database_status == "connected"
+                "database_rates": database_status == "connected",
+                "inventory_pricing": VSC_SERVICE_AVAILABLE
             },
             "timestamp": datetime.now(timezone.utc).isoformat() + "Z"
         })
@@ -89,6 +102,7 @@ def vsc_health():
         return jsonify({"error": f"VSC service error: {str(e)}"}), 500
 
 @vsc_bp.route('/coverage-options')
+@cached_response(ttl=300, tags=('pricing',))
 def get_vsc_coverage():
     """Get available VSC coverage options"""
     service_checker = ServiceChecker()
@@ -401,6 +415,7 @@ def check_vsc_eligibility():
         return jsonify(f"Eligibility check error: {str(e)}"), 500
 
 @vsc_bp.route('/eligibility/requirements', methods=['GET'])
+@cached_response(ttl=3600)
 def get_vsc_eligibility_requirements():
     """Get current VSC eligibility requirements"""
     return jsonify({
@@ -577,4 +592,69 @@ def generate_vsc_quote_from_vin():
             return jsonify("VSC pricing system not available"), 503
 
     except Exception as e:
-        return jsonify(f"VIN quote generation error: {str(e)}"), 500
\ No newline at end of file
+        return jsonify(f"VIN quote generation error: {str(e)}"), 500
+
+
+@vsc_bp.route('/inventory/price', methods=['POST'])
+@token_required
+def price_inventory():
+    """
+    Check eligibility and price every plan for a dealer's lot in one job
+
+    Accepts a multipart 'file' (CSV with a VIN and mileage column, or NDJSON)
+    or the same content as the raw body. Options (form or query): coverage_levels
+    and terms as comma lists, deductible, customer_type. Streams NDJSON events:
+    started, one vehicle line per row, progress per chunk, then summary.
+    """
+    if not VSC_SERVICE_AVAILABLE or not enhanced_vin_available:
+        return jsonify("VSC pricing system not available"), 503
+
+    try:
+        options = {**request.args.to_dict(), **request.form.to_dict()}
+
+        upload = request.files.get('file')
+        if upload is not None:
+            stream = upload.stream
+            file_format = detect_format(upload.filename, upload.mimetype)
+        elif request.content_length:
+            stream = request.stream
+            file_format = detect_format(content_type=request.content_type)
+        else:
+            return jsonify("Inventory file is required"), 400
+        file_format = options.get('format', file_format).lower()
+
+        def split(value):
+            return [part.strip() for part in value.split(',') if part.strip()] if value else None
+
+        job = InventoryPricingJob(
+            enhanced_vin_service,
+            coverage_levels=split(options.get('coverage_levels')),
+            terms=[int(term) for term in split(options.get('terms')) or []],
+            deductible=int(options.get('deductible', 100)),
+            customer_type=options.get('customer_type', 'retail').lower(),
+            max_rows=min(int(options.get('max_rows', INVENTORY_MAX_ROWS)), INVENTORY_MAX_ROWS)
+        )
+
+        rows = iter_inventory_rows(stream, file_format)
+        # Pull the first row now so a bad header is a 400 rather than a broken stream
+        first_row = next(rows, None)
+        if first_row is None:
+            return jsonify("Inventory file has no rows"), 400
+
+        def all_rows():
+            yield first_row
+            yield from rows
+
+        response = Response(stream_with_context(to_ndjson(job.run(all_rows()))),
+                            mimetype='application/x-ndjson')
+        response.headers['Cache-Control'] = 'no-store'
+        response.headers['X-Accel-Buffering'] = 'no'
+        response.headers['X-Inventory-Job-Id'] = job.job_id
+        return response
+
+    except InventoryFileError as e:
+        return jsonify(str(e)), 400
+    except ValueError as e:
+        return jsonify(f"Invalid inventory option: {str(e)}"), 400
+    except Exception as e:
+        return jsonify(f"Inventory pricing error: {str(e)}"), 500
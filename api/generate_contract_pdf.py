@@ -7,13 +7,21 @@ Usage:
 python generate_contract_pdf.py CAC-VSC-TXN-20250908041348-20250908040634
 python generate_contract_pdf.py --transaction TXN-20250908041348-20250908040634
 python generate_contract_pdf.py --all
+python generate_contract_pdf.py --all --since 2025-09-01 --changed-only --workers 8
 python generate_contract_pdf.py --list
 """
 
+import io
 import os
 import sys
+import copy
 import json
+import time
+import uuid
+import hashlib
 import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from datetime import datetime, timezone
@@ -52,6 +60,7 @@ def get_contract_by_number(contract_number):
                           gc.effective_date,
                           gc.expiration_date,
                           gc.transaction_id,
+                          gc.file_path,
                           ct.name      as template_name,
                           t.amount,
                           t.currency,
@@ -84,6 +93,7 @@ def get_contract_by_transaction(transaction_number):
                           gc.effective_date,
                           gc.expiration_date,
                           gc.transaction_id,
+                          gc.file_path,
                           ct.name      as template_name,
                           t.amount,
                           t.currency,
@@ -233,240 +243,271 @@ def extract_coverage_information(contract):
     return coverage_info
 
 
-def create_contract_pdf(contract, output_dir="./contracts"):
-    """Generate PDF from contract data with complete vehicle information"""
-
-    # Create output directory if it doesn't exist
-    os.makedirs(output_dir, exist_ok=True)
-
-    # Extract data
-    customer_data = contract['customer_data'] if contract['customer_data'] else {}
-    contract_data = contract['contract_data'] if contract['contract_data'] else {}
-
-    # Customer info
-    customer_name = f"{customer_data.get('first_name', '')} {customer_data.get('last_name', '')}".strip()
-    customer_email = customer_data.get('email', 'N/A')
-    customer_phone = customer_data.get('phone', 'N/A')
-
-    # Transaction info
-    transaction_info = contract_data.get('transaction_info', {})
-    product_info = contract_data.get('product_info', {})
-
-    # Create PDF filename
-    safe_contract_number = contract['contract_number'].replace('/', '-')
-    pdf_filename = f"{safe_contract_number}.pdf"
-    pdf_path = os.path.join(output_dir, pdf_filename)
-
-    # Create PDF document
-    doc = SimpleDocTemplate(pdf_path, pagesize=letter,
-                            rightMargin=72, leftMargin=72,
-                            topMargin=72, bottomMargin=18)
-
-    # Create story (content list)
-    story = []
-
-    # Get styles
-    styles = getSampleStyleSheet()
-
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        textColor=colors.HexColor('#1f4e79')
-    )
-
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=16,
-        spaceAfter=12,
-        spaceBefore=20,
-        textColor=colors.HexColor('#1f4e79')
-    )
-
-    normal_style = styles['Normal']
-    normal_style.fontSize = 11
-    normal_style.spaceAfter = 6
-
-    # Company Header
-    story.append(Paragraph("CONNECTED AUTO CARE", title_style))
-    story.append(Paragraph("VEHICLE PROTECTION PLAN CONTRACT", heading_style))
-    story.append(Spacer(1, 20))
-
-    # Contract Information Table
-    contract_info_data = [
-        ['Contract Number:', contract['contract_number']],
-        ['Transaction ID:', contract['transaction_id']],
-        ['Contract Status:', contract['status'].title()],
-        ['Generated Date:', contract['generated_date'].strftime('%B %d, %Y') if contract['generated_date'] else 'N/A'],
-        ['Template Used:', contract['template_name'] or 'Standard Contract']
-    ]
+# Label column styling shared by every information table
+INFO_TABLE_COMMANDS = [
+    ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f0f0')),
+    ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#1f4e79')),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+]
+
+
+class ContractPDFRenderer:
+    """
+    Renders contract PDFs in memory
+
+    Styles, the static header and section headings are built once per process
+    and each template's section layout once per template; a render only builds
+    the per-contract tables.
+    """
+
+    def __init__(self):
+        styles = getSampleStyleSheet()
+        self.title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            spaceAfter=30,
+            alignment=TA_CENTER,
+            textColor=colors.HexColor('#1f4e79')
+        )
+        self.heading_style = ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=16,
+            spaceAfter=12,
+            spaceBefore=20,
+            textColor=colors.HexColor('#1f4e79')
+        )
+        # A copy, so the stylesheet's shared Normal style is left alone
+        self.normal_style = ParagraphStyle('ContractNormal', parent=styles['Normal'], fontSize=11, spaceAfter=6)
+        self.footer_style = ParagraphStyle('Footer', parent=self.normal_style, fontSize=8,
+                                           alignment=TA_CENTER, textColor=colors.grey)
+        self.table_style = TableStyle(INFO_TABLE_COMMANDS)
+
+        # Parsed once; renders get shallow copies since platypus sets layout state on flowables
+        self._header = [
+            Paragraph("CONNECTED AUTO CARE", self.title_style),
+            Paragraph("VEHICLE PROTECTION PLAN CONTRACT", self.heading_style)
+        ]
+        self._headings = {
+            title: Paragraph(title, self.heading_style)
+            for title in ('CUSTOMER INFORMATION', 'TRANSACTION DETAILS', 'VEHICLE INFORMATION', 'COVERAGE DETAILS')
+        }
+
+        self._layouts = {}
+        self._lock = threading.Lock()
+        self._stats = {'renders': 0, 'failures': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'last_ms': None}
+
+    def layout(self, template_name, product_type):
+        """Section builders for a template, compiled on first use"""
+        key = (template_name or 'Standard Contract', product_type)
+        sections = self._layouts.get(key)
+        if sections is None:
+            sections = [self._contract_section, self._customer_section, self._transaction_section]
+            if product_type == 'vsc':
+                sections += [self._vehicle_section, self._coverage_section]
+            sections = self._layouts[key] = tuple(sections)
+        return sections
+
+    def _table(self, rows, label_width):
+        table = Table(rows, colWidths=[label_width * inch, (6 - label_width) * inch])
+        table.setStyle(self.table_style)
+        return table
+
+    def _heading(self, title):
+        return copy.copy(self._headings[title])
+
+    def _contract_section(self, contract):
+        return [
+            self._table([
+                ['Contract Number:', contract['contract_number']],
+                ['Transaction ID:', contract['transaction_id']],
+                ['Contract Status:', contract['status'].title()],
+                ['Generated Date:', contract['generated_date'].strftime('%B %d, %Y') if contract['generated_date'] else 'N/A'],
+                ['Template Used:', contract['template_name'] or 'Standard Contract']
+            ], 2),
+            Spacer(1, 20)
+        ]
 
-    contract_info_table = Table(contract_info_data, colWidths=[2 * inch, 4 * inch])
-    contract_info_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f0f0')),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#1f4e79')),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-
-    story.append(contract_info_table)
-    story.append(Spacer(1, 20))
-
-    # Customer Information
-    story.append(Paragraph("CUSTOMER INFORMATION", heading_style))
-
-    customer_info_data = [
-        ['Name:', customer_name or 'N/A'],
-        ['Email:', customer_email],
-        ['Phone:', customer_phone],
-        ['Address:', str(customer_data.get('address', 'N/A'))]
-    ]
+    def _customer_section(self, contract):
+        customer_data = contract['customer_data'] if contract['customer_data'] else {}
+        customer_name = f"{customer_data.get('first_name', '')} {customer_data.get('last_name', '')}".strip()
+        return [
+            self._heading("CUSTOMER INFORMATION"),
+            self._table([
+                ['Name:', customer_name or 'N/A'],
+                ['Email:', customer_data.get('email', 'N/A')],
+                ['Phone:', customer_data.get('phone', 'N/A')],
+                ['Address:', str(customer_data.get('address', 'N/A'))]
+            ], 1.5),
+            Spacer(1, 20)
+        ]
 
-    customer_info_table = Table(customer_info_data, colWidths=[1.5 * inch, 4.5 * inch])
-    customer_info_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f0f0')),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#1f4e79')),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-
-    story.append(customer_info_table)
-    story.append(Spacer(1, 20))
-
-    # Transaction Details
-    story.append(Paragraph("TRANSACTION DETAILS", heading_style))
-
-    amount = float(contract['amount']) if contract['amount'] else 0.0
-    currency = contract['currency'] or 'USD'
-
-    transaction_details_data = [
-        ['Transaction Amount:', f"${amount:,.2f} {currency}"],
-        ['Transaction Date:',
-         contract['transaction_date'].strftime('%B %d, %Y') if contract['transaction_date'] else 'N/A'],
-        ['Payment Method:', transaction_info.get('payment_method', {}).get('method', 'N/A') if isinstance(
-            transaction_info.get('payment_method'), dict) else str(transaction_info.get('payment_method', 'N/A'))],
-        ['Product Type:', product_info.get('product_type', 'N/A').upper()]
-    ]
+    def _transaction_section(self, contract):
+        contract_data = contract['contract_data'] if contract['contract_data'] else {}
+        transaction_info = contract_data.get('transaction_info', {})
+        product_info = contract_data.get('product_info', {})
+        amount = float(contract['amount']) if contract['amount'] else 0.0
+        currency = contract['currency'] or 'USD'
+        return [
+            self._heading("TRANSACTION DETAILS"),
+            self._table([
+                ['Transaction Amount:', f"${amount:,.2f} {currency}"],
+                ['Transaction Date:',
+                 contract['transaction_date'].strftime('%B %d, %Y') if contract['transaction_date'] else 'N/A'],
+                ['Payment Method:', transaction_info.get('payment_method', {}).get('method', 'N/A') if isinstance(
+                    transaction_info.get('payment_method'), dict) else str(transaction_info.get('payment_method', 'N/A'))],
+                ['Product Type:', product_info.get('product_type', 'N/A').upper()]
+            ], 2),
+            Spacer(1, 20)
+        ]
 
-    transaction_table = Table(transaction_details_data, colWidths=[2 * inch, 4 * inch])
-    transaction_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f0f0')),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#1f4e79')),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-
-    story.append(transaction_table)
-    story.append(Spacer(1, 20))
-
-    # Vehicle Information (Enhanced for VSC)
-    if product_info.get('product_type') == 'vsc':
+    def _vehicle_section(self, contract):
         vehicle_info = extract_vehicle_information(contract)
 
-        story.append(Paragraph("VEHICLE INFORMATION", heading_style))
-
         # Build vehicle description
-        vehicle_description = []
-        if vehicle_info['year'] != 'N/A':
-            vehicle_description.append(vehicle_info['year'])
-        if vehicle_info['make'] != 'N/A':
-            vehicle_description.append(vehicle_info['make'])
-        if vehicle_info['model'] != 'N/A':
-            vehicle_description.append(vehicle_info['model'])
-        if vehicle_info['series'] != 'N/A':
-            vehicle_description.append(vehicle_info['series'])
-        if vehicle_info['trim'] != 'N/A':
-            vehicle_description.append(vehicle_info['trim'])
-
+        vehicle_description = [
+            vehicle_info[field] for field in ('year', 'make', 'model', 'series', 'trim')
+            if vehicle_info[field] != 'N/A'
+        ]
         full_vehicle_name = ' '.join(
             vehicle_description) if vehicle_description else 'Vehicle Information Not Available'
 
-        vehicle_details_data = [
-            ['Vehicle:', full_vehicle_name],
-            ['VIN:', vehicle_info['vin']],
-            ['Current Mileage:', f"{vehicle_info['mileage']} miles" if vehicle_info['mileage'] != 'N/A' else 'N/A'],
-            ['Body Style:', vehicle_info['body_style']],
-            ['Engine:', vehicle_info['engine']],
-            ['Fuel Type:', vehicle_info['fuel_type']],
-            ['Drive Type:', vehicle_info['drive_type']]
+        return [
+            self._heading("VEHICLE INFORMATION"),
+            self._table([
+                ['Vehicle:', full_vehicle_name],
+                ['VIN:', vehicle_info['vin']],
+                ['Current Mileage:', f"{vehicle_info['mileage']} miles" if vehicle_info['mileage'] != 'N/A' else 'N/A'],
+                ['Body Style:', vehicle_info['body_style']],
+                ['Engine:', vehicle_info['engine']],
+                ['Fuel Type:', vehicle_info['fuel_type']],
+                ['Drive Type:', vehicle_info['drive_type']]
+            ], 1.8),
+            Spacer(1, 20)
         ]
 
-        vehicle_table = Table(vehicle_details_data, colWidths=[1.8 * inch, 4.2 * inch])
-        vehicle_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f0f0')),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#1f4e79')),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-
-        story.append(vehicle_table)
-        story.append(Spacer(1, 20))
-
-        # Coverage Details
+    def _coverage_section(self, contract):
         coverage_info = extract_coverage_information(contract)
-
-        story.append(Paragraph("COVERAGE DETAILS", heading_style))
-
-        coverage_details_data = [
-            ['Coverage Level:', coverage_info['level']],
-            ['Contract Term:',
-             f"{coverage_info['term_months']} months ({coverage_info['term_years']} years)" if coverage_info[
-                                                                                                   'term_months'] != 'N/A' else 'N/A'],
-            ['Deductible:', coverage_info['deductible']],
-            ['Customer Type:', coverage_info['customer_type']]
+        return [
+            self._heading("COVERAGE DETAILS"),
+            self._table([
+                ['Coverage Level:', coverage_info['level']],
+                ['Contract Term:',
+                 f"{coverage_info['term_months']} months ({coverage_info['term_years']} years)"
+                 if coverage_info['term_months'] != 'N/A' else 'N/A'],
+                ['Deductible:', coverage_info['deductible']],
+                ['Customer Type:', coverage_info['customer_type']]
+            ], 1.8),
+            Spacer(1, 20)
         ]
 
-        coverage_table = Table(coverage_details_data, colWidths=[1.8 * inch, 4.2 * inch])
-        coverage_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f0f0')),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#1f4e79')),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-
-        story.append(coverage_table)
-        story.append(Spacer(1, 20))
+    def render(self, contract):
+        """
+        Render a contract to PDF bytes
+
+        Args:
+            contract: Row from get_contract_by_number / get_contract_by_transaction
 
-    # Footer
-    story.append(Spacer(1, 30))
-    footer_text = f"Contract generated on {datetime.now().strftime('%B %d, %Y at %I:%M %p')}"
-    footer_style = ParagraphStyle('Footer', parent=styles['Normal'], fontSize=8,
-                                  alignment=TA_CENTER, textColor=colors.grey)
-    story.append(Paragraph(footer_text, footer_style))
+        Returns:
+            bytes: The PDF document
+        """
+        start = time.perf_counter()
+        contract_data = contract['contract_data'] if contract['contract_data'] else {}
+        product_type = contract_data.get('product_info', {}).get('product_type')
 
-    # Build PDF
+        story = [copy.copy(flowable) for flowable in self._header]
+        story.append(Spacer(1, 20))
+        for section in self.layout(contract['template_name'], product_type):
+            story.extend(section(contract))
+
+        # Footer
+        story.append(Spacer(1, 30))
+        footer_text = f"Contract generated on {datetime.now().strftime('%B %d, %Y at %I:%M %p')}"
+        story.append(Paragraph(footer_text, self.footer_style))
+
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=letter,
+                                rightMargin=72, leftMargin=72,
+                                topMargin=72, bottomMargin=18,
+                                title=f"Contract {contract['contract_number']}")
+        try:
+            doc.build(story)
+        except Exception:
+            with self._lock:
+                self._stats['failures'] += 1
+            raise
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._stats['renders'] += 1
+            self._stats['total_ms'] += elapsed_ms
+            self._stats['max_ms'] = max(self._stats['max_ms'], elapsed_ms)
+            self._stats['last_ms'] = elapsed_ms
+        return buffer.getvalue()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['avg_ms'] = round(stats['total_ms'] / stats['renders'], 2) if stats['renders'] else None
+        stats['total_ms'] = round(stats['total_ms'], 2)
+        stats['max_ms'] = round(stats['max_ms'], 2)
+        stats['last_ms'] = round(stats['last_ms'], 2) if stats['last_ms'] is not None else None
+        stats['cached_layouts'] = len(self._layouts)
+        return stats
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def get_contract_renderer():
+    """Process-wide renderer; styles and static sections are compiled on first use"""
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = ContractPDFRenderer()
+    return _renderer
+
+
+def get_render_stats():
+    return _renderer.stats() if _renderer is not None else None
+
+
+def render_contract_pdf(contract):
+    """Render a contract to PDF bytes, or None if rendering fails"""
     try:
-        doc.build(story)
-        return pdf_path
+        return get_contract_renderer().render(contract)
     except Exception as e:
         print(f"Error generating PDF: {e}")
         return None
 
 
+def contract_pdf_filename(contract):
+    safe_contract_number = contract['contract_number'].replace('/', '-')
+    return f"{safe_contract_number}.pdf"
+
+
+def create_contract_pdf(contract, output_dir="./contracts"):
+    """Generate PDF from contract data and write it to output_dir (CLI use)"""
+    pdf_data = render_contract_pdf(contract)
+    if pdf_data is None:
+        return None
+
+    # Create output directory if it doesn't exist
+    os.makedirs(output_dir, exist_ok=True)
+    pdf_path = os.path.join(output_dir, contract_pdf_filename(contract))
+    with open(pdf_path, 'wb') as f:
+        f.write(pdf_data)
+    return pdf_path
+
+
 def generate_pdf_by_contract_number(contract_number):
     """Generate PDF for specific contract number"""
     print(f"Looking up contract: {contract_number}")
@@ -509,33 +550,163 @@ def generate_pdf_by_transaction(transaction_number):
         return False
 
 
-def generate_all_pdfs():
-    """Generate PDFs for all contracts"""
-    contracts = get_all_contracts()
+# Keyset-paged bulk fetch for batch runs: same columns as get_contract_by_number,
+# ordered by primary key so each page resumes after the last row
+BULK_CONTRACTS_SQL = '''
+                   SELECT gc.id,
+                          gc.contract_number,
+                          gc.customer_data,
+                          gc.contract_data,
+                          gc.status,
+                          gc.generated_date,
+                          gc.effective_date,
+                          gc.expiration_date,
+                          gc.transaction_id,
+                          gc.file_path,
+                          ct.name      as template_name,
+                          t.amount,
+                          t.currency,
+                          t.created_at as transaction_date
+                   FROM generated_contracts gc
+                            LEFT JOIN contract_templates ct ON gc.template_id = ct.id
+                            LEFT JOIN transactions t ON gc.transaction_id = t.transaction_number
+                   WHERE (%(since)s::timestamp IS NULL OR gc.generated_date >= %(since)s::timestamp)
+                     AND (%(after_id)s IS NULL OR gc.id > %(after_id)s)
+                   ORDER BY gc.id
+                   LIMIT %(page_size)s
+                   '''
 
-    if not contracts:
-        print("No contracts found")
-        return
+BATCH_PAGE_SIZE = 500
+MANIFEST_FILENAME = '.manifest.json'
 
-    print(f"Found {len(contracts)} contracts to process")
 
-    success_count = 0
-    for contract in contracts:
-        print(f"\nProcessing contract: {contract['contract_number']}")
-
-        # Get full contract details
-        full_contract = get_contract_by_number(contract['contract_number'])
-        if full_contract:
-            pdf_path = create_contract_pdf(full_contract)
-            if pdf_path:
-                success_count += 1
-                print(f"  PDF created: {pdf_path}")
+def iter_contract_pages(since=None, page_size=BATCH_PAGE_SIZE):
+    """Yield pages of full contract rows over a single connection"""
+    conn = get_connection()
+    try:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        after_id = None
+        while True:
+            cursor.execute(BULK_CONTRACTS_SQL, {
+                'since': since,
+                'after_id': after_id,
+                'page_size': page_size
+            })
+            rows = [dict(row) for row in cursor.fetchall()]
+            if not rows:
+                break
+            yield rows
+            if len(rows) < page_size:
+                break
+            after_id = rows[-1]['id']
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def contract_fingerprint(contract):
+    """Hash of everything the PDF is rendered from; unchanged contracts keep their PDF"""
+    # Where the PDF was stored is an output of rendering, not an input
+    inputs = {key: value for key, value in contract.items() if key != 'file_path'}
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def contract_pdf_pathname(contract):
+    """Blob pathname for a rendered PDF; carries the fingerprint it was rendered from"""
+    # Random suffix keeps the public blob URL unguessable
+    return f"contracts/{contract['contract_number']}-{contract_fingerprint(contract)[:16]}-{uuid.uuid4().hex}.pdf"
+
+
+def current_pdf_url(contract):
+    """The stored blob URL if it was rendered from the contract as it is now, else None"""
+    url = contract.get('file_path') or ''
+    if url.startswith('http') and f"-{contract_fingerprint(contract)[:16]}-" in url.rsplit('/', 1)[-1]:
+        return url
+    return None
+
+
+def _load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILENAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_FILENAME)
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(manifest, f)
+    os.replace(f'{path}.tmp', path)
+
+
+def _render_to_file(contract, output_dir):
+    """Process pool task: render one contract; returns (contract_number, path or None)"""
+    return contract['contract_number'], create_contract_pdf(contract, output_dir)
+
+
+def generate_all_pdfs(output_dir="./contracts", workers=None, since=None, changed_only=False):
+    """
+    Generate PDFs for all contracts (or those generated since a date)
+
+    Contract rows are fetched in keyset pages over one connection and rendered
+    across a process pool, one process per core by default.
+
+    Args:
+        output_dir: Directory the PDFs are written to
+        workers: Render processes; 1 renders in this process
+        since: Only contracts generated at or after this datetime
+        changed_only: Skip contracts whose data is unchanged since their PDF was written
+    """
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = _load_manifest(output_dir)
+
+    start = time.perf_counter()
+    found = skipped = success_count = 0
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for page in iter_contract_pages(since):
+            found += len(page)
+            pending = []
+            for contract in page:
+                fingerprint = contract_fingerprint(contract)
+                pdf_path = os.path.join(output_dir, contract_pdf_filename(contract))
+                if changed_only and manifest.get(contract['contract_number']) == fingerprint \
+                        and os.path.exists(pdf_path):
+                    skipped += 1
+                    continue
+                pending.append((contract, fingerprint))
+
+            contracts = [contract for contract, _ in pending]
+            if executor:
+                results = executor.map(_render_to_file, contracts, [output_dir] * len(contracts),
+                                       chunksize=max(1, len(contracts) // (workers * 4)))
             else:
-                print(f"  Failed to create PDF")
-        else:
-            print(f"  Failed to get contract details")
+                results = (_render_to_file(contract, output_dir) for contract in contracts)
+
+            for (contract, fingerprint), (contract_number, pdf_path) in zip(pending, results):
+                if pdf_path:
+                    success_count += 1
+                    manifest[contract_number] = fingerprint
+                else:
+                    print(f"  Failed to create PDF: {contract_number}")
+
+            print(f"Processed {found} contracts ({success_count} rendered, {skipped} unchanged)")
+    finally:
+        if executor:
+            executor.shutdown()
+        _save_manifest(output_dir, manifest)
+
+    if not found:
+        print("No contracts found")
+        return
 
-    print(f"\nGenerated {success_count}/{len(contracts)} PDFs successfully")
+    elapsed = time.perf_counter() - start
+    rendered = found - skipped
+    print(f"\nGenerated {success_count}/{rendered} PDFs successfully in {elapsed:.1f}s "
+          f"using {workers} process{'es' if workers > 1 else ''}"
+          + (f"; {skipped} unchanged contracts skipped" if skipped else ''))
 
 
 def list_contracts():
@@ -568,6 +739,12 @@ def main():
     parser.add_argument('contract_number', nargs='?', help='Contract number (e.g., CAC-VSC-TXN-...)')
     parser.add_argument('--transaction', help='Generate PDF for contract associated with transaction number')
     parser.add_argument('--all', action='store_true', help='Generate PDFs for all contracts')
+    parser.add_argument('--workers', type=int, help='Render processes for --all (default: one per CPU core)')
+    parser.add_argument('--since', type=datetime.fromisoformat,
+                        help='With --all, only contracts generated on or after this date (YYYY-MM-DD[THH:MM])')
+    parser.add_argument('--changed-only', action='store_true',
+                        help='With --all, skip contracts unchanged since their PDF was last generated')
+    parser.add_argument('--output-dir', default='./contracts', help='Directory PDFs are written to')
     parser.add_argument('--list', action='store_true', help='List all available contracts')
 
     args = parser.parse_args()
@@ -587,7 +764,8 @@ def main():
         list_contracts()
 
     elif args.all:
-        generate_all_pdfs()
+        generate_all_pdfs(args.output_dir, workers=args.workers, since=args.since,
+                          changed_only=args.changed_only)
 
     elif args.transaction:
         if generate_pdf_by_transaction(args.transaction):
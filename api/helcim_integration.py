@@ -1,18 +1,34 @@
 import requests
 import hmac
 import hashlib
+import base64
+import binascii
 import json
 import os
+import time
+import uuid
 import logging
+import threading
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timezone
 from dataclasses import dataclass
 from enum import Enum
 
+from utils.http_client import get_http_client, CircuitOpenError
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Outbound call budget: a degraded Helcim costs a checkout a few seconds, not 30
+HELCIM_CONNECT_TIMEOUT_SECONDS = float(os.getenv('HELCIM_CONNECT_TIMEOUT_SECONDS', 3.05))
+HELCIM_READ_TIMEOUT_SECONDS = float(os.getenv('HELCIM_READ_TIMEOUT_SECONDS', 15))
+HELCIM_MAX_RETRIES = int(os.getenv('HELCIM_MAX_RETRIES', 2))
+HELCIM_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('HELCIM_CIRCUIT_FAILURE_THRESHOLD', 5))
+HELCIM_CIRCUIT_RECOVERY_SECONDS = float(os.getenv('HELCIM_CIRCUIT_RECOVERY_SECONDS', 30))
+# Webhooks signed longer ago than this are rejected as replays
+WEBHOOK_TOLERANCE_SECONDS = 300
+
 class PaymentType(Enum):
     """Enum for payment types."""
     PURCHASE = "purchase"
@@ -209,11 +225,21 @@ class HelcimPaymentProcessor:
     
     def __init__(self, api_token: Optional[str] = None, terminal_id: Optional[str] = None):
         """Initialize HelcimPaymentProcessor with configuration."""
-        self.api_endpoint = "https://api.helcim.com/v2"
+        self.api_endpoint = os.getenv('HELCIM_API_BASE_URL', "https://api.helcim.com/v2").rstrip('/')
         self.api_token = api_token or os.getenv('HELCIM_API_TOKEN', 'aB@p8sL2!OYmW@!CVFenAP@mRgi@A2hT-rtGH4Pe0c%Bqwpy2ZO*AzAYE4s6@N!y')
         self.terminal_id = terminal_id or os.getenv('HELCIM_TERMINAL_ID', '79167') 
         self.webhook_secret = os.getenv('HELCIM_WEBHOOK_SECRET', '0gv8Cbl1UFuE4oaQGThGVt1yWcqCS1O2')
-        self.timeout = 30
+        self.timeout = (HELCIM_CONNECT_TIMEOUT_SECONDS, HELCIM_READ_TIMEOUT_SECONDS)
+        # Shared by every processor so keep-alive connections and breaker state are process-wide
+        self.http = get_http_client(
+            'helcim',
+            base_url=self.api_endpoint,
+            connect_timeout=HELCIM_CONNECT_TIMEOUT_SECONDS,
+            read_timeout=HELCIM_READ_TIMEOUT_SECONDS,
+            max_retries=HELCIM_MAX_RETRIES,
+            failure_threshold=HELCIM_CIRCUIT_FAILURE_THRESHOLD,
+            recovery_seconds=HELCIM_CIRCUIT_RECOVERY_SECONDS
+        )
         
         # Validate configuration on initialization
         self._validate_config()
@@ -245,17 +271,22 @@ class HelcimPaymentProcessor:
             if data:
                 logger.debug(f"Request payload: {json.dumps(data, indent=2)}")
             
-            if method.upper() == 'GET':
-                response = requests.get(url, headers=headers, params=params, timeout=self.timeout)
-            elif method.upper() == 'POST':
-                response = requests.post(url, headers=headers, json=data, timeout=self.timeout)
-            elif method.upper() == 'PUT':
-                response = requests.put(url, headers=headers, json=data, timeout=self.timeout)
-            elif method.upper() == 'DELETE':
-                response = requests.delete(url, headers=headers, timeout=self.timeout)
-            else:
+            method = method.upper()
+            if method not in ('GET', 'POST', 'PUT', 'DELETE'):
                 raise ValueError(f"Unsupported HTTP method: {method}")
 
+            # One key per logical call, reused across retries, so a retried POST
+            # can't create a second customer/invoice/session
+            response = self.http.request(
+                method, url,
+                headers=headers,
+                params=params if method == 'GET' else None,
+                json=data if method in ('POST', 'PUT') else None,
+                timeout=self.timeout,
+                idempotency_key=uuid.uuid4().hex if method == 'POST' else None,
+                idempotency_header='idempotency-key'
+            )
+
             # Log response details
             logger.info(f"Response status: {response.status_code}")
             
@@ -277,16 +308,50 @@ class HelcimPaymentProcessor:
 
             return response.json() if response.content else {}
 
+        except CircuitOpenError as e:
+            logger.error(f"Helcim circuit open: {str(e)}")
+            raise HelcimAPIError("Payment processor temporarily unavailable, please retry shortly", 503)
         except requests.RequestException as e:
             logger.error(f"Request failed: {str(e)}")
             raise HelcimAPIError(f"Request failed: {str(e)}")
 
+    def verify_webhook_signature(self, headers: Dict[str, str], raw_body: bytes) -> bool:
+        """Check a webhook's webhook-signature header against the verifier token."""
+        headers = {key.lower(): value for key, value in headers.items()}
+        webhook_id = headers.get('webhook-id')
+        timestamp = headers.get('webhook-timestamp')
+        signatures = headers.get('webhook-signature')
+        if not (webhook_id and timestamp and signatures and self.webhook_secret):
+            return False
+
+        try:
+            if abs(time.time() - int(timestamp)) > WEBHOOK_TOLERANCE_SECONDS:
+                logger.warning("Rejected webhook with stale timestamp")
+                return False
+        except ValueError:
+            return False
+
+        try:
+            key = base64.b64decode(self.webhook_secret, validate=True)
+        except (binascii.Error, ValueError):
+            key = self.webhook_secret.encode('utf-8')
+
+        signed_content = f"{webhook_id}.{timestamp}.".encode('utf-8') + raw_body
+        expected = base64.b64encode(hmac.new(key, signed_content, hashlib.sha256).digest()).decode('ascii')
+
+        # The header holds space-separated "v1,<signature>" entries
+        for entry in signatures.split():
+            _, _, signature = entry.partition(',')
+            if signature and hmac.compare_digest(signature, expected):
+                return True
+        return False
+
     def test_connection(self) -> Dict[str, Any]:
         """Test connection to Helcim API."""
         try:
             # Use the general endpoint to test connectivity
-            response = requests.get(
-                f"{self.api_endpoint}/general",
+            response = self.http.request(
+                'GET', f"{self.api_endpoint}/general",
                 headers=self._get_headers(),
                 timeout=self.timeout
             )
@@ -419,7 +484,7 @@ class HelcimPaymentProcessor:
             }
         except (HelcimAPIError, ValueError) as e:
             logger.error(f"Failed to create invoice: {str(e)}")
-            return {'success': False, 'error': str(e)}
+            return {'success': False, 'error': str(e), 'status_code': getattr(e, 'status_code', None)}
 
     # HelcimPay.js Integration
     def create_helcimpay_checkout_session(self, amount: float, currency: Currency,
@@ -452,32 +517,41 @@ class HelcimPaymentProcessor:
             }
         except (HelcimAPIError, ValueError) as e:
             logger.error(f"Checkout session creation failed: {str(e)}")
-            return {'success': False, 'error': str(e)}
+            return {'success': False, 'error': str(e), 'status_code': getattr(e, 'status_code', None)}
 
     # Utility Methods
     def create_complete_checkout_flow(self, amount: float, currency: Currency,
                                     customer_info: CustomerInfo,
-                                    description: Optional[str] = None) -> Dict[str, Any]:
-        """Complete checkout flow: create customer, invoice, and checkout session."""
+                                    description: Optional[str] = None,
+                                    customer_id: Optional[str] = None,
+                                    invoice_id: Optional[str] = None) -> Dict[str, Any]:
+        """Complete checkout flow: create customer, invoice, and checkout session (reusing any IDs passed in)."""
         try:
+            customer_code = None
+            invoice_number = None
+
             # Step 1: Create customer
-            customer_result = self.create_customer(customer_info)
-            if not customer_result['success']:
-                return customer_result
+            if not customer_id:
+                customer_result = self.create_customer(customer_info)
+                if not customer_result['success']:
+                    return customer_result
 
-            customer_id = customer_result['customer_id']
+                customer_id = customer_result['customer_id']
+                customer_code = customer_result.get('customer_code')
 
             # Step 2: Create invoice
-            invoice_result = self.create_invoice(
-                amount=amount,
-                currency=currency,
-                customer_id=customer_id,
-                description=description
-            )
-            if not invoice_result['success']:
-                return invoice_result
-
-            invoice_id = invoice_result['invoice_id']
+            if not invoice_id:
+                invoice_result = self.create_invoice(
+                    amount=amount,
+                    currency=currency,
+                    customer_id=customer_id,
+                    description=description
+                )
+                if not invoice_result['success']:
+                    return invoice_result
+
+                invoice_id = invoice_result['invoice_id']
+                invoice_number = invoice_result.get('invoice_number')
 
             # Step 3: Create checkout session
             checkout_result = self.create_helcimpay_checkout_session(
@@ -491,7 +565,9 @@ class HelcimPaymentProcessor:
                 return {
                     'success': True,
                     'customer_id': customer_id,
+                    'customer_code': customer_code,
                     'invoice_id': invoice_id,
+                    'invoice_number': invoice_number,
                     'checkout_token': checkout_result['checkout_token'],
                     'transaction_id': checkout_result['transaction_id']
                 }
@@ -503,6 +579,20 @@ class HelcimPaymentProcessor:
             return {'success': False, 'error': str(e)}
 
 
+_processor: Optional[HelcimPaymentProcessor] = None
+_processor_lock = threading.Lock()
+
+
+def get_helcim_processor() -> HelcimPaymentProcessor:
+    """Process-wide processor configured from the environment"""
+    global _processor
+    if _processor is None:
+        with _processor_lock:
+            if _processor is None:
+                _processor = HelcimPaymentProcessor()
+    return _processor
+
+
 # Test the province conversion
 if __name__ == "__main__":
     # Test province normalization
@@ -13,7 +13,11 @@ import psycopg2
 from flask import Flask, jsonify, Blueprint, request
 from flask_cors import CORS
 import json
-from utils.database import execute_query
+from utils.database import execute_query, pin_to_primary, init_replica_routing
+from utils.http_cache import get_cache_stats
+from utils.single_flight import get_single_flight_stats
+from utils.http_client import get_http_client_stats
+from utils.prepared_statements import get_prepared_statement_stats
 
 # Add the current directory to Python path for imports
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -362,6 +366,16 @@ else:
     # Basic CORS
     CORS(app, origins="*", supports_credentials=True)
 
+# Per-request database instrumentation (Server-Timing headers, N+1 detection)
+try:
+    from utils.query_instrumentation import init_app as init_query_instrumentation
+    init_query_instrumentation(app)
+except ImportError:
+    pass
+
+# Reads go to the read replica (if configured) until a request writes
+init_replica_routing(app)
+
 # Register all blueprints
 def register_blueprints(app):
     """Register all endpoint blueprints"""
@@ -410,6 +424,13 @@ def register_blueprints(app):
 # Register all blueprints
 register_blueprints(app)
 
+# Load the shipped pricing snapshot before the first quote arrives
+try:
+    from data.pricing_snapshot import initialize_snapshot
+    initialize_snapshot()
+except ImportError:
+    pass
+
 # Global error handlers
 @app.errorhandler(404)
 def not_found(error):
@@ -499,6 +520,12 @@ def health_check():
         "config_loaded": CONFIG_AVAILABLE
     }
 
+def get_contract_render_stats():
+    """PDF render timings, if this process has rendered a contract (avoids importing ReportLab here)"""
+    module = sys.modules.get('api.generate_contract_pdf')
+    return module.get_render_stats() if module else None
+
+
 # API status endpoint
 @app.route('/api/status')
 def api_status():
@@ -512,7 +539,12 @@ def api_status():
             "video_service": "healthy" if ENDPOINTS_AVAILABLE else "degraded",
             "configuration": "loaded" if CONFIG_AVAILABLE else "fallback"
         },
-        "endpoints_available": ENDPOINTS_AVAILABLE
+        "endpoints_available": ENDPOINTS_AVAILABLE,
+        "http_cache": get_cache_stats(),
+        "single_flight": get_single_flight_stats(),
+        "outbound_http": get_http_client_stats(),
+        "contract_pdf": get_contract_render_stats(),
+        "prepared_statements": get_prepared_statement_stats()
     })
 
 
@@ -660,6 +692,8 @@ def view_shared_quote(share_token):
 @app.route('/quote/<share_token>/accept', methods=['POST'])
 def accept_shared_quote(share_token):
     """Enhanced endpoint for customers to accept/purchase from shared quote with payment integration"""
+    # Checkout: a just-shared quote may not have reached the read replica yet
+    pin_to_primary()
     try:
         data = request.get_json()
         payment_data = data.get('payment_data', {})
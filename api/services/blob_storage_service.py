@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Vercel Blob Storage Client
+Streams uploads to Vercel Blob in fixed-size chunks using the multipart API:
+parts upload concurrently with retries, and size and SHA-256 are computed in
+the same pass, so memory stays at roughly concurrency x chunk size whatever
+the file size
+"""
+
+import os
+import time
+import random
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, BinaryIO, Optional
+from urllib.parse import quote
+
+import requests
+
+MB = 1024 * 1024
+
+# Vercel requires every part except the last to be at least 5MB
+BLOB_UPLOAD_CHUNK_SIZE = max(5, int(os.environ.get('BLOB_UPLOAD_CHUNK_MB', 8))) * MB
+BLOB_UPLOAD_CONCURRENCY = max(1, int(os.environ.get('BLOB_UPLOAD_CONCURRENCY', 3)))
+BLOB_UPLOAD_MAX_RETRIES = int(os.environ.get('BLOB_UPLOAD_MAX_RETRIES', 3))
+
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class BlobUploadError(Exception):
+    """Upload failed after retries"""
+
+
+class BlobSizeLimitExceeded(BlobUploadError):
+    """Stream grew past the allowed size; nothing was committed"""
+
+
+class BlobStorageClient:
+    """Thin Vercel Blob client; one instance can be shared across requests"""
+
+    def __init__(self, token: str, api_url: str = 'https://blob.vercel-storage.com',
+                 chunk_size: int = BLOB_UPLOAD_CHUNK_SIZE, concurrency: int = BLOB_UPLOAD_CONCURRENCY,
+                 max_retries: int = BLOB_UPLOAD_MAX_RETRIES, timeout: float = 60):
+        self.token = token
+        self.api_url = api_url.rstrip('/')
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @property
+    def _session(self) -> requests.Session:
+        # requests.Session isn't safe to share between the part-upload threads
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _headers(self, content_type: str = None, **extra) -> Dict[str, str]:
+        headers = {'Authorization': f'Bearer {self.token}'}
+        if content_type:
+            headers['X-Content-Type'] = content_type
+        headers.update(extra)
+        return headers
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send with exponential backoff on connection errors and retryable statuses"""
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(min(8.0, 0.5 * 2 ** (attempt - 1)) * random.uniform(0.8, 1.2))
+            try:
+                response = self._session.request(method, url, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = f'{type(e).__name__}: {e}'
+                continue
+            if response.status_code in (200, 201):
+                return response
+            last_error = f'HTTP {response.status_code} - {response.text[:300]}'
+            if response.status_code not in RETRYABLE_STATUSES:
+                break
+        raise BlobUploadError(last_error)
+
+    def put(self, pathname: str, data: bytes, content_type: str) -> Dict[str, Any]:
+        """Single-request upload for bodies that fit in one chunk"""
+        response = self._request('PUT', f'{self.api_url}/{pathname}', data=data,
+                                 headers=self._headers(content_type))
+        return response.json()
+
+    def stream_upload(self, stream: BinaryIO, pathname: str, content_type: str,
+                      max_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Upload a readable stream without holding it in memory
+
+        Args:
+            stream: Object with read(size)
+            pathname: Blob pathname
+            content_type: Stored content type
+            max_size: Abort with BlobSizeLimitExceeded once more bytes than this are read
+
+        Returns:
+            dict with url, pathname, size, sha256 and parts (0 for a single PUT)
+        """
+        digest = hashlib.sha256()
+        total = 0
+
+        def next_chunk() -> bytes:
+            nonlocal total
+            # Raw streams may return short reads; parts other than the last must be full
+            chunk = stream.read(self.chunk_size)
+            while chunk and len(chunk) < self.chunk_size:
+                more = stream.read(self.chunk_size - len(chunk))
+                if not more:
+                    break
+                chunk += more
+            total += len(chunk)
+            if max_size is not None and total > max_size:
+                raise BlobSizeLimitExceeded(f'File too large. Maximum size: {max_size / MB}MB')
+            digest.update(chunk)
+            return chunk
+
+        first = next_chunk()
+        second = next_chunk() if len(first) == self.chunk_size else b''
+
+        if not second:
+            result = self.put(pathname, first, content_type)
+            return {
+                'url': result.get('url', f'{self.api_url}/{pathname}'),
+                'pathname': result.get('pathname', pathname),
+                'size': total,
+                'sha256': digest.hexdigest(),
+                'parts': 0
+            }
+
+        mpu_url = f'{self.api_url}/mpu?pathname={quote(pathname)}'
+        created = self._request('PUT', mpu_url, headers=self._headers(content_type, **{'x-mpu-action': 'create'})).json()
+        mpu_headers = {'x-mpu-key': quote(created['key']), 'x-mpu-upload-id': created['uploadId']}
+
+        def upload_part(part_number: int, chunk: bytes) -> Dict[str, Any]:
+            try:
+                response = self._request('PUT', mpu_url, data=chunk, headers=self._headers(
+                    content_type, **mpu_headers, **{'x-mpu-action': 'upload', 'x-mpu-part-number': str(part_number)}
+                ))
+                return {'partNumber': part_number, 'etag': response.json()['etag']}
+            finally:
+                slots.release()
+
+        # A failed part or completion aborts the upload so its parts don't keep accruing storage
+        try:
+            # At most `concurrency` chunks are buffered or in flight at once
+            slots = threading.BoundedSemaphore(self.concurrency)
+            parts = []
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='blob-part') as pool:
+                futures = []
+                try:
+                    part_number, chunk = 1, first
+                    pending = [second]
+                    while chunk:
+                        slots.acquire()
+                        futures.append(pool.submit(upload_part, part_number, chunk))
+                        failed = [f for f in futures if f.done() and f.exception()]
+                        if failed:
+                            raise failed[0].exception()
+                        part_number += 1
+                        chunk = pending.pop() if pending else next_chunk()
+
+                    for future in futures:
+                        parts.append(future.result())
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+
+            completed = self._request('PUT', mpu_url, json=sorted(parts, key=lambda p: p['partNumber']),
+                                      headers=self._headers(content_type, **mpu_headers, **{'x-mpu-action': 'complete'})).json()
+        except BaseException:
+            self._abort_multipart(mpu_url, content_type, mpu_headers)
+            raise
+        return {
+            'url': completed.get('url', f'{self.api_url}/{pathname}'),
+            'pathname': completed.get('pathname', pathname),
+            'size': total,
+            'sha256': digest.hexdigest(),
+            'parts': len(parts)
+        }
+
+    def _abort_multipart(self, mpu_url: str, content_type: str, mpu_headers: Dict[str, str]):
+        """Best effort: the original error is what the caller needs to see"""
+        try:
+            self._session.put(mpu_url, timeout=self.timeout, headers=self._headers(
+                content_type, **mpu_headers, **{'x-mpu-action': 'abort'}
+            ))
+        except requests.RequestException as e:
+            print(f"⚠️ Failed to abort multipart upload {mpu_headers['x-mpu-upload-id']}: {e}")
+
+    def delete(self, file_url: str) -> requests.Response:
+        return self._session.delete(file_url, headers=self._headers(), timeout=self.timeout)
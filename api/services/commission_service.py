@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Commission Batch Engine
+Computes period totals for every reseller in one grouped statement, upserts all
+reseller_commissions rows in one INSERT ... ON CONFLICT and records which sales
+each commission covers in reseller_commission_sales, so month-end close is a
+single transaction instead of one request per reseller.
+"""
+
+import time
+import threading
+from datetime import date, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+from psycopg2.extras import RealDictCursor
+
+from utils.database import get_db_manager
+
+COMMISSION_TABLES_SQL = '''
+    CREATE TABLE IF NOT EXISTS reseller_commission_sales (
+        commission_id UUID NOT NULL REFERENCES reseller_commissions(id) ON DELETE CASCADE,
+        sale_id UUID NOT NULL REFERENCES reseller_sales(id) ON DELETE CASCADE,
+        gross_amount NUMERIC NOT NULL DEFAULT 0,
+        commission_amount NUMERIC NOT NULL DEFAULT 0,
+        commission_status VARCHAR(50),
+        PRIMARY KEY (commission_id, sale_id)
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_reseller_commission_sales_sale ON reseller_commission_sales (sale_id);
+    CREATE INDEX IF NOT EXISTS idx_reseller_sales_period ON reseller_sales (sale_date, reseller_id);
+'''
+
+# Paid commissions are left untouched so the amount that was paid stays on record
+UPSERT_COMMISSIONS_SQL = '''
+    WITH totals AS (
+        SELECT reseller_id,
+               COALESCE(SUM(gross_amount), 0) AS total_sales,
+               COALESCE(SUM(commission_amount), 0) AS total_commission,
+               COUNT(*) AS sales_count
+        FROM reseller_sales
+        WHERE sale_date >= %(period_start)s
+          AND sale_date <= %(period_end)s
+          AND (%(reseller_ids)s::text[] IS NULL OR reseller_id::text = ANY(%(reseller_ids)s::text[]))
+        GROUP BY reseller_id
+    )
+    INSERT INTO reseller_commissions (
+        reseller_id, period_start, period_end, total_sales_amount,
+        total_commission_amount, status, commission_details
+    )
+    SELECT reseller_id, %(period_start)s, %(period_end)s, total_sales, total_commission, 'ready',
+           jsonb_build_object('sales_count', sales_count)
+    FROM totals
+    ON CONFLICT (reseller_id, period_start, period_end)
+    DO UPDATE SET
+        total_sales_amount = EXCLUDED.total_sales_amount,
+        total_commission_amount = EXCLUDED.total_commission_amount,
+        commission_details = EXCLUDED.commission_details,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE reseller_commissions.status IS DISTINCT FROM 'paid'
+    RETURNING id, reseller_id, total_sales_amount, total_commission_amount
+'''
+
+# Unpaid rows for resellers whose sales for the period were since deleted or
+# reassigned; zeroed like the totals would be, and their links cleared below
+CLEAR_STALE_COMMISSIONS_SQL = '''
+    UPDATE reseller_commissions c
+    SET total_sales_amount = 0,
+        total_commission_amount = 0,
+        commission_details = jsonb_build_object('sales_count', 0),
+        updated_at = CURRENT_TIMESTAMP
+    WHERE c.period_start = %(period_start)s
+      AND c.period_end = %(period_end)s
+      AND c.status IS DISTINCT FROM 'paid'
+      AND (%(reseller_ids)s::text[] IS NULL OR c.reseller_id::text = ANY(%(reseller_ids)s::text[]))
+      AND NOT EXISTS (
+          SELECT 1 FROM reseller_sales s
+          WHERE s.reseller_id = c.reseller_id
+            AND s.sale_date >= %(period_start)s
+            AND s.sale_date <= %(period_end)s
+      )
+    RETURNING id, reseller_id, total_sales_amount, total_commission_amount
+'''
+
+LINK_SALES_SQL = '''
+    DELETE FROM reseller_commission_sales WHERE commission_id = ANY(%(commission_ids)s::uuid[]);
+
+    INSERT INTO reseller_commission_sales (commission_id, sale_id, gross_amount, commission_amount, commission_status)
+    SELECT c.id, s.id, COALESCE(s.gross_amount, 0), COALESCE(s.commission_amount, 0), s.commission_status
+    FROM reseller_commissions c
+    JOIN reseller_sales s
+      ON s.reseller_id = c.reseller_id
+     AND s.sale_date >= c.period_start
+     AND s.sale_date <= c.period_end
+    WHERE c.id = ANY(%(commission_ids)s::uuid[]);
+'''
+
+_tables_ready = False
+_tables_lock = threading.Lock()
+
+
+def ensure_commission_tables() -> bool:
+    """Create the commission/sale link table once per process"""
+    global _tables_ready
+    if _tables_ready:
+        return True
+
+    with _tables_lock:
+        if _tables_ready:
+            return True
+        db = get_db_manager()
+        if not db.available:
+            return False
+        try:
+            with db.get_cursor() as (cursor, conn):
+                cursor.execute(COMMISSION_TABLES_SQL)
+                conn.commit()
+            _tables_ready = True
+        except Exception as e:
+            print(f"❌ Failed to create commission tables: {e}")
+        return _tables_ready
+
+
+def previous_month(today: date = None) -> Tuple[date, date]:
+    """First and last day of the month before today"""
+    first_of_month = (today or date.today()).replace(day=1)
+    period_end = first_of_month - timedelta(days=1)
+    return period_end.replace(day=1), period_end
+
+
+def run_commission_batch(period_start: date, period_end: date,
+                         reseller_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Calculate commissions for all resellers (or the given ones) for a period
+
+    Args:
+        period_start: First sale date included
+        period_end: Last sale date included
+        reseller_ids: Limit the run to these resellers
+
+    Returns:
+        dict: success, per-reseller commissions and run totals
+    """
+    if period_end < period_start:
+        return {'success': False, 'error': 'period_end must not be before period_start'}
+    if not ensure_commission_tables():
+        return {'success': False, 'error': 'Database not available'}
+
+    params = {
+        'period_start': period_start,
+        'period_end': period_end,
+        'reseller_ids': [str(reseller_id) for reseller_id in reseller_ids] if reseller_ids else None
+    }
+
+    start = time.perf_counter()
+    try:
+        with get_db_manager().get_cursor(RealDictCursor) as (cursor, conn):
+            cursor.execute(UPSERT_COMMISSIONS_SQL, params)
+            commissions = cursor.fetchall()
+            cursor.execute(CLEAR_STALE_COMMISSIONS_SQL, params)
+            cleared = cursor.fetchall()
+            commissions += cleared
+
+            sales_counts = {}
+            if commissions:
+                commission_ids = [str(row['id']) for row in commissions]
+                cursor.execute(LINK_SALES_SQL, {'commission_ids': commission_ids})
+                cursor.execute('''
+                    SELECT commission_id::text AS commission_id, COUNT(*) AS sales_count
+                    FROM reseller_commission_sales
+                    WHERE commission_id = ANY(%s::uuid[])
+                    GROUP BY commission_id
+                ''', (commission_ids,))
+                sales_counts = {row['commission_id']: row['sales_count'] for row in cursor.fetchall()}
+            conn.commit()
+    except Exception as e:
+        print(f"❌ Commission batch failed: {e}")
+        return {'success': False, 'error': str(e)}
+
+    results = [
+        {
+            'commission_id': str(row['id']),
+            'reseller_id': str(row['reseller_id']),
+            'total_sales': float(row['total_sales_amount']),
+            'total_commission': float(row['total_commission_amount']),
+            'sales_count': sales_counts.get(str(row['id']), 0)
+        }
+        for row in commissions
+    ]
+
+    return {
+        'success': True,
+        'period_start': period_start.isoformat(),
+        'period_end': period_end.isoformat(),
+        'commissions_updated': len(results),
+        'commissions_cleared': len(cleared),
+        'sales_linked': sum(sales_counts.values()),
+        'total_sales': round(sum(row['total_sales'] for row in results), 2),
+        'total_commission': round(sum(row['total_commission'] for row in results), 2),
+        'duration_ms': round((time.perf_counter() - start) * 1000, 2),
+        'commissions': results
+    }
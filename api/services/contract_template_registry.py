@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Contract Template Registry
+Compiled contract templates (the required-field list resolved once from the
+template's field definitions) cached per process and keyed by template_id and version
+(updated_at). Contract generation writes the contract and its activity log in
+a single statement that also re-checks the cached version, so a template
+edited in another process is picked up instead of being generated from.
+"""
+
+import os
+import json
+import uuid
+import time
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from psycopg2.extras import RealDictCursor
+
+from utils.database import get_db_manager, execute_query
+
+# Upper bound on how long another process's edits can go unnoticed for reads;
+# generation itself always checks the version
+CONTRACT_TEMPLATE_CACHE_SECONDS = float(os.environ.get('CONTRACT_TEMPLATE_CACHE_SECONDS', 300))
+
+# Insert only if the template is still active at the cached version; the
+# reseller lookup and the activity row ride along in the same round trip
+GENERATE_CONTRACT_SQL = '''
+    WITH template AS (
+        SELECT id FROM contract_templates
+        WHERE id = %(template_uuid)s
+          AND active
+          AND updated_at IS NOT DISTINCT FROM %(version)s
+    ),
+    contract AS (
+        INSERT INTO generated_contracts
+        (contract_number, template_id, customer_id, reseller_id, customer_data, status, created_by)
+        SELECT %(contract_number)s, template.id, %(customer_id)s,
+               (SELECT user_id FROM resellers WHERE user_id = %(user_id)s),
+               %(customer_data)s, 'generated', %(user_id)s
+        FROM template
+        RETURNING id, contract_number, generated_date, status
+    ),
+    activity AS (
+        INSERT INTO contract_activities (contract_id, activity_type, description, performed_by)
+        SELECT id, 'created', %(description)s, %(user_id)s FROM contract
+    )
+    SELECT id, contract_number, generated_date, status FROM contract
+'''
+
+
+class CompiledTemplate:
+    """A contract template with its required fields resolved ahead of time"""
+
+    def __init__(self, row: Dict[str, Any]):
+        self.id = row['id']
+        self.template_id = row['template_id']
+        self.name = row['name']
+        self.active = row['active']
+        self.version = row['updated_at']
+        self.loaded_at = time.monotonic()
+
+        fields = row['fields'] or []
+        if isinstance(fields, str):
+            fields = json.loads(fields)
+        self.required_fields = [field['name'] for field in fields if field.get('required')]
+
+    def validate(self, customer_data: Dict[str, Any]) -> Optional[str]:
+        """Error message for customer data that does not satisfy the template, else None"""
+        missing = [name for name in self.required_fields if name not in customer_data]
+        if missing:
+            return f'Missing required customer data: {", ".join(missing)}'
+        return None
+
+
+_templates: Dict[str, CompiledTemplate] = {}
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'invalidations': 0, 'stale_versions': 0}
+
+
+def _load_template(template_id: str) -> Optional[CompiledTemplate]:
+    result = execute_query('''
+        SELECT id, template_id, name, fields, active, updated_at
+        FROM contract_templates
+        WHERE template_id = %s
+    ''', (template_id,), 'one')
+    if not result['success'] or not result['data']:
+        return None
+    return CompiledTemplate(result['data'])
+
+
+def get_compiled_template(template_id: str, refresh: bool = False) -> Optional[CompiledTemplate]:
+    """
+    Compiled template from the process cache, loading it on a miss
+
+    Args:
+        template_id: Template's public ID
+        refresh: Reload from the database even if cached
+
+    Returns:
+        CompiledTemplate, or None if the template does not exist
+    """
+    template = _templates.get(template_id)
+    if (template is not None and not refresh
+            and time.monotonic() - template.loaded_at < CONTRACT_TEMPLATE_CACHE_SECONDS):
+        with _lock:
+            _stats['hits'] += 1
+        return template
+
+    template = _load_template(template_id)
+    with _lock:
+        _stats['misses'] += 1
+        if template is None:
+            _templates.pop(template_id, None)
+        else:
+            _templates[template_id] = template
+    return template
+
+
+def invalidate_template(template_id: Optional[str] = None):
+    """Drop one compiled template (or all of them) after it changes"""
+    with _lock:
+        if template_id is None:
+            _templates.clear()
+        else:
+            _templates.pop(template_id, None)
+        _stats['invalidations'] += 1
+
+
+def generate_contract_record(template: CompiledTemplate, customer_data: Dict[str, Any],
+                             customer_id: Optional[str], user_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Insert a generated contract and its 'created' activity in one statement
+
+    Args:
+        template: Compiled template the contract is generated from
+        customer_data: Validated customer data
+        customer_id: Customer the contract belongs to
+        user_id: User generating the contract; recorded as reseller if they are one
+
+    Returns:
+        dict: id, contract_number, generated_date and status, or None if the
+        template changed or was deactivated since it was compiled
+    """
+    contract_number = f"CON-{datetime.now().strftime('%Y%m%d')}-{str(uuid.uuid4())[:8].upper()}"
+    with get_db_manager().get_cursor(RealDictCursor) as (cursor, conn):
+        cursor.execute(GENERATE_CONTRACT_SQL, {
+            'template_uuid': template.id,
+            'version': template.version,
+            'contract_number': contract_number,
+            'customer_id': customer_id,
+            'user_id': user_id,
+            'customer_data': json.dumps(customer_data),
+            'description': f'Contract generated from template {template.template_id}'
+        })
+        contract = cursor.fetchone()
+        conn.commit()
+
+    if contract is None:
+        with _lock:
+            _stats['stale_versions'] += 1
+        return None
+    return dict(contract)
+
+
+def get_template_registry_stats() -> Dict[str, Any]:
+    with _lock:
+        stats = dict(_stats)
+        stats['cached_templates'] = len(_templates)
+    stats['ttl_seconds'] = CONTRACT_TEMPLATE_CACHE_SECONDS
+    return stats
@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+Admin Dashboard Snapshots
+The analytics dashboard, KPI summary and real-time metrics are computed once per
+interval and served to every admin from memory. Stale snapshots are returned
+immediately while a background thread rebuilds them (stale-while-revalidate),
+so polling admin tabs never wait on the aggregate queries.
+"""
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, Callable, Optional, Tuple
+
+from utils.database import get_db_manager, execute_query
+from utils.generated_columns import generated_column
+from utils.single_flight import SingleFlight
+from services.revenue_rollup_service import get_revenue_series, get_revenue_totals
+
+DASHBOARD_SNAPSHOT_DISABLED = os.environ.get('DASHBOARD_SNAPSHOT_DISABLED', 'false').lower() == 'true'
+DASHBOARD_SNAPSHOT_TTL_SECONDS = float(os.environ.get('DASHBOARD_SNAPSHOT_TTL_SECONDS', 60))
+REAL_TIME_SNAPSHOT_TTL_SECONDS = float(os.environ.get('REAL_TIME_SNAPSHOT_TTL_SECONDS', 15))
+# How long past its TTL a snapshot may still be served while it is rebuilt
+DASHBOARD_SNAPSHOT_MAX_STALE_SECONDS = float(os.environ.get('DASHBOARD_SNAPSHOT_MAX_STALE_SECONDS', 900))
+MAX_SNAPSHOTS = 64
+
+
+class SectionTimings:
+    """Collects per-section build durations for a snapshot"""
+
+    def __init__(self):
+        self.sections: Dict[str, float] = {}
+
+    @contextmanager
+    def section(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sections[name] = round((time.perf_counter() - start) * 1000, 2)
+
+
+def build_dashboard(timings: SectionTimings, days: int) -> Optional[Dict[str, Any]]:
+    """Full analytics dashboard payload, or None when the database is unavailable"""
+    if not get_db_manager().available:
+        return None
+
+    end_date = datetime.now(timezone.utc)
+    start_date = end_date - timedelta(days=days)
+
+    with timings.section('transactions'):
+        transactions_result = execute_query('''
+            SELECT COUNT(*) as total_transactions,
+                   COUNT(CASE WHEN status = 'completed' THEN 1 END) as completed_transactions,
+                   COUNT(CASE WHEN status = 'failed' THEN 1 END) as failed_transactions,
+                   COALESCE(SUM(CASE WHEN status = 'completed' THEN amount ELSE 0 END), 0) as total_revenue,
+                   COALESCE(AVG(CASE WHEN status = 'completed' THEN amount ELSE NULL END), 0) as avg_transaction_amount
+            FROM transactions
+            WHERE created_at >= %s
+              AND created_at <= %s
+        ''', (start_date, end_date), 'one')
+
+    with timings.section('contract_metrics'):
+        contract_metrics_result = execute_query('''
+            SELECT COUNT(*) as total_contracts,
+                   COUNT(CASE WHEN status = 'active' THEN 1 END) as active_contracts,
+                   COUNT(CASE WHEN status = 'signed' THEN 1 END) as signed_contracts,
+                   COUNT(CASE WHEN generated_date >= %s THEN 1 END) as contracts_this_period
+            FROM generated_contracts
+            WHERE generated_date >= %s - INTERVAL '90 days'
+        ''', (start_date, start_date), 'one')
+
+    with timings.section('contract_revenue'):
+        contract_revenue_result = execute_query('''
+            SELECT COALESCE(SUM(contract_value), 0) as contract_revenue,
+                   COUNT(*) as revenue_generating_contracts
+            FROM generated_contracts
+            WHERE generated_date >= %s
+              AND generated_date <= %s
+              AND contract_value IS NOT NULL
+              AND contract_value > 0
+        ''', (start_date, end_date), 'one')
+
+    with timings.section('daily_trends'):
+        daily_trends_result = get_revenue_series(start_date, end_date, 'day')
+
+    with timings.section('product_performance'):
+        product_type = generated_column('transactions', 'product_type')
+        product_performance_result = execute_query(f'''
+            WITH transaction_products AS (
+                SELECT COALESCE({product_type}, 'unknown') as product_type,
+                       COUNT(*) as quote_count,
+                       COUNT(CASE WHEN status = 'completed' THEN 1 END) as conversion_count,
+                       COALESCE(SUM(CASE WHEN status = 'completed' THEN amount ELSE 0 END), 0) as revenue
+                FROM transactions
+                WHERE created_at >= %s
+                  AND created_at <= %s
+                  AND {product_type} IS NOT NULL
+                GROUP BY {product_type}
+            ),
+            contract_products AS (
+                SELECT COALESCE(product_type, 'contract') as product_type,
+                       COUNT(*) as contract_count,
+                       COUNT(CASE WHEN status IN ('active', 'signed') THEN 1 END) as active_contracts,
+                       COALESCE(SUM(contract_value), 0) as contract_revenue
+                FROM generated_contracts gc
+                JOIN contract_templates ct ON gc.template_id = ct.template_id
+                WHERE gc.generated_date >= %s
+                  AND gc.generated_date <= %s
+                GROUP BY ct.product_type
+            )
+            SELECT COALESCE(tp.product_type, cp.product_type) as product_type,
+                   COALESCE(tp.quote_count, 0) as quote_count,
+                   COALESCE(tp.conversion_count, 0) as conversion_count,
+                   COALESCE(tp.revenue, 0) as transaction_revenue,
+                   COALESCE(cp.contract_count, 0) as contract_count,
+                   COALESCE(cp.active_contracts, 0) as active_contracts,
+                   COALESCE(cp.contract_revenue, 0) as contract_revenue,
+                   COALESCE(tp.revenue, 0) + COALESCE(cp.contract_revenue, 0) as total_revenue
+            FROM transaction_products tp
+            FULL OUTER JOIN contract_products cp ON tp.product_type = cp.product_type
+            ORDER BY total_revenue DESC
+        ''', (start_date, end_date, start_date, end_date))
+
+    # Estimated customer count (would be better with proper customer table)
+    with timings.section('customers'):
+        customer_count_result = execute_query('''
+            SELECT COUNT(DISTINCT customer_id) as total_customers
+            FROM (
+                SELECT customer_id
+                FROM transactions
+                WHERE customer_id IS NOT NULL
+                UNION
+                SELECT customer_data->>'customer_id' as customer_id
+                FROM generated_contracts
+                WHERE customer_data->>'customer_id' IS NOT NULL
+            ) combined_customers
+        ''', (), 'one')
+
+    dashboard_data = {
+        'period': {
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'days': days
+        },
+        'revenue_metrics': {
+            'total_revenue': 0,
+            'current_period_revenue': 0,
+            'average_transaction_value': 0,
+            'growth_rate': 0,
+            'revenue_by_period': {}
+        },
+        'customer_metrics': {
+            'total_customers': 0,
+            'new_customers_this_month': 0,
+            'retention_rate': 85.0  # Default value
+        },
+        'product_metrics': {
+            'product_metrics': {}
+        },
+        'operational_metrics': {
+            'active_policies': 0,
+            'total_transactions': 0,
+            'policies_expiring_soon': 0
+        }
+    }
+
+    if transactions_result['success'] and transactions_result['data']:
+        txn_data = transactions_result['data']
+        dashboard_data['revenue_metrics']['current_period_revenue'] = float(txn_data['total_revenue'] or 0)
+        dashboard_data['revenue_metrics']['average_transaction_value'] = float(txn_data['avg_transaction_amount'] or 0)
+        dashboard_data['operational_metrics']['total_transactions'] = txn_data['total_transactions'] or 0
+
+    if contract_metrics_result['success'] and contract_metrics_result['data']:
+        contract_data = contract_metrics_result['data']
+        dashboard_data['operational_metrics']['active_policies'] = contract_data['active_contracts'] or 0
+        dashboard_data['operational_metrics']['policies_expiring_soon'] = 0  # Would need expiration date logic
+
+    if contract_revenue_result['success'] and contract_revenue_result['data']:
+        contract_rev = float(contract_revenue_result['data']['contract_revenue'] or 0)
+        dashboard_data['revenue_metrics']['current_period_revenue'] += contract_rev
+        dashboard_data['revenue_metrics']['total_revenue'] = dashboard_data['revenue_metrics']['current_period_revenue']
+
+    if daily_trends_result['success']:
+        revenue_by_period = dashboard_data['revenue_metrics']['revenue_by_period']
+        for point in daily_trends_result['series']:
+            date_key = point['bucket'][:7]  # YYYY-MM
+            revenue_by_period[date_key] = revenue_by_period.get(date_key, 0) + point['total_revenue']
+
+    if product_performance_result['success'] and product_performance_result['data']:
+        for row in product_performance_result['data']:
+            dashboard_data['product_metrics']['product_metrics'][row['product_type']] = {
+                'total_revenue': float(row['total_revenue']),
+                'sales_count': (row['conversion_count'] or 0) + (row['active_contracts'] or 0),
+                'quote_count': row['quote_count'] or 0,
+                'contract_count': row['contract_count'] or 0
+            }
+
+    if customer_count_result['success'] and customer_count_result['data']:
+        dashboard_data['customer_metrics']['total_customers'] = customer_count_result['data']['total_customers'] or 0
+
+    return dashboard_data
+
+
+UNIQUE_CUSTOMERS_QUERY = '''
+    SELECT COUNT(DISTINCT customer_id) as unique_customers
+    FROM transactions
+    WHERE created_at >= %s AND created_at <= %s
+'''
+
+KPI_KEYS = ('total_quotes', 'conversions', 'revenue', 'unique_customers', 'avg_order_value')
+
+
+def _period_kpis(start_date: datetime, end_date: datetime) -> Optional[Dict[str, Any]]:
+    """Quote, conversion and revenue totals from the rollups; distinct customers from transactions"""
+    totals = get_revenue_totals(start_date, end_date)
+    customers = execute_query(UNIQUE_CUSTOMERS_QUERY, (start_date, end_date), 'one')
+    if not totals['success'] or not customers['success']:
+        return None
+
+    conversions = totals['completed_count']
+    return {
+        'total_quotes': totals['transaction_count'],
+        'conversions': conversions,
+        'revenue': totals['transaction_revenue'],
+        'unique_customers': customers['data']['unique_customers'],
+        'avg_order_value': totals['transaction_revenue'] / conversions if conversions else 0
+    }
+
+
+def build_kpi_summary(timings: SectionTimings, days: int, compare_previous: bool) -> Optional[Dict[str, Any]]:
+    """KPI summary with optional growth against the previous period"""
+    if not get_db_manager().available:
+        return None
+
+    end_date = datetime.now(timezone.utc)
+    start_date = end_date - timedelta(days=days)
+    prev_end_date = start_date
+    prev_start_date = prev_end_date - timedelta(days=days)
+
+    with timings.section('current_period'):
+        current_data = _period_kpis(start_date, end_date)
+
+    kpi_summary = {
+        'period': {
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'days': days
+        },
+        'kpis': {}
+    }
+
+    if current_data is None:
+        return kpi_summary
+
+    conversion_rate = (current_data['conversions'] / current_data['total_quotes'] * 100) if current_data['total_quotes'] > 0 else 0
+    kpi_summary['kpis'] = {
+        'total_quotes': current_data['total_quotes'],
+        'conversions': current_data['conversions'],
+        'conversion_rate': round(conversion_rate, 2),
+        'revenue': float(current_data['revenue']),
+        'unique_customers': current_data['unique_customers'],
+        'avg_order_value': float(current_data['avg_order_value'])
+    }
+
+    if compare_previous:
+        with timings.section('previous_period'):
+            prev_data = _period_kpis(prev_start_date, prev_end_date)
+
+        if prev_data is not None:
+            growth_rates = {}
+            for key in KPI_KEYS:
+                current_val = float(current_data[key]) if current_data[key] else 0
+                prev_val = float(prev_data[key]) if prev_data[key] else 0
+                if prev_val > 0:
+                    growth_rates[f'{key}_growth'] = round(((current_val - prev_val) / prev_val) * 100, 2)
+                else:
+                    growth_rates[f'{key}_growth'] = 0 if current_val == 0 else 100
+
+            kpi_summary['growth_rates'] = growth_rates
+            kpi_summary['comparison_period'] = {
+                'start_date': prev_start_date.isoformat(),
+                'end_date': prev_end_date.isoformat()
+            }
+
+    return kpi_summary
+
+
+def build_real_time_metrics(timings: SectionTimings) -> Optional[Dict[str, Any]]:
+    """Last-24-hour transaction counts, revenue and hourly distribution"""
+    if not get_db_manager().available:
+        return None
+
+    last_24h = datetime.now(timezone.utc) - timedelta(hours=24)
+
+    with timings.section('last_24_hours'):
+        recent = execute_query('''
+            SELECT COUNT(*) as count,
+                   COALESCE(SUM(CASE WHEN status = 'completed' THEN amount ELSE 0 END), 0) as revenue
+            FROM transactions
+            WHERE created_at >= %s
+        ''', (last_24h,), 'one')
+
+    with timings.section('hourly_distribution'):
+        hourly_series = get_revenue_series(last_24h, datetime.now(timezone.utc), 'hour')
+
+    recent_ok = recent['success'] and recent['data']
+    real_time_metrics = {
+        'last_24_hours': {
+            'transactions': recent['data']['count'] if recent_ok else 0,
+            'revenue': float(recent['data']['revenue']) if recent_ok else 0.0,
+            'active_sessions': 0  # Would require session tracking in production
+        },
+        'hourly_distribution': []
+    }
+
+    if hourly_series['success']:
+        # The first and last buckets share an hour of day
+        quotes_by_hour = {}
+        for point in hourly_series['series']:
+            hour = datetime.fromisoformat(point['bucket']).hour
+            quotes_by_hour[hour] = quotes_by_hour.get(hour, 0) + point['transaction_count']
+        real_time_metrics['hourly_distribution'] = [
+            {'hour': hour, 'quote_count': count} for hour, count in sorted(quotes_by_hour.items())
+        ]
+
+    real_time_metrics['updated_at'] = datetime.now(timezone.utc).isoformat() + 'Z'
+    return real_time_metrics
+
+
+# view name -> (builder, ttl seconds)
+DASHBOARD_VIEWS: Dict[str, Tuple[Callable[..., Optional[Dict[str, Any]]], float]] = {
+    'dashboard': (build_dashboard, DASHBOARD_SNAPSHOT_TTL_SECONDS),
+    'kpi_summary': (build_kpi_summary, DASHBOARD_SNAPSHOT_TTL_SECONDS),
+    'real_time': (build_real_time_metrics, REAL_TIME_SNAPSHOT_TTL_SECONDS)
+}
+
+
+class DashboardSnapshot:
+    __slots__ = ('body', 'created', 'generated_at', 'build_ms', 'sections')
+
+    def __init__(self, body: bytes, created: float, generated_at: str, build_ms: float, sections: Dict[str, float]):
+        self.body = body
+        self.created = created
+        self.generated_at = generated_at
+        self.build_ms = build_ms
+        self.sections = sections
+
+    def age(self) -> float:
+        return time.monotonic() - self.created
+
+
+_snapshots: Dict[tuple, DashboardSnapshot] = {}
+_refreshing = set()
+_lock = threading.Lock()
+_flight = SingleFlight('dashboard_snapshot', timeout=60)
+_stats = {'fresh': 0, 'stale': 0, 'miss': 0, 'builds': 0, 'refresh_errors': 0}
+
+
+def _count(stat: str):
+    with _lock:
+        _stats[stat] += 1
+
+
+def _build(key: tuple) -> Optional[DashboardSnapshot]:
+    builder = DASHBOARD_VIEWS[key[0]][0]
+    timings = SectionTimings()
+    start = time.perf_counter()
+    payload = builder(timings, *key[1:])
+    if payload is None:
+        return None
+
+    build_ms = round((time.perf_counter() - start) * 1000, 2)
+    generated_at = datetime.now(timezone.utc).isoformat() + 'Z'
+    payload['snapshot'] = {'generated_at': generated_at, 'build_ms': build_ms, 'sections': timings.sections}
+    # Serialized once so serving a snapshot is a memory read
+    snapshot = DashboardSnapshot(json.dumps(payload, default=str).encode('utf-8'), time.monotonic(),
+                                 generated_at, build_ms, timings.sections)
+
+    with _lock:
+        _stats['builds'] += 1
+        if DASHBOARD_SNAPSHOT_DISABLED:
+            return snapshot
+        _snapshots.pop(key, None)
+        _snapshots[key] = snapshot
+        while len(_snapshots) > MAX_SNAPSHOTS:
+            _snapshots.pop(next(iter(_snapshots)))
+    return snapshot
+
+
+def _refresh(key: tuple):
+    try:
+        _flight.do(key, lambda: _build(key))
+    except Exception as e:
+        _count('refresh_errors')
+        print(f"⚠️ Dashboard snapshot refresh failed for {key[0]}: {e}")
+    finally:
+        with _lock:
+            _refreshing.discard(key)
+
+
+def _schedule_refresh(key: tuple):
+    with _lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+    threading.Thread(target=_refresh, args=(key,), name=f'dashboard-refresh-{key[0]}', daemon=True).start()
+
+
+def get_dashboard_snapshot(view: str, *params) -> Tuple[Optional[DashboardSnapshot], str]:
+    """
+    Serve a dashboard view from its snapshot
+
+    Args:
+        view: Key of DASHBOARD_VIEWS
+        params: Builder arguments (also part of the snapshot key)
+
+    Returns:
+        tuple: (snapshot or None when the database is unavailable, 'fresh' | 'stale' | 'miss')
+    """
+    key = (view, *params)
+    ttl = DASHBOARD_VIEWS[view][1]
+
+    with _lock:
+        snapshot = _snapshots.get(key)
+
+    if snapshot is not None:
+        age = snapshot.age()
+        if age < ttl:
+            _count('fresh')
+            return snapshot, 'fresh'
+        if age < ttl + DASHBOARD_SNAPSHOT_MAX_STALE_SECONDS:
+            _count('stale')
+            _schedule_refresh(key)
+            return snapshot, 'stale'
+
+    _count('miss')
+    # Concurrent misses for the same view share one build
+    return _flight.do(key, lambda: _build(key)), 'miss'
+
+
+def rebuild_dashboard_snapshot(view: str, *params) -> Optional[DashboardSnapshot]:
+    """Build and store a view's snapshot now, regardless of its age"""
+    key = (view, *params)
+    return _flight.do(key, lambda: _build(key))
+
+
+def get_dashboard_snapshot_stats() -> Dict[str, Any]:
+    """Hit counts and the age and section timings of each cached snapshot"""
+    with _lock:
+        stats = dict(_stats)
+        snapshots = list(_snapshots.items())
+    stats['enabled'] = not DASHBOARD_SNAPSHOT_DISABLED
+    stats['snapshots'] = [
+        {
+            'view': key[0],
+            'params': list(key[1:]),
+            'age_seconds': round(snapshot.age(), 1),
+            'generated_at': snapshot.generated_at,
+            'build_ms': snapshot.build_ms,
+            'sections': snapshot.sections
+        }
+        for key, snapshot in snapshots
+    ]
+    return stats
@@ -12,6 +12,17 @@ from typing import Optional, Dict, Any
 from functools import lru_cache
 import os
 
+try:
+    from data.pricing_snapshot import get_active_snapshot, invalidate_snapshot
+except ImportError:
+    def get_active_snapshot(): return None
+    def invalidate_snapshot(reason: str = 'invalidated'): pass
+
+try:
+    from utils.prepared_statements import execute_prepared, uses_shared_pool
+except ImportError:
+    def uses_shared_pool(database_url): return False
+
 
 class DatabaseSettingsService:
     def __init__(self, database_url: str = None):
@@ -94,7 +105,8 @@ class DatabaseSettingsService:
             ('video', 'landing_page_description', '"Showcase of our comprehensive protection plans"', 'Landing page video description'),
             ('video', 'landing_page_duration', '"2:30"', 'Landing page video duration'),
             ('video', 'landing_page_url', '""', 'Landing page video URL'),
-            ('video', 'landing_page_thumbnail', '""', 'Landing page video thumbnail URL')
+            ('video', 'landing_page_thumbnail', '""', 'Landing page video thumbnail URL'),
+            ('video', 'landing_page_thumbnail_renditions', '{}', 'Landing page thumbnail WebP/JPEG rendition URLs by width')
         ]
         
         for category, key, value, description in default_settings:
@@ -113,19 +125,29 @@ class DatabaseSettingsService:
     def get_admin_setting(self, category: str, key: str, default_value: Any = None) -> Any:
         if not self.connection_available:
             return default_value
+        
+        snapshot = get_active_snapshot()
+        if snapshot is not None and snapshot.has_admin_setting(category, key):
+            return snapshot.get_admin_setting(category, key, default_value)
             
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                "SELECT value FROM admin_settings WHERE category = %s AND key = %s",
-                (category, key)
-            )
-            result = cursor.fetchone()
-            
-            cursor.close()
-            conn.close()
+            if uses_shared_pool(self.database_url):
+                prepared = execute_prepared('admin_setting', (category, key))
+                if not prepared['success']:
+                    raise Exception(prepared['error'])
+                result = (prepared['data']['value'],) if prepared['data'] else None
+            else:
+                conn = self.get_connection()
+                cursor = conn.cursor()
+                
+                cursor.execute(
+                    "SELECT value FROM admin_settings WHERE category = %s AND key = %s",
+                    (category, key)
+                )
+                result = cursor.fetchone()
+                
+                cursor.close()
+                conn.close()
             
             if result:
                 value = json.loads(result[0]) if isinstance(result[0], str) else result[0]
@@ -140,19 +162,31 @@ class DatabaseSettingsService:
     def get_all_settings_by_category(self, category: str) -> Dict[str, Any]:
         if not self.connection_available:
             return {}
+        
+        snapshot = get_active_snapshot()
+        if snapshot is not None:
+            snapshot_settings = snapshot.get_settings_by_category(category)
+            if snapshot_settings:
+                return snapshot_settings
             
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                "SELECT key, value FROM admin_settings WHERE category = %s",
-                (category,)
-            )
-            results = cursor.fetchall()
-            
-            cursor.close()
-            conn.close()
+            if uses_shared_pool(self.database_url):
+                prepared = execute_prepared('admin_settings_by_category', (category,), 'all')
+                if not prepared['success']:
+                    raise Exception(prepared['error'])
+                results = [(row['key'], row['value']) for row in prepared['data']]
+            else:
+                conn = self.get_connection()
+                cursor = conn.cursor()
+                
+                cursor.execute(
+                    "SELECT key, value FROM admin_settings WHERE category = %s",
+                    (category,)
+                )
+                results = cursor.fetchall()
+                
+                cursor.close()
+                conn.close()
             
             settings = {}
             for key, value in results:
@@ -176,6 +210,8 @@ class DatabaseSettingsService:
     
     def clear_cache(self):
         self.get_admin_setting.cache_clear()
+        # Settings changed after the snapshot was built; stop serving it here
+        invalidate_snapshot('invalidated by settings update')
     
     def update_setting(self, category: str, key: str, value: Any, description: str = None, updated_by: str = None):
         if not self.connection_available:
@@ -4,6 +4,7 @@ Enhanced VIN Decoder Service with Database Integration
 Handles VIN validation, decoding, and VSC eligibility checking using database-driven rules
 """
 
+import os
 import re
 import requests
 from datetime import datetime, timedelta
@@ -22,6 +23,14 @@ try:
 except ImportError:
     DATABASE_INTEGRATION = False
 
+try:
+    from utils.single_flight import coalesce
+except ImportError:
+    def coalesce(group, key_func, timeout=None): return lambda func: func
+
+# vPIC base URL (overridable so load tests can point at a local stand-in)
+NHTSA_API_BASE_URL = os.environ.get('NHTSA_API_BASE_URL', 'https://vpic.nhtsa.dot.gov/api').rstrip('/')
+
 class EnhancedVINDecoderService:
     """Enhanced service for VIN validation, decoding, and eligibility checking with database integration"""
     
@@ -185,6 +194,9 @@ class EnhancedVINDecoderService:
         except Exception as e:
             return self._validation_error(f'VIN validation error: {str(e)}')
     
+    @coalesce('vin_decode', lambda self, vin, model_year=None: (
+        str(vin).strip().upper(), int(model_year) if model_year else None
+    ))
     def decode_vin(self, vin: str, model_year: Optional[int] = None) -> Dict:
         """Enhanced VIN decoding with database integration"""
         try:
@@ -584,7 +596,7 @@ class EnhancedVINDecoderService:
         try:
             print(f"🔍 Attempting NHTSA decode for VIN: {vin}")
             
-            url = f"https://vpic.nhtsa.dot.gov/api/vehicles/DecodeVin/{vin}"
+            url = f"{NHTSA_API_BASE_URL}/vehicles/DecodeVin/{vin}"
             params = {'format': 'json'}
             
             if model_year:
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Helcim Customer/Invoice Reuse
+Persists which Helcim customer belongs to each signed-in user and which Helcim
+invoice is still open for a quote, so returning buyers and retried payment
+forms go straight to creating the checkout session instead of creating a new
+customer and invoice every attempt.
+
+A Helcim customer can carry saved payment methods, so it is only ever reused
+for the user id from a verified token, never for an email or id taken from the
+request body, and only while the billing details match the ones it was
+created with. Guests always get a new customer.
+
+Databases created before the billing details hash need a one-off migration:
+
+Usage:
+    python api/services/helcim_customer_cache_service.py migrate
+"""
+
+import os
+import sys
+import hashlib
+import threading
+from typing import Dict, Any, List, Optional
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from psycopg2.extras import RealDictCursor
+
+from utils.database import get_db_manager, execute_query
+
+# An unpaid invoice is reused for retries of the same quote for this long
+HELCIM_INVOICE_REUSE_HOURS = float(os.environ.get('HELCIM_INVOICE_REUSE_HOURS', 24))
+HELCIM_REUSE_DISABLED = os.environ.get('HELCIM_REUSE_DISABLED', 'false').lower() == 'true'
+
+HELCIM_CACHE_TABLES_SQL = '''
+    CREATE TABLE IF NOT EXISTS helcim_customers (
+        identity_key VARCHAR(320) PRIMARY KEY,
+        helcim_customer_id VARCHAR(64) NOT NULL,
+        helcim_customer_code VARCHAR(64),
+        details_hash VARCHAR(64),
+        created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        last_used_at TIMESTAMP WITHOUT TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_helcim_customers_helcim_id ON helcim_customers (helcim_customer_id);
+
+    CREATE TABLE IF NOT EXISTS helcim_invoices (
+        invoice_id VARCHAR(64) PRIMARY KEY,
+        invoice_number VARCHAR(64),
+        quote_id VARCHAR(255) NOT NULL,
+        helcim_customer_id VARCHAR(64) NOT NULL,
+        amount NUMERIC(12, 2) NOT NULL,
+        currency VARCHAR(3) NOT NULL,
+        status VARCHAR(20) NOT NULL DEFAULT 'open',
+        created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        closed_at TIMESTAMP WITHOUT TIME ZONE
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_helcim_invoices_open_quote ON helcim_invoices (quote_id, helcim_customer_id)
+        WHERE status = 'open';
+'''
+
+# Mappings used to be keyed on request-supplied customer ids and emails, without
+# a details hash; run once by the migrate command, never from a request
+HELCIM_CACHE_MIGRATION_SQL = '''
+    ALTER TABLE helcim_customers ADD COLUMN IF NOT EXISTS details_hash VARCHAR(64);
+    DELETE FROM helcim_customers WHERE identity_key NOT LIKE 'user:%' OR details_hash IS NULL;
+'''
+
+CUSTOMER_LOOKUP_SQL = '''
+    SELECT helcim_customer_id, helcim_customer_code
+    FROM helcim_customers
+    WHERE identity_key = ANY(%(identity_keys)s)
+      AND details_hash = %(details_hash)s
+    ORDER BY array_position(%(identity_keys)s, identity_key::text)
+    LIMIT 1
+'''
+
+# Customer and open invoice in one round trip; changed billing details don't match
+LOOKUP_SQL = '''
+    SELECT hc.helcim_customer_id, hc.helcim_customer_code,
+           hi.invoice_id, hi.invoice_number
+    FROM helcim_customers hc
+    LEFT JOIN LATERAL (
+        SELECT invoice_id, invoice_number
+        FROM helcim_invoices
+        WHERE quote_id = %(quote_id)s
+          AND helcim_customer_id = hc.helcim_customer_id
+          AND amount = %(amount)s
+          AND currency = %(currency)s
+          AND status = 'open'
+          AND created_at > CURRENT_TIMESTAMP - make_interval(secs => %(reuse_seconds)s)
+        ORDER BY created_at DESC
+        LIMIT 1
+    ) hi ON %(quote_id)s::text IS NOT NULL
+    WHERE hc.identity_key = ANY(%(identity_keys)s)
+      AND hc.details_hash = %(details_hash)s
+    ORDER BY array_position(%(identity_keys)s, hc.identity_key::text)
+    LIMIT 1
+'''
+
+_tables_ready = False
+_tables_lock = threading.Lock()
+
+
+def ensure_helcim_cache_tables() -> bool:
+    """Create the Helcim customer/invoice mapping tables once per process"""
+    global _tables_ready
+    if _tables_ready:
+        return True
+
+    with _tables_lock:
+        if _tables_ready:
+            return True
+        db = get_db_manager()
+        if not db.available:
+            return False
+        try:
+            with db.get_cursor() as (cursor, conn):
+                cursor.execute(HELCIM_CACHE_TABLES_SQL)
+                conn.commit()
+            _tables_ready = True
+        except Exception as e:
+            print(f"❌ Failed to create Helcim cache tables: {e}")
+        return _tables_ready
+
+
+def migrate_helcim_cache() -> Dict[str, Any]:
+    """
+    Add the details_hash column and drop mappings from before it existed
+
+    Old mappings were keyed on ids and emails taken from the request body, so
+    they must not be reused. Until this runs they are never matched anyway
+    (lookups only use user keys and require a matching hash).
+    """
+    if not ensure_helcim_cache_tables():
+        return {'success': False, 'error': 'Database not available'}
+    try:
+        with get_db_manager().get_cursor() as (cursor, conn):
+            cursor.execute(HELCIM_CACHE_MIGRATION_SQL)
+            removed = cursor.rowcount
+            conn.commit()
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+    return {'success': True, 'legacy_mappings_removed': removed}
+
+
+def identity_keys(user_id: Optional[Any] = None) -> List[str]:
+    """
+    Lookup keys for a buyer
+
+    Args:
+        user_id: Id of the authenticated user, from a verified token only
+
+    Returns:
+        list: Empty for guests, who are never matched to an existing customer
+    """
+    return [f'user:{user_id}'] if user_id else []
+
+
+def details_hash(customer_info) -> str:
+    """Fingerprint of the billing details a Helcim customer was created with"""
+    address = customer_info.billing_address
+    fields = [customer_info.contact_name, customer_info.email, customer_info.phone]
+    if address is not None:
+        fields += [address.street1, address.street2, address.city, address.province,
+                   address.postal_code, address.country]
+    normalized = '\x1f'.join(' '.join(str(field or '').split()).lower() for field in fields)
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def _helcim_id(value: Optional[str]) -> Any:
+    """Helcim IDs are integers; they are stored as text"""
+    return int(value) if value is not None and value.isdigit() else value
+
+
+def lookup_customer(keys: List[str], fingerprint: str) -> Optional[Dict[str, Any]]:
+    """Known Helcim customer for the buyer and these billing details"""
+    if HELCIM_REUSE_DISABLED or not keys or not ensure_helcim_cache_tables():
+        return None
+
+    result = execute_query(CUSTOMER_LOOKUP_SQL, {'identity_keys': keys, 'details_hash': fingerprint}, 'one')
+    if not result.get('success') or not result.get('data'):
+        return None
+    row = dict(result['data'])
+    row['helcim_customer_id'] = _helcim_id(row['helcim_customer_id'])
+    return row
+
+
+def lookup_checkout_reuse(keys: List[str], fingerprint: str, quote_id: Optional[str], amount: float,
+                          currency: str) -> Optional[Dict[str, Any]]:
+    """Known Helcim customer for the buyer and these billing details, plus any still-open invoice for the quote"""
+    if HELCIM_REUSE_DISABLED or not keys or not ensure_helcim_cache_tables():
+        return None
+
+    result = execute_query(LOOKUP_SQL, {
+        'identity_keys': keys,
+        'details_hash': fingerprint,
+        'quote_id': quote_id,
+        'amount': round(float(amount), 2),
+        'currency': currency,
+        'reuse_seconds': HELCIM_INVOICE_REUSE_HOURS * 3600
+    }, 'one')
+    if not result.get('success') or not result.get('data'):
+        return None
+    row = dict(result['data'])
+    row['helcim_customer_id'] = _helcim_id(row['helcim_customer_id'])
+    row['invoice_id'] = _helcim_id(row['invoice_id'])
+    return row
+
+
+def remember_customer(keys: List[str], fingerprint: str, helcim_customer_id: Any,
+                      helcim_customer_code: Optional[str] = None):
+    """Map every identity key of the buyer to the Helcim customer created for these billing details"""
+    if HELCIM_REUSE_DISABLED or not keys or helcim_customer_id is None or not ensure_helcim_cache_tables():
+        return
+    try:
+        with get_db_manager().get_cursor(RealDictCursor) as (cursor, conn):
+            # The code is only kept while the customer stays the same
+            cursor.execute('''
+                INSERT INTO helcim_customers (identity_key, helcim_customer_id, helcim_customer_code, details_hash)
+                SELECT key, %s, %s, %s FROM unnest(%s::text[]) AS key
+                ON CONFLICT (identity_key) DO UPDATE SET
+                    helcim_customer_id = EXCLUDED.helcim_customer_id,
+                    helcim_customer_code = CASE
+                        WHEN helcim_customers.helcim_customer_id = EXCLUDED.helcim_customer_id
+                        THEN COALESCE(EXCLUDED.helcim_customer_code, helcim_customers.helcim_customer_code)
+                        ELSE EXCLUDED.helcim_customer_code
+                    END,
+                    details_hash = EXCLUDED.details_hash,
+                    last_used_at = CURRENT_TIMESTAMP
+            ''', (str(helcim_customer_id), helcim_customer_code, fingerprint, keys))
+            conn.commit()
+    except Exception as e:
+        print(f"⚠️ Failed to remember Helcim customer: {e}")
+
+
+def forget_customer(helcim_customer_id: Any):
+    """Drop a mapping Helcim no longer accepts so the next checkout creates a fresh customer"""
+    execute_query('DELETE FROM helcim_customers WHERE helcim_customer_id = %s',
+                  (str(helcim_customer_id),), None)
+
+
+def remember_invoice(invoice_id: Any, invoice_number: Optional[str], quote_id: Optional[str],
+                     helcim_customer_id: Any, amount: float, currency: str):
+    """Record an open invoice so retries of the same quote reuse it"""
+    if HELCIM_REUSE_DISABLED or not quote_id or invoice_id is None or not ensure_helcim_cache_tables():
+        return
+    execute_query('''
+        INSERT INTO helcim_invoices (invoice_id, invoice_number, quote_id, helcim_customer_id, amount, currency)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON CONFLICT (invoice_id) DO NOTHING
+    ''', (str(invoice_id), invoice_number, quote_id, str(helcim_customer_id), round(float(amount), 2), currency), None)
+
+
+def close_quote_invoices(quote_id: Optional[str], status: str = 'paid'):
+    """Stop reusing a quote's invoices once it has been paid"""
+    if not quote_id or not ensure_helcim_cache_tables():
+        return
+    execute_query('''
+        UPDATE helcim_invoices SET status = %s, closed_at = CURRENT_TIMESTAMP
+        WHERE quote_id = %s AND status = 'open'
+    ''', (status, quote_id), None)
+
+
+def create_checkout_with_reuse(processor, amount: float, currency, customer_info,
+                               description: Optional[str] = None, user_id: Optional[Any] = None,
+                               quote_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Run the Helcim checkout flow, skipping customer/invoice creation when they can be reused
+
+    Args:
+        processor: HelcimPaymentProcessor
+        amount: Checkout amount
+        currency: helcim_integration.Currency
+        customer_info: helcim_integration.CustomerInfo
+        description: Invoice description
+        user_id: Authenticated user id from a verified token; None for guests
+        quote_id: Quote being paid; enables invoice reuse across retries
+
+    Returns:
+        dict: create_complete_checkout_flow result plus which steps were reused
+    """
+    keys = identity_keys(user_id)
+    fingerprint = details_hash(customer_info)
+    reuse = lookup_checkout_reuse(keys, fingerprint, quote_id, amount, currency.value) or {}
+    customer_id = reuse.get('helcim_customer_id')
+    invoice_id = reuse.get('invoice_id')
+
+    result = processor.create_complete_checkout_flow(
+        amount=amount,
+        currency=currency,
+        customer_info=customer_info,
+        description=description,
+        customer_id=customer_id,
+        invoice_id=invoice_id
+    )
+    status_code = result.get('status_code') or 0
+    if not result['success'] and customer_id and 400 <= status_code < 500:
+        # Helcim rejected the stored customer or invoice (e.g. removed on their side)
+        print(f"⚠️ Reused Helcim customer {customer_id} rejected, creating a new one: {result.get('error')}")
+        forget_customer(customer_id)
+        customer_id = invoice_id = None
+        result = processor.create_complete_checkout_flow(
+            amount=amount,
+            currency=currency,
+            customer_info=customer_info,
+            description=description
+        )
+    if not result['success']:
+        return result
+
+    # A customer created because the billing details changed replaces the old mapping
+    remember_customer(keys, fingerprint, result['customer_id'], result.get('customer_code'))
+    if not invoice_id:
+        remember_invoice(result['invoice_id'], result.get('invoice_number'), quote_id,
+                         result['customer_id'], amount, currency.value)
+
+    result['reused_customer'] = customer_id is not None
+    result['reused_invoice'] = invoice_id is not None
+    return result
+
+
+def get_or_create_helcim_customer(processor, customer_info, user_id: Optional[Any] = None) -> Dict[str, Any]:
+    """The signed-in user's Helcim customer for these billing details, or a newly created (and remembered) one"""
+    keys = identity_keys(user_id)
+    fingerprint = details_hash(customer_info)
+    known = lookup_customer(keys, fingerprint)
+    if known:
+        remember_customer(keys, fingerprint, known['helcim_customer_id'], known['helcim_customer_code'])
+        return {
+            'success': True,
+            'customer_id': known['helcim_customer_id'],
+            'customer_code': known['helcim_customer_code'],
+            'reused': True
+        }
+
+    result = processor.create_customer(customer_info)
+    if result['success']:
+        remember_customer(keys, fingerprint, result['customer_id'], result.get('customer_code'))
+        result['reused'] = False
+    return result
+
+
+if __name__ == '__main__':
+    import json
+
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == 'migrate':
+        result = migrate_helcim_cache()
+    else:
+        print(__doc__)
+        sys.exit(1)
+    print(json.dumps(result, indent=2, default=str))
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Responsive Image Rendition Service
+Decodes an uploaded image once (at reduced JPEG scale via Image.draft where
+possible) and renders a set of widths in WebP and JPEG on a thread pool;
+Pillow releases the GIL while resizing and encoding
+"""
+
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Union, BinaryIO
+
+from PIL import Image, ImageOps
+
+RENDITION_WIDTHS = tuple(sorted(int(w) for w in os.environ.get(
+    'IMAGE_RENDITION_WIDTHS', '320,640,960,1280,1920').split(',') if w.strip()))
+RENDITION_FORMATS = {
+    'webp': {'format': 'WEBP', 'content_type': 'image/webp', 'extension': 'webp',
+             'options': {'quality': 80, 'method': 2}},
+    'jpeg': {'format': 'JPEG', 'content_type': 'image/jpeg', 'extension': 'jpg',
+             'options': {'quality': 82, 'optimize': True}}
+}
+MAX_RENDITION_HEIGHT = 1080
+RENDITION_WORKERS = int(os.environ.get('IMAGE_RENDITION_WORKERS', min(4, os.cpu_count() or 1)))
+
+
+class Rendition:
+    __slots__ = ('width', 'height', 'format', 'content_type', 'extension', 'data')
+
+    def __init__(self, width: int, height: int, format_name: str, data: bytes):
+        spec = RENDITION_FORMATS[format_name]
+        self.width = width
+        self.height = height
+        self.format = format_name
+        self.content_type = spec['content_type']
+        self.extension = spec['extension']
+        self.data = data
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+
+def _target_sizes(source_size: tuple, widths, max_height: int) -> List[tuple]:
+    """Distinct (width, height) targets that don't upscale the source"""
+    source_width, source_height = source_size
+    sizes = []
+    for width in sorted(widths):
+        width = min(width, source_width)
+        height = max(1, round(source_height * width / source_width))
+        if height > max_height:
+            height = max_height
+            width = max(1, round(source_width * height / source_height))
+        if (width, height) not in sizes:
+            sizes.append((width, height))
+    return sizes
+
+
+def decode_source(source: Union[bytes, BinaryIO], widths=RENDITION_WIDTHS,
+                  max_height: int = MAX_RENDITION_HEIGHT) -> Image.Image:
+    """
+    Decode an image once at the smallest scale that still covers the largest rendition
+
+    For JPEGs Image.draft lets libjpeg decode at 1/2, 1/4 or 1/8 scale, which
+    skips most of the IDCT work for large camera images.
+    """
+    image = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+    if image.format == 'JPEG':
+        # EXIF orientations 5-8 are stored rotated by 90 degrees
+        rotated = image.getexif().get(0x0112) in (5, 6, 7, 8)
+        width, height = image.size[::-1] if rotated else image.size
+        largest = _target_sizes((width, height), widths, max_height)[-1]
+        image.draft('RGB', largest[::-1] if rotated else largest)
+
+    image = ImageOps.exif_transpose(image)
+
+    if image.mode in ('RGBA', 'LA', 'P'):
+        rgba = image.convert('RGBA')
+        background = Image.new('RGB', rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    image.load()
+    return image
+
+
+def _render_size(source: Image.Image, size: tuple, formats) -> List[Rendition]:
+    resized = source if size == source.size else source.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+    renditions = []
+    for format_name in formats:
+        spec = RENDITION_FORMATS[format_name]
+        output = io.BytesIO()
+        resized.save(output, format=spec['format'], **spec['options'])
+        renditions.append(Rendition(size[0], size[1], format_name, output.getvalue()))
+    return renditions
+
+
+def render_renditions(source: Union[bytes, BinaryIO], widths=RENDITION_WIDTHS,
+                      formats=tuple(RENDITION_FORMATS), max_height: int = MAX_RENDITION_HEIGHT,
+                      workers: int = RENDITION_WORKERS) -> List[Rendition]:
+    """
+    Render every width in every format from one decode
+
+    Args:
+        source: Encoded image bytes or file object
+        widths: Target widths; widths above the source size collapse to the source width
+        formats: Keys of RENDITION_FORMATS
+        max_height: Height cap applied after scaling to width
+        workers: Thread pool size (1 renders inline)
+
+    Returns:
+        Renditions ordered by width, then format
+    """
+    image = decode_source(source, widths, max_height)
+    sizes = _target_sizes(image.size, widths, max_height)
+
+    if workers <= 1 or len(sizes) == 1:
+        results = [_render_size(image, size, formats) for size in sizes]
+    else:
+        with ThreadPoolExecutor(max_workers=min(workers, len(sizes)), thread_name_prefix='rendition') as pool:
+            results = list(pool.map(lambda size: _render_size(image, size, formats), sizes))
+
+    return [rendition for group in results for rendition in group]
+
+
+def build_srcsets(rendition_urls: Dict[str, Dict[str, str]]) -> Dict[str, str]:
+    """{'webp': {'320': url, ...}} -> {'webp': 'url 320w, ...'} for <picture>/<img srcset>"""
+    return {
+        format_name: ', '.join(f"{url} {width}w" for width, url in
+                               sorted(urls.items(), key=lambda item: int(item[0])))
+        for format_name, urls in rendition_urls.items()
+    }
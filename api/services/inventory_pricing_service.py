@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Inventory Pricing Service
+Prices a dealer's whole lot from one CSV or NDJSON upload: rows are read
+lazily, VINs decode concurrently a chunk at a time, and every eligible vehicle
+is priced for every plan against one pinned set of rate tables. Results are
+yielded as events so the endpoint can stream them while the job runs.
+"""
+
+import io
+import re
+import csv
+import json
+import os
+import time
+import uuid
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Any, Iterator, List, Optional, BinaryIO, Tuple
+
+from data.vsc_rates_data import calculate_vsc_price, rate_manager
+from data.pricing_snapshot import PricingSnapshot, build_snapshot, get_active_snapshot, pinned_snapshot
+from services.database_settings_service import get_admin_fee, get_tax_rate, settings_service
+
+INVENTORY_MAX_ROWS = int(os.environ.get('INVENTORY_MAX_ROWS', 5000))
+INVENTORY_CHUNK_SIZE = int(os.environ.get('INVENTORY_CHUNK_SIZE', 100))
+INVENTORY_DECODE_WORKERS = int(os.environ.get('INVENTORY_DECODE_WORKERS', 8))
+
+DEFAULT_TERMS = (12, 24, 36, 48, 60)
+DEFAULT_COVERAGE_LEVELS = ('silver', 'gold', 'platinum')
+
+# Normalized header -> field; dealer management system exports disagree on names
+COLUMN_ALIASES = {
+    'vin': 'vin', 'vin_number': 'vin', 'vehicle_vin': 'vin',
+    'mileage': 'mileage', 'miles': 'mileage', 'odometer': 'mileage', 'current_mileage': 'mileage',
+    'make': 'make', 'vehicle_make': 'make',
+    'model': 'model', 'vehicle_model': 'model',
+    'year': 'year', 'model_year': 'year', 'vehicle_year': 'year',
+    'stock': 'stock_number', 'stock_number': 'stock_number', 'stock_no': 'stock_number'
+}
+
+
+class InventoryFileError(ValueError):
+    """Upload can't be read as an inventory file"""
+
+
+def detect_format(filename: str = None, content_type: str = None) -> str:
+    """'ndjson' for .ndjson/.jsonl or an NDJSON content type, otherwise 'csv'"""
+    filename = (filename or '').lower()
+    content_type = (content_type or '').lower()
+    if filename.endswith(('.ndjson', '.jsonl')) or 'ndjson' in content_type or 'jsonl' in content_type:
+        return 'ndjson'
+    return 'csv'
+
+
+def _field_for(header) -> Optional[str]:
+    return COLUMN_ALIASES.get(re.sub(r'[^a-z0-9]+', '_', str(header).lower()).strip('_'))
+
+
+def _normalize_row(raw: Dict[str, Any]) -> Dict[str, Any]:
+    row = {}
+    for key, value in raw.items():
+        if key is None:
+            continue
+        field = _field_for(key)
+        if field and field not in row:
+            row[field] = value.strip() if isinstance(value, str) else value
+    return row
+
+
+def iter_inventory_rows(stream: BinaryIO, file_format: str = 'csv') -> Iterator[Dict[str, Any]]:
+    """
+    Read rows lazily from an uploaded file
+
+    Args:
+        stream: Binary file object
+        file_format: 'csv' (header row required) or 'ndjson'
+
+    Yields:
+        dict with any of vin, mileage, make, model, year, stock_number
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+
+    if file_format == 'ndjson':
+        for line_number, line in enumerate(text, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield {'error': f'Line {line_number} is not valid JSON: {e.msg}'}
+                continue
+            yield _normalize_row(record) if isinstance(record, dict) else {'error': f'Line {line_number} is not an object'}
+        return
+
+    reader = csv.DictReader(text)
+    if not reader.fieldnames or 'vin' not in {_field_for(name) for name in reader.fieldnames}:
+        raise InventoryFileError('CSV must have a header row with a VIN column')
+    for record in reader:
+        yield _normalize_row(record)
+
+
+def _parse_int(value) -> Optional[int]:
+    if value in (None, ''):
+        return None
+    try:
+        return int(float(str(value).replace(',', '')))
+    except (TypeError, ValueError):
+        return None
+
+
+def _prepare_item(row_number: int, row: Dict[str, Any]) -> Dict[str, Any]:
+    item = {
+        'row': row_number,
+        'vin': str(row.get('vin') or '').strip().upper(),
+        'stock_number': row.get('stock_number'),
+        'mileage': _parse_int(row.get('mileage')),
+        'make': (row.get('make') or '').strip() or None,
+        'model': (row.get('model') or '').strip() or None,
+        'year': _parse_int(row.get('year'))
+    }
+    if row.get('error'):
+        item['error'] = row['error']
+    elif not item['vin']:
+        item['error'] = 'VIN is required'
+    elif item['mileage'] is None or item['mileage'] < 0:
+        item['error'] = 'Valid mileage is required'
+    return item
+
+
+class InventoryPricingJob:
+    """One pass over an uploaded lot; iterate run() for result events"""
+
+    def __init__(self, vin_service, coverage_levels: List[str] = None, terms: List[int] = None,
+                 deductible: int = 100, customer_type: str = 'retail',
+                 chunk_size: int = INVENTORY_CHUNK_SIZE, max_rows: int = INVENTORY_MAX_ROWS,
+                 decode_workers: int = INVENTORY_DECODE_WORKERS):
+        self.job_id = f"INV-{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6].upper()}"
+        self.vin_service = vin_service
+        self.coverage_levels = [level.lower() for level in coverage_levels] if coverage_levels else None
+        self.terms = sorted(int(term) for term in terms) if terms else None
+        self.deductible = deductible
+        self.customer_type = customer_type
+        self.chunk_size = max(1, chunk_size)
+        self.max_rows = max_rows
+        self.decode_workers = max(1, decode_workers)
+        self._decoded: Dict[Tuple[str, Optional[int]], Dict[str, Any]] = {}
+        self.counts = {'processed': 0, 'priced': 0, 'ineligible': 0, 'invalid': 0, 'errors': 0, 'decoded': 0}
+
+    def _job_snapshot(self) -> Tuple[Optional[PricingSnapshot], str]:
+        active = get_active_snapshot()
+        if active is not None:
+            return active, 'snapshot'
+        try:
+            return PricingSnapshot(build_snapshot()), 'job_snapshot'
+        except Exception as e:
+            print(f"⚠️ Inventory job {self.job_id} pricing from live tables: {e}")
+            return None, 'database'
+
+    def _resolve_plans(self):
+        if not self.coverage_levels:
+            levels = rate_manager.get_coverage_levels() or {}
+            self.coverage_levels = list(levels) or list(DEFAULT_COVERAGE_LEVELS)
+        if not self.terms:
+            terms = rate_manager.get_term_multipliers() or {}
+            self.terms = sorted(terms) or list(DEFAULT_TERMS)
+
+    @staticmethod
+    def _decode_key(item: Dict[str, Any]) -> Optional[Tuple[str, Optional[int]]]:
+        """Cache key for rows that need an NHTSA decode; None when the file supplies make and year"""
+        if item['make'] and item['year']:
+            return None
+        return item['vin'], item['year']
+
+    def _resolve_supplied(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """A supplied make and year skip the NHTSA round trip; the VIN is still validated"""
+        validation = self.vin_service.validate_vin(item['vin'])
+        if not validation.get('valid'):
+            return {'success': False, 'error': validation.get('error', 'Invalid VIN')}
+        return {'success': True, 'vehicle_info': {
+            'vin': item['vin'], 'make': item['make'], 'model': item['model'],
+            'year': item['year'], 'decode_method': 'inventory_file'
+        }}
+
+    def _price_vehicle(self, item: Dict[str, Any], vehicle_info: Dict[str, Any]) -> Dict[str, Any]:
+        make = vehicle_info.get('make') or item['make']
+        year = _parse_int(vehicle_info.get('year')) or item['year']
+        model = vehicle_info.get('model') or item['model']
+        result = {
+            'type': 'vehicle',
+            'row': item['row'],
+            'vin': item['vin'],
+            'stock_number': item['stock_number'],
+            'vehicle_info': {'make': make, 'model': model, 'year': year, 'mileage': item['mileage']}
+        }
+
+        if not make or not year:
+            result.update(status='invalid', error='Could not determine vehicle make/year from VIN')
+            return result
+
+        eligibility = self.vin_service.check_vsc_eligibility(
+            make=make, year=year, mileage=item['mileage'],
+            vehicle_info={**vehicle_info, 'make': make, 'year': year, 'mileage': item['mileage']}
+        )
+        if not eligibility.get('success'):
+            result.update(status='error', error=eligibility.get('error', 'Eligibility check failed'))
+            return result
+        if not eligibility.get('eligible'):
+            result.update(status='ineligible', restrictions=eligibility.get('restrictions', []))
+            return result
+
+        plans = []
+        for coverage_level in self.coverage_levels:
+            for term_months in self.terms:
+                price = calculate_vsc_price(
+                    make=make, year=year, mileage=item['mileage'], coverage_level=coverage_level,
+                    term_months=term_months, deductible=self.deductible, customer_type=self.customer_type
+                )
+                if not price.get('success'):
+                    continue
+                base_price = price['calculated_price']
+                subtotal = base_price + self.admin_fee
+                tax_amount = subtotal * self.tax_rate
+                total_price = subtotal + tax_amount
+                plans.append({
+                    'coverage_level': coverage_level,
+                    'term_months': term_months,
+                    'base_price': round(base_price, 2),
+                    'admin_fee': round(self.admin_fee, 2),
+                    'tax_amount': round(tax_amount, 2),
+                    'total_price': round(total_price, 2),
+                    'monthly_payment': round(total_price / term_months, 2) if term_months > 0 else round(total_price, 2),
+                    'pricing_method': price.get('pricing_method')
+                })
+                result['vehicle_info']['vehicle_class'] = price.get('vehicle_class')
+
+        if not plans:
+            result.update(status='error', error='No plan could be priced')
+            return result
+
+        result.update(status='priced', warnings=eligibility.get('warnings', []), plans=plans)
+        return result
+
+    def _process_chunk(self, pool: ThreadPoolExecutor, chunk: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        valid = [item for item in chunk if 'error' not in item]
+        # One decode per (VIN, year) not already cached, so duplicate rows don't each call NHTSA.
+        # Workers only run the calls; the cache and counters are updated on this thread.
+        # Each task needs its own context copy so the pinned snapshot is visible in the worker
+        supplied, decodes = {}, {}
+        for item in valid:
+            key = self._decode_key(item)
+            if key is None:
+                supplied[id(item)] = pool.submit(contextvars.copy_context().run, self._resolve_supplied, item)
+            elif key not in self._decoded and key not in decodes:
+                decodes[key] = pool.submit(contextvars.copy_context().run, self.vin_service.decode_vin, *key)
+
+        for item in chunk:
+            if 'error' in item:
+                yield {'type': 'vehicle', 'row': item['row'], 'vin': item['vin'] or None,
+                       'stock_number': item['stock_number'], 'status': 'invalid', 'error': item['error']}
+                continue
+            try:
+                key = self._decode_key(item)
+                if key is None:
+                    decoded = supplied[id(item)].result()
+                elif key in self._decoded:
+                    decoded = self._decoded[key]
+                else:
+                    decoded = self._decoded[key] = decodes[key].result()
+                    self.counts['decoded'] += 1
+                if not decoded.get('success'):
+                    yield {'type': 'vehicle', 'row': item['row'], 'vin': item['vin'],
+                           'stock_number': item['stock_number'], 'status': 'invalid',
+                           'error': decoded.get('error', 'VIN could not be decoded')}
+                    continue
+                yield self._price_vehicle(item, decoded.get('vehicle_info', {}))
+            except Exception as e:
+                yield {'type': 'vehicle', 'row': item['row'], 'vin': item['vin'],
+                       'stock_number': item['stock_number'], 'status': 'error', 'error': str(e)}
+
+    def run(self, rows: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Process rows and yield events
+
+        Yields:
+            {'type': 'started', ...} once, {'type': 'vehicle', ...} per row in
+            upload order, {'type': 'progress', ...} after every chunk and
+            {'type': 'summary', ...} last. Rows past max_rows are not processed.
+        """
+        started = time.perf_counter()
+        snapshot, pricing_source = self._job_snapshot()
+
+        with pinned_snapshot(snapshot):
+            self._resolve_plans()
+            if settings_service.connection_available or snapshot is not None:
+                self.admin_fee, self.tax_rate = float(get_admin_fee('vsc')), float(get_tax_rate())
+            else:
+                self.admin_fee, self.tax_rate = 50.00, 0.00
+
+            yield {
+                'type': 'started',
+                'job_id': self.job_id,
+                'pricing_source': pricing_source,
+                'pricing_version': snapshot.version if snapshot else None,
+                'coverage_levels': self.coverage_levels,
+                'terms': self.terms,
+                'deductible': self.deductible,
+                'customer_type': self.customer_type,
+                'max_rows': self.max_rows
+            }
+
+            truncated = False
+            with ThreadPoolExecutor(max_workers=self.decode_workers, thread_name_prefix='inventory-decode') as pool:
+                chunk = []
+                for row_number, row in enumerate(rows, 1):
+                    if row_number > self.max_rows:
+                        truncated = True
+                        break
+                    chunk.append(_prepare_item(row_number, row))
+                    if len(chunk) >= self.chunk_size:
+                        yield from self._emit_chunk(pool, chunk, started)
+                        chunk = []
+                if chunk:
+                    yield from self._emit_chunk(pool, chunk, started)
+
+        yield {
+            'type': 'summary',
+            'job_id': self.job_id,
+            **self.counts,
+            'truncated': truncated,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+            'completed_at': datetime.now(timezone.utc).isoformat()
+        }
+
+    def _emit_chunk(self, pool, chunk, started) -> Iterator[Dict[str, Any]]:
+        for event in self._process_chunk(pool, chunk):
+            self.counts['processed'] += 1
+            status = event['status']
+            self.counts['errors' if status == 'error' else status] += 1
+            yield event
+        yield {
+            'type': 'progress',
+            'job_id': self.job_id,
+            'processed': self.counts['processed'],
+            'priced': self.counts['priced'],
+            'ineligible': self.counts['ineligible'],
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+        }
+
+
+def to_ndjson(events: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    for event in events:
+        yield json.dumps(event, default=str, separators=(',', ':')) + '\n'
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Background Job Handlers
+Work moved off the request path. Each handler takes the job payload and
+returns a JSON-serializable result; raising retries the job with backoff and
+PermanentJobError fails it immediately.
+"""
+
+from datetime import date
+from typing import Dict, Any
+
+from services.job_queue_service import job_handler, enqueue_or_run, PermanentJobError
+from utils.database import execute_query
+
+_blob_client = None
+
+
+def get_blob_client():
+    """Shared Vercel Blob client, or None when no token is configured"""
+    global _blob_client
+    if _blob_client is None:
+        from config.app_config import AppConfig
+        from services.blob_storage_service import BlobStorageClient
+        config = AppConfig()
+        if not config.VERCEL_BLOB_READ_WRITE_TOKEN:
+            return None
+        _blob_client = BlobStorageClient(config.VERCEL_BLOB_READ_WRITE_TOKEN, config.VERCEL_BLOB_API_URL)
+    return _blob_client
+
+
+@job_handler('webhook.inbox', max_attempts=1, schedule_seconds=15, priority=10)
+def handle_webhook_inbox(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply pending inbox webhooks to their transactions, batch after batch until drained"""
+    from services.webhook_inbox_service import process_webhook_inbox, WEBHOOK_INBOX_BATCH_SIZE
+    totals = {'batches': 0, 'claimed': 0, 'processed': 0, 'retrying': 0, 'unmatched': 0, 'superseded': 0}
+    while True:
+        result = process_webhook_inbox()
+        if not result['success']:
+            raise RuntimeError(result['error'])
+        totals['batches'] += 1
+        for key in ('claimed', 'processed', 'retrying', 'unmatched', 'superseded'):
+            totals[key] += result[key]
+        if result['claimed'] < WEBHOOK_INBOX_BATCH_SIZE:
+            return totals
+
+
+@job_handler('contract_pdf.generate', max_attempts=3)
+def handle_contract_pdf(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Render a contract PDF, upload it to blob storage and record the URL on the contract"""
+    transaction_number = payload.get('transaction_number')
+    if not transaction_number:
+        raise PermanentJobError('transaction_number is required')
+
+    client = get_blob_client()
+    if client is None:
+        raise PermanentJobError('Vercel Blob token not configured')
+
+    try:
+        from api.generate_contract_pdf import (
+            get_contract_by_transaction, render_contract_pdf, contract_pdf_pathname, current_pdf_url
+        )
+        contract = get_contract_by_transaction(transaction_number)
+    except SystemExit:
+        # The PDF module exits the process when it can't connect
+        raise RuntimeError('Contract database unavailable')
+
+    if not contract:
+        raise PermanentJobError(f'No contract for transaction {transaction_number}')
+
+    current = current_pdf_url(contract)
+    if current:
+        return {'contract_number': contract['contract_number'], 'url': current, 'unchanged': True}
+
+    pdf_data = render_contract_pdf(contract)
+    if not pdf_data:
+        raise RuntimeError('PDF generation failed')
+
+    pathname = contract_pdf_pathname(contract)
+    uploaded = client.put(pathname, pdf_data, 'application/pdf')
+    url = uploaded.get('url', f'{client.api_url}/{pathname}')
+
+    update = execute_query(
+        'UPDATE generated_contracts SET file_path = %s WHERE id = %s;',
+        (url, contract['id']), None
+    )
+    if not update['success']:
+        raise RuntimeError(f"Failed to record PDF location: {update.get('error')}")
+
+    # The copy rendered from the contract's earlier data is no longer linked anywhere
+    previous = contract.get('file_path') or ''
+    if previous.startswith('http'):
+        enqueue_or_run('blob.delete', {'urls': [previous]})
+
+    return {'contract_number': contract['contract_number'], 'url': url, 'size': len(pdf_data)}
+
+
+@job_handler('contracts.backfill', max_attempts=3)
+def handle_contract_backfill(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Create contracts for completed transactions that have none"""
+    from endpoints.payment_endpoints import run_contract_backfill
+    results = run_contract_backfill(limit=int(payload.get('limit', 100)))
+    return {
+        'total_found': results['total_found'],
+        'processed': results['processed'],
+        'errors': results['errors'],
+        'errors_list': results['errors_list'][:50]
+    }
+
+
+@job_handler('commission.calculate', max_attempts=5)
+def handle_commission_calculation(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Roll up a reseller's sales for a period into reseller_commissions"""
+    from endpoints.admin_endpoints import calculate_commission_period
+    result = calculate_commission_period(
+        payload['reseller_id'],
+        date.fromisoformat(payload['period_start']),
+        date.fromisoformat(payload['period_end'])
+    )
+    if not result['success']:
+        raise RuntimeError(result['error'])
+    return result
+
+
+@job_handler('commission.batch', max_attempts=3)
+def handle_commission_batch(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Month-end commission run for every reseller (or the listed ones)"""
+    from services.commission_service import run_commission_batch
+    result = run_commission_batch(
+        date.fromisoformat(payload['period_start']),
+        date.fromisoformat(payload['period_end']),
+        payload.get('reseller_ids')
+    )
+    if not result['success']:
+        raise RuntimeError(result['error'])
+    # Per-reseller rows are in reseller_commissions; keep the stored job result small
+    return {key: value for key, value in result.items() if key != 'commissions'}
+
+
+@job_handler('blob.delete', max_attempts=6)
+def handle_blob_delete(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Delete replaced files from blob storage; already-missing files count as deleted"""
+    client = get_blob_client()
+    if client is None:
+        raise PermanentJobError('Vercel Blob token not configured')
+
+    urls = payload.get('urls', [])
+    failed = []
+    for url in urls:
+        try:
+            response = client.delete(url)
+            if response.status_code not in (200, 204, 404):
+                failed.append(f'{url} (HTTP {response.status_code})')
+        except Exception as e:
+            failed.append(f'{url} ({type(e).__name__})')
+
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(urls)} deletes failed: {', '.join(failed[:5])}")
+    return {'deleted': len(urls)}
+
+
+@job_handler('revenue.rollup', max_attempts=1, schedule_seconds=300)
+def handle_revenue_rollup(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Fold new and changed transactions into the revenue rollup tables"""
+    from services.revenue_rollup_service import refresh_revenue_rollups
+    result = refresh_revenue_rollups()
+    if not result['success']:
+        raise RuntimeError(result['error'])
+    return result
+
+
+@job_handler('partitions.maintain', max_attempts=1, schedule_seconds=6 * 3600)
+def handle_partition_maintenance(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Create upcoming monthly partitions and drop those past retention"""
+    from utils.partitioning import maintain_partitions
+    results = maintain_partitions()
+    failed = [table for table, result in results.items() if not result['success']]
+    if failed:
+        raise RuntimeError(f"Partition maintenance failed for {', '.join(failed)}")
+    return results
@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+"""
+Background Job Queue
+Durable Postgres-backed queue: endpoints enqueue typed jobs and return, and
+workers (api/worker.py) claim them with FOR UPDATE SKIP LOCKED so any number
+of workers can poll the same table without blocking each other. Failed jobs
+retry with exponential backoff; recurring jobs are driven by a schedule table.
+"""
+
+import os
+import hmac
+import json
+import time
+import random
+import socket
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Any, Callable, List, Optional
+
+from utils.database import get_db_manager, execute_query, reset_primary_pin
+
+JOB_QUEUE_DISABLED = os.environ.get('JOB_QUEUE_DISABLED', 'false').lower() == 'true'
+JOB_DEFAULT_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+JOB_RETRY_BASE_SECONDS = float(os.environ.get('JOB_RETRY_BASE_SECONDS', 10))
+JOB_RETRY_MAX_SECONDS = float(os.environ.get('JOB_RETRY_MAX_SECONDS', 3600))
+# Running jobs whose lock is older than this are assumed to belong to a dead worker
+JOB_LOCK_TIMEOUT_SECONDS = int(os.environ.get('JOB_LOCK_TIMEOUT_SECONDS', 900))
+JOB_RETENTION_DAYS = int(os.environ.get('JOB_RETENTION_DAYS', 14))
+# Vercel Cron sends it as a bearer token; the cron drain endpoint is disabled without it
+CRON_SECRET = os.environ.get('CRON_SECRET')
+# Kept well under the function timeout; a job started near the end still has to finish
+JOB_CRON_TIME_BUDGET_SECONDS = float(os.environ.get('JOB_CRON_TIME_BUDGET_SECONDS', 20))
+
+JOB_STATUSES = ('queued', 'running', 'succeeded', 'failed', 'cancelled')
+
+JOB_TABLES_SQL = '''
+    CREATE TABLE IF NOT EXISTS background_jobs (
+        id BIGSERIAL PRIMARY KEY,
+        job_type VARCHAR(100) NOT NULL,
+        payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+        status VARCHAR(20) NOT NULL DEFAULT 'queued',
+        priority INTEGER NOT NULL DEFAULT 0,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL DEFAULT 5,
+        run_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+        dedupe_key VARCHAR(255),
+        locked_by VARCHAR(100),
+        locked_at TIMESTAMP WITH TIME ZONE,
+        result JSONB,
+        last_error TEXT,
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+        updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+        completed_at TIMESTAMP WITH TIME ZONE
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_background_jobs_ready
+        ON background_jobs (priority DESC, run_at) WHERE status = 'queued';
+    CREATE INDEX IF NOT EXISTS idx_background_jobs_running
+        ON background_jobs (locked_at) WHERE status = 'running';
+    CREATE INDEX IF NOT EXISTS idx_background_jobs_finished
+        ON background_jobs (completed_at) WHERE status IN ('succeeded', 'failed', 'cancelled');
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_background_jobs_dedupe
+        ON background_jobs (dedupe_key) WHERE dedupe_key IS NOT NULL AND status IN ('queued', 'running');
+
+    CREATE TABLE IF NOT EXISTS background_job_schedules (
+        job_type VARCHAR(100) PRIMARY KEY,
+        interval_seconds INTEGER NOT NULL,
+        next_run_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+        last_enqueued_at TIMESTAMP WITH TIME ZONE
+    );
+'''
+
+_DEDUPE_CONFLICT = "(dedupe_key) WHERE dedupe_key IS NOT NULL AND status IN ('queued', 'running')"
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying can't help; the job fails immediately"""
+
+
+class JobHandler:
+    __slots__ = ('job_type', 'func', 'max_attempts', 'schedule_seconds', 'priority')
+
+    def __init__(self, job_type: str, func: Callable, max_attempts: int,
+                 schedule_seconds: Optional[int], priority: int):
+        self.job_type = job_type
+        self.func = func
+        self.max_attempts = max_attempts
+        self.schedule_seconds = schedule_seconds
+        self.priority = priority
+
+
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+_tables_ready = False
+_tables_lock = threading.Lock()
+
+
+def job_handler(job_type: str, max_attempts: int = JOB_DEFAULT_MAX_ATTEMPTS,
+                schedule_seconds: int = None, priority: int = 0):
+    """
+    Register a function as the handler for job_type
+
+    Args:
+        job_type: Name jobs are enqueued under, e.g. 'contract_pdf.generate'
+        max_attempts: Attempts before the job is marked failed
+        schedule_seconds: Also enqueue the job on this interval (recurring jobs)
+        priority: Default priority; higher runs first
+
+    The handler is called with the job payload dict and may return a
+    JSON-serializable result, which is stored on the job row.
+    """
+    def decorator(func):
+        JOB_HANDLERS[job_type] = JobHandler(job_type, func, max_attempts, schedule_seconds, priority)
+        return func
+    return decorator
+
+
+def load_job_handlers():
+    """Import the modules that register handlers"""
+    import services.job_handlers  # noqa: F401
+    return JOB_HANDLERS
+
+
+def ensure_job_tables() -> bool:
+    """Create the queue tables once per process"""
+    global _tables_ready
+    if _tables_ready:
+        return True
+
+    with _tables_lock:
+        if _tables_ready:
+            return True
+        db = get_db_manager()
+        if not db.available:
+            return False
+        try:
+            with db.get_cursor() as (cursor, conn):
+                cursor.execute(JOB_TABLES_SQL)
+                conn.commit()
+            _tables_ready = True
+        except Exception as e:
+            print(f"❌ Failed to create background job tables: {e}")
+        return _tables_ready
+
+
+def _json(value) -> str:
+    return json.dumps(value if value is not None else {}, default=str)
+
+
+def enqueue_job(job_type: str, payload: Dict[str, Any] = None, run_at: datetime = None,
+                delay_seconds: float = 0, priority: int = None, max_attempts: int = None,
+                dedupe_key: str = None) -> Dict[str, Any]:
+    """
+    Add a job to the queue
+
+    Args:
+        job_type: Registered handler name
+        payload: JSON-serializable arguments for the handler
+        run_at: Earliest time to run (scheduled jobs); defaults to now
+        delay_seconds: Alternative to run_at, relative to now
+        priority: Higher runs first (defaults to the handler's priority)
+        max_attempts: Overrides the handler's max_attempts
+        dedupe_key: While a job with this key is queued or running, return it instead of adding another
+
+    Returns:
+        dict: success, job_id and duplicate (True when dedupe_key matched an existing job)
+    """
+    if JOB_QUEUE_DISABLED:
+        return {'success': False, 'error': 'Job queue disabled'}
+    if not ensure_job_tables():
+        return {'success': False, 'error': 'Database not available'}
+
+    handler = load_job_handlers().get(job_type)
+    if priority is None:
+        priority = handler.priority if handler else 0
+    if max_attempts is None:
+        max_attempts = handler.max_attempts if handler else JOB_DEFAULT_MAX_ATTEMPTS
+
+    result = execute_query(f'''
+        INSERT INTO background_jobs (job_type, payload, priority, max_attempts, run_at, dedupe_key)
+        VALUES (%s, %s, %s, %s, COALESCE(%s, NOW()) + make_interval(secs => %s), %s)
+        ON CONFLICT {_DEDUPE_CONFLICT} DO NOTHING
+        RETURNING id;
+    ''', (job_type, _json(payload), priority, max_attempts, run_at, delay_seconds, dedupe_key), 'one')
+
+    if not result['success']:
+        return result
+    if result['data']:
+        return {'success': True, 'job_id': result['data']['id'], 'duplicate': False}
+
+    existing = execute_query(
+        "SELECT id FROM background_jobs WHERE dedupe_key = %s AND status IN ('queued', 'running');",
+        (dedupe_key,), 'one'
+    )
+    return {
+        'success': True,
+        'job_id': existing['data']['id'] if existing['success'] and existing['data'] else None,
+        'duplicate': True
+    }
+
+
+def run_job_inline(job_type: str, payload: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Run a handler in the calling thread (used when the queue can't be reached)"""
+    handler = load_job_handlers().get(job_type)
+    if handler is None:
+        return {'success': False, 'error': f'No handler registered for {job_type}'}
+    try:
+        return {'success': True, 'queued': False, 'result': handler.func(payload or {})}
+    except Exception as e:
+        return {'success': False, 'queued': False, 'error': str(e)}
+
+
+def enqueue_or_run(job_type: str, payload: Dict[str, Any] = None, **options) -> Dict[str, Any]:
+    """Enqueue a job, falling back to running it inline when the queue is unavailable"""
+    queued = enqueue_job(job_type, payload, **options)
+    if queued['success']:
+        return {**queued, 'queued': True}
+    print(f"⚠️ Job queue unavailable ({queued.get('error')}) - running {job_type} inline")
+    return run_job_inline(job_type, payload)
+
+
+def claim_jobs(worker_id: str, limit: int = 1, job_types: List[str] = None) -> List[Dict[str, Any]]:
+    """
+    Lock up to limit ready jobs for worker_id
+
+    Rows another worker has locked are skipped rather than waited on, so
+    concurrent workers each get distinct jobs.
+    """
+    type_filter = 'AND job_type = ANY(%s)' if job_types else ''
+    params = (worker_id, *((list(job_types),) if job_types else ()), limit)
+    result = execute_query(f'''
+        UPDATE background_jobs
+        SET status = 'running', locked_by = %s, locked_at = NOW(),
+            attempts = attempts + 1, updated_at = NOW()
+        WHERE id IN (
+            SELECT id FROM background_jobs
+            WHERE status = 'queued' AND run_at <= NOW() {type_filter}
+            ORDER BY priority DESC, run_at
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, job_type, payload, attempts, max_attempts, priority, run_at, created_at;
+    ''', params)
+    return (result['data'] or []) if result['success'] else []
+
+
+def retry_delay_seconds(attempts: int) -> float:
+    """Exponential backoff with jitter for the given number of attempts made"""
+    delay = min(JOB_RETRY_MAX_SECONDS, JOB_RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1))
+    return round(delay * random.uniform(0.8, 1.2), 1)
+
+
+def complete_job(job_id: int, worker_id: str, result: Any = None) -> bool:
+    update = execute_query('''
+        UPDATE background_jobs
+        SET status = 'succeeded', result = %s, last_error = NULL, completed_at = NOW(),
+            locked_by = NULL, locked_at = NULL, updated_at = NOW()
+        WHERE id = %s AND locked_by = %s;
+    ''', (_json(result), job_id, worker_id), None)
+    return update['success'] and update['rowcount'] == 1
+
+
+def fail_job(job: Dict[str, Any], worker_id: str, error: str, permanent: bool = False) -> str:
+    """Requeue with backoff, or mark failed once attempts run out; returns the new status"""
+    if permanent or job['attempts'] >= job['max_attempts']:
+        execute_query('''
+            UPDATE background_jobs
+            SET status = 'failed', last_error = %s, completed_at = NOW(),
+                locked_by = NULL, locked_at = NULL, updated_at = NOW()
+            WHERE id = %s AND locked_by = %s;
+        ''', (error, job['id'], worker_id), None)
+        return 'failed'
+
+    execute_query('''
+        UPDATE background_jobs
+        SET status = 'queued', last_error = %s, run_at = NOW() + make_interval(secs => %s),
+            locked_by = NULL, locked_at = NULL, updated_at = NOW()
+        WHERE id = %s AND locked_by = %s;
+    ''', (error, retry_delay_seconds(job['attempts']), job['id'], worker_id), None)
+    return 'queued'
+
+
+def execute_job(job: Dict[str, Any], worker_id: str) -> Dict[str, Any]:
+    """Run one claimed job and record the outcome"""
+    started = time.perf_counter()
+    # Claiming the job wrote to the queue, not to anything the job reads
+    reset_primary_pin()
+    handler = JOB_HANDLERS.get(job['job_type'])
+
+    if handler is None:
+        status = fail_job(job, worker_id, f"No handler registered for {job['job_type']}", permanent=True)
+        return {'job_id': job['id'], 'job_type': job['job_type'], 'status': status}
+
+    try:
+        result = handler.func(job['payload'] or {})
+        complete_job(job['id'], worker_id, result)
+        status, error = 'succeeded', None
+    except PermanentJobError as e:
+        status, error = fail_job(job, worker_id, str(e), permanent=True), str(e)
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+        status = fail_job(job, worker_id, error)
+
+    duration_ms = round((time.perf_counter() - started) * 1000, 1)
+    marker = '✅' if status == 'succeeded' else ('🔄' if status == 'queued' else '❌')
+    print(f"{marker} Job {job['id']} {job['job_type']} {status} in {duration_ms}ms"
+          + (f" (attempt {job['attempts']}/{job['max_attempts']}: {error})" if error else ''))
+    return {'job_id': job['id'], 'job_type': job['job_type'], 'status': status,
+            'duration_ms': duration_ms, 'error': error}
+
+
+def run_pending_jobs(worker_id: str = None, max_jobs: int = 50, time_budget_seconds: float = 50,
+                     job_types: List[str] = None) -> Dict[str, Any]:
+    """
+    Drain ready jobs in this process until the queue is empty, max_jobs ran or the budget is spent
+
+    Lets a cron-invoked serverless function do queue work when no
+    long-running worker is deployed.
+    """
+    load_job_handlers()
+    if not ensure_job_tables():
+        return {'success': False, 'error': 'Database not available'}
+
+    worker_id = worker_id or default_worker_id('drain')
+    deadline = time.monotonic() + time_budget_seconds
+    enqueue_scheduled_jobs()
+    results = []
+    while len(results) < max_jobs and time.monotonic() < deadline:
+        jobs = claim_jobs(worker_id, 1, job_types)
+        if not jobs:
+            break
+        results.append(execute_job(jobs[0], worker_id))
+
+    return {
+        'success': True,
+        'processed': len(results),
+        'succeeded': sum(1 for r in results if r['status'] == 'succeeded'),
+        'jobs': results
+    }
+
+
+def cron_request_authorized(authorization: Optional[str]) -> bool:
+    """Whether an Authorization header carries CRON_SECRET"""
+    if not CRON_SECRET or not authorization:
+        return False
+    return hmac.compare_digest(authorization.encode(), f'Bearer {CRON_SECRET}'.encode())
+
+
+def enqueue_scheduled_jobs() -> List[str]:
+    """
+    Enqueue recurring jobs that are due
+
+    The conditional UPDATE on the schedule row lets exactly one worker win
+    each interval, however many are polling.
+    """
+    scheduled = {t: h for t, h in JOB_HANDLERS.items() if h.schedule_seconds}
+    if not scheduled:
+        return []
+
+    for job_type, handler in scheduled.items():
+        execute_query('''
+            INSERT INTO background_job_schedules (job_type, interval_seconds)
+            VALUES (%s, %s)
+            ON CONFLICT (job_type) DO UPDATE SET interval_seconds = EXCLUDED.interval_seconds
+            WHERE background_job_schedules.interval_seconds <> EXCLUDED.interval_seconds;
+        ''', (job_type, handler.schedule_seconds), None)
+
+    due = execute_query('''
+        UPDATE background_job_schedules
+        SET next_run_at = NOW() + make_interval(secs => interval_seconds), last_enqueued_at = NOW()
+        WHERE job_type = ANY(%s) AND next_run_at <= NOW()
+        RETURNING job_type;
+    ''', (list(scheduled),))
+
+    enqueued = []
+    for row in (due['data'] or []) if due['success'] else []:
+        if enqueue_job(row['job_type'], {}, dedupe_key=f"schedule:{row['job_type']}")['success']:
+            enqueued.append(row['job_type'])
+    return enqueued
+
+
+def requeue_stale_jobs(timeout_seconds: int = JOB_LOCK_TIMEOUT_SECONDS) -> int:
+    """Return jobs locked by workers that died mid-run to the queue"""
+    result = execute_query('''
+        UPDATE background_jobs
+        SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END,
+            completed_at = CASE WHEN attempts >= max_attempts THEN NOW() END,
+            last_error = COALESCE(last_error, 'Worker lock expired'),
+            locked_by = NULL, locked_at = NULL, updated_at = NOW()
+        WHERE status = 'running' AND locked_at < NOW() - make_interval(secs => %s);
+    ''', (timeout_seconds,), None)
+    return result['rowcount'] if result['success'] else 0
+
+
+def prune_finished_jobs(retention_days: int = JOB_RETENTION_DAYS) -> int:
+    result = execute_query('''
+        DELETE FROM background_jobs
+        WHERE status IN ('succeeded', 'cancelled') AND completed_at < NOW() - make_interval(days => %s);
+    ''', (retention_days,), None)
+    return result['rowcount'] if result['success'] else 0
+
+
+def get_job(job_id: int) -> Optional[Dict[str, Any]]:
+    result = execute_query('SELECT * FROM background_jobs WHERE id = %s;', (job_id,), 'one')
+    return result['data'] if result['success'] else None
+
+
+def retry_job(job_id: int) -> bool:
+    """Requeue a failed or cancelled job immediately with a fresh attempt budget"""
+    result = execute_query('''
+        UPDATE background_jobs
+        SET status = 'queued', attempts = 0, run_at = NOW(), completed_at = NULL, updated_at = NOW()
+        WHERE id = %s AND status IN ('failed', 'cancelled');
+    ''', (job_id,), None)
+    return result['success'] and result['rowcount'] == 1
+
+
+def get_queue_stats() -> Dict[str, Any]:
+    """Job counts by type and status, plus the age of the oldest ready job"""
+    if not ensure_job_tables():
+        return {'success': False, 'error': 'Database not available'}
+
+    counts = execute_query('''
+        SELECT job_type, status, COUNT(*) AS count
+        FROM background_jobs GROUP BY job_type, status ORDER BY job_type, status;
+    ''')
+    lag = execute_query('''
+        SELECT EXTRACT(EPOCH FROM NOW() - MIN(run_at)) AS oldest_ready_seconds
+        FROM background_jobs WHERE status = 'queued' AND run_at <= NOW();
+    ''', fetch='one')
+    if not counts['success']:
+        return counts
+
+    by_type: Dict[str, Dict[str, int]] = {}
+    totals = dict.fromkeys(JOB_STATUSES, 0)
+    for row in counts['data'] or []:
+        by_type.setdefault(row['job_type'], {})[row['status']] = row['count']
+        totals[row['status']] = totals.get(row['status'], 0) + row['count']
+
+    oldest = lag['data']['oldest_ready_seconds'] if lag['success'] and lag['data'] else None
+    return {
+        'success': True,
+        'totals': totals,
+        'by_type': by_type,
+        'oldest_ready_seconds': round(float(oldest), 1) if oldest is not None else None,
+        'registered_handlers': sorted(JOB_HANDLERS),
+        'timestamp': datetime.now(timezone.utc).isoformat()
+    }
+
+
+def default_worker_id(suffix: str = None) -> str:
+    base = f"{socket.gethostname()}:{os.getpid()}"
+    return f"{base}:{suffix}" if suffix else base
+
+
+@job_handler('jobs.maintenance', max_attempts=1, schedule_seconds=300)
+def _queue_maintenance(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Recover jobs from dead workers and prune old finished jobs"""
+    return {
+        'requeued': requeue_stale_jobs(),
+        'pruned': prune_finished_jobs()
+    }
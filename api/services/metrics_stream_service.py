@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Real-Time Metrics Stream
+One shared aggregator per process recomputes the real-time metrics on an
+interval, or as soon as Postgres reports a write to transactions, and fans the
+changes out to every Server-Sent Events subscriber. Database cost is one
+rebuild per interval no matter how many admins are watching.
+
+The notify trigger on transactions is installed by an explicit migration,
+never by a subscriber; without it the stream refreshes on the interval only.
+
+Usage:
+    python api/services/metrics_stream_service.py migrate
+"""
+
+import os
+import sys
+import json
+import queue
+import select
+import threading
+import time
+import uuid
+from typing import Dict, Any, Optional
+
+try:
+    import psycopg2
+    import psycopg2.extensions
+    PSYCOPG2_AVAILABLE = True
+except ImportError:
+    PSYCOPG2_AVAILABLE = False
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import get_db_manager
+from services.dashboard_snapshot_service import rebuild_dashboard_snapshot
+
+METRICS_STREAM_INTERVAL_SECONDS = float(os.environ.get('METRICS_STREAM_INTERVAL_SECONDS', 10))
+# Minimum gap between rebuilds when notifications arrive in bursts
+METRICS_STREAM_MIN_INTERVAL_SECONDS = float(os.environ.get('METRICS_STREAM_MIN_INTERVAL_SECONDS', 2))
+METRICS_STREAM_KEEPALIVE_SECONDS = 15
+# Streams are closed after this long so serverless functions stay within their
+# duration limit; clients reconnect automatically
+METRICS_STREAM_MAX_SECONDS = float(os.environ.get('METRICS_STREAM_MAX_SECONDS', 270))
+# The aggregator stops when nobody has been subscribed for this long
+AGGREGATOR_IDLE_SECONDS = 30
+SUBSCRIBER_QUEUE_SIZE = 32
+# Event ids are "<instance>-<version>": versions count per process, so an id from
+# another instance (or from before a cold start) never passes for current
+STREAM_INSTANCE_ID = uuid.uuid4().hex[:12]
+
+NOTIFY_CHANNEL = 'transactions_changed'
+# CREATE TRIGGER takes SHARE ROW EXCLUSIVE on transactions; give up rather than queue ahead of checkout writes
+NOTIFY_TRIGGER_LOCK_TIMEOUT = '5s'
+
+NOTIFY_TRIGGER_SQL = '''
+    CREATE OR REPLACE FUNCTION notify_transactions_changed() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_notify('transactions_changed', TG_OP);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    DROP TRIGGER IF EXISTS transactions_changed_notify ON transactions;
+    CREATE TRIGGER transactions_changed_notify
+        AFTER INSERT OR UPDATE OR DELETE ON transactions
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_transactions_changed();
+'''
+
+
+def _notify_trigger_installed(cursor) -> bool:
+    cursor.execute('''
+        SELECT 1 FROM pg_trigger
+        WHERE tgname = 'transactions_changed_notify' AND tgrelid = to_regclass('transactions')
+    ''')
+    return cursor.fetchone() is not None
+
+
+def install_notify_trigger() -> Dict[str, Any]:
+    """Create (or replace) the statement trigger that reports writes to transactions"""
+    db = get_db_manager()
+    if not db.available:
+        return {'success': False, 'error': 'Database not available'}
+    try:
+        with db.get_cursor() as (cursor, conn):
+            cursor.execute('SET LOCAL lock_timeout = %s;', (NOTIFY_TRIGGER_LOCK_TIMEOUT,))
+            cursor.execute(NOTIFY_TRIGGER_SQL)
+            conn.commit()
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+    return {'success': True, 'trigger': 'transactions_changed_notify', 'channel': NOTIFY_CHANNEL}
+
+
+def format_event(event: str, data: Dict[str, Any], event_id: str = None) -> str:
+    """Serialize one SSE message"""
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, default=str)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+class Subscriber:
+    """One stream's outbox; a subscriber that falls behind is resynced with a full snapshot"""
+
+    def __init__(self):
+        self.queue: 'queue.Queue[str]' = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.needs_snapshot = True
+
+    def send(self, message: str) -> bool:
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except queue.Full:
+            return False
+
+    def resync(self, snapshot_message: str):
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+        self.send(snapshot_message)
+
+
+class RealTimeMetricsHub:
+    """Shared aggregator plus the set of connected subscribers"""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._payload: Optional[Dict[str, Any]] = None
+        self._version = 0
+        self._idle_since = None
+        self._stats = {'rebuilds': 0, 'notifications': 0, 'deltas': 0, 'resyncs': 0}
+        self._listening = False
+
+    def subscribe(self, last_event_id: str = None) -> Subscriber:
+        """Register a stream; it receives a snapshot first unless it is already current"""
+        subscriber = Subscriber()
+        with self._lock:
+            self._subscribers.add(subscriber)
+            self._idle_since = None
+            if self._payload is not None:
+                if last_event_id != self._event_id():
+                    subscriber.send(self._snapshot_message())
+                subscriber.needs_snapshot = False
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='metrics-aggregator', daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            if not self._subscribers:
+                self._idle_since = time.monotonic()
+
+    def _event_id(self) -> str:
+        return f'{STREAM_INSTANCE_ID}-{self._version}'
+
+    def _snapshot_message(self) -> str:
+        return format_event('snapshot', self._payload, self._event_id())
+
+    def _publish(self):
+        snapshot = rebuild_dashboard_snapshot('real_time')
+        if snapshot is None:
+            return
+        payload = json.loads(snapshot.body)
+
+        with self._lock:
+            self._stats['rebuilds'] += 1
+            previous = self._payload or {}
+            delta = {
+                key: value for key, value in payload.items()
+                if key not in ('snapshot', 'updated_at') and previous.get(key) != value
+            }
+            first = self._payload is None
+            self._payload = payload
+            if not delta and not first:
+                return
+
+            self._version += 1
+            self._stats['deltas'] += 1
+            delta['updated_at'] = payload.get('updated_at')
+            delta_message = format_event('delta', delta, self._event_id())
+            snapshot_message = self._snapshot_message()
+
+            for subscriber in self._subscribers:
+                if subscriber.needs_snapshot:
+                    subscriber.needs_snapshot = False
+                    subscriber.send(snapshot_message)
+                elif not subscriber.send(delta_message):
+                    self._stats['resyncs'] += 1
+                    subscriber.resync(snapshot_message)
+
+    def _listen_connection(self):
+        """Dedicated LISTEN connection, or None to fall back to interval-only rebuilds"""
+        db = get_db_manager()
+        if not (PSYCOPG2_AVAILABLE and db.available):
+            return None
+        try:
+            conn = psycopg2.connect(db.database_url)
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                if not _notify_trigger_installed(cursor):
+                    conn.close()
+                    print("⚠️ Notify trigger not installed, metrics stream refreshes on its interval")
+                    return None
+                cursor.execute(f'LISTEN {NOTIFY_CHANNEL};')
+            return conn
+        except Exception as e:
+            print(f"⚠️ Metrics stream falling back to interval refresh: {e}")
+            return None
+
+    def _wait(self, conn, timeout: float) -> bool:
+        """Block until the interval elapses or a change is reported; True when notified"""
+        if conn is None:
+            time.sleep(timeout)
+            return False
+
+        ready, _, _ = select.select([conn], [], [], timeout)
+        if not ready:
+            return False
+        conn.poll()
+        notified = bool(conn.notifies)
+        conn.notifies.clear()
+        return notified
+
+    def _run(self):
+        conn = self._listen_connection()
+        self._listening = conn is not None
+        last_rebuild = 0.0
+        try:
+            while True:
+                with self._lock:
+                    if self._idle_since and time.monotonic() - self._idle_since > AGGREGATOR_IDLE_SECONDS:
+                        self._thread = None
+                        self._payload = None
+                        return
+
+                # Debounce bursts of writes into one rebuild
+                pause = METRICS_STREAM_MIN_INTERVAL_SECONDS - (time.monotonic() - last_rebuild)
+                if pause > 0:
+                    time.sleep(pause)
+
+                # Rollup reads include rows newer than the high-water mark, so new writes show up without a refresh
+                try:
+                    self._publish()
+                except Exception as e:
+                    print(f"❌ Real-time metrics rebuild failed: {e}")
+                last_rebuild = time.monotonic()
+
+                try:
+                    if self._wait(conn, METRICS_STREAM_INTERVAL_SECONDS):
+                        with self._lock:
+                            self._stats['notifications'] += 1
+                except Exception as e:
+                    print(f"⚠️ Metrics stream lost its LISTEN connection: {e}")
+                    conn.close()
+                    conn = None
+                    self._listening = False
+        finally:
+            if conn is not None:
+                conn.close()
+            self._listening = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['subscribers'] = len(self._subscribers)
+            stats['version'] = self._version
+            stats['instance_id'] = STREAM_INSTANCE_ID
+            stats['running'] = self._thread is not None
+        stats['listening'] = self._listening
+        stats['interval_seconds'] = METRICS_STREAM_INTERVAL_SECONDS
+        return stats
+
+
+metrics_hub = RealTimeMetricsHub()
+
+
+def stream_real_time_metrics(last_event_id: str = None):
+    """Generator of SSE messages for one client"""
+    subscriber = metrics_hub.subscribe(last_event_id)
+    deadline = time.monotonic() + METRICS_STREAM_MAX_SECONDS
+    try:
+        yield 'retry: 5000\n\n'
+        while time.monotonic() < deadline:
+            try:
+                yield subscriber.queue.get(timeout=METRICS_STREAM_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                # Comment lines keep proxies from closing an idle stream
+                yield ': keepalive\n\n'
+    finally:
+        metrics_hub.unsubscribe(subscriber)
+
+
+def get_metrics_stream_stats() -> Dict[str, Any]:
+    return metrics_hub.stats()
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == 'migrate':
+        result = install_notify_trigger()
+    else:
+        print(__doc__)
+        sys.exit(1)
+    print(json.dumps(result, indent=2, default=str))
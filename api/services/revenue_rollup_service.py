@@ -0,0 +1,534 @@
+#!/usr/bin/env python3
+"""
+Revenue Rollups
+Hourly and daily pre-aggregates of transactions and generated contracts, keyed
+by source, product type, status and reseller. Refreshes are incremental: only
+hour buckets touched since the last high-water mark are recomputed, so trend
+charts read a few hundred rollup rows instead of scanning raw transactions.
+
+Buckets are UTC hours and UTC days. Reads never refresh: rows created after the
+high-water mark are aggregated live and added to the stored buckets, and the
+first backfill is left to the revenue.rollup job or this module's CLI.
+
+Usage:
+python api/services/revenue_rollup_service.py refresh
+python api/services/revenue_rollup_service.py status
+"""
+
+import os
+import sys
+import time
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional
+
+from psycopg2.extras import RealDictCursor
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import get_db_manager, execute_query
+from utils.generated_columns import generated_column
+from utils.partitioning import create_index_concurrently
+
+# Buckets this far behind the high-water mark are always recomputed, which picks
+# up status changes and rows committed late by long-running transactions
+REVENUE_ROLLUP_LOOKBACK_HOURS = int(os.environ.get('REVENUE_ROLLUP_LOOKBACK_HOURS', 24))
+MAX_SERIES_POINTS = 10000
+
+GRANULARITIES = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1)
+}
+
+# Arbitrary constant for pg_try_advisory_xact_lock
+ROLLUP_LOCK_ID = 720431
+
+ROLLUP_TABLES_SQL = '''
+    CREATE TABLE IF NOT EXISTS revenue_rollup_hourly (
+        bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+        source VARCHAR(20) NOT NULL,
+        product_type VARCHAR(100) NOT NULL,
+        status VARCHAR(50) NOT NULL,
+        reseller_id VARCHAR(100) NOT NULL DEFAULT '',
+        row_count INTEGER NOT NULL DEFAULT 0,
+        amount NUMERIC NOT NULL DEFAULT 0,
+        PRIMARY KEY (bucket, source, product_type, status, reseller_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS revenue_rollup_daily (
+        bucket DATE NOT NULL,
+        source VARCHAR(20) NOT NULL,
+        product_type VARCHAR(100) NOT NULL,
+        status VARCHAR(50) NOT NULL,
+        reseller_id VARCHAR(100) NOT NULL DEFAULT '',
+        row_count INTEGER NOT NULL DEFAULT 0,
+        amount NUMERIC NOT NULL DEFAULT 0,
+        PRIMARY KEY (bucket, source, product_type, status, reseller_id)
+    );
+
+    CREATE TABLE IF NOT EXISTS revenue_rollup_state (
+        name VARCHAR(50) PRIMARY KEY,
+        high_water_mark TIMESTAMP,
+        refreshed_at TIMESTAMP WITH TIME ZONE,
+        changed_buckets INTEGER
+    );
+'''
+
+# Indexes the refresh and the live tail read through: name -> (table, column).
+# Built concurrently by the refresh, never from a read
+SOURCE_INDEXES = {
+    'idx_transactions_created_at': ('transactions', 'created_at'),
+    'idx_transactions_processed_at': ('transactions', 'processed_at'),
+    'idx_generated_contracts_generated_date': ('generated_contracts', 'generated_date'),
+}
+
+# created_at and generated_date are DB-local timestamps: ::timestamptz reads them in
+# the session time zone and buckets are truncated in UTC. Joins convert the bucket
+# back to a local timestamp so the raw tables' indexes still apply.
+CHANGED_HOURS_SQL = '''
+    CREATE TEMP TABLE rollup_changed_hours ON COMMIT DROP AS
+    SELECT DISTINCT date_trunc('hour', created_at::timestamptz AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS bucket
+    FROM transactions
+    WHERE created_at IS NOT NULL
+      AND (%(since)s::timestamp IS NULL
+           OR created_at >= %(since)s::timestamp - %(lookback)s * INTERVAL '1 hour'
+           OR processed_at >= %(since)s::timestamp)
+    UNION
+    SELECT DISTINCT date_trunc('hour', generated_date::timestamptz AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+    FROM generated_contracts
+    WHERE generated_date IS NOT NULL
+      AND (%(since)s::timestamp IS NULL
+           OR generated_date >= %(since)s::timestamp - %(lookback)s * INTERVAL '1 hour');
+'''
+
+# {product_type} is the transactions.product_type generated column (or its JSONB fallback)
+REBUILD_HOURLY_SQL = '''
+    DELETE FROM revenue_rollup_hourly WHERE bucket IN (SELECT bucket FROM rollup_changed_hours);
+
+    INSERT INTO revenue_rollup_hourly (bucket, source, product_type, status, reseller_id, row_count, amount)
+    SELECT h.bucket, 'transaction',
+           COALESCE({product_type}, 'unknown'),
+           COALESCE(t.status, 'unknown'),
+           COALESCE(t.metadata->>'reseller_id', ''),
+           COUNT(*), COALESCE(SUM(t.amount), 0)
+    FROM rollup_changed_hours h
+    JOIN transactions t ON t.created_at >= h.bucket::timestamp
+                       AND t.created_at < (h.bucket + INTERVAL '1 hour')::timestamp
+    GROUP BY 1, 2, 3, 4, 5;
+
+    INSERT INTO revenue_rollup_hourly (bucket, source, product_type, status, reseller_id, row_count, amount)
+    SELECT h.bucket, 'contract',
+           COALESCE(ct.product_type, 'contract'),
+           COALESCE(gc.status, 'unknown'),
+           '',
+           COUNT(*), COALESCE(SUM(gc.contract_value), 0)
+    FROM rollup_changed_hours h
+    JOIN generated_contracts gc ON gc.generated_date >= h.bucket::timestamp
+                               AND gc.generated_date < (h.bucket + INTERVAL '1 hour')::timestamp
+    LEFT JOIN contract_templates ct ON ct.template_id = gc.template_id
+    GROUP BY 1, 2, 3, 4, 5;
+'''
+
+REBUILD_DAILY_SQL = '''
+    CREATE TEMP TABLE rollup_changed_days ON COMMIT DROP AS
+    SELECT DISTINCT (bucket AT TIME ZONE 'UTC')::date AS bucket FROM rollup_changed_hours;
+
+    DELETE FROM revenue_rollup_daily WHERE bucket IN (SELECT bucket FROM rollup_changed_days);
+
+    INSERT INTO revenue_rollup_daily (bucket, source, product_type, status, reseller_id, row_count, amount)
+    SELECT d.bucket, r.source, r.product_type, r.status, r.reseller_id, SUM(r.row_count), SUM(r.amount)
+    FROM rollup_changed_days d
+    JOIN revenue_rollup_hourly r ON r.bucket >= d.bucket::timestamp AT TIME ZONE 'UTC'
+                                AND r.bucket < (d.bucket + 1)::timestamp AT TIME ZONE 'UTC'
+    GROUP BY 1, 2, 3, 4, 5;
+'''
+
+# Hourly buckets used to be DB-local timestamps; converted once by the first refresh after upgrading
+UPGRADE_BUCKETS_SQL = '''
+    ALTER TABLE revenue_rollup_hourly ALTER COLUMN bucket TYPE TIMESTAMP WITH TIME ZONE USING bucket::timestamptz;
+
+    TRUNCATE revenue_rollup_daily;
+    INSERT INTO revenue_rollup_daily (bucket, source, product_type, status, reseller_id, row_count, amount)
+    SELECT (bucket AT TIME ZONE 'UTC')::date, source, product_type, status, reseller_id, SUM(row_count), SUM(amount)
+    FROM revenue_rollup_hourly
+    GROUP BY 1, 2, 3, 4, 5;
+'''
+
+# Bucket rows for [start, end) in naive UTC: stored buckets before the high-water
+# mark's hour, plus the rows created since aggregated live. Without a mark
+# (never backfilled) the whole range is live. {granularity} is 'hour' or 'day'.
+TAIL_SQL = '''
+    tail AS (
+        SELECT COALESCE(MAX(date_trunc('hour', high_water_mark::timestamptz AT TIME ZONE 'UTC')),
+                        '-infinity'::timestamp) AS start
+        FROM revenue_rollup_state
+        WHERE name = 'revenue'
+    )
+'''
+
+HOURLY_ROWS_SQL = '''
+    SELECT h.bucket AT TIME ZONE 'UTC' AS bucket, h.source, h.product_type, h.status, h.reseller_id, h.row_count, h.amount
+    FROM revenue_rollup_hourly h, tail
+    WHERE h.bucket >= %(start)s::timestamp AT TIME ZONE 'UTC'
+      AND h.bucket < LEAST(tail.start, %(end)s::timestamp) AT TIME ZONE 'UTC'
+'''
+
+DAILY_ROWS_SQL = '''
+    SELECT d.bucket::timestamp AS bucket, d.source, d.product_type, d.status, d.reseller_id, d.row_count, d.amount
+    FROM revenue_rollup_daily d, tail
+    WHERE d.bucket >= %(start)s::date
+      AND d.bucket < LEAST(date_trunc('day', tail.start), %(end)s::timestamp)::date
+    UNION ALL
+    -- The mark's own day is only partly in the daily rollup
+    SELECT date_trunc('day', h.bucket AT TIME ZONE 'UTC'), h.source, h.product_type, h.status, h.reseller_id,
+           h.row_count, h.amount
+    FROM revenue_rollup_hourly h, tail
+    WHERE h.bucket >= GREATEST(date_trunc('day', tail.start), %(start)s::timestamp) AT TIME ZONE 'UTC'
+      AND h.bucket < LEAST(tail.start, %(end)s::timestamp) AT TIME ZONE 'UTC'
+'''
+
+# {product_type} as in REBUILD_HOURLY_SQL
+LIVE_ROWS_SQL = '''
+    SELECT date_trunc('{granularity}', t.created_at::timestamptz AT TIME ZONE 'UTC') AS bucket, 'transaction' AS source,
+           COALESCE({product_type}, 'unknown') AS product_type,
+           COALESCE(t.status, 'unknown') AS status,
+           COALESCE(t.metadata->>'reseller_id', '') AS reseller_id,
+           COUNT(*) AS row_count, COALESCE(SUM(t.amount), 0) AS amount
+    FROM transactions t, tail
+    WHERE t.created_at >= (GREATEST(tail.start, %(start)s::timestamp) AT TIME ZONE 'UTC')::timestamp
+      AND t.created_at < (%(end)s::timestamp AT TIME ZONE 'UTC')::timestamp
+    GROUP BY 1, 2, 3, 4, 5
+    UNION ALL
+    SELECT date_trunc('{granularity}', gc.generated_date::timestamptz AT TIME ZONE 'UTC'), 'contract',
+           COALESCE(ct.product_type, 'contract'),
+           COALESCE(gc.status, 'unknown'),
+           '',
+           COUNT(*), COALESCE(SUM(gc.contract_value), 0)
+    FROM generated_contracts gc
+    CROSS JOIN tail
+    LEFT JOIN contract_templates ct ON ct.template_id = gc.template_id
+    WHERE gc.generated_date >= (GREATEST(tail.start, %(start)s::timestamp) AT TIME ZONE 'UTC')::timestamp
+      AND gc.generated_date < (%(end)s::timestamp AT TIME ZONE 'UTC')::timestamp
+    GROUP BY 1, 2, 3, 4, 5
+'''
+
+SERIES_METRICS_SQL = '''
+    COALESCE(SUM(r.row_count) FILTER (WHERE r.source = 'transaction'), 0) AS transaction_count,
+    COALESCE(SUM(r.row_count) FILTER (WHERE r.source = 'transaction' AND r.status = 'completed'), 0) AS completed_count,
+    COALESCE(SUM(r.amount) FILTER (WHERE r.source = 'transaction' AND r.status = 'completed'), 0) AS transaction_revenue,
+    COALESCE(SUM(r.row_count) FILTER (WHERE r.source = 'contract'), 0) AS contract_count,
+    COALESCE(SUM(r.amount) FILTER (WHERE r.source = 'contract'), 0) AS contract_revenue
+'''
+
+_tables_ready = False
+_tables_lock = threading.Lock()
+_backfill_requested = False
+_source_indexes_ready = False
+
+
+def ensure_rollup_tables() -> bool:
+    """Create the rollup tables once per process"""
+    global _tables_ready
+    if _tables_ready:
+        return True
+
+    with _tables_lock:
+        if _tables_ready:
+            return True
+        db = get_db_manager()
+        if not db.available:
+            return False
+        try:
+            with db.get_cursor() as (cursor, conn):
+                cursor.execute(ROLLUP_TABLES_SQL)
+                conn.commit()
+            _tables_ready = True
+        except Exception as e:
+            print(f"❌ Failed to create revenue rollup tables: {e}")
+        return _tables_ready
+
+
+def ensure_source_indexes() -> bool:
+    """
+    Build the transactions and generated_contracts indexes the rollups read
+    through, with CREATE INDEX CONCURRENTLY so payments keep being written;
+    only called from the refresh (job or CLI)
+    """
+    global _source_indexes_ready
+    if _source_indexes_ready:
+        return True
+    try:
+        with get_db_manager().get_cursor() as (cursor, conn):
+            conn.autocommit = True
+            try:
+                cursor.execute('''
+                    SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+                    WHERE c.relname = ANY(%s) AND c.relnamespace = current_schema()::regnamespace
+                      AND i.indisvalid
+                ''', (list(SOURCE_INDEXES),))
+                existing = {row[0] for row in cursor.fetchall()}
+                for name, (table, column) in SOURCE_INDEXES.items():
+                    if name not in existing:
+                        create_index_concurrently(cursor, table, name, column)
+                        print(f"✅ Built {name} for revenue rollups")
+            finally:
+                conn.autocommit = False
+        _source_indexes_ready = True
+    except Exception as e:
+        print(f"⚠️ Revenue rollup source indexes not built: {e}")
+    return _source_indexes_ready
+
+
+def refresh_revenue_rollups() -> Dict[str, Any]:
+    """
+    Recompute the hour and day buckets touched since the high-water mark
+
+    The first run has no high-water mark and backfills every bucket, so it
+    belongs in the revenue.rollup job or the CLI, never a request. Only one
+    refresh runs at a time across processes; the others return skipped.
+
+    Returns:
+        dict: success, changed_hours, high_water_mark and duration_ms
+    """
+    if not ensure_rollup_tables():
+        return {'success': False, 'error': 'Database not available'}
+    # A missing index only makes the refresh slower, so carry on without it
+    ensure_source_indexes()
+
+    rebuild_hourly_sql = REBUILD_HOURLY_SQL.format(product_type=generated_column('transactions', 'product_type', 't'))
+    start = time.perf_counter()
+    try:
+        with get_db_manager().get_cursor(RealDictCursor) as (cursor, conn):
+            cursor.execute('SELECT pg_try_advisory_xact_lock(%s) AS locked;', (ROLLUP_LOCK_ID,))
+            if not cursor.fetchone()['locked']:
+                conn.rollback()
+                return {'success': True, 'skipped': True}
+
+            cursor.execute('''
+                SELECT data_type FROM information_schema.columns
+                WHERE table_name = 'revenue_rollup_hourly' AND column_name = 'bucket'
+                  AND table_schema = current_schema();
+            ''')
+            if cursor.fetchone()['data_type'] == 'timestamp without time zone':
+                cursor.execute(UPGRADE_BUCKETS_SQL)
+                print("✅ Revenue rollup buckets converted to UTC")
+
+            cursor.execute("SELECT high_water_mark FROM revenue_rollup_state WHERE name = 'revenue';")
+            state = cursor.fetchone()
+            since = state['high_water_mark'] if state else None
+
+            # transactions.created_at is a local timestamp, so the mark is too
+            cursor.execute('SELECT LOCALTIMESTAMP AS now;')
+            high_water_mark = cursor.fetchone()['now']
+
+            cursor.execute(CHANGED_HOURS_SQL, {'since': since, 'lookback': REVENUE_ROLLUP_LOOKBACK_HOURS})
+            cursor.execute('SELECT COUNT(*) AS count FROM rollup_changed_hours;')
+            changed_hours = cursor.fetchone()['count']
+
+            if changed_hours:
+                cursor.execute(rebuild_hourly_sql)
+                cursor.execute(REBUILD_DAILY_SQL)
+
+            cursor.execute('''
+                INSERT INTO revenue_rollup_state (name, high_water_mark, refreshed_at, changed_buckets)
+                VALUES ('revenue', %s, NOW(), %s)
+                ON CONFLICT (name) DO UPDATE SET
+                    high_water_mark = EXCLUDED.high_water_mark,
+                    refreshed_at = EXCLUDED.refreshed_at,
+                    changed_buckets = EXCLUDED.changed_buckets;
+            ''', (high_water_mark, changed_hours))
+            conn.commit()
+    except Exception as e:
+        print(f"❌ Revenue rollup refresh failed: {e}")
+        return {'success': False, 'error': str(e)}
+
+    return {
+        'success': True,
+        'backfill': since is None,
+        'changed_hours': changed_hours,
+        'high_water_mark': high_water_mark.isoformat(),
+        'duration_ms': round((time.perf_counter() - start) * 1000, 2)
+    }
+
+
+def _request_backfill():
+    """Queue the first refresh once per process; reads are served live until it lands"""
+    global _backfill_requested
+    if _backfill_requested:
+        return
+    _backfill_requested = True
+    try:
+        from services.job_queue_service import enqueue_job
+        enqueue_job('revenue.rollup', dedupe_key='revenue.rollup')
+    except Exception as e:
+        print(f"⚠️ Could not queue the revenue rollup backfill: {e}")
+
+
+def _rows_sql(granularity: str) -> str:
+    """WITH clause defining r, the bucket rows for %(start)s..%(end)s"""
+    stored = HOURLY_ROWS_SQL if granularity == 'hour' else DAILY_ROWS_SQL
+    live = LIVE_ROWS_SQL.format(granularity=granularity,
+                                product_type=generated_column('transactions', 'product_type', 't'))
+    return f'WITH {TAIL_SQL}, r AS ({stored} UNION ALL {live})'
+
+
+def _backfilled() -> bool:
+    result = execute_query("SELECT 1 FROM revenue_rollup_state WHERE name = 'revenue';", fetch='one')
+    return not result['success'] or bool(result['data'])
+
+
+def _utc_naive(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _truncate(value: datetime, granularity: str) -> datetime:
+    value = value.replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0) if granularity == 'day' else value
+
+
+def _filters(product_type: Optional[str], reseller_id: Optional[str]):
+    clauses, params = [], {}
+    if product_type:
+        clauses.append('r.product_type = %(product_type)s')
+        params['product_type'] = product_type
+    if reseller_id:
+        clauses.append('r.reseller_id = %(reseller_id)s')
+        params['reseller_id'] = str(reseller_id)
+    return ''.join(f' AND {clause}' for clause in clauses), params
+
+
+def _metrics(row: Dict[str, Any]) -> Dict[str, Any]:
+    transaction_revenue = float(row['transaction_revenue'])
+    contract_revenue = float(row['contract_revenue'])
+    return {
+        'transaction_count': int(row['transaction_count']),
+        'completed_count': int(row['completed_count']),
+        'transaction_revenue': transaction_revenue,
+        'contract_count': int(row['contract_count']),
+        'contract_revenue': contract_revenue,
+        'total_revenue': transaction_revenue + contract_revenue
+    }
+
+
+def get_revenue_series(start: datetime, end: datetime, granularity: str = 'day',
+                       product_type: str = None, reseller_id: str = None) -> Dict[str, Any]:
+    """
+    Gap-filled revenue series from the rollups
+
+    Args:
+        start: First bucket (truncated to the granularity)
+        end: Last bucket (inclusive, truncated to the granularity)
+        granularity: 'hour' or 'day'
+        product_type: Only this product type
+        reseller_id: Only this reseller's transactions
+
+    Returns:
+        dict: success and series, one entry per bucket with zeros for empty buckets
+    """
+    if granularity not in GRANULARITIES:
+        return {'success': False, 'error': f"granularity must be one of {', '.join(GRANULARITIES)}"}
+    step = GRANULARITIES[granularity]
+
+    start, end = _utc_naive(start), _utc_naive(end)
+    if end < start:
+        return {'success': False, 'error': 'end must not be before start'}
+    if (end - start) / step > MAX_SERIES_POINTS:
+        return {'success': False, 'error': f'Range exceeds {MAX_SERIES_POINTS} {granularity} buckets'}
+
+    if not ensure_rollup_tables():
+        return {'success': False, 'error': 'Database not available'}
+    if not _backfilled():
+        _request_backfill()
+
+    filter_sql, filter_params = _filters(product_type, reseller_id)
+    first = _truncate(start, granularity)
+    last = _truncate(end, granularity)
+    result = execute_query(f'''
+        {_rows_sql(granularity)}
+        SELECT s.bucket, {SERIES_METRICS_SQL}
+        FROM generate_series(%(start)s::timestamp, %(last)s::timestamp, %(step)s::interval) AS s(bucket)
+        LEFT JOIN r ON r.bucket = s.bucket{filter_sql}
+        GROUP BY s.bucket
+        ORDER BY s.bucket
+    ''', {'start': first, 'last': last, 'end': last + step, 'step': f'1 {granularity}', **filter_params})
+
+    if not result['success']:
+        return result
+
+    series = []
+    for row in result['data'] or []:
+        bucket = row['bucket'].date() if granularity == 'day' else row['bucket']
+        series.append({'bucket': bucket.isoformat(), **_metrics(row)})
+
+    return {
+        'success': True,
+        'granularity': granularity,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'series': series
+    }
+
+
+def get_revenue_totals(start: datetime, end: datetime, product_type: str = None,
+                       reseller_id: str = None) -> Dict[str, Any]:
+    """Revenue metrics summed over the hour buckets in [start, end)"""
+    start, end = _utc_naive(start), _utc_naive(end)
+    if not ensure_rollup_tables():
+        return {'success': False, 'error': 'Database not available'}
+    if not _backfilled():
+        _request_backfill()
+
+    filter_sql, filter_params = _filters(product_type, reseller_id)
+    result = execute_query(f'''
+        {_rows_sql('hour')}
+        SELECT {SERIES_METRICS_SQL}
+        FROM r
+        WHERE TRUE{filter_sql}
+    ''', {'start': _truncate(start, 'hour'), 'end': end, **filter_params}, 'one')
+
+    if not result['success']:
+        return result
+    return {'success': True, **_metrics(result['data'])}
+
+
+def get_rollup_status() -> Dict[str, Any]:
+    """High-water mark and size of the rollup tables"""
+    if not ensure_rollup_tables():
+        return {'success': False, 'error': 'Database not available'}
+
+    result = execute_query('''
+        SELECT s.high_water_mark, s.refreshed_at, s.changed_buckets,
+               (SELECT COUNT(*) FROM revenue_rollup_hourly) AS hourly_rows,
+               (SELECT COUNT(*) FROM revenue_rollup_daily) AS daily_rows
+        FROM (SELECT 1) one
+        LEFT JOIN revenue_rollup_state s ON s.name = 'revenue'
+    ''', fetch='one')
+    if not result['success']:
+        return result
+
+    row = result['data']
+    return {
+        'success': True,
+        'high_water_mark': row['high_water_mark'].isoformat() if row['high_water_mark'] else None,
+        'refreshed_at': row['refreshed_at'].isoformat() if row['refreshed_at'] else None,
+        'changed_buckets': row['changed_buckets'],
+        'hourly_rows': row['hourly_rows'],
+        'daily_rows': row['daily_rows']
+    }
+
+
+if __name__ == '__main__':
+    import json
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'status'
+    if command == 'refresh':
+        result = refresh_revenue_rollups()
+    elif command == 'status':
+        result = get_rollup_status()
+    else:
+        print(__doc__)
+        sys.exit(1)
+    print(json.dumps(result, indent=2, default=str))
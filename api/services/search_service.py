@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Global Search
+Customers, users, quotes and contracts are searched through normalized search
+documents (lower-cased concatenations of the fields people actually type) that
+carry pg_trgm GIN indexes, so substring and fuzzy lookups stay index scans as
+the tables grow instead of ILIKE over every row's JSONB.
+
+The functions and indexes are created by an explicit migration; building a GIN
+index blocks writes unless it is built concurrently, so requests only look the
+schema up in the catalog.
+
+Usage:
+    python api/services/search_service.py status
+    python api/services/search_service.py migrate
+"""
+
+import os
+import sys
+import time
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from psycopg2.extras import RealDictCursor
+
+from utils.database import get_db_manager
+
+SEARCH_SIMILARITY_THRESHOLD = float(os.environ.get('SEARCH_SIMILARITY_THRESHOLD', 0.5))
+SEARCH_MIN_TERM_LENGTH = 2
+SEARCH_MAX_TERM_LENGTH = 100
+SEARCH_MAX_LIMIT = 50
+# Processes look for a schema migrated elsewhere this often while it is incomplete
+SEARCH_SCHEMA_RECHECK_SECONDS = 300
+
+SEARCH_ENTITY_TYPES = ('customer', 'user', 'quote', 'contract')
+
+# The document functions are IMMUTABLE so they can back expression indexes;
+# queries must call them with the same arguments for the planner to use them
+SEARCH_FUNCTIONS_SQL = '''
+    CREATE OR REPLACE FUNCTION customer_search_text(personal_info JSONB, contact_info JSONB, business_info JSONB)
+    RETURNS TEXT AS $$
+        SELECT lower(
+            coalesce(personal_info->>'first_name', '') || ' ' ||
+            coalesce(personal_info->>'last_name', '') || ' ' ||
+            coalesce(contact_info->>'email', '') || ' ' ||
+            coalesce(contact_info->>'phone', '') || ' ' ||
+            coalesce(business_info->>'company_name', '')
+        )
+    $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+
+    CREATE OR REPLACE FUNCTION user_search_text(email TEXT, profile JSONB)
+    RETURNS TEXT AS $$
+        SELECT lower(
+            coalesce(email, '') || ' ' ||
+            coalesce(profile->>'first_name', '') || ' ' ||
+            coalesce(profile->>'last_name', '') || ' ' ||
+            coalesce(profile->>'company_name', '') || ' ' ||
+            coalesce(profile->>'phone', '')
+        )
+    $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE;
+'''
+
+SEARCH_FUNCTIONS = ('customer_search_text(jsonb,jsonb,jsonb)', 'user_search_text(text,jsonb)')
+
+# name: (table, indexed expression)
+SEARCH_INDEXES = {
+    'idx_customers_search_trgm': ('customers', 'customer_search_text(personal_info, contact_info, business_info)'),
+    'idx_users_search_trgm': ('users', 'user_search_text(email, profile)'),
+    'idx_quotes_quote_id_trgm': ('quotes', 'lower(quote_id)'),
+    'idx_generated_contracts_number_trgm': ('generated_contracts', 'lower(contract_number)'),
+}
+
+CUSTOMER_DOCUMENT = 'customer_search_text(c.personal_info, c.contact_info, c.business_info)'
+USER_DOCUMENT = 'user_search_text(u.email, u.profile)'
+
+# Each branch matches by substring (LIKE) or by word similarity (<%), both of
+# which the trigram indexes serve, and is ranked by word similarity
+SEARCH_BRANCHES = {
+    'customer': f'''
+        (SELECT 'customer' AS entity_type, c.id::text AS entity_id,
+                trim(coalesce(c.personal_info->>'first_name', '') || ' ' ||
+                     coalesce(c.personal_info->>'last_name', '')) AS title,
+                coalesce(c.contact_info->>'email', c.business_info->>'company_name') AS subtitle,
+                word_similarity(%(term)s, {CUSTOMER_DOCUMENT}) AS score
+         FROM customers c
+         WHERE ({CUSTOMER_DOCUMENT} LIKE %(pattern)s OR %(term)s <%% {CUSTOMER_DOCUMENT})
+           AND (%(reseller_id)s::text IS NULL OR c.assigned_reseller_id::text = %(reseller_id)s)
+         ORDER BY score DESC
+         LIMIT %(limit)s)
+    ''',
+    'user': f'''
+        (SELECT 'user' AS entity_type, u.id::text AS entity_id,
+                u.email AS title,
+                u.role AS subtitle,
+                word_similarity(%(term)s, {USER_DOCUMENT}) AS score
+         FROM users u
+         WHERE ({USER_DOCUMENT} LIKE %(pattern)s OR %(term)s <%% {USER_DOCUMENT})
+         ORDER BY score DESC
+         LIMIT %(limit)s)
+    ''',
+    'quote': '''
+        (SELECT 'quote' AS entity_type, q.id::text AS entity_id,
+                q.quote_id AS title,
+                q.product_type || ' - ' || coalesce(q.status, '') AS subtitle,
+                word_similarity(%(term)s, lower(q.quote_id)) AS score
+         FROM quotes q
+         WHERE (lower(q.quote_id) LIKE %(pattern)s OR %(term)s <%% lower(q.quote_id))
+           AND (%(reseller_id)s::text IS NULL OR q.reseller_id::text = %(reseller_id)s)
+         ORDER BY score DESC
+         LIMIT %(limit)s)
+    ''',
+    'contract': '''
+        (SELECT 'contract' AS entity_type, gc.id::text AS entity_id,
+                gc.contract_number AS title,
+                gc.status AS subtitle,
+                word_similarity(%(term)s, lower(gc.contract_number)) AS score
+         FROM generated_contracts gc
+         WHERE (lower(gc.contract_number) LIKE %(pattern)s OR %(term)s <%% lower(gc.contract_number))
+           AND (%(reseller_id)s::text IS NULL OR gc.reseller_id::text = %(reseller_id)s)
+         ORDER BY score DESC
+         LIMIT %(limit)s)
+    '''
+}
+
+_schema_ready = False
+_trigram_ready = False
+_next_check_at = 0.0
+_schema_lock = threading.Lock()
+
+
+def check_search_schema() -> bool:
+    """
+    Look up the search document functions and trigram indexes; catalog reads only
+
+    A complete schema is remembered; an incomplete one is looked up again
+    after SEARCH_SCHEMA_RECHECK_SECONDS, a failed lookup after 30 seconds.
+
+    Returns:
+        bool: True when the document functions exist; substring filters on them
+        still work (unindexed) where the trigram indexes are missing
+    """
+    global _schema_ready, _trigram_ready, _next_check_at
+    if _trigram_ready or time.monotonic() < _next_check_at:
+        return _schema_ready
+
+    with _schema_lock:
+        if _trigram_ready or time.monotonic() < _next_check_at:
+            return _schema_ready
+        db = get_db_manager()
+        if not db.available:
+            return False
+        try:
+            with db.get_cursor(read_only=True) as (cursor, conn):
+                cursor.execute('''
+                    SELECT bool_and(to_regprocedure(signature) IS NOT NULL) FROM unnest(%s::text[]) AS signature
+                ''', (list(SEARCH_FUNCTIONS),))
+                functions_ready = bool(cursor.fetchone()[0])
+                cursor.execute('''
+                    SELECT count(*) FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+                    WHERE c.relname = ANY(%s) AND c.relnamespace = current_schema()::regnamespace
+                      AND i.indisvalid
+                ''', (list(SEARCH_INDEXES),))
+                indexes_ready = cursor.fetchone()[0] == len(SEARCH_INDEXES)
+        except Exception as e:
+            print(f"⚠️ Failed to inspect search schema: {e}")
+            _next_check_at = time.monotonic() + 30
+            return _schema_ready
+
+        _schema_ready = functions_ready
+        _trigram_ready = functions_ready and indexes_ready
+        _next_check_at = time.monotonic() + SEARCH_SCHEMA_RECHECK_SECONDS
+        return _schema_ready
+
+
+def migrate_search_schema() -> Dict[str, Any]:
+    """
+    Install pg_trgm, the search document functions and the trigram indexes
+
+    Indexes are built with CREATE INDEX CONCURRENTLY so writes to customers,
+    users, quotes and contracts continue during the build; an invalid index
+    left by an interrupted build is dropped and rebuilt.
+    """
+    global _next_check_at
+    db = get_db_manager()
+    if not db.available:
+        return {'success': False, 'error': 'Database not available'}
+
+    built = []
+    with db.get_cursor() as (cursor, conn):
+        conn.autocommit = True
+        try:
+            # The functions are useful without pg_trgm: unindexed substring filters
+            cursor.execute(SEARCH_FUNCTIONS_SQL)
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm;')
+            for name, (table, expression) in SEARCH_INDEXES.items():
+                cursor.execute('''
+                    SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+                    WHERE c.relname = %s AND c.relnamespace = current_schema()::regnamespace
+                      AND NOT i.indisvalid
+                ''', (name,))
+                if cursor.fetchone():
+                    cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name};')
+                cursor.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} '
+                               f'USING gin ({expression} gin_trgm_ops);')
+                built.append(name)
+        except Exception as e:
+            print(f"❌ Search schema migration failed: {e}")
+            _next_check_at = 0.0
+            check_search_schema()
+            return {'success': False, 'error': str(e), 'indexes': built, **get_search_status()}
+        finally:
+            conn.autocommit = False
+
+    _next_check_at = 0.0
+    check_search_schema()
+    return {'success': True, 'indexes': built, **get_search_status()}
+
+
+def like_pattern(term: str) -> str:
+    """Lower-cased substring pattern with LIKE wildcards in the term escaped"""
+    escaped = term.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def customer_search_condition(term: str) -> Tuple[str, List[str]]:
+    """WHERE fragment matching customers (aliased c) against the indexed search document"""
+    return f'{CUSTOMER_DOCUMENT} LIKE %s', [like_pattern(term)]
+
+
+def user_search_condition(term: str) -> Tuple[str, List[str]]:
+    """WHERE fragment matching users against the indexed search document"""
+    return 'user_search_text(email, profile) LIKE %s', [like_pattern(term)]
+
+
+def global_search(term: str, entity_types: Optional[List[str]] = None,
+                  reseller_id: Optional[str] = None, limit: int = 20) -> Dict[str, Any]:
+    """
+    Search customers, users, quotes and contracts in one ranked list
+
+    Args:
+        term: Text to look for (names, emails, phones, quote IDs, contract numbers)
+        entity_types: Limit the search to these entity types
+        reseller_id: Restrict results to one reseller's customers, quotes and contracts
+        limit: Maximum number of results
+
+    Returns:
+        dict: success and results ordered by similarity
+    """
+    term = (term or '').strip().lower()[:SEARCH_MAX_TERM_LENGTH]
+    if len(term) < SEARCH_MIN_TERM_LENGTH:
+        return {'success': False, 'error': f'Search term must be at least {SEARCH_MIN_TERM_LENGTH} characters'}
+
+    requested = entity_types or list(SEARCH_ENTITY_TYPES)
+    unknown = [entity for entity in requested if entity not in SEARCH_ENTITY_TYPES]
+    if unknown:
+        return {'success': False, 'error': f"Unknown entity types: {', '.join(unknown)}"}
+    if reseller_id:
+        # Resellers never see other users' accounts
+        requested = [entity for entity in requested if entity != 'user']
+    if not requested:
+        return {'success': True, 'term': term, 'results': [], 'count': 0}
+
+    if not check_search_schema() or not _trigram_ready:
+        return {'success': False, 'error': 'Search not available'}
+
+    limit = max(1, min(int(limit), SEARCH_MAX_LIMIT))
+    query = '\nUNION ALL\n'.join(SEARCH_BRANCHES[entity] for entity in requested)
+    query = f'SELECT * FROM ({query}) results ORDER BY score DESC, title LIMIT %(limit)s'
+    params = {
+        'term': term,
+        'pattern': like_pattern(term),
+        'reseller_id': str(reseller_id) if reseller_id else None,
+        'limit': limit
+    }
+
+    try:
+        with get_db_manager().get_cursor(RealDictCursor, read_only=True) as (cursor, conn):
+            cursor.execute('SELECT set_config(%s, %s, true);',
+                           ('pg_trgm.word_similarity_threshold', str(SEARCH_SIMILARITY_THRESHOLD)))
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            conn.commit()
+    except Exception as e:
+        print(f"❌ Global search failed: {e}")
+        return {'success': False, 'error': str(e)}
+
+    results = [
+        {
+            'type': row['entity_type'],
+            'id': row['entity_id'],
+            'title': row['title'],
+            'subtitle': row['subtitle'],
+            'score': round(float(row['score']), 3)
+        }
+        for row in rows
+    ]
+    return {'success': True, 'term': term, 'results': results, 'count': len(results)}
+
+
+def get_search_status() -> Dict[str, Any]:
+    return {
+        'schema_ready': _schema_ready,
+        'trigram_indexes': _trigram_ready,
+        'similarity_threshold': SEARCH_SIMILARITY_THRESHOLD
+    }
+
+
+if __name__ == '__main__':
+    import json
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'status'
+    if command == 'status':
+        check_search_schema()
+        result = get_search_status()
+    elif command == 'migrate':
+        result = migrate_search_schema()
+    else:
+        print(__doc__)
+        sys.exit(1)
+    print(json.dumps(result, indent=2, default=str))
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Webhook Inbox
+Verified webhooks are stored with a single INSERT into webhook_inbox, keyed by
+the provider's event id so redelivered events are dropped by the unique
+constraint, and applied to their transaction straight away. Events that can't
+be applied yet (the transaction isn't saved, the database hiccuped) stay
+pending, and a scheduled batch job applies them through the indexed
+processor_transaction_id column.
+
+Each transaction remembers the time of the event that set its status, and an
+event older than that is acknowledged without being applied, so a retried
+decline can't overwrite a later approval.
+"""
+
+import os
+import json
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from psycopg2.extras import RealDictCursor
+
+from utils.database import get_db_manager, execute_query
+from utils.generated_columns import generated_column
+
+WEBHOOK_INBOX_BATCH_SIZE = int(os.environ.get('WEBHOOK_INBOX_BATCH_SIZE', 500))
+# Helcim can deliver the webhook before the browser saves the transaction;
+# unmatched events are retried for a while before being parked
+WEBHOOK_UNMATCHED_RETRY_SECONDS = int(os.environ.get('WEBHOOK_UNMATCHED_RETRY_SECONDS', 60))
+WEBHOOK_UNMATCHED_MAX_AGE_SECONDS = int(os.environ.get('WEBHOOK_UNMATCHED_MAX_AGE_SECONDS', 3600))
+# Opt-in: apply each event in the webhook request instead of leaving it to the webhook.inbox job
+WEBHOOK_APPLY_INLINE = os.environ.get('WEBHOOK_APPLY_INLINE', 'false').lower() == 'true'
+
+WEBHOOK_INBOX_TABLES_SQL = '''
+    CREATE TABLE IF NOT EXISTS webhook_inbox (
+        id BIGSERIAL PRIMARY KEY,
+        provider VARCHAR(50) NOT NULL,
+        event_key VARCHAR(255) NOT NULL,
+        event_type VARCHAR(100),
+        processor_transaction_id VARCHAR(100),
+        payload JSONB NOT NULL,
+        status VARCHAR(20) NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        received_at TIMESTAMP WITHOUT TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        next_attempt_at TIMESTAMP WITHOUT TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        processed_at TIMESTAMP WITHOUT TIME ZONE,
+        event_at TIMESTAMP WITH TIME ZONE,
+        UNIQUE (provider, event_key)
+    );
+
+    ALTER TABLE webhook_inbox ADD COLUMN IF NOT EXISTS event_at TIMESTAMP WITH TIME ZONE;
+
+    CREATE INDEX IF NOT EXISTS idx_webhook_inbox_pending ON webhook_inbox (next_attempt_at, id)
+        WHERE status = 'pending';
+'''
+
+INSERT_EVENT_SQL = '''
+    INSERT INTO webhook_inbox (provider, event_key, event_type, processor_transaction_id, payload, event_at)
+    VALUES (%s, %s, %s, %s, %s, COALESCE(%s, CURRENT_TIMESTAMP))
+    ON CONFLICT (provider, event_key) DO NOTHING
+    RETURNING id
+'''
+
+# One statement per batch (or per event, with inbox_id): claim pending events,
+# apply the newest event per transaction unless the transaction already holds a
+# newer one, then mark every claimed event processed, retried or unmatched.
+# Events are ordered by (event_at, id); the applied pair is kept in processor_response.
+# {processor_transaction_id} is the generated column or its JSONB fallback.
+APPLY_BATCH_SQL = '''
+    WITH batch AS (
+        SELECT id, processor_transaction_id, event_type, received_at,
+               COALESCE(event_at, received_at::timestamptz) AS event_at
+        FROM webhook_inbox
+        WHERE status = 'pending' AND provider = 'helcim' AND next_attempt_at <= CURRENT_TIMESTAMP
+          AND (%(inbox_id)s::bigint IS NULL OR id = %(inbox_id)s::bigint)
+        ORDER BY next_attempt_at, id
+        LIMIT %(limit)s
+        FOR UPDATE SKIP LOCKED
+    ),
+    latest AS (
+        SELECT DISTINCT ON (processor_transaction_id) id, processor_transaction_id, event_type, event_at
+        FROM batch
+        WHERE processor_transaction_id IS NOT NULL
+        ORDER BY processor_transaction_id, event_at DESC, id DESC
+    ),
+    applied AS (
+        UPDATE transactions t
+        SET status = CASE WHEN l.event_type = 'transaction.approved' THEN 'completed' ELSE 'failed' END,
+            processed_at = CURRENT_TIMESTAMP,
+            processor_response = COALESCE(t.processor_response, '{{}}'::jsonb)
+                || jsonb_build_object('webhook_received', true, 'webhook_type', l.event_type,
+                                      'webhook_event_at', l.event_at, 'webhook_inbox_id', l.id)
+        FROM latest l
+        WHERE {processor_transaction_id} = l.processor_transaction_id
+          AND (t.processor_response->>'webhook_event_at' IS NULL
+               OR ((t.processor_response->>'webhook_event_at')::timestamptz,
+                   COALESCE((t.processor_response->>'webhook_inbox_id')::bigint, 0)) < (l.event_at, l.id))
+        RETURNING {processor_transaction_id} AS processor_transaction_id, t.status,
+                  t.metadata->>'quote_id' AS quote_id
+    ),
+    -- Events for a transaction that holds a newer one are done too, just not applied
+    matched AS (
+        SELECT DISTINCT b.processor_transaction_id
+        FROM batch b
+        JOIN transactions t ON {processor_transaction_id} = b.processor_transaction_id
+    ),
+    marked AS (
+        UPDATE webhook_inbox i
+        SET attempts = i.attempts + 1,
+            status = CASE
+                WHEN m.processor_transaction_id IS NOT NULL THEN 'processed'
+                WHEN b.received_at > CURRENT_TIMESTAMP - make_interval(secs => %(max_age)s) THEN 'pending'
+                ELSE 'unmatched'
+            END,
+            next_attempt_at = CURRENT_TIMESTAMP + make_interval(secs => %(retry_seconds)s),
+            processed_at = CASE WHEN m.processor_transaction_id IS NOT NULL THEN CURRENT_TIMESTAMP END
+        FROM batch b
+        LEFT JOIN matched m ON m.processor_transaction_id = b.processor_transaction_id
+        WHERE i.id = b.id
+        RETURNING i.status
+    )
+    SELECT
+        (SELECT COUNT(*) FROM marked) AS claimed,
+        (SELECT COUNT(*) FROM marked WHERE status = 'processed') AS processed,
+        (SELECT COUNT(*) FROM marked WHERE status = 'pending') AS retrying,
+        (SELECT COUNT(*) FROM marked WHERE status = 'unmatched') AS unmatched,
+        (SELECT COUNT(*) FROM applied) AS transactions_updated,
+        (SELECT COUNT(*) FROM latest JOIN matched USING (processor_transaction_id))
+          - (SELECT COUNT(DISTINCT processor_transaction_id) FROM applied) AS superseded,
+        (SELECT COALESCE(array_agg(DISTINCT quote_id), '{{}}') FROM applied
+          WHERE status = 'completed' AND quote_id IS NOT NULL) AS paid_quotes
+'''
+
+_tables_ready = False
+_tables_lock = threading.Lock()
+
+
+def ensure_webhook_inbox_tables() -> bool:
+    """Create the inbox table once per process; requires the processor_transaction_id generated column"""
+    global _tables_ready
+    if _tables_ready:
+        return True
+
+    with _tables_lock:
+        if _tables_ready:
+            return True
+        db = get_db_manager()
+        if not db.available:
+            return False
+        try:
+            with db.get_cursor() as (cursor, conn):
+                cursor.execute(WEBHOOK_INBOX_TABLES_SQL)
+                conn.commit()
+            _tables_ready = True
+        except Exception as e:
+            print(f"❌ Failed to create webhook inbox tables: {e}")
+        return _tables_ready
+
+
+def record_webhook(provider: str, event_key: str, event_type: Optional[str],
+                   processor_transaction_id: Optional[str], payload: Dict[str, Any],
+                   event_at: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Store a verified webhook for batch processing
+
+    Args:
+        provider: Webhook source, e.g. 'helcim'
+        event_key: Provider's unique delivery/event id
+        event_type: Event type from the payload
+        processor_transaction_id: Processor's transaction id the event applies to
+        payload: Parsed webhook body
+        event_at: When the provider sent the event; defaults to now
+
+    Returns:
+        dict: success, inbox id and duplicate (True when the event was already stored)
+    """
+    if not ensure_webhook_inbox_tables():
+        return {'success': False, 'error': 'Database not available'}
+
+    result = execute_query(INSERT_EVENT_SQL, (
+        provider,
+        event_key,
+        event_type,
+        str(processor_transaction_id) if processor_transaction_id is not None else None,
+        json.dumps(payload),
+        event_at
+    ), 'one')
+    if not result['success']:
+        return result
+    inserted = result['data']
+    return {
+        'success': True,
+        'inbox_id': inserted['id'] if inserted else None,
+        'duplicate': inserted is None
+    }
+
+
+def process_webhook_inbox(limit: int = WEBHOOK_INBOX_BATCH_SIZE, inbox_id: Optional[int] = None) -> Dict[str, Any]:
+    """Apply pending Helcim webhooks to their transactions in one batch, or just the event inbox_id"""
+    if not ensure_webhook_inbox_tables():
+        return {'success': False, 'error': 'Database not available'}
+
+    apply_batch_sql = APPLY_BATCH_SQL.format(
+        processor_transaction_id=generated_column('transactions', 'processor_transaction_id', 't')
+    )
+    try:
+        with get_db_manager().get_cursor(RealDictCursor) as (cursor, conn):
+            cursor.execute(apply_batch_sql, {
+                'inbox_id': inbox_id,
+                'limit': limit,
+                'retry_seconds': WEBHOOK_UNMATCHED_RETRY_SECONDS,
+                'max_age': WEBHOOK_UNMATCHED_MAX_AGE_SECONDS
+            })
+            row = dict(cursor.fetchone())
+            conn.commit()
+    except Exception as e:
+        print(f"❌ Webhook inbox batch failed: {e}")
+        return {'success': False, 'error': str(e)}
+
+    paid_quotes = row.pop('paid_quotes') or []
+    if paid_quotes:
+        from services.helcim_customer_cache_service import close_quote_invoices
+        for quote_id in paid_quotes:
+            close_quote_invoices(quote_id)
+
+    return {'success': True, **row}
+
+
+def get_webhook_inbox_stats() -> Dict[str, Any]:
+    """Event counts by status plus the age of the oldest pending event"""
+    if not ensure_webhook_inbox_tables():
+        return {'success': False, 'error': 'Database not available'}
+
+    result = execute_query('''
+        SELECT status, COUNT(*) AS count,
+               EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - MIN(received_at)) AS oldest_seconds
+        FROM webhook_inbox
+        GROUP BY status
+    ''')
+    if not result['success']:
+        return result
+
+    rows = result['data'] or []
+    pending = next((row for row in rows if row['status'] == 'pending'), None)
+    return {
+        'success': True,
+        'by_status': {row['status']: row['count'] for row in rows},
+        'oldest_pending_seconds': round(float(pending['oldest_seconds']), 1) if pending else None
+    }
@@ -4,10 +4,14 @@ PostgreSQL connection pooling, query helpers, and database operations
 """
 
 import os
+import re
 import time
 import json
+import threading
+from contextvars import ContextVar
 from datetime import datetime, timezone, timedelta
 from contextlib import contextmanager
+from functools import lru_cache
 from typing import Dict, List, Optional, Any, Union
 
 try:
@@ -19,16 +23,105 @@ except ImportError:
     PSYCOPG2_AVAILABLE = False
     print("Warning: psycopg2 not available. Database functionality will be limited.")
 
+# Optional read-only replica; reads fall back to the primary when it lags or fails
+DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 5))
+REPLICA_LAG_CHECK_SECONDS = 5
+# A replica that failed is left alone for this long before it is tried again
+REPLICA_RETRY_SECONDS = 30
+
+REPLICA_LAG_SQL = '''
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END;
+'''
+
+_READ_STATEMENT = re.compile(r'^\s*\(?\s*(SELECT|WITH)\b', re.IGNORECASE)
+_WRITE_CLAUSE = re.compile(
+    r'\b(INSERT|UPDATE|DELETE|MERGE|INTO|NEXTVAL|SETVAL|FOR\s+(NO\s+KEY\s+)?UPDATE|FOR\s+(KEY\s+)?SHARE)\b'
+    r'|pg_advisory',
+    re.IGNORECASE
+)
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+
+# Set once the current request (or job) has written; its later reads stay on the primary
+_primary_pinned: ContextVar[bool] = ContextVar('db_primary_pinned', default=False)
+
+
+@lru_cache(maxsize=1024)
+def is_read_only_statement(query: str) -> bool:
+    """Whether a statement is a plain SELECT (or WITH ... SELECT) that is safe on a replica"""
+    if not _READ_STATEMENT.match(query):
+        return False
+    return not _WRITE_CLAUSE.search(_STRING_LITERAL.sub("''", query))
+
+
+def pin_to_primary():
+    """Send the rest of the current request's queries to the primary (read-your-writes)"""
+    _primary_pinned.set(True)
+
+
+def reset_primary_pin():
+    _primary_pinned.set(False)
+
+
+class PrimaryPinningCursorMixin:
+    """Pins the request to the primary once a statement that may write runs on the cursor"""
+
+    def execute(self, query, vars=None):
+        if not (isinstance(query, str) and is_read_only_statement(query)):
+            _primary_pinned.set(True)
+        return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        _primary_pinned.set(True)
+        return super().executemany(query, vars_list)
+
+    def callproc(self, procname, vars=None):
+        _primary_pinned.set(True)
+        return super().callproc(procname, vars)
+
+
+_pinning_cursor_classes: Dict[type, type] = {}
+
+
+def _pinning_cursor_class(cursor_class: type) -> type:
+    if issubclass(cursor_class, PrimaryPinningCursorMixin):
+        return cursor_class
+    pinning = _pinning_cursor_classes.get(cursor_class)
+    if pinning is None:
+        pinning = type(f"PrimaryPinning{cursor_class.__name__}", (PrimaryPinningCursorMixin, cursor_class), {})
+        _pinning_cursor_classes[cursor_class] = pinning
+    return pinning
+
+
 class DatabaseManager:
     """Database connection and utility manager with connection pooling"""
     
-    def __init__(self, database_url=None, pool_size_min=1, pool_size_max=10):
+    def __init__(self, database_url=None, pool_size_min=1, pool_size_max=10, replica_url=None):
         self.database_url = database_url or os.environ.get('DATABASE_URL')
+        self.replica_url = replica_url or DATABASE_REPLICA_URL
         self.available = bool(self.database_url and PSYCOPG2_AVAILABLE)
         self.pool = None
+        self.replica_pool = None
+        self._replica_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._replica_checked_at = 0.0
+        self._replica_ok = False
+        self._replica_lag = None
+        self._replica_stats = {'replica_reads': 0, 'primary_reads': 0, 'fallbacks': 0, 'lag_fallbacks': 0}
         
         if self.available:
             try:
+                # Pool members must be created through the instrumented connect
+                try:
+                    from utils.query_instrumentation import install_instrumentation
+                    install_instrumentation()
+                except ImportError:
+                    pass
+                
                 # Initialize connection pool
                 self.pool = ThreadedConnectionPool(
                     pool_size_min, 
@@ -39,29 +132,106 @@ class DatabaseManager:
             except Exception as e:
                 print(f"❌ Failed to initialize database pool: {e}")
                 self.available = False
+        
+        if self.available and self.replica_url:
+            try:
+                self.replica_pool = ThreadedConnectionPool(pool_size_min, pool_size_max, self.replica_url)
+                print(f"✅ Read replica pool initialized ({pool_size_min}-{pool_size_max} connections)")
+            except Exception as e:
+                print(f"⚠️ Read replica not available, reading from the primary: {e}")
+    
+    def replica_available(self) -> bool:
+        """
+        Whether reads may go to the replica right now: one is configured, this
+        request has not written, and its lag (checked every few seconds) is
+        within REPLICA_MAX_LAG_SECONDS
+        """
+        if self.replica_pool is None or _primary_pinned.get():
+            return False
+        if time.monotonic() < self._replica_checked_at + REPLICA_LAG_CHECK_SECONDS:
+            return self._replica_ok
+        
+        with self._replica_lock:
+            if time.monotonic() < self._replica_checked_at + REPLICA_LAG_CHECK_SECONDS:
+                return self._replica_ok
+            try:
+                with self._pooled_connection(self.replica_pool) as conn:
+                    with conn.cursor() as cursor:
+                        cursor.execute(REPLICA_LAG_SQL)
+                        lag = float(cursor.fetchone()[0])
+                    conn.rollback()
+                healthy = lag <= REPLICA_MAX_LAG_SECONDS
+                if self._replica_ok and not healthy:
+                    print(f"⚠️ Read replica is {lag:.1f}s behind, reading from the primary")
+                    self._count_replica_stat('lag_fallbacks')
+                self._replica_lag = lag
+                self._replica_ok = healthy
+                self._replica_checked_at = time.monotonic()
+            except Exception as e:
+                self._replica_failed(e)
+        return self._replica_ok
+    
+    def _count_replica_stat(self, key: str):
+        with self._stats_lock:
+            self._replica_stats[key] += 1
+    
+    def _replica_failed(self, error: Exception):
+        """Read from the primary for REPLICA_RETRY_SECONDS after a replica connection error"""
+        print(f"⚠️ Read replica failed, reading from the primary: {error}")
+        self._replica_ok = False
+        self._replica_lag = None
+        self._replica_checked_at = time.monotonic() + REPLICA_RETRY_SECONDS - REPLICA_LAG_CHECK_SECONDS
     
     @contextmanager
-    def get_connection(self):
-        """Get database connection from pool"""
-        if not self.available:
-            raise Exception("Database not available")
-        
+    def _pooled_connection(self, pool):
         conn = None
         try:
-            conn = self.pool.getconn()
+            conn = pool.getconn()
             yield conn
         except Exception as e:
-            if conn:
+            if conn and not conn.closed:
                 conn.rollback()
             raise e
         finally:
             if conn:
-                self.pool.putconn(conn)
+                pool.putconn(conn, close=bool(conn.closed))
     
     @contextmanager
-    def get_cursor(self, cursor_factory=None):
-        """Get database cursor with automatic connection management"""
-        with self.get_connection() as conn:
+    def get_connection(self, read_only: bool = False, pin: bool = True):
+        """
+        Get database connection from pool
+        
+        Args:
+            read_only: The caller only reads, so the replica may serve it.
+                Anything else is assumed to write and pins the rest of the
+                request to the primary.
+            pin: Pin as soon as a primary connection is handed out; off when
+                the caller pins once it actually writes
+        """
+        if not self.available:
+            raise Exception("Database not available")
+        
+        if read_only and self.replica_available():
+            pool = self.replica_pool
+        else:
+            pool = self.pool
+            if not read_only and pin:
+                _primary_pinned.set(True)
+        with self._pooled_connection(pool) as conn:
+            yield conn
+    
+    @contextmanager
+    def get_cursor(self, cursor_factory=None, read_only: bool = False):
+        """
+        Get database cursor with automatic connection management
+        
+        Without read_only the cursor runs on the primary, but the request is
+        only pinned there once a statement that may write is executed.
+        """
+        with self.get_connection(read_only, pin=False) as conn:
+            if not read_only:
+                cursor_factory = _pinning_cursor_class(
+                    cursor_factory or conn.cursor_factory or psycopg2.extensions.cursor)
             cursor = conn.cursor(cursor_factory=cursor_factory)
             try:
                 yield cursor, conn
@@ -116,13 +286,48 @@ class DatabaseManager:
                 'connection_time_ms': round((time.time() - start_time) * 1000, 2) if 'start_time' in locals() else None
             }
     
-    def execute_query(self, query: str, params: tuple = None, fetch: str = 'all') -> Dict[str, Any]:
-        """Execute SQL query with error handling"""
+    def execute_query(self, query: str, params: tuple = None, fetch: str = 'all',
+                      read_only: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Execute SQL query with error handling
+        
+        Args:
+            read_only: Whether the replica may serve the query; plain SELECTs are
+                detected when not given. A read the replica rejects (a function
+                that writes, a cancellation during recovery) is retried on the primary.
+        """
         if not self.available:
             return {'success': False, 'error': 'Database not available'}
         
+        if read_only is None:
+            read_only = is_read_only_statement(query)
+        if read_only and self.replica_available():
+            try:
+                result = self._run_query(self.replica_pool, query, params, fetch)
+                self._count_replica_stat('replica_reads')
+                return result
+            except Exception as e:
+                self._count_replica_stat('fallbacks')
+                # Connection trouble, not a statement the replica refused or cancelled
+                if (isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+                        and not isinstance(e, psycopg2.extensions.QueryCanceledError)):
+                    self._replica_failed(e)
+        
+        if read_only:
+            self._count_replica_stat('primary_reads')
+        else:
+            _primary_pinned.set(True)
         try:
-            with self.get_cursor(cursor_factory=RealDictCursor) as (cursor, conn):
+            return self._run_query(self.pool, query, params, fetch)
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def _run_query(self, pool, query: str, params: tuple, fetch: str) -> Dict[str, Any]:
+        with self._pooled_connection(pool) as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                 cursor.execute(query, params)
                 
                 if fetch == 'all':
@@ -143,12 +348,6 @@ class DatabaseManager:
                     'data': result,
                     'rowcount': cursor.rowcount
                 }
-                
-        except Exception as e:
-            return {
-                'success': False,
-                'error': str(e)
-            }
     
     def insert_record(self, table: str, data: Dict[str, Any], returning: str = 'id') -> Dict[str, Any]:
         """Insert record into table"""
@@ -327,6 +526,7 @@ class DatabaseManager:
                         "max_connections": self.pool.maxconn if self.pool else 0,
                         "closed_connections": self.pool.closed if self.pool else 0
                     },
+                    "read_replica": self.get_replica_status(),
                     "top_tables": [dict(row) for row in table_stats] if table_stats else []
                 }
                 
@@ -368,29 +568,14 @@ class DatabaseManager:
             }
     
     def cleanup_old_records(self, table: str, date_column: str, days_to_keep: int = 30) -> Dict[str, Any]:
-        """Clean up old records from table"""
+        """Clean up old records from table (drops whole partitions when the table is partitioned)"""
         if not self.available:
             return {'success': False, 'error': 'Database not available'}
         
         try:
+            from utils.partitioning import apply_retention
             cutoff_date = datetime.now() - timedelta(days=days_to_keep)
-            
-            with self.get_cursor() as (cursor, conn):
-                # Count records to be deleted
-                cursor.execute(f'SELECT COUNT(*) FROM {table} WHERE {date_column} < %s;', (cutoff_date,))
-                records_to_delete = cursor.fetchone()[0]
-                
-                if records_to_delete > 0:
-                    # Delete old records
-                    cursor.execute(f'DELETE FROM {table} WHERE {date_column} < %s;', (cutoff_date,))
-                    conn.commit()
-                
-                return {
-                    'success': True,
-                    'records_deleted': records_to_delete,
-                    'cutoff_date': cutoff_date.isoformat(),
-                    'table': table
-                }
+            return apply_retention(table, date_column, cutoff_date)
                 
         except Exception as e:
             return {
@@ -446,11 +631,25 @@ class DatabaseManager:
                 'error': str(e)
             }
     
+    def get_replica_status(self) -> Dict[str, Any]:
+        """Whether a read replica is configured and in use, its last measured lag and read routing counts"""
+        with self._stats_lock:
+            stats = dict(self._replica_stats)
+        return {
+            'configured': self.replica_pool is not None,
+            'in_use': self.replica_pool is not None and self._replica_ok,
+            'lag_seconds': round(self._replica_lag, 2) if self._replica_lag is not None else None,
+            'max_lag_seconds': REPLICA_MAX_LAG_SECONDS,
+            **stats
+        }
+    
     def close_pool(self):
         """Close connection pool"""
         if self.pool:
             self.pool.closeall()
             print("🔒 Database connection pool closed")
+        if self.replica_pool:
+            self.replica_pool.closeall()
 
 # Global database manager instance
 db_manager = None
@@ -462,10 +661,16 @@ def get_db_manager():
         db_manager = DatabaseManager()
     return db_manager
 
+def init_replica_routing(app):
+    """Start every request unpinned, so reads go to the replica until the request writes"""
+    @app.before_request
+    def _reset_replica_routing():
+        reset_primary_pin()
+
 # Convenience functions for common operations
-def execute_query(query: str, params: tuple = None, fetch: str = 'all'):
+def execute_query(query: str, params: tuple = None, fetch: str = 'all', read_only: Optional[bool] = None):
     """Execute query using global database manager"""
-    return get_db_manager().execute_query(query, params, fetch)
+    return get_db_manager().execute_query(query, params, fetch, read_only)
 
 def insert_record(table: str, data: Dict[str, Any], returning: str = 'id'):
     """Insert record using global database manager"""
@@ -493,13 +698,13 @@ def paginate_query(query: str, params: tuple = None, page: int = 1, per_page: in
             query = f"{query.rstrip(';')} ORDER BY {order_by}"
         
         # Get total count (without LIMIT/OFFSET)
-        count_query = f"SELECT COUNT(*) FROM ({query}) as count_query"
+        count_query = f"SELECT COUNT(*) AS total_count FROM ({query}) as count_query"
         count_result = execute_query(count_query, params, fetch='one')
         
         if not count_result['success']:
             return count_result
         
-        total_count = count_result['data'][0] if count_result['data'] else 0
+        total_count = count_result['data']['total_count'] if count_result['data'] else 0
         
         # Add pagination to original query
         paginated_query = f"{query} LIMIT %s OFFSET %s"
@@ -1170,7 +1375,7 @@ def calculate_vsc_price(vehicle_class: str, coverage_level: str, term_months: in
         if not base_result['success'] or not base_result['data']:
             return {'success': False, 'error': 'Base rate not found'}
         
-        base_rate = float(base_result['data'][0][0])
+        base_rate = float(base_result['data'][0]['base_rate'])
         
         # Get term multiplier
         term_query = '''
@@ -1179,7 +1384,7 @@ def calculate_vsc_price(vehicle_class: str, coverage_level: str, term_months: in
         '''
         
         term_result = db.execute_query(term_query, (term_months,))
-        term_multiplier = float(term_result['data'][0][0]) if term_result['success'] and term_result['data'] else 1.0
+        term_multiplier = float(term_result['data'][0]['multiplier']) if term_result['success'] and term_result['data'] else 1.0
         
         # Get mileage multiplier
         mileage_query = '''
@@ -1188,7 +1393,7 @@ def calculate_vsc_price(vehicle_class: str, coverage_level: str, term_months: in
         '''
         
         mileage_result = db.execute_query(mileage_query, (mileage, mileage))
-        mileage_multiplier = float(mileage_result['data'][0][0]) if mileage_result['success'] and mileage_result['data'] else 1.0
+        mileage_multiplier = float(mileage_result['data'][0]['multiplier']) if mileage_result['success'] and mileage_result['data'] else 1.0
         
         # Calculate final price
         calculated_price = base_rate * term_multiplier * mileage_multiplier
@@ -1203,7 +1408,7 @@ def calculate_vsc_price(vehicle_class: str, coverage_level: str, term_months: in
             
             pricing_result = db.execute_query(pricing_query, (customer_type,))
             if pricing_result['success'] and pricing_result['data']:
-                customer_multiplier = float(pricing_result['data'][0][0])
+                customer_multiplier = float(pricing_result['data'][0]['multiplier'])
                 calculated_price *= customer_multiplier
         
         return {
@@ -1307,12 +1512,13 @@ def get_dashboard_metrics() -> Dict[str, Any]:
             }
         
         # Policy metrics
-        policy_query = '''
+        from utils.generated_columns import generated_column
+        policy_query = f'''
             SELECT 
                 COUNT(*) as total_policies,
                 COUNT(CASE WHEN status = 'active' THEN 1 END) as active_policies,
                 COUNT(CASE WHEN created_at >= CURRENT_DATE - INTERVAL '30 days' THEN 1 END) as new_policies_30d,
-                AVG(CAST(pricing->>'calculated_price' AS NUMERIC)) as avg_policy_value
+                AVG({generated_column('policies', 'calculated_price')}) as avg_policy_value
             FROM policies;
         '''
         
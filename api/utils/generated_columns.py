@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Generated Columns
+Hot JSONB extractions promoted to stored generated columns with B-tree
+indexes. Postgres keeps them in sync on every write, so existing INSERT and
+UPDATE statements need no changes, while lookups and GROUP BYs become index
+scans on a plain column instead of per-row JSON parsing.
+
+Adding a stored generated column rewrites the table under an exclusive lock,
+so it is never done from a request. Run the migration explicitly; until it
+has run, queries use the JSONB expression instead.
+
+Usage:
+python api/utils/generated_columns.py status
+python api/utils/generated_columns.py migrate
+"""
+
+import os
+import sys
+import time
+import threading
+from collections import namedtuple
+from typing import Dict, Any, List
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import get_db_manager
+from utils.partitioning import create_index_concurrently
+
+# Processes look for columns added by a migration run elsewhere this often
+GENERATED_COLUMNS_RECHECK_SECONDS = float(os.environ.get('GENERATED_COLUMNS_RECHECK_SECONDS', 300))
+# A failed catalog check is retried after this long instead of on every query
+GENERATED_COLUMNS_RETRY_SECONDS = 30
+
+GeneratedColumn = namedtuple('GeneratedColumn', ['table', 'column', 'sql_type', 'expression', 'index_columns'])
+
+GENERATED_COLUMNS = (
+    # Webhook matching by the processor's transaction id
+    GeneratedColumn('transactions', 'processor_transaction_id', 'VARCHAR(100)',
+                    "processor_response->>'transaction_id'", ('processor_transaction_id',)),
+    # Product mix reports and rollups group by product over a date range
+    GeneratedColumn('transactions', 'product_type', 'VARCHAR(100)',
+                    "metadata->>'product_type'", ('product_type', 'created_at')),
+    # Find-or-create customer by email on quote generation and checkout
+    GeneratedColumn('customers', 'contact_email', 'VARCHAR(255)',
+                    "contact_info->>'email'", ('contact_email',)),
+    # Non-numeric prices become NULL instead of failing the write
+    GeneratedColumn('policies', 'calculated_price', 'NUMERIC',
+                    "CASE WHEN pricing->>'calculated_price' ~ '^\\s*-?[0-9]+(\\.[0-9]+)?\\s*$' "
+                    "THEN (pricing->>'calculated_price')::numeric END", ('calculated_price',)),
+)
+
+_COLUMNS = {(spec.table, spec.column): spec for spec in GENERATED_COLUMNS}
+
+_ready = set()
+_next_check_at = 0.0
+_lock = threading.Lock()
+
+
+def _index_name(spec: GeneratedColumn) -> str:
+    return f"idx_{spec.table}_{'_'.join(spec.index_columns)}"
+
+
+def _existing_columns(cursor, tables: List[str]) -> set:
+    cursor.execute('''
+        SELECT table_name, column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = ANY(%s)
+    ''', (tables,))
+    return {tuple(row) for row in cursor.fetchall()}
+
+
+def check_generated_columns() -> bool:
+    """
+    Look up which generated columns exist; catalog reads only, never DDL
+
+    The result is reused until GENERATED_COLUMNS_RECHECK_SECONDS have passed
+    while a column is still missing. A failed lookup is not cached.
+
+    Returns:
+        bool: True when every generated column exists
+    """
+    global _next_check_at
+    if len(_ready) == len(GENERATED_COLUMNS) or time.monotonic() < _next_check_at:
+        return len(_ready) == len(GENERATED_COLUMNS)
+
+    with _lock:
+        if len(_ready) == len(GENERATED_COLUMNS) or time.monotonic() < _next_check_at:
+            return len(_ready) == len(GENERATED_COLUMNS)
+        db = get_db_manager()
+        if not db.available:
+            return False
+
+        try:
+            with db.get_cursor(read_only=True) as (cursor, conn):
+                existing = _existing_columns(cursor, sorted({spec.table for spec in GENERATED_COLUMNS}))
+        except Exception as e:
+            print(f"⚠️ Failed to inspect generated columns: {e}")
+            _next_check_at = time.monotonic() + GENERATED_COLUMNS_RETRY_SECONDS
+            return False
+
+        _ready.update((spec.table, spec.column) for spec in GENERATED_COLUMNS
+                      if (spec.table, spec.column) in existing)
+        _next_check_at = time.monotonic() + GENERATED_COLUMNS_RECHECK_SECONDS
+        return len(_ready) == len(GENERATED_COLUMNS)
+
+
+def migrate_generated_columns(lock_timeout: str = '10s') -> Dict[str, Any]:
+    """
+    Add the missing generated columns and build their indexes concurrently
+
+    Each table gets all of its new columns in one ALTER TABLE, which rewrites
+    the table under an ACCESS EXCLUSIVE lock, so run this in a quiet period.
+    lock_timeout makes it give up rather than queue behind (and block) live
+    traffic. Indexes are then built with CREATE INDEX CONCURRENTLY, so writes
+    continue during the build.
+
+    Returns:
+        dict: success and, per table, the columns added and indexes built
+    """
+    global _next_check_at
+    db = get_db_manager()
+    if not db.available:
+        return {'success': False, 'error': 'Database not available'}
+
+    tables = sorted({spec.table for spec in GENERATED_COLUMNS})
+    results = {}
+    with db.get_connection() as conn:
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cursor:
+                existing = _existing_columns(cursor, tables)
+                cursor.execute('''
+                    SELECT table_name FROM information_schema.tables
+                    WHERE table_schema = current_schema() AND table_name = ANY(%s)
+                ''', (tables,))
+                present = {row[0] for row in cursor.fetchall()}
+
+                for table in tables:
+                    if table not in present:
+                        results[table] = {'success': False, 'error': 'Table does not exist'}
+                        continue
+                    specs = [spec for spec in GENERATED_COLUMNS if spec.table == table]
+                    missing = [spec for spec in specs if (table, spec.column) not in existing]
+                    in_transaction = False
+                    try:
+                        if missing:
+                            cursor.execute('BEGIN;')
+                            in_transaction = True
+                            cursor.execute(f"SET LOCAL lock_timeout = '{lock_timeout}';")
+                            cursor.execute(f'ALTER TABLE {table} ' + ', '.join(
+                                f'ADD COLUMN IF NOT EXISTS {spec.column} {spec.sql_type} '
+                                f'GENERATED ALWAYS AS ({spec.expression}) STORED'
+                                for spec in missing
+                            ) + ';')
+                            cursor.execute('COMMIT;')
+                            in_transaction = False
+                        for spec in specs:
+                            create_index_concurrently(cursor, table, _index_name(spec), ', '.join(spec.index_columns))
+                        results[table] = {
+                            'success': True,
+                            'columns_added': [spec.column for spec in missing],
+                            'indexes': [_index_name(spec) for spec in specs]
+                        }
+                    except Exception as e:
+                        if in_transaction:
+                            cursor.execute('ROLLBACK;')
+                        results[table] = {'success': False, 'error': str(e)}
+                        print(f"❌ Generated columns on {table} failed: {e}")
+        finally:
+            conn.autocommit = False
+
+    # Pick the new columns up in this process straight away
+    _next_check_at = 0.0
+    check_generated_columns()
+    return {'success': all(result['success'] for result in results.values()), 'tables': results}
+
+
+def has_generated_column(table: str, column: str) -> bool:
+    """Whether the generated column exists in this database"""
+    check_generated_columns()
+    return (table, column) in _ready
+
+
+def generated_column(table: str, column: str, alias: str = None) -> str:
+    """
+    SQL for a promoted JSONB field: the indexed generated column when it exists,
+    otherwise the original JSONB expression, so queries work either way
+
+    Args:
+        table: Table the column belongs to
+        column: Generated column name
+        alias: Table alias used in the query
+    """
+    prefix = f'{alias}.' if alias else ''
+    if has_generated_column(table, column):
+        return f'{prefix}{column}'
+    expression = _COLUMNS[(table, column)].expression
+    if alias:
+        for source in ('processor_response', 'metadata', 'contact_info', 'pricing'):
+            expression = expression.replace(f'{source}->>', f'{prefix}{source}->>')
+    return f'({expression})'
+
+
+def get_generated_column_status() -> Dict[str, Any]:
+    return {
+        f'{spec.table}.{spec.column}': (spec.table, spec.column) in _ready
+        for spec in GENERATED_COLUMNS
+    }
+
+
+if __name__ == '__main__':
+    import json
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'status'
+    if command == 'status':
+        check_generated_columns()
+        result = get_generated_column_status()
+    elif command == 'migrate':
+        result = migrate_generated_columns()
+    else:
+        print(__doc__)
+        sys.exit(1)
+    print(json.dumps(result, indent=2, default=str))
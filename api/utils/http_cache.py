@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+HTTP Response Cache
+Per-route TTL caching for public, read-mostly GET endpoints: strong ETags from
+the response body, 304 handling and Cache-Control/s-maxage headers so the
+Vercel edge serves repeat traffic without invoking the function
+"""
+
+import os
+import hashlib
+import threading
+import time
+from functools import wraps
+from typing import Dict, Any, Iterable
+
+from flask import request, make_response
+
+HTTP_CACHE_DISABLED = os.environ.get('HTTP_CACHE_DISABLED', 'false').lower() == 'true'
+MAX_CACHED_RESPONSES = 512
+
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+
+class _CachedResponse:
+    __slots__ = ('body', 'etag', 'mimetype', 'headers', 'expires_at', 'tags')
+
+    def __init__(self, body: bytes, etag: str, mimetype: str, headers: Dict[str, str],
+                 expires_at: float, tags: tuple):
+        self.body = body
+        self.etag = etag
+        self.mimetype = mimetype
+        self.headers = headers
+        self.expires_at = expires_at
+        self.tags = tags
+
+
+_entries: Dict[str, _CachedResponse] = {}
+_tag_generations: Dict[str, int] = {}
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'invalidations': 0}
+
+
+def _count(stat: str):
+    with _lock:
+        _stats[stat] += 1
+
+
+def _generation(tags: Iterable[str]) -> tuple:
+    # '*' is bumped by a full invalidation
+    return tuple(_tag_generations.get(tag, 0) for tag in ('*', *tags))
+
+
+def compute_etag(body: bytes) -> str:
+    """Strong ETag (unquoted) derived from the response body"""
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def cache_control_header(ttl: int, max_age: int = None, stale_while_revalidate: int = None) -> str:
+    """Browsers revalidate after max_age; the edge keeps the response for ttl"""
+    browser_age = min(ttl, 60) if max_age is None else max_age
+    swr = ttl if stale_while_revalidate is None else stale_while_revalidate
+    header = f'public, max-age={browser_age}, s-maxage={ttl}'
+    if swr:
+        header += f', stale-while-revalidate={swr}'
+    return header
+
+
+def uncacheable(response):
+    """Mark a view's response no-store so cached_response neither keeps nor publishes it"""
+    response = make_response(response)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+def _finalize(response, etag: str, cache_control: str):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    if request.if_none_match and request.if_none_match.contains(etag):
+        _count('not_modified')
+        response.status_code = 304
+        response.set_data(b'')
+    return response
+
+
+def cached_response(ttl: int, tags: Iterable[str] = (), max_age: int = None,
+                    stale_while_revalidate: int = None):
+    """
+    Cache a public GET view's 200 responses for ttl seconds
+
+    Args:
+        ttl: Seconds the response is kept in-process and at the edge (s-maxage)
+        tags: Invalidation tags; see invalidate_cache()
+        max_age: Browser max-age (defaults to min(ttl, 60))
+        stale_while_revalidate: Seconds the edge may serve stale while refreshing
+
+    Non-200 responses pass through uncached with Cache-Control: no-store, as
+    do responses the view marked with uncacheable() (e.g. fallback defaults
+    served while the database is unavailable).
+    """
+    tags = tuple(tags)
+    cache_control = cache_control_header(ttl, max_age, stale_while_revalidate)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if HTTP_CACHE_DISABLED or request.method not in ('GET', 'HEAD'):
+                return view(*args, **kwargs)
+
+            key = f"{request.endpoint}:{request.full_path}"
+            now = time.time()
+            with _lock:
+                entry = _entries.get(key)
+                if entry is not None and entry.expires_at <= now:
+                    del _entries[key]
+                    entry = None
+
+            if entry is not None:
+                _count('hits')
+                response = make_response(entry.body)
+                response.mimetype = entry.mimetype
+                response.headers.update(entry.headers)
+                return _finalize(response, entry.etag, cache_control)
+
+            _count('misses')
+            with _lock:
+                generation = _generation(tags)
+            response = make_response(view(*args, **kwargs))
+
+            if (response.status_code != 200 or response.direct_passthrough
+                    or 'no-store' in response.headers.get('Cache-Control', '')):
+                response.headers['Cache-Control'] = 'no-store'
+                return response
+
+            body = response.get_data()
+            etag = compute_etag(body)
+            extra_headers = {name: value for name, value in response.headers.items()
+                             if name.lower() not in ('content-type', 'content-length', 'etag', 'cache-control')}
+
+            with _lock:
+                # An admin write landed while this was rendering; don't store the old body
+                if _generation(tags) == generation:
+                    if len(_entries) >= MAX_CACHED_RESPONSES:
+                        _entries.pop(min(_entries, key=lambda k: _entries[k].expires_at))
+                    _entries[key] = _CachedResponse(body, etag, response.mimetype, extra_headers,
+                                                    now + ttl, tags)
+
+            return _finalize(response, etag, cache_control)
+
+        return wrapper
+    return decorator
+
+
+def invalidate_cache(*tags: str) -> int:
+    """
+    Drop cached responses carrying any of the given tags (all when none given)
+
+    Returns:
+        Number of entries removed from this instance. Other instances and the
+        edge expire their copies within the route's TTL.
+    """
+    with _lock:
+        if tags:
+            for tag in tags:
+                _tag_generations[tag] = _tag_generations.get(tag, 0) + 1
+            stale = [key for key, entry in _entries.items() if set(entry.tags) & set(tags)]
+        else:
+            _tag_generations['*'] = _tag_generations.get('*', 0) + 1
+            stale = list(_entries)
+        for key in stale:
+            del _entries[key]
+        _stats['invalidations'] += 1
+    return len(stale)
+
+
+def register_cache_invalidation(blueprint, *tags: str):
+    """Invalidate tags after every successful write request handled by blueprint"""
+    @blueprint.after_request
+    def _invalidate_after_write(response):
+        if request.method in WRITE_METHODS and response.status_code < 400:
+            invalidate_cache(*tags)
+        return response
+    return blueprint
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    with _lock:
+        return {
+            'enabled': not HTTP_CACHE_DISABLED,
+            'entries': len(_entries),
+            **_stats
+        }
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Outbound HTTP Client
+Shared, pooled client for third-party APIs. Keep-alive connections are reused
+across requests, transient failures are retried with jittered backoff (POSTs
+only when they carry an idempotency key), a circuit breaker fails fast while
+the upstream is degraded, and per-endpoint latency histograms show where time
+goes
+"""
+
+import re
+import time
+import random
+import threading
+from urllib.parse import urlsplit
+from typing import Dict, Any, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Histogram bucket upper bounds in milliseconds; the last bucket is unbounded
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'})
+MAX_RETRY_AFTER_SECONDS = 5.0
+NUMERIC_SEGMENT = re.compile(r'/\d+(?=/|$)')
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without contacting the upstream while its circuit is open"""
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets one trial request through after a cooldown"""
+
+    def __init__(self, failure_threshold: int = 5, recovery_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self._state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self._stats = {'opened': 0, 'rejected': 0}
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == 'closed':
+                return True
+            if self._state == 'open' and time.monotonic() - self._opened_at >= self.recovery_seconds:
+                self._state = 'half_open'
+            if self._state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self._stats['rejected'] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = 'closed'
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == 'half_open' or self._failures >= self.failure_threshold:
+                if self._state != 'open':
+                    self._stats['opened'] += 1
+                self._state = 'open'
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['state'] = self._state
+            stats['consecutive_failures'] = self._failures
+            if self._state == 'open':
+                stats['retry_in_seconds'] = round(
+                    max(0.0, self.recovery_seconds - (time.monotonic() - self._opened_at)), 1)
+        return stats
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram for one endpoint"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, elapsed_ms: float, error: bool = False):
+        index = len(LATENCY_BUCKETS_MS)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                index = i
+                break
+        self.buckets[index] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if error:
+            self.errors += 1
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given fraction of observations"""
+        if not self.count:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= target:
+                return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else round(self.max_ms, 2)
+        return round(self.max_ms, 2)
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f'le_{bound}' for bound in LATENCY_BUCKETS_MS] + ['le_inf']
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'avg_ms': round(self.total_ms / self.count, 2) if self.count else None,
+            'max_ms': round(self.max_ms, 2),
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'buckets': dict(zip(labels, self.buckets))
+        }
+
+
+class OutboundHTTPClient:
+    """Pooled session with retries, a circuit breaker and latency metrics for one upstream"""
+
+    def __init__(self, name: str, base_url: str = '', connect_timeout: float = 3.05,
+                 read_timeout: float = 15.0, max_retries: int = 2, backoff_base: float = 0.25,
+                 backoff_max: float = 2.0, pool_size: int = 10, failure_threshold: int = 5,
+                 recovery_seconds: float = 30.0):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = CircuitBreaker(failure_threshold, recovery_seconds)
+
+        # Retries are handled here so the circuit breaker sees every attempt
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'attempts': 0, 'retries': 0, 'failures': 0}
+
+    @staticmethod
+    def endpoint_label(method: str, path: str) -> str:
+        """Histogram label with numeric IDs collapsed so paths don't explode cardinality"""
+        return f"{method.upper()} {NUMERIC_SEGMENT.sub('/{id}', path)}"
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response]) -> float:
+        if response is not None and response.headers.get('Retry-After', '').isdigit():
+            return min(float(response.headers['Retry-After']), MAX_RETRY_AFTER_SECONDS)
+        # Full jitter keeps retrying workers from hitting the upstream in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _observe(self, label: str, elapsed_ms: float, error: bool):
+        with self._lock:
+            histogram = self._histograms.get(label)
+            if histogram is None:
+                histogram = self._histograms[label] = LatencyHistogram()
+            histogram.observe(elapsed_ms, error)
+
+    def request(self, method: str, path: str, idempotency_key: Optional[str] = None,
+                idempotency_header: str = 'Idempotency-Key', **kwargs) -> requests.Response:
+        """
+        Send a request through the shared session
+
+        Args:
+            method: HTTP method
+            path: Path appended to base_url (or an absolute URL)
+            idempotency_key: Sent on every attempt; makes non-idempotent methods retryable
+            idempotency_header: Header name the upstream expects the key in
+            **kwargs: Passed to requests (json, params, headers, ...)
+
+        Returns:
+            requests.Response of the last attempt (4xx/5xx are returned, not raised)
+
+        Raises:
+            CircuitOpenError: The upstream is failing and the circuit is open
+            requests.RequestException: Transport error after the last attempt
+        """
+        method = method.upper()
+        url = path if path.startswith('http') else f'{self.base_url}{path}'
+        label = self.endpoint_label(method, urlsplit(url).path)
+        retryable = method in IDEMPOTENT_METHODS or idempotency_key is not None
+        kwargs.setdefault('timeout', self.timeout)
+        if idempotency_key:
+            kwargs['headers'] = dict(kwargs.get('headers') or {}, **{idempotency_header: idempotency_key})
+
+        with self._lock:
+            self._stats['requests'] += 1
+
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError(f'{self.name} circuit open; not calling {label}')
+
+            with self._lock:
+                self._stats['attempts'] += 1
+            response = None
+            error = None
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except Exception as e:
+                # Anything that escapes here must still be recorded, or a half-open
+                # trial would never finish and the circuit would stay shut
+                error = e
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            failed = error is not None or response.status_code >= 500
+            self._observe(label, elapsed_ms, failed)
+            if failed:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+
+            if error is not None:
+                transient = isinstance(error, requests.RequestException)
+            else:
+                transient = response.status_code in RETRYABLE_STATUS_CODES
+            # A read timeout on a non-idempotent call may have been applied upstream
+            if isinstance(error, requests.exceptions.ReadTimeout) and idempotency_key is None:
+                transient = False
+
+            if not (transient and retryable and attempt < self.max_retries):
+                if failed:
+                    with self._lock:
+                        self._stats['failures'] += 1
+                if error is not None:
+                    raise error
+                return response
+
+            time.sleep(self._backoff(attempt, response))
+            attempt += 1
+            with self._lock:
+                self._stats['retries'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['endpoints'] = {label: histogram.to_dict() for label, histogram in self._histograms.items()}
+        stats['circuit'] = self.breaker.stats()
+        stats['timeout_seconds'] = {'connect': self.timeout[0], 'read': self.timeout[1]}
+        return stats
+
+
+_clients: Dict[str, OutboundHTTPClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_http_client(name: str, **options) -> OutboundHTTPClient:
+    """Process-wide client for an upstream; options only apply when it is first created"""
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = OutboundHTTPClient(name, **options)
+    return client
+
+
+def get_http_client_stats() -> Dict[str, Any]:
+    return {name: client.stats() for name, client in list(_clients.items())}
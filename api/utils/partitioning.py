@@ -0,0 +1,579 @@
+#!/usr/bin/env python3
+"""
+Table Partitioning
+Append-heavy tables (activity logs, security events, transactions) are range
+partitioned by month on created_at. Inserts only touch the current month's
+small indexes, recent-range queries prune to a few partitions, and retention
+detaches and drops whole partitions instead of running a large DELETE.
+
+Existing tables are converted once with `migrate`: the current table becomes a
+"legacy" partition holding everything up to the first monthly boundary, so no
+rows are copied and the exclusive lock is only held for catalog changes.
+
+Usage:
+    python api/utils/partitioning.py status
+    python api/utils/partitioning.py migrate quote_activities
+    python api/utils/partitioning.py maintain
+"""
+
+import os
+import re
+import sys
+from collections import namedtuple
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import get_db_manager
+
+# Monthly partitions are created this many months ahead of the current month
+PARTITION_PREMAKE_MONTHS = int(os.environ.get('PARTITION_PREMAKE_MONTHS', 3))
+# DDL gives up instead of queueing behind (and blocking) long-running queries
+PARTITION_LOCK_TIMEOUT = os.environ.get('PARTITION_LOCK_TIMEOUT', '5s')
+# Unpartitioned tables are trimmed in batches so no DELETE holds locks for long
+RETENTION_DELETE_BATCH_SIZE = 5000
+
+PartitionedTable = namedtuple('PartitionedTable', ['table', 'column', 'retention_months'])
+
+
+def _retention_months(env_name: str, default: int) -> Optional[int]:
+    """0 keeps data forever"""
+    return int(os.environ.get(env_name, default)) or None
+
+
+PARTITIONED_TABLES = {
+    spec.table: spec for spec in (
+        PartitionedTable('quote_activities', 'created_at', _retention_months('QUOTE_ACTIVITY_RETENTION_MONTHS', 24)),
+        PartitionedTable('security_events', 'created_at', _retention_months('SECURITY_EVENT_RETENTION_MONTHS', 3)),
+        # Contract history and payments are business records; partitioned for pruning, kept by default
+        PartitionedTable('contract_activities', 'created_at',
+                         _retention_months('CONTRACT_ACTIVITY_RETENTION_MONTHS', 0)),
+        PartitionedTable('transactions', 'created_at', _retention_months('TRANSACTION_RETENTION_MONTHS', 0)),
+    )
+}
+
+UPPER_BOUND_PATTERN = re.compile(r"TO \('([^']+)'\)")
+
+PARTITIONS_SQL = '''
+    SELECT c.relname AS name, pg_get_expr(c.relpartbound, c.oid) AS bound, i.inhdetachpending AS detach_pending
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = to_regclass(%s)
+    ORDER BY c.relname
+'''
+
+
+def _month_start(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_months(value: datetime, months: int) -> datetime:
+    month = value.month - 1 + months
+    return value.replace(year=value.year + month // 12, month=month % 12 + 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f'{table}_p{month:%Y%m}'
+
+
+def _set_lock_timeout(cursor, local: bool = True):
+    cursor.execute(f"SET {'LOCAL ' if local else ''}lock_timeout = %s;", (PARTITION_LOCK_TIMEOUT,))
+
+
+def _is_partitioned(cursor, table: str) -> bool:
+    cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s);', (table,))
+    return cursor.fetchone() is not None
+
+
+def _partitions(cursor, table: str) -> List[Dict[str, Any]]:
+    """Partitions with their upper bound (None for a DEFAULT partition)"""
+    cursor.execute(PARTITIONS_SQL, (table,))
+    partitions = []
+    for name, bound, detach_pending in cursor.fetchall():
+        match = UPPER_BOUND_PATTERN.search(bound or '')
+        partitions.append({
+            'name': name,
+            # Columns are timestamp without time zone; ignore any offset in the bound text
+            'upper': datetime.fromisoformat(match.group(1)[:19]) if match else None,
+            'detach_pending': detach_pending
+        })
+    return partitions
+
+
+def _drop_invalid_index(cursor, name: str):
+    """A concurrent build that failed leaves an invalid index behind; drop it so it is rebuilt"""
+    cursor.execute('''
+        SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s AND c.relnamespace = current_schema()::regnamespace AND NOT i.indisvalid
+    ''', (name,))
+    if cursor.fetchone():
+        cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name};')
+
+
+def create_index_concurrently(cursor, table: str, name: str, columns: str):
+    """
+    CREATE INDEX CONCURRENTLY, also on a partitioned table; the cursor's
+    connection must be in autocommit
+
+    A partitioned parent can't be indexed concurrently: its index is created
+    ON ONLY the parent, each partition's index is built concurrently and then
+    attached, which makes the parent index valid.
+    """
+    cursor.execute('''
+        SELECT child.relname
+        FROM pg_inherits inh
+        JOIN pg_class parent ON parent.oid = inh.inhparent
+        JOIN pg_class child ON child.oid = inh.inhrelid
+        WHERE parent.relname = %s AND parent.relkind = 'p'
+          AND parent.relnamespace = current_schema()::regnamespace
+    ''', (table,))
+    partitions = [row[0] for row in cursor.fetchall()]
+    cursor.execute('''
+        SELECT relkind FROM pg_class WHERE relname = %s AND relnamespace = current_schema()::regnamespace
+    ''', (table,))
+    if cursor.fetchone()[0] != 'p':
+        _drop_invalid_index(cursor, name)
+        cursor.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns});')
+        return
+
+    cursor.execute('''
+        SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s AND c.relnamespace = current_schema()::regnamespace
+    ''', (name,))
+    existing = cursor.fetchone()
+    if existing and existing[0]:
+        return
+    cursor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON ONLY {table} ({columns});')
+    for partition in partitions:
+        partition_index = f'{partition}_{name[4:]}'[:63]
+        _drop_invalid_index(cursor, partition_index)
+        cursor.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition_index} ON {partition} ({columns});')
+        cursor.execute('''
+            SELECT 1 FROM pg_inherits WHERE inhrelid = %s::regclass AND inhparent = %s::regclass
+        ''', (partition_index, name))
+        if not cursor.fetchone():
+            cursor.execute(f'ALTER INDEX {name} ATTACH PARTITION {partition_index};')
+
+
+def _create_partition(cursor, table: str, month: datetime):
+    """
+    Create a month's partition as a standalone table, then attach it; ATTACH
+    only needs SHARE UPDATE EXCLUSIVE on the parent, so writers are not blocked
+    """
+    name = partition_name(table, month)
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {name}
+        (LIKE {table} INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING CONSTRAINTS INCLUDING STORAGE);
+    ''')
+    cursor.execute(f'ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s);',
+                   (month, _add_months(month, 1)))
+
+
+def create_future_partitions(table: str) -> Dict[str, Any]:
+    """Make sure monthly partitions exist through PARTITION_PREMAKE_MONTHS ahead"""
+    db = get_db_manager()
+    created = []
+    with db.get_cursor() as (cursor, conn):
+        if not _is_partitioned(cursor, table):
+            return {'success': True, 'table': table, 'partitioned': False, 'created': created}
+        bounds = [partition['upper'] for partition in _partitions(cursor, table) if partition['upper']]
+
+    last_month = _add_months(_month_start(datetime.now()), PARTITION_PREMAKE_MONTHS)
+    month = _month_start(max(bounds)) if bounds else _month_start(datetime.now())
+    while month <= last_month:
+        # One short transaction per partition
+        with db.get_cursor() as (cursor, conn):
+            _set_lock_timeout(cursor)
+            _create_partition(cursor, table, month)
+            conn.commit()
+        created.append(partition_name(table, month))
+        month = _add_months(month, 1)
+
+    return {'success': True, 'table': table, 'partitioned': True, 'created': created}
+
+
+def drop_expired_partitions(table: str, cutoff: datetime) -> Dict[str, Any]:
+    """
+    Detach and drop partitions holding only rows older than cutoff
+
+    DETACH ... CONCURRENTLY never takes an exclusive lock on the parent; a
+    detach interrupted part-way is finished on the next run.
+    """
+    db = get_db_manager()
+    dropped = []
+    records_deleted = 0
+    with db.get_cursor() as (cursor, conn):
+        conn.autocommit = True
+        try:
+            _set_lock_timeout(cursor, local=False)
+            for partition in _partitions(cursor, table):
+                name = partition['name']
+                if partition['detach_pending']:
+                    cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {name} FINALIZE;')
+                elif partition['upper'] is None or partition['upper'] > cutoff:
+                    continue
+                else:
+                    cursor.execute(f'SELECT COUNT(*) FROM {name};')
+                    records_deleted += cursor.fetchone()[0]
+                    cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {name} CONCURRENTLY;')
+                cursor.execute(f'DROP TABLE {name};')
+                dropped.append(name)
+        finally:
+            cursor.execute('RESET lock_timeout;')
+            conn.autocommit = False
+
+    return {
+        'success': True,
+        'table': table,
+        'partitions_dropped': dropped,
+        'records_deleted': records_deleted,
+        'cutoff_date': cutoff.isoformat()
+    }
+
+
+def delete_in_batches(table: str, date_column: str, cutoff: datetime) -> Dict[str, Any]:
+    """Retention for tables that are not partitioned: short DELETE transactions"""
+    db = get_db_manager()
+    records_deleted = 0
+    while True:
+        with db.get_cursor() as (cursor, conn):
+            cursor.execute(f'''
+                DELETE FROM {table}
+                WHERE ctid = ANY(ARRAY(
+                    SELECT ctid FROM {table} WHERE {date_column} < %s LIMIT %s
+                ));
+            ''', (cutoff, RETENTION_DELETE_BATCH_SIZE))
+            deleted = cursor.rowcount
+            conn.commit()
+        records_deleted += deleted
+        if deleted < RETENTION_DELETE_BATCH_SIZE:
+            break
+
+    return {
+        'success': True,
+        'table': table,
+        'records_deleted': records_deleted,
+        'cutoff_date': cutoff.isoformat()
+    }
+
+
+def apply_retention(table: str, date_column: str, cutoff: datetime) -> Dict[str, Any]:
+    """Remove rows older than cutoff: whole partitions when partitioned, batched deletes otherwise"""
+    with get_db_manager().get_cursor() as (cursor, conn):
+        partitioned = _is_partitioned(cursor, table)
+    if partitioned:
+        return drop_expired_partitions(table, cutoff)
+    return delete_in_batches(table, date_column, cutoff)
+
+
+def maintain_partitions() -> Dict[str, Any]:
+    """Create upcoming partitions and apply retention for every registered table"""
+    results = {}
+    for spec in PARTITIONED_TABLES.values():
+        try:
+            with get_db_manager().get_cursor() as (cursor, conn):
+                if not _is_partitioned(cursor, spec.table):
+                    continue
+            result = create_future_partitions(spec.table)
+            if spec.retention_months:
+                cutoff = _add_months(_month_start(datetime.now()), -spec.retention_months)
+                result['retention'] = drop_expired_partitions(spec.table, cutoff)
+            results[spec.table] = result
+        except Exception as e:
+            print(f"⚠️ Partition maintenance failed for {spec.table}: {e}")
+            results[spec.table] = {'success': False, 'error': str(e)}
+    return results
+
+
+def _migration_blockers(cursor, table: str, column: str) -> List[str]:
+    """Reasons a table can't be swapped for a partitioned one in place"""
+    blockers = []
+    cursor.execute('''
+        SELECT conname, conrelid::regclass::text FROM pg_constraint
+        WHERE contype = 'f' AND confrelid = to_regclass(%s)
+    ''', (table,))
+    blockers += [f'foreign key {name} on {source} references it' for name, source in cursor.fetchall()]
+    cursor.execute('''
+        SELECT DISTINCT v.oid::regclass::text
+        FROM pg_depend d
+        JOIN pg_rewrite r ON r.oid = d.objid
+        JOIN pg_class v ON v.oid = r.ev_class
+        WHERE d.refobjid = to_regclass(%s) AND v.oid <> d.refobjid
+    ''', (table,))
+    blockers += [f'view {name} depends on it' for (name,) in cursor.fetchall()]
+    cursor.execute('''
+        SELECT attname FROM pg_attribute
+        WHERE attrelid = to_regclass(%s) AND attidentity <> '' AND NOT attisdropped
+    ''', (table,))
+    blockers += [f'identity column {name}' for (name,) in cursor.fetchall()]
+    cursor.execute('''
+        SELECT i.indexrelid::regclass::text FROM pg_index i
+        WHERE i.indrelid = to_regclass(%s) AND i.indisunique
+          AND (i.indexprs IS NOT NULL OR i.indpred IS NOT NULL)
+    ''', (table,))
+    blockers += [f'unique index {name} is partial or on expressions' for (name,) in cursor.fetchall()]
+    cursor.execute('''
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s
+    ''', (table, column))
+    if cursor.fetchone() is None:
+        blockers.append(f'column {column} does not exist')
+    return blockers
+
+
+def _table_indexes(cursor, table: str) -> List[Dict[str, Any]]:
+    cursor.execute('''
+        SELECT c.relname AS name, pg_get_indexdef(i.indexrelid) AS definition,
+               i.indisprimary AS is_primary, i.indisunique AS is_unique,
+               ARRAY(SELECT a.attname FROM unnest(i.indkey) WITH ORDINALITY k(attnum, n)
+                     JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+                     ORDER BY k.n)::text[] AS columns
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = to_regclass(%s)
+    ''', (table,))
+    return [
+        {'name': name, 'definition': definition, 'is_primary': is_primary, 'is_unique': is_unique, 'columns': columns}
+        for name, definition, is_primary, is_unique, columns in cursor.fetchall()
+    ]
+
+
+def _table_triggers(cursor, table: str) -> List[tuple]:
+    """(name, CREATE TRIGGER statement) for the table's own triggers"""
+    cursor.execute('''
+        SELECT tgname, pg_get_triggerdef(oid) FROM pg_trigger
+        WHERE tgrelid = to_regclass(%s) AND NOT tgisinternal
+    ''', (table,))
+    return cursor.fetchall()
+
+
+def _undo_migration_prep(table: str, check_name: str, index_names: List[str]):
+    """
+    Remove what step 1 left on the original table when the swap didn't happen;
+    the CHECK would otherwise reject rows past the boundary
+    """
+    with get_db_manager().get_cursor() as (cursor, conn):
+        conn.autocommit = True
+        try:
+            _set_lock_timeout(cursor, local=False)
+            cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {check_name};')
+            for name in index_names:
+                cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name};')
+        finally:
+            cursor.execute('RESET lock_timeout;')
+            conn.autocommit = False
+
+
+def migrate_to_partitioned(table: str) -> Dict[str, Any]:
+    """
+    Convert a registered table to monthly range partitions in place
+
+    1. Without blocking writers: add and validate a CHECK matching the legacy
+       partition's range, and build concurrently the unique indexes extended
+       with the partition column that a partitioned table requires.
+    2. In one short transaction: rename the table to <table>_legacy, create the
+       partitioned parent under the original name, attach the legacy table as
+       the partition up to the first boundary (no scan, thanks to the CHECK)
+       and create the monthly partitions after it. Triggers move from the
+       legacy table to the parent.
+
+    If either step fails, the CHECK and the indexes from step 1 are removed
+    again and the table is left as it was.
+
+    Unique constraints that did not include created_at are enforced per
+    partition afterwards (existing rows stay covered by the legacy index).
+    """
+    spec = PARTITIONED_TABLES.get(table)
+    if spec is None:
+        return {'success': False, 'error': f"{table} is not registered in PARTITIONED_TABLES"}
+
+    db = get_db_manager()
+    if not db.available:
+        return {'success': False, 'error': 'Database not available'}
+
+    legacy = f'{table}_legacy'
+    column = spec.column
+    # At least a week ahead, so writes keep landing in the legacy range until the swap commits
+    boundary = _add_months(_month_start(datetime.now() + timedelta(days=7)), 1)
+    check_name = f'{table}_partition_bound'
+
+    with db.get_cursor() as (cursor, conn):
+        if _is_partitioned(cursor, table):
+            return {'success': True, 'table': table, 'already_partitioned': True}
+        blockers = _migration_blockers(cursor, table, column)
+        if blockers:
+            return {'success': False, 'table': table, 'error': 'Cannot partition in place', 'blockers': blockers}
+        indexes = _table_indexes(cursor, table)
+        cursor.execute('''
+            SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+            WHERE conrelid = to_regclass(%s) AND contype = 'f'
+        ''', (table,))
+        foreign_keys = cursor.fetchall()
+        cursor.execute('''
+            SELECT attname, pg_get_serial_sequence(%s, attname) FROM pg_attribute
+            WHERE attrelid = to_regclass(%s) AND attnum > 0 AND NOT attisdropped
+              AND pg_get_serial_sequence(%s, attname) IS NOT NULL
+        ''', (table, table, table))
+        sequences = cursor.fetchall()
+        triggers = _table_triggers(cursor, table)
+
+    unique_indexes = [index for index in indexes if index['is_unique']]
+    prep_indexes = [f"{index['name'][:50]}_legacy" for index in unique_indexes if index['is_primary']]
+    prep_indexes += [f"{index['name'][:55]}_part" for index in unique_indexes if column not in index['columns']]
+    try:
+        _prepare_migration(table, column, boundary, check_name, unique_indexes)
+        created = _swap_to_partitioned(table, column, boundary, check_name, indexes,
+                                       foreign_keys, sequences, triggers)
+    except Exception as e:
+        print(f"❌ Partitioning {table} failed, undoing preparation: {e}")
+        try:
+            _undo_migration_prep(table, check_name, prep_indexes)
+        except Exception as cleanup_error:
+            print(f"⚠️ Cleanup after failed partitioning of {table} failed: {cleanup_error}")
+            return {'success': False, 'table': table, 'error': str(e), 'cleanup_error': str(cleanup_error)}
+        return {'success': False, 'table': table, 'error': str(e)}
+
+    print(f"✅ {table} partitioned by month on {column}; existing rows kept in {legacy}")
+    return {
+        'success': True,
+        'table': table,
+        'legacy_partition': legacy,
+        'legacy_upper_bound': boundary.isoformat(),
+        'created': created
+    }
+
+
+def _prepare_migration(table: str, column: str, boundary: datetime, check_name: str,
+                       unique_indexes: List[Dict[str, Any]]):
+    """Step 1: everything that scans the table, under locks that don't block writes"""
+    with get_db_manager().get_cursor() as (cursor, conn):
+        conn.autocommit = True
+        try:
+            _set_lock_timeout(cursor, local=False)
+            cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {check_name};')
+            cursor.execute(f'''
+                ALTER TABLE {table} ADD CONSTRAINT {check_name}
+                CHECK ({column} IS NOT NULL AND {column} < %s) NOT VALID;
+            ''', (boundary,))
+            cursor.execute(f'ALTER TABLE {table} VALIDATE CONSTRAINT {check_name};')
+            for index in unique_indexes:
+                if index['is_primary']:
+                    # The legacy partition can't keep a primary key that differs from the parent's;
+                    # this index keeps its rows unique once the constraint is dropped
+                    cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index['name'][:50]}_legacy;")
+                    cursor.execute(f'''
+                        CREATE UNIQUE INDEX CONCURRENTLY {index['name'][:50]}_legacy
+                        ON {table} ({', '.join(index['columns'])});
+                    ''')
+                if column not in index['columns']:
+                    cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index['name'][:55]}_part;")
+                    cursor.execute(f'''
+                        CREATE UNIQUE INDEX CONCURRENTLY {index['name'][:55]}_part
+                        ON {table} ({', '.join(index['columns'] + [column])});
+                    ''')
+        finally:
+            cursor.execute('RESET lock_timeout;')
+            conn.autocommit = False
+
+
+def _swap_to_partitioned(table: str, column: str, boundary: datetime, check_name: str,
+                         indexes: List[Dict[str, Any]], foreign_keys: List[tuple],
+                         sequences: List[tuple], triggers: List[tuple]) -> List[str]:
+    """Step 2: catalog-only swap in one transaction; returns the monthly partitions created"""
+    legacy = f'{table}_legacy'
+    with get_db_manager().get_cursor() as (cursor, conn):
+        _set_lock_timeout(cursor)
+        cursor.execute(f'LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE;')
+        cursor.execute(f'ALTER TABLE {table} RENAME TO {legacy};')
+        # Index names are schema-wide; the parent takes over the original names
+        for index in indexes:
+            if index['is_primary']:
+                cursor.execute(f"ALTER TABLE {legacy} DROP CONSTRAINT {index['name']};")
+            else:
+                cursor.execute(f"ALTER INDEX {index['name']} RENAME TO {index['name'][:50]}_legacy;")
+
+        cursor.execute(f'''
+            CREATE TABLE {table}
+            (LIKE {legacy} INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING CONSTRAINTS
+                           INCLUDING STORAGE INCLUDING COMMENTS)
+            PARTITION BY RANGE ({column});
+        ''')
+        cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT {check_name};')
+
+        # The saved definitions name the original table, which is now the parent.
+        # Row triggers are cloned onto every partition, the legacy one included,
+        # when it is attached below
+        for name, definition in triggers:
+            cursor.execute(f'DROP TRIGGER {name} ON {legacy};')
+            cursor.execute(definition)
+
+        for index in indexes:
+            columns = index['columns'] if column in index['columns'] else index['columns'] + [column]
+            if index['is_primary']:
+                cursor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {index['name']} PRIMARY KEY ({', '.join(columns)});")
+            elif index['is_unique']:
+                cursor.execute(f"CREATE UNIQUE INDEX {index['name']} ON {table} ({', '.join(columns)});")
+            else:
+                cursor.execute(index['definition'])
+
+        # Both use the validated CHECK instead of scanning the legacy table
+        cursor.execute(f'ALTER TABLE {legacy} ALTER COLUMN {column} SET NOT NULL;')
+        # ATTACH only adopts an index for the parent's primary key if it backs a constraint too
+        for index in indexes:
+            if index['is_primary'] and column not in index['columns']:
+                cursor.execute(f"ALTER TABLE {legacy} ADD CONSTRAINT {index['name'][:55]}_part "
+                               f"PRIMARY KEY USING INDEX {index['name'][:55]}_part;")
+        cursor.execute(f'ALTER TABLE {table} ATTACH PARTITION {legacy} FOR VALUES FROM (MINVALUE) TO (%s);',
+                       (boundary,))
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition};')
+        for attname, sequence in sequences:
+            cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {table}.{attname};')
+
+        month = boundary
+        created = []
+        while month <= _add_months(_month_start(datetime.now()), PARTITION_PREMAKE_MONTHS):
+            _create_partition(cursor, table, month)
+            created.append(partition_name(table, month))
+            month = _add_months(month, 1)
+        conn.commit()
+    return created
+
+
+def get_partition_status() -> Dict[str, Any]:
+    """Per registered table: whether it is partitioned, its partitions and retention"""
+    status = {}
+    with get_db_manager().get_cursor() as (cursor, conn):
+        for spec in PARTITIONED_TABLES.values():
+            cursor.execute('SELECT to_regclass(%s) IS NOT NULL;', (spec.table,))
+            if not cursor.fetchone()[0]:
+                continue
+            partitioned = _is_partitioned(cursor, spec.table)
+            partitions = _partitions(cursor, spec.table) if partitioned else []
+            status[spec.table] = {
+                'partitioned': partitioned,
+                'partitions': len(partitions),
+                'covered_until': max(
+                    (p['upper'].isoformat() for p in partitions if p['upper']), default=None
+                ),
+                'retention_months': spec.retention_months
+            }
+    return status
+
+
+if __name__ == '__main__':
+    import json
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'status'
+    if command == 'status':
+        result = get_partition_status()
+    elif command == 'migrate' and len(sys.argv) > 2:
+        result = migrate_to_partitioned(sys.argv[2])
+    elif command == 'maintain':
+        result = maintain_partitions()
+    else:
+        print(__doc__)
+        sys.exit(1)
+    print(json.dumps(result, indent=2, default=str))
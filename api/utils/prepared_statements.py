@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Prepared Statements
+The lookups that run on nearly every request (the token user check, customer
+and reseller by user, the VSC rate and admin settings) are prepared once per
+pooled connection and executed by name afterwards, so Postgres no longer
+parses and plans them on every call.
+
+Transaction-mode poolers (Neon's "-pooler" endpoints, PgBouncer) hand each
+transaction to whichever server connection is free, so a statement prepared
+in one transaction may not exist in the next. Through those the same SQL is
+sent as a plain query instead.
+"""
+
+import os
+import re
+import threading
+import weakref
+from typing import Dict, Any
+
+try:
+    import psycopg2
+    import psycopg2.errors
+    from psycopg2.extras import RealDictCursor
+    PSYCOPG2_AVAILABLE = True
+except ImportError:
+    PSYCOPG2_AVAILABLE = False
+
+from utils.database import get_db_manager, execute_query
+
+# auto: prepare unless the host looks like a transaction-mode pooler; on; off
+DB_PREPARED_STATEMENTS = os.environ.get('DB_PREPARED_STATEMENTS', 'auto').lower()
+POOLER_HOST_MARKERS = ('-pooler',)
+
+PREPARED_STATEMENTS = {
+    # verify_token, on every authenticated request
+    'user_by_id': '''
+        SELECT id, email, role, status
+        FROM users
+        WHERE id = %s AND status = 'active'
+    ''',
+    'customer_id_by_user_id': 'SELECT customer_id FROM customers WHERE user_id = %s',
+    'reseller_by_user_id': 'SELECT reseller_id, commission_rate FROM resellers WHERE user_id = %s',
+    # Pricing falls back to this when no pricing snapshot is loaded
+    'vsc_exact_rate': '''
+        SELECT rate_amount
+        FROM vsc_rate_matrix
+        WHERE vehicle_class = %s
+        AND coverage_level = %s
+        AND term_months = %s
+        AND min_mileage <= %s
+        AND max_mileage >= %s
+        AND active = TRUE
+        ORDER BY effective_date DESC
+        LIMIT 1
+    ''',
+    'admin_setting': 'SELECT value FROM admin_settings WHERE category = %s AND key = %s',
+    'admin_settings_by_category': 'SELECT key, value FROM admin_settings WHERE category = %s',
+}
+
+_PLACEHOLDER = re.compile(r'%s')
+
+# Statement names prepared on each pooled connection; entries go away with the connection
+_prepared: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+# DSNs that turned out to sit behind a transaction-mode pooler
+_unsupported_dsns = set()
+_lock = threading.Lock()
+_stats = {'prepares': 0, 'executions': 0, 'plain_queries': 0, 'fallbacks': 0}
+
+
+def _positional(query: str) -> str:
+    """%s placeholders as $1, $2, ... for PREPARE"""
+    counter = iter(range(1, query.count('%s') + 1))
+    return _PLACEHOLDER.sub(lambda match: f'${next(counter)}', query)
+
+
+def _prepared_on(conn):
+    """Names prepared on this connection, or None if it can't keep prepared statements"""
+    if DB_PREPARED_STATEMENTS == 'off' or conn.dsn in _unsupported_dsns:
+        return None
+    statements = _prepared.get(conn)
+    if statements is None:
+        if DB_PREPARED_STATEMENTS == 'auto' and any(
+                marker in (conn.info.host or '') for marker in POOLER_HOST_MARKERS):
+            with _lock:
+                _unsupported_dsns.add(conn.dsn)
+            return None
+        statements = _prepared[conn] = set()
+    return statements
+
+
+def _count(key: str):
+    with _lock:
+        _stats[key] += 1
+
+
+def uses_shared_pool(database_url: str) -> bool:
+    """Whether a service's own database URL is the one the shared pool connects to"""
+    db = get_db_manager()
+    return db.available and db.database_url == database_url
+
+
+def execute_prepared(name: str, params: tuple, fetch: str = 'one') -> Dict[str, Any]:
+    """
+    Run a registered read by name, preparing it on the connection first if needed
+
+    Reads may be served by the read replica like any other SELECT. Anything
+    that goes wrong on the prepared path is retried once as a plain query.
+
+    Args:
+        name: Key in PREPARED_STATEMENTS
+        params: Values for the statement's %s placeholders
+        fetch: 'one' or 'all'
+
+    Returns:
+        dict: Same shape as execute_query
+    """
+    query = PREPARED_STATEMENTS[name]
+    db = get_db_manager()
+    if not db.available:
+        return {'success': False, 'error': 'Database not available'}
+
+    try:
+        with db.get_connection(read_only=True) as conn:
+            prepared = _prepared_on(conn)
+            if prepared is not None:
+                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                    if name not in prepared:
+                        cursor.execute(f'PREPARE ps_{name} AS {_positional(query)}')
+                        prepared.add(name)
+                        _count('prepares')
+                    cursor.execute(f"EXECUTE ps_{name} ({', '.join(['%s'] * len(params))})", params)
+                    data = cursor.fetchone() if fetch == 'one' else cursor.fetchall()
+                    _count('executions')
+                    return {'success': True, 'data': data, 'rowcount': cursor.rowcount}
+    except (psycopg2.errors.InvalidSqlStatementName, psycopg2.errors.DuplicatePreparedStatement) as e:
+        # Prepared in one session, executed in another: a pooler is multiplexing connections
+        with _lock:
+            _unsupported_dsns.add(conn.dsn)
+            _stats['fallbacks'] += 1
+        print(f"⚠️ Prepared statements not kept by this connection (transaction pooler?), using plain queries: {e}")
+    except Exception:
+        # Surfaced by the plain query below if it is not specific to the prepared path
+        _count('fallbacks')
+
+    _count('plain_queries')
+    return execute_query(query, params, fetch, read_only=True)
+
+
+def get_prepared_statement_stats() -> Dict[str, Any]:
+    with _lock:
+        stats = dict(_stats)
+        stats['pooled_connections'] = len(_prepared)
+        stats['pooler_fallback'] = bool(_unsupported_dsns)
+    stats['mode'] = DB_PREPARED_STATEMENTS
+    stats['registered'] = sorted(PREPARED_STATEMENTS)
+    return stats
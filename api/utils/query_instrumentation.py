@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Database Query Instrumentation
+Request-scoped statement counts, timings and N+1 detection for every
+psycopg2 connection (pooled DatabaseManager connections and raw connects)
+"""
+
+import os
+import re
+import time
+import threading
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from typing import Dict, List, Any, Optional
+
+try:
+    import psycopg2
+    import psycopg2.extensions
+    PSYCOPG2_AVAILABLE = True
+except ImportError:
+    PSYCOPG2_AVAILABLE = False
+
+# Same normalized statement this many times in one request is an N+1 candidate
+N_PLUS_ONE_THRESHOLD = int(os.environ.get('DB_N_PLUS_ONE_THRESHOLD', 5))
+MAX_TRACKED_STATEMENTS = 500
+RECENT_REQUESTS_KEPT = 100
+
+_current_request_stats: ContextVar[Optional['RequestQueryStats']] = ContextVar('db_request_stats', default=None)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:\?|%s)\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(query) -> str:
+    """Collapse a SQL statement to its shape so repeated executions group together"""
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    elif not isinstance(query, str):
+        query = str(query)
+
+    normalized = _STRING_LITERAL.sub('?', query)
+    normalized = _NUMBER_LITERAL.sub('?', normalized)
+    normalized = _IN_LIST.sub('IN (...)', normalized)
+    normalized = _WHITESPACE.sub(' ', normalized).strip().rstrip(';').strip()
+    return normalized
+
+
+class RequestQueryStats:
+    """Statements executed while handling a single request"""
+
+    def __init__(self, method: str = None, path: str = None):
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self.statements: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, duration_ms: float, rowcount: int, error: str = None):
+        with self._lock:
+            self.statements.append({
+                'statement': statement,
+                'duration_ms': duration_ms,
+                'rowcount': rowcount,
+                'error': error
+            })
+
+    @property
+    def query_count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def total_ms(self) -> float:
+        return round(sum(s['duration_ms'] for s in self.statements), 2)
+
+    def grouped(self) -> Dict[str, Dict[str, Any]]:
+        groups = OrderedDict()
+        for s in self.statements:
+            group = groups.setdefault(s['statement'], {'count': 0, 'total_ms': 0.0, 'rows': 0})
+            group['count'] += 1
+            group['total_ms'] += s['duration_ms']
+            group['rows'] += max(s['rowcount'], 0)
+        return groups
+
+    def n_plus_one_candidates(self, threshold: int = None) -> List[Dict[str, Any]]:
+        threshold = threshold or N_PLUS_ONE_THRESHOLD
+        return [
+            {'statement': statement, 'count': group['count'], 'total_ms': round(group['total_ms'], 2)}
+            for statement, group in self.grouped().items()
+            if group['count'] >= threshold
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'method': self.method,
+            'path': self.path,
+            'query_count': self.query_count,
+            'db_time_ms': self.total_ms,
+            'request_time_ms': round((time.time() - self.started_at) * 1000, 2),
+            'n_plus_one': self.n_plus_one_candidates(),
+            'timestamp': self.started_at
+        }
+
+
+class QueryStatsRegistry:
+    """Process-wide aggregates per normalized statement and per request"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._statements: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._recent_requests = deque(maxlen=RECENT_REQUESTS_KEPT)
+        self._n_plus_one: Dict[str, Dict[str, Any]] = {}
+        self.started_at = time.time()
+
+    def record_statement(self, statement: str, duration_ms: float, rowcount: int, error: str = None):
+        with self._lock:
+            entry = self._statements.get(statement)
+            if entry is None:
+                if len(self._statements) >= MAX_TRACKED_STATEMENTS:
+                    self._statements.popitem(last=False)
+                entry = self._statements[statement] = {
+                    'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'errors': 0
+                }
+            else:
+                self._statements.move_to_end(statement)
+            entry['calls'] += 1
+            entry['total_ms'] += duration_ms
+            entry['max_ms'] = max(entry['max_ms'], duration_ms)
+            entry['rows'] += max(rowcount, 0)
+            if error:
+                entry['errors'] += 1
+
+    def record_request(self, stats: RequestQueryStats):
+        summary = stats.summary()
+        with self._lock:
+            self._recent_requests.append(summary)
+            route = f"{stats.method} {stats.path}"
+            for candidate in summary['n_plus_one']:
+                key = f"{route}|{candidate['statement']}"
+                entry = self._n_plus_one.setdefault(key, {
+                    'route': route,
+                    'statement': candidate['statement'],
+                    'occurrences': 0,
+                    'max_count': 0
+                })
+                entry['occurrences'] += 1
+                entry['max_count'] = max(entry['max_count'], candidate['count'])
+                entry['last_seen'] = summary['timestamp']
+        return summary
+
+    def report(self, limit: int = 20, order_by: str = 'total_ms') -> Dict[str, Any]:
+        with self._lock:
+            statements = [
+                {
+                    'statement': statement,
+                    'calls': entry['calls'],
+                    'total_ms': round(entry['total_ms'], 2),
+                    'mean_ms': round(entry['total_ms'] / entry['calls'], 2) if entry['calls'] else 0,
+                    'max_ms': round(entry['max_ms'], 2),
+                    'rows': entry['rows'],
+                    'errors': entry['errors']
+                }
+                for statement, entry in self._statements.items()
+            ]
+            recent = list(self._recent_requests)
+            n_plus_one = sorted(self._n_plus_one.values(), key=lambda e: e['occurrences'], reverse=True)
+
+        sort_key = order_by if order_by in ('total_ms', 'mean_ms', 'max_ms', 'calls') else 'total_ms'
+        statements.sort(key=lambda s: s[sort_key], reverse=True)
+
+        return {
+            'since': self.started_at,
+            'tracked_statements': len(statements),
+            'top_statements': statements[:limit],
+            'slowest_requests': sorted(recent, key=lambda r: r['db_time_ms'], reverse=True)[:limit],
+            'most_queries_requests': sorted(recent, key=lambda r: r['query_count'], reverse=True)[:limit],
+            'n_plus_one_candidates': n_plus_one[:limit],
+            'n_plus_one_threshold': N_PLUS_ONE_THRESHOLD
+        }
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._recent_requests.clear()
+            self._n_plus_one.clear()
+            self.started_at = time.time()
+
+
+query_stats = QueryStatsRegistry()
+
+
+def _record(query, duration_ms: float, rowcount: int, error: str = None):
+    statement = normalize_statement(query)
+    duration_ms = round(duration_ms, 3)
+    query_stats.record_statement(statement, duration_ms, rowcount, error)
+    request_stats = _current_request_stats.get()
+    if request_stats is not None:
+        request_stats.record(statement, duration_ms, rowcount, error)
+
+
+class InstrumentedCursorMixin:
+    """Times execute/executemany/callproc on any psycopg2 cursor class"""
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        error = None
+        try:
+            return super().execute(query, vars)
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            _record(query, (time.perf_counter() - start) * 1000, self.rowcount, error)
+
+    def executemany(self, query, vars_list):
+        start = time.perf_counter()
+        error = None
+        try:
+            return super().executemany(query, vars_list)
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            _record(query, (time.perf_counter() - start) * 1000, self.rowcount, error)
+
+    def callproc(self, procname, vars=None):
+        start = time.perf_counter()
+        error = None
+        try:
+            return super().callproc(procname, vars)
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            _record(f"CALL {procname}", (time.perf_counter() - start) * 1000, self.rowcount, error)
+
+
+_instrumented_cursor_classes: Dict[type, type] = {}
+
+
+def _instrumented_cursor_class(cursor_class: type) -> type:
+    if issubclass(cursor_class, InstrumentedCursorMixin):
+        return cursor_class
+    instrumented = _instrumented_cursor_classes.get(cursor_class)
+    if instrumented is None:
+        instrumented = type(f"Instrumented{cursor_class.__name__}", (InstrumentedCursorMixin, cursor_class), {})
+        _instrumented_cursor_classes[cursor_class] = instrumented
+    return instrumented
+
+
+if PSYCOPG2_AVAILABLE:
+    class InstrumentedConnection(psycopg2.extensions.connection):
+        """Connection whose cursors (of any factory) report to the instrumentation layer"""
+
+        def cursor(self, *args, **kwargs):
+            cursor_factory = kwargs.get('cursor_factory') or self.cursor_factory or psycopg2.extensions.cursor
+            kwargs['cursor_factory'] = _instrumented_cursor_class(cursor_factory)
+            return super().cursor(*args, **kwargs)
+
+
+_original_connect = None
+_install_lock = threading.Lock()
+
+
+def install_instrumentation() -> bool:
+    """
+    Route every psycopg2.connect through InstrumentedConnection
+
+    psycopg2.pool calls psycopg2.connect for new pool members, and the
+    endpoints that open raw connections call it directly, so patching the
+    module attribute covers both paths.
+    """
+    global _original_connect
+
+    if not PSYCOPG2_AVAILABLE:
+        return False
+    if os.environ.get('DB_INSTRUMENTATION_ENABLED', 'true').lower() != 'true':
+        return False
+
+    with _install_lock:
+        if _original_connect is not None:
+            return True
+
+        _original_connect = psycopg2.connect
+
+        def instrumented_connect(dsn=None, connection_factory=None, cursor_factory=None, **kwargs):
+            if connection_factory is None:
+                connection_factory = InstrumentedConnection
+            return _original_connect(dsn, connection_factory=connection_factory,
+                                     cursor_factory=cursor_factory, **kwargs)
+
+        psycopg2.connect = instrumented_connect
+        return True
+
+
+def instrumentation_installed() -> bool:
+    return _original_connect is not None
+
+
+def begin_request(method: str = None, path: str = None) -> RequestQueryStats:
+    stats = RequestQueryStats(method, path)
+    _current_request_stats.set(stats)
+    return stats
+
+
+def end_request() -> Optional[Dict[str, Any]]:
+    stats = _current_request_stats.get()
+    if stats is None:
+        return None
+    _current_request_stats.set(None)
+    return query_stats.record_request(stats)
+
+
+def get_request_stats() -> Optional[RequestQueryStats]:
+    return _current_request_stats.get()
+
+
+def build_server_timing(summary: Dict[str, Any]) -> str:
+    """Format a request summary as a Server-Timing header value"""
+    parts = [
+        f'db;desc="{summary["query_count"]} queries";dur={summary["db_time_ms"]}',
+        f'app;dur={summary["request_time_ms"]}'
+    ]
+    if summary['n_plus_one']:
+        worst = max(c['count'] for c in summary['n_plus_one'])
+        parts.append(f'n1;desc="{len(summary["n_plus_one"])} repeated statements (max {worst}x)"')
+    return ', '.join(parts)
+
+
+def init_app(app):
+    """Register request hooks that collect stats and emit Server-Timing headers"""
+    if not install_instrumentation():
+        return False
+
+    from flask import request
+
+    @app.before_request
+    def _begin_query_instrumentation():
+        begin_request(request.method, request.url_rule.rule if request.url_rule else request.path)
+
+    @app.after_request
+    def _emit_query_instrumentation(response):
+        summary = end_request()
+        if summary is not None:
+            response.headers['Server-Timing'] = build_server_timing(summary)
+            if summary['n_plus_one']:
+                print(f"⚠️ Possible N+1 on {summary['method']} {summary['path']}: "
+                      f"{summary['n_plus_one'][0]['count']}x {summary['n_plus_one'][0]['statement'][:120]}")
+        return response
+
+    @app.teardown_request
+    def _reset_query_instrumentation(exc=None):
+        # after_request is skipped on unhandled errors; never leak stats into the next request
+        if _current_request_stats.get() is not None:
+            end_request()
+
+    return True
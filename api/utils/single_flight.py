@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Single-Flight Request Coalescing
+Concurrent calls with the same key share one in-flight computation: the first
+caller runs it, later callers wait for its result instead of repeating the
+work. Used for quote pricing and VIN decodes, where double submits and
+validate/decode bursts otherwise fan out into duplicate upstream calls
+"""
+
+import os
+import copy
+import threading
+from functools import wraps
+from typing import Dict, Any, Callable, Hashable
+
+SINGLE_FLIGHT_DISABLED = os.environ.get('SINGLE_FLIGHT_DISABLED', 'false').lower() == 'true'
+SINGLE_FLIGHT_TIMEOUT_SECONDS = float(os.environ.get('SINGLE_FLIGHT_TIMEOUT_SECONDS', 20))
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Group of keyed in-flight computations with coalescing metrics"""
+
+    def __init__(self, name: str, timeout: float = SINGLE_FLIGHT_TIMEOUT_SECONDS):
+        self.name = name
+        self.timeout = timeout
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'executions': 0, 'coalesced': 0, 'timeouts': 0, 'errors': 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: float = None) -> Any:
+        """
+        Run fn once per key across concurrent callers
+
+        Args:
+            key: Normalized inputs identifying the computation
+            fn: Zero-argument callable producing the result
+            timeout: Seconds a follower waits before computing on its own
+
+        Returns:
+            The leader's result (followers get a deep copy so callers can mutate it)
+        """
+        with self._lock:
+            self._stats['calls'] += 1
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+            else:
+                call.waiters += 1
+                leader = False
+
+        if leader:
+            return self._lead(key, call, fn)
+
+        if not call.done.wait(self.timeout if timeout is None else timeout):
+            # The leader is stuck; don't tie this request's latency to it
+            with self._lock:
+                self._stats['timeouts'] += 1
+                self._stats['executions'] += 1
+            return fn()
+
+        with self._lock:
+            self._stats['coalesced'] += 1
+        if call.error is not None:
+            raise call.error
+        return copy.deepcopy(call.result)
+
+    def _lead(self, key: Hashable, call: _Call, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            self._stats['executions'] += 1
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._stats['errors'] += 1
+            raise
+        finally:
+            # Remove the key before waking followers so the next burst starts fresh
+            with self._lock:
+                self._calls.pop(key, None)
+                shared = call.waiters > 0
+            call.done.set()
+        # Followers copy call.result, so the leader gets its own copy when shared
+        return copy.deepcopy(call.result) if shared else call.result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._calls)
+        stats['timeout_seconds'] = self.timeout
+        stats['coalesce_rate'] = round(stats['coalesced'] / stats['calls'], 4) if stats['calls'] else 0.0
+        return stats
+
+
+_groups: Dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+
+
+def single_flight_group(name: str, timeout: float = None) -> SingleFlight:
+    """Get or create the named coalescing group"""
+    with _groups_lock:
+        group = _groups.get(name)
+        if group is None:
+            group = _groups[name] = SingleFlight(name, SINGLE_FLIGHT_TIMEOUT_SECONDS if timeout is None else timeout)
+        return group
+
+
+def coalesce(group: str, key_func: Callable[..., Hashable], timeout: float = None):
+    """
+    Decorator coalescing concurrent calls whose key_func(*args, **kwargs) match
+
+    key_func returning None skips coalescing for that call (e.g. invalid input).
+    """
+    flight = single_flight_group(group, timeout)
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if SINGLE_FLIGHT_DISABLED:
+                return func(*args, **kwargs)
+            try:
+                key = key_func(*args, **kwargs)
+            except Exception:
+                key = None
+            if key is None:
+                return func(*args, **kwargs)
+            return flight.do(key, lambda: func(*args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def get_single_flight_stats() -> Dict[str, Any]:
+    """Per-group coalescing metrics for the status endpoint"""
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {
+        'enabled': not SINGLE_FLIGHT_DISABLED,
+        'groups': {group.name: group.stats() for group in groups}
+    }
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Background Job Worker
+Runs N concurrent workers against the Postgres job queue. Each worker claims
+one ready job at a time with FOR UPDATE SKIP LOCKED, so throughput scales by
+adding threads here or more worker processes on other machines.
+
+Usage:
+python api/worker.py
+python api/worker.py --concurrency 8
+python api/worker.py --job-type contract_pdf.generate --job-type blob.delete
+python api/worker.py --drain
+python api/worker.py --stats
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import threading
+
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+for path in (API_DIR, os.path.dirname(API_DIR)):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from utils import database
+from services.job_queue_service import (
+    claim_jobs, execute_job, enqueue_scheduled_jobs, ensure_job_tables, load_job_handlers,
+    run_pending_jobs, get_queue_stats, default_worker_id
+)
+
+SCHEDULER_INTERVAL_SECONDS = 30
+
+
+def worker_loop(worker_id, stop_event, job_types=None, poll_interval=1.0, max_idle_interval=10.0,
+                run_scheduler=False):
+    """Claim and run jobs until stop_event is set; polling backs off while the queue is empty"""
+    idle_interval = poll_interval
+    next_schedule_check = 0.0
+
+    while not stop_event.is_set():
+        try:
+            if run_scheduler and time.monotonic() >= next_schedule_check:
+                for job_type in enqueue_scheduled_jobs():
+                    print(f"🔄 Scheduled {job_type}")
+                next_schedule_check = time.monotonic() + SCHEDULER_INTERVAL_SECONDS
+
+            jobs = claim_jobs(worker_id, 1, job_types)
+            if jobs:
+                execute_job(jobs[0], worker_id)
+                idle_interval = poll_interval
+                continue
+        except Exception as e:
+            print(f"❌ Worker {worker_id} error: {e}")
+
+        stop_event.wait(idle_interval)
+        idle_interval = min(max_idle_interval, idle_interval * 2)
+
+
+def run_workers(concurrency=2, job_types=None, poll_interval=1.0):
+    """Start concurrency worker threads and block until SIGINT/SIGTERM"""
+    # One pooled connection per worker plus headroom for scheduling
+    database.db_manager = database.DatabaseManager(pool_size_max=max(10, concurrency + 2))
+    if not ensure_job_tables():
+        print("❌ Database not available - cannot start workers")
+        return 1
+
+    handlers = load_job_handlers()
+    print(f"✅ Starting {concurrency} worker(s) for: {', '.join(job_types or sorted(handlers))}")
+
+    stop_event = threading.Event()
+
+    def request_stop(signum, frame):
+        print("🔄 Stopping workers after their current job...")
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    threads = [
+        threading.Thread(
+            target=worker_loop,
+            args=(default_worker_id(str(index)), stop_event, job_types, poll_interval),
+            kwargs={'run_scheduler': index == 0},
+            name=f'job-worker-{index}'
+        )
+        for index in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+
+    # Keep the main thread in an interruptible wait so signals are delivered
+    while not stop_event.is_set():
+        stop_event.wait(1.0)
+    for thread in threads:
+        thread.join()
+
+    print("✅ Workers stopped")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run background job workers')
+    parser.add_argument('--concurrency', type=int, default=int(os.environ.get('JOB_WORKER_CONCURRENCY', 2)),
+                        help='Concurrent workers in this process')
+    parser.add_argument('--job-type', action='append', dest='job_types',
+                        help='Only run these job types (repeatable)')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between polls when idle')
+    parser.add_argument('--drain', action='store_true', help='Run ready jobs once, then exit')
+    parser.add_argument('--max-jobs', type=int, default=500, help='Job limit for --drain')
+    parser.add_argument('--stats', action='store_true', help='Print queue statistics and exit')
+
+    args = parser.parse_args()
+
+    if args.stats:
+        print(json.dumps(get_queue_stats(), indent=2, default=str))
+        return 0
+
+    if args.drain:
+        result = run_pending_jobs(max_jobs=args.max_jobs, time_budget_seconds=float('inf'),
+                                  job_types=args.job_types)
+        print(json.dumps({k: v for k, v in result.items() if k != 'jobs'}, indent=2))
+        return 0 if result['success'] else 1
+
+    return run_workers(max(1, args.concurrency), args.job_types, args.poll_interval)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Local Stand-Ins for External HTTP APIs
+Fake vPIC (NHTSA), Helcim and Vercel Blob servers with configurable latency
+and error injection, so the API can be load tested fully offline.
+
+The API is pointed at them through NHTSA_API_BASE_URL, HELCIM_API_BASE_URL and
+VERCEL_BLOB_API_URL (see service_environment()).
+
+Usage:
+    python benchmarks/fake_services.py --latency-ms 80 --jitter-ms 40 --error-rate 0.01
+    python benchmarks/fake_services.py --service helcim:latency_ms=350,error_rate=0.05
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fixtures
+
+SERVICE_NAMES = ('nhtsa', 'helcim', 'blob')
+DEFAULT_PORTS = {'nhtsa': 8701, 'helcim': 8702, 'blob': 8703}
+
+
+class FaultConfig:
+    """Latency and error injection settings for one fake service"""
+
+    FIELDS = {
+        'latency_ms': float,    # base response delay
+        'jitter_ms': float,     # uniform extra delay in [0, jitter_ms]
+        'error_rate': float,    # fraction of requests answered with error_status
+        'error_status': int,
+        'slow_rate': float,     # fraction of requests delayed by slow_ms on top
+        'slow_ms': float,
+        'drop_rate': float      # fraction of requests whose connection is closed unanswered
+    }
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, slow_rate: float = 0.0, slow_ms: float = 5000.0,
+                 drop_rate: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.drop_rate = drop_rate
+
+    def update(self, **values):
+        for key, value in values.items():
+            if key not in self.FIELDS:
+                raise ValueError(f"Unknown fault setting '{key}' (expected one of {', '.join(self.FIELDS)})")
+            setattr(self, key, self.FIELDS[key](value))
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: getattr(self, key) for key in self.FIELDS}
+
+    def delay_seconds(self, rng: random.Random) -> float:
+        delay = self.latency_ms + rng.uniform(0, self.jitter_ms)
+        if self.slow_rate and rng.random() < self.slow_rate:
+            delay += self.slow_ms
+        return delay / 1000
+
+
+def parse_service_override(spec: str) -> Tuple[str, Dict[str, str]]:
+    """Parse 'helcim:latency_ms=300,error_rate=0.02' into ('helcim', {...})"""
+    name, _, settings = spec.partition(':')
+    if name not in SERVICE_NAMES:
+        raise ValueError(f"Unknown service '{name}' (expected one of {', '.join(SERVICE_NAMES)})")
+    values = {}
+    for item in filter(None, settings.split(',')):
+        key, _, value = item.partition('=')
+        values[key.strip()] = value.strip()
+    return name, values
+
+
+class FakeServiceHandler(BaseHTTPRequestHandler):
+    """Applies fault injection, then dispatches to the service-specific route() method"""
+
+    server_version = 'FakeService/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _send_json(self, status: int, payload: Any):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method: str):
+        server = self.server
+        body = self._read_body()
+        path = self.path.split('?', 1)[0]
+
+        if path == '/__stats':
+            return self._send_json(200, server.stats_snapshot())
+
+        faults = server.faults
+        with server.rng_lock:
+            delay = faults.delay_seconds(server.rng)
+            roll = server.rng.random()
+
+        if delay:
+            time.sleep(delay)
+
+        if roll < faults.drop_rate:
+            server.record(method, path, 'dropped')
+            self.close_connection = True
+            return
+        if roll < faults.drop_rate + faults.error_rate:
+            server.record(method, path, faults.error_status)
+            return self._send_json(faults.error_status, {'errors': ['Injected failure from fake service']})
+
+        status, payload = self.route(method, path, body)
+        server.record(method, path, status)
+        self._send_json(status, payload)
+
+    def route(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        return 404, {'error': f'No fake route for {method} {path}'}
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+
+class NHTSAHandler(FakeServiceHandler):
+    """vPIC DecodeVin"""
+
+    _DECODE = re.compile(r'^/api/vehicles/DecodeVin/([A-Za-z0-9]+)$')
+
+    def route(self, method, path, body):
+        match = self._DECODE.match(path)
+        if method != 'GET' or not match:
+            return super().route(method, path, body)
+        vin = match.group(1).upper()
+        return 200, {
+            'Count': 136,
+            'Message': 'Results returned successfully (fake vPIC)',
+            'SearchCriteria': f'VIN:{vin}',
+            'Results': fixtures.nhtsa_results(vin)
+        }
+
+
+class HelcimHandler(FakeServiceHandler):
+    """Helcim v2: connection test, customers, invoices and HelcimPay.js sessions"""
+
+    def route(self, method, path, body):
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            return 400, {'errors': ['Invalid JSON body']}
+
+        if method == 'GET' and path == '/v2/general':
+            return 200, {'status': 'ok', 'terminalId': 'fake-terminal'}
+
+        if method == 'POST' and path == '/v2/customers':
+            customer_id = random.randint(10_000_000, 99_999_999)
+            return 200, {
+                'customerId': customer_id,
+                'customerCode': f'CST{customer_id}',
+                'contactName': data.get('contactName'),
+                'email': data.get('email')
+            }
+
+        if method == 'POST' and path == '/v2/invoices':
+            invoice_id = random.randint(10_000_000, 99_999_999)
+            return 200, {
+                'invoiceId': invoice_id,
+                'invoiceNumber': f'INV{invoice_id}',
+                'amount': data.get('amount'),
+                'status': 'DUE'
+            }
+
+        if method == 'POST' and path == '/v2/helcim-pay/initialize':
+            return 200, {
+                'checkoutToken': uuid.uuid4().hex,
+                'secretToken': uuid.uuid4().hex,
+                'transactionId': random.randint(10_000_000, 99_999_999)
+            }
+
+        return super().route(method, path, body)
+
+
+class BlobHandler(FakeServiceHandler):
+    """Vercel Blob put/delete and multipart (/mpu); uploaded bodies are counted, not stored"""
+
+    def _multipart(self, body):
+        server = self.server
+        action = self.headers.get('x-mpu-action')
+        pathname = parse_qs(urlsplit(self.path).query).get('pathname', [''])[0]
+
+        if action == 'create':
+            upload_id = uuid.uuid4().hex
+            with server._stats_lock:
+                server.multipart_uploads[upload_id] = {'pathname': pathname, 'parts': {}}
+            return 200, {'key': pathname, 'uploadId': upload_id}
+
+        upload = server.multipart_uploads.get(self.headers.get('x-mpu-upload-id'))
+        if upload is None:
+            return 404, {'error': {'code': 'not_found', 'message': 'Unknown multipart upload'}}
+
+        if action == 'upload':
+            part_number = int(self.headers.get('x-mpu-part-number') or 0)
+            etag = hashlib.md5(body).hexdigest()
+            with server._stats_lock:
+                upload['parts'][part_number] = (etag, len(body))
+                server.bytes_received += len(body)
+            return 200, {'etag': etag, 'partNumber': part_number}
+
+        if action == 'complete':
+            parts = json.loads(body or b'[]')
+            with server._stats_lock:
+                stored = server.multipart_uploads.pop(self.headers.get('x-mpu-upload-id'))['parts']
+            if [p['partNumber'] for p in parts] != sorted(stored) or \
+                    any(stored[p['partNumber']][0] != p['etag'] for p in parts):
+                return 400, {'error': {'code': 'bad_request', 'message': 'Part list does not match uploaded parts'}}
+            return 200, {
+                'url': f"http://{self.headers.get('Host')}/{upload['pathname']}",
+                'pathname': upload['pathname'],
+                'contentType': self.headers.get('X-Content-Type', 'application/octet-stream'),
+                'size': sum(size for _, size in stored.values())
+            }
+
+        if action == 'abort':
+            with server._stats_lock:
+                server.multipart_uploads.pop(self.headers.get('x-mpu-upload-id'), None)
+            return 200, {}
+
+        return 400, {'error': {'code': 'bad_request', 'message': f'Unknown x-mpu-action {action}'}}
+
+    def route(self, method, path, body):
+        if method == 'PUT' and path == '/mpu':
+            return self._multipart(body)
+        if method == 'PUT' and len(path) > 1:
+            with self.server._stats_lock:
+                self.server.bytes_received += len(body)
+            return 200, {
+                'url': f"http://{self.headers.get('Host')}{path}",
+                'pathname': path.lstrip('/'),
+                'contentType': self.headers.get('X-Content-Type', 'application/octet-stream'),
+                'size': len(body)
+            }
+        if method == 'DELETE':
+            return 200, {}
+        return super().route(method, path, body)
+
+
+HANDLERS = {'nhtsa': NHTSAHandler, 'helcim': HelcimHandler, 'blob': BlobHandler}
+
+
+class FakeServiceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, name: str, address, faults: FaultConfig, seed: int = None, verbose: bool = False):
+        super().__init__(address, HANDLERS[name])
+        self.name = name
+        self.faults = faults
+        self.verbose = verbose
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.bytes_received = 0
+        self.multipart_uploads = {}
+        self._stats_lock = threading.Lock()
+        self._stats = defaultdict(lambda: defaultdict(int))
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, method: str, path: str, status):
+        # Collapse ids so the stats stay keyed by route
+        route = re.sub(r'/[A-Za-z0-9_.-]{17,}$', '/<id>', path)
+        with self._stats_lock:
+            self._stats[f"{method} {route}"][str(status)] += 1
+
+    def stats_snapshot(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            routes = {route: dict(counts) for route, counts in self._stats.items()}
+        return {'service': self.name, 'faults': self.faults.to_dict(),
+                'bytes_received': self.bytes_received, 'routes': routes}
+
+
+class FakeServices:
+    """Starts all three fake servers on background threads"""
+
+    def __init__(self, host: str = '127.0.0.1', ports: Optional[Dict[str, int]] = None,
+                 faults: Optional[Dict[str, FaultConfig]] = None, seed: int = None, verbose: bool = False):
+        self.servers: Dict[str, FakeServiceServer] = {}
+        self._threads = []
+        ports = ports or {}
+        faults = faults or {}
+        for index, name in enumerate(SERVICE_NAMES):
+            self.servers[name] = FakeServiceServer(
+                name, (host, ports.get(name, 0)), faults.get(name) or FaultConfig(),
+                seed=None if seed is None else seed + index, verbose=verbose
+            )
+
+    def start(self) -> 'FakeServices':
+        for server in self.servers.values():
+            thread = threading.Thread(target=server.serve_forever, name=f"fake-{server.name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def service_environment(self) -> Dict[str, str]:
+        """Environment variables that point the API at these servers"""
+        return {
+            'NHTSA_API_BASE_URL': f"{self.servers['nhtsa'].base_url}/api",
+            'HELCIM_API_BASE_URL': f"{self.servers['helcim'].base_url}/v2",
+            'VERCEL_BLOB_API_URL': self.servers['blob'].base_url,
+            'HELCIM_API_TOKEN': 'fake-helcim-token',
+            'HELCIM_TERMINAL_ID': 'fake-terminal',
+            'BLOB_READ_WRITE_TOKEN': 'fake-blob-token'
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: server.stats_snapshot() for name, server in self.servers.items()}
+
+
+def build_faults(args) -> Dict[str, FaultConfig]:
+    faults = {
+        name: FaultConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate)
+        for name in SERVICE_NAMES
+    }
+    for spec in args.service or []:
+        name, values = parse_service_override(spec)
+        faults[name].update(**values)
+    return faults
+
+
+def add_fault_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Base latency for every fake service')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Uniform extra latency for every fake service')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of fake responses that fail')
+    parser.add_argument('--service', action='append', metavar='NAME:KEY=VALUE,...',
+                        help=f"Per-service override ({', '.join(SERVICE_NAMES)}), e.g. "
+                             f"helcim:latency_ms=300,error_rate=0.05,slow_rate=0.01")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Run local fake NHTSA, Helcim and Vercel Blob servers')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--seed', type=int, help='Seed the fault injection for reproducible runs')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    add_fault_arguments(parser)
+    args = parser.parse_args(argv)
+
+    try:
+        faults = build_faults(args)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+
+    services = FakeServices(args.host, DEFAULT_PORTS, faults, seed=args.seed, verbose=args.verbose).start()
+    print("✅ Fake services running (GET /__stats on any of them for counters)")
+    for name, server in services.servers.items():
+        print(f"   {name:<7}{server.base_url}  {server.faults.to_dict()}")
+    print("\nPoint the API at them with:")
+    for key, value in services.service_environment().items():
+        print(f"   export {key}={value}")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("\n🔄 Stopping fake services")
+        services.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
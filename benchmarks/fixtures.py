@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Benchmark Fixtures
+Deterministic pricing, settings and business data for the benchmark suite.
+The core schema comes from utils.database.create_tables_if_not_exist(); the
+VSC multiplier tables it does not create are defined here with the columns
+VSCRateManager and seed_initial_data() use.
+"""
+
+import json
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Any
+
+# Pricing tables read by VSCRateManager that create_tables_if_not_exist() does not create
+EXTRA_TABLES = {
+    'vsc_term_multipliers': '''
+        CREATE TABLE IF NOT EXISTS vsc_term_multipliers (
+            id SERIAL PRIMARY KEY,
+            term_months INTEGER UNIQUE NOT NULL,
+            multiplier NUMERIC NOT NULL,
+            description TEXT,
+            active BOOLEAN DEFAULT true,
+            display_order INTEGER DEFAULT 0
+        );
+    ''',
+    'vsc_deductible_multipliers': '''
+        CREATE TABLE IF NOT EXISTS vsc_deductible_multipliers (
+            id SERIAL PRIMARY KEY,
+            deductible_amount INTEGER UNIQUE NOT NULL,
+            multiplier NUMERIC NOT NULL,
+            description TEXT,
+            active BOOLEAN DEFAULT true,
+            display_order INTEGER DEFAULT 0
+        );
+    ''',
+    'vsc_mileage_multipliers': '''
+        CREATE TABLE IF NOT EXISTS vsc_mileage_multipliers (
+            id SERIAL PRIMARY KEY,
+            category VARCHAR(50) UNIQUE NOT NULL,
+            min_mileage INTEGER NOT NULL,
+            max_mileage INTEGER NOT NULL,
+            multiplier NUMERIC NOT NULL,
+            description TEXT,
+            active BOOLEAN DEFAULT true,
+            display_order INTEGER DEFAULT 0
+        );
+    ''',
+    'vsc_age_multipliers': '''
+        CREATE TABLE IF NOT EXISTS vsc_age_multipliers (
+            id SERIAL PRIMARY KEY,
+            category VARCHAR(50) UNIQUE NOT NULL,
+            min_age INTEGER NOT NULL,
+            max_age INTEGER NOT NULL,
+            multiplier NUMERIC NOT NULL,
+            description TEXT,
+            active BOOLEAN DEFAULT true,
+            display_order INTEGER DEFAULT 0
+        );
+    ''',
+    'vsc_base_rates': '''
+        CREATE TABLE IF NOT EXISTS vsc_base_rates (
+            id SERIAL PRIMARY KEY,
+            vehicle_class CHAR(1) NOT NULL,
+            coverage_level VARCHAR(50) NOT NULL,
+            base_rate NUMERIC NOT NULL,
+            effective_date DATE NOT NULL DEFAULT CURRENT_DATE,
+            active BOOLEAN DEFAULT true
+        );
+    '''
+}
+
+COVERAGE_LEVELS = [
+    ('silver', 'Silver Coverage', 'Essential powertrain coverage', 1),
+    ('gold', 'Gold Coverage', 'Comprehensive coverage with additional benefits', 2),
+    ('platinum', 'Platinum Coverage', 'Ultimate coverage with maximum benefits', 3)
+]
+
+VEHICLE_CLASSES = [
+    ('Honda', 'A'), ('Toyota', 'A'), ('Nissan', 'A'), ('Hyundai', 'A'), ('Kia', 'A'),
+    ('Ford', 'B'), ('Chevrolet', 'B'), ('Dodge', 'B'), ('GMC', 'B'), ('Jeep', 'B'),
+    ('BMW', 'C'), ('Mercedes-Benz', 'C'), ('Audi', 'C'), ('Cadillac', 'C'), ('Volvo', 'C')
+]
+
+TERM_MULTIPLIERS = [(12, 0.60), (24, 0.80), (36, 1.00), (48, 1.15), (60, 1.30), (72, 1.45)]
+
+DEDUCTIBLE_MULTIPLIERS = [(0, 1.25), (50, 1.15), (100, 1.00), (200, 0.95), (500, 0.85), (1000, 0.75)]
+
+MILEAGE_MULTIPLIERS = [
+    ('LOW', 0, 36000, 0.90), ('MEDIUM', 36001, 75000, 1.00), ('HIGH', 75001, 100000, 1.15),
+    ('VERY_HIGH', 100001, 125000, 1.30), ('EXTREME', 125001, 150000, 1.50), ('MAX', 150001, 999999, 2.00)
+]
+
+AGE_MULTIPLIERS = [
+    ('NEW', 0, 3, 1.00), ('RECENT', 4, 6, 1.10), ('MATURE', 7, 10, 1.25),
+    ('OLDER', 11, 15, 1.45), ('CLASSIC', 16, 20, 1.70)
+]
+
+BASE_RATES = {
+    'A': {'silver': 1500, 'gold': 1580, 'platinum': 1650},
+    'B': {'silver': 1650, 'gold': 1750, 'platinum': 1900},
+    'C': {'silver': 1850, 'gold': 2000, 'platinum': 2600}
+}
+
+# Exact-rate matrix covers up to 150k miles; higher mileage exercises the calculated path
+RATE_MATRIX_MILEAGE_RANGES = [('0_50k', 0, 50000, 1.00), ('50k_100k', 50001, 100000, 1.18), ('100k_150k', 100001, 150000, 1.42)]
+
+ADMIN_SETTINGS = [
+    ('fees', 'admin_fee', 25.00, 'Default admin fee for Hero products'),
+    ('fees', 'vsc_admin_fee', 50.00, 'Admin fee for VSC products'),
+    ('fees', 'processing_fee', 15.00, 'Processing fee'),
+    ('fees', 'dealer_fee', 50.00, 'Dealer fee'),
+    ('discounts', 'wholesale_discount', 0.15, 'Wholesale discount rate (15%)'),
+    ('taxes', 'default_tax_rate', 0.08, 'Default tax rate (8%)'),
+    ('taxes', 'fl_tax_rate', 0.07, 'Florida tax rate (7%)'),
+    ('taxes', 'ca_tax_rate', 0.0875, 'California tax rate (8.75%)'),
+    ('taxes', 'tx_tax_rate', 0.0625, 'Texas tax rate (6.25%)')
+]
+
+# Sample VINs spread across all three vehicle classes
+SAMPLE_VINS = [
+    ('1HGCM82633A004352', 'Honda', 'Accord', 2003),
+    ('4T1BF1FK5CU123456', 'Toyota', 'Camry', 2012),
+    ('1FTFW1ET5DFC10312', 'Ford', 'F-150', 2013),
+    ('1G1ZT53826F109149', 'Chevrolet', 'Malibu', 2006),
+    ('WBA3A5C51DF359412', 'BMW', '328i', 2013),
+    ('WDDGF8AB9EA940372', 'Mercedes-Benz', 'C300', 2014),
+    ('WAUAF78E97A123456', 'Audi', 'A4', 2007),
+    ('5NPE24AF1FH123456', 'Hyundai', 'Sonata', 2015)
+]
+
+PRODUCT_TYPES = ['vsc', 'home_protection', 'comprehensive_auto_protection', 'home_deductible_reimbursement']
+
+
+def build_rate_matrix() -> List[tuple]:
+    """Rate matrix rows (vehicle_class, coverage_level, term_months, range_key, min, max, rate)"""
+    rows = []
+    for vehicle_class, levels in BASE_RATES.items():
+        for coverage_level, base_rate in levels.items():
+            for term_months, term_multiplier in TERM_MULTIPLIERS:
+                for range_key, min_mileage, max_mileage, mileage_factor in RATE_MATRIX_MILEAGE_RANGES:
+                    rate = round(base_rate * term_multiplier * mileage_factor, 2)
+                    rows.append((vehicle_class, coverage_level, term_months, range_key,
+                                 min_mileage, max_mileage, rate))
+    return rows
+
+
+def build_business_data(scale: int = 1000, seed: int = 42) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Generate customers, policies, resellers and transactions shaped like the API rows
+
+    Args:
+        scale: Number of transactions (customers and policies scale with it)
+        seed: Random seed so every run sees identical data
+
+    Returns:
+        dict: Lists keyed the way KPISystem.generate_dashboard_data() expects
+    """
+    rng = random.Random(seed)
+    now = datetime(2025, 7, 1)
+
+    def stable_uuid():
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+    resellers = []
+    for i in range(max(scale // 100, 3)):
+        resellers.append({
+            'id': stable_uuid(),
+            'user_id': stable_uuid(),
+            'business_name': f'Benchmark Dealer {i + 1}',
+            'status': 'active' if i % 5 else 'pending',
+            'commission_structure': {'vsc_commission': rng.choice([0.10, 0.15, 0.20])}
+        })
+
+    customers = []
+    for i in range(max(scale // 4, 10)):
+        customers.append({
+            'id': stable_uuid(),
+            'customer_type': 'individual',
+            'personal_info': {'first_name': f'Customer{i}', 'last_name': 'Benchmark'},
+            'contact_info': {'email': f'customer{i}@example.com'},
+            'status': 'active' if rng.random() < 0.9 else 'inactive',
+            'created_at': (now - timedelta(days=rng.randint(0, 540))).isoformat()
+        })
+
+    policies = []
+    for i in range(max(scale // 2, 10)):
+        effective = now - timedelta(days=rng.randint(0, 720))
+        policies.append({
+            'id': stable_uuid(),
+            'policy_number': f'POL-BENCH-{i:07d}',
+            'customer_id': rng.choice(customers)['id'],
+            'product_type': rng.choice(PRODUCT_TYPES),
+            'status': rng.choices(['active', 'expired', 'cancelled'], weights=[8, 1, 1])[0],
+            'effective_date': effective.date().isoformat(),
+            'expiration_date': (effective + timedelta(days=365 * rng.randint(1, 5))).isoformat(),
+            'created_at': effective.isoformat()
+        })
+
+    transactions = []
+    for i in range(scale):
+        policy = rng.choice(policies)
+        transactions.append({
+            'id': stable_uuid(),
+            'transaction_number': f'TXN-BENCH-{i:08d}',
+            'customer_id': policy['customer_id'],
+            'policy_id': policy['id'],
+            'type': rng.choices(['purchase', 'refund'], weights=[19, 1])[0],
+            'amount': round(rng.uniform(150, 3500), 2),
+            'status': rng.choices(['completed', 'pending', 'failed'], weights=[17, 2, 1])[0],
+            'created_by': rng.choice(resellers)['user_id'] if rng.random() < 0.4 else None,
+            'created_at': (now - timedelta(days=rng.randint(0, 540), minutes=rng.randint(0, 1440))).isoformat()
+        })
+
+    return {
+        'customers': customers,
+        'policies': policies,
+        'resellers': resellers,
+        'transactions': transactions
+    }
+
+
+def create_extra_tables(cursor):
+    for create_sql in EXTRA_TABLES.values():
+        cursor.execute(create_sql)
+
+
+def seed_pricing_data(cursor):
+    """Insert VSC rate tables, Hero product pricing and pricing admin settings"""
+    from data.hero_products_data import HERO_PRODUCTS_PRICING
+
+    for level_code, level_name, description, display_order in COVERAGE_LEVELS:
+        cursor.execute("""
+            INSERT INTO vsc_coverage_levels (level_code, level_name, description, display_order)
+            VALUES (%s, %s, %s, %s);
+        """, (level_code, level_name, description, display_order))
+
+    for make, vehicle_class in VEHICLE_CLASSES:
+        cursor.execute("""
+            INSERT INTO vsc_vehicle_classes (make, vehicle_class, class_description)
+            VALUES (%s, %s, %s);
+        """, (make, vehicle_class, f'Class {vehicle_class} benchmark fixture'))
+
+    for order, (term_months, multiplier) in enumerate(TERM_MULTIPLIERS):
+        cursor.execute("""
+            INSERT INTO vsc_term_multipliers (term_months, multiplier, description, display_order)
+            VALUES (%s, %s, %s, %s);
+        """, (term_months, multiplier, f'{term_months} Month Term', order))
+
+    for order, (deductible, multiplier) in enumerate(DEDUCTIBLE_MULTIPLIERS):
+        cursor.execute("""
+            INSERT INTO vsc_deductible_multipliers (deductible_amount, multiplier, description, display_order)
+            VALUES (%s, %s, %s, %s);
+        """, (deductible, multiplier, f'${deductible} Deductible', order))
+
+    for order, (category, min_mileage, max_mileage, multiplier) in enumerate(MILEAGE_MULTIPLIERS):
+        cursor.execute("""
+            INSERT INTO vsc_mileage_multipliers (category, min_mileage, max_mileage, multiplier, description, display_order)
+            VALUES (%s, %s, %s, %s, %s, %s);
+        """, (category, min_mileage, max_mileage, multiplier, f'{min_mileage}-{max_mileage} miles', order))
+
+    for order, (category, min_age, max_age, multiplier) in enumerate(AGE_MULTIPLIERS):
+        cursor.execute("""
+            INSERT INTO vsc_age_multipliers (category, min_age, max_age, multiplier, description, display_order)
+            VALUES (%s, %s, %s, %s, %s, %s);
+        """, (category, min_age, max_age, multiplier, f'{min_age}-{max_age} years', order))
+
+    for vehicle_class, levels in BASE_RATES.items():
+        for coverage_level, base_rate in levels.items():
+            cursor.execute("""
+                INSERT INTO vsc_base_rates (vehicle_class, coverage_level, base_rate)
+                VALUES (%s, %s, %s);
+            """, (vehicle_class, coverage_level, base_rate))
+
+    for row in build_rate_matrix():
+        cursor.execute("""
+            INSERT INTO vsc_rate_matrix
+                (vehicle_class, coverage_level, term_months, mileage_range_key, min_mileage, max_mileage, rate_amount)
+            VALUES (%s, %s, %s, %s, %s, %s, %s);
+        """, row)
+
+    for product_code, config in HERO_PRODUCTS_PRICING.items():
+        cursor.execute("""
+            INSERT INTO products (product_code, product_name, base_price)
+            VALUES (%s, %s, %s);
+        """, (product_code, product_code.replace('_', ' ').title(), config['base_price']))
+        for term_years, multiplier in config['multipliers'].items():
+            for customer_type, factor in (('retail', 1.0), ('wholesale', 0.85)):
+                cursor.execute("""
+                    INSERT INTO pricing (product_code, term_years, multiplier, customer_type)
+                    VALUES (%s, %s, %s, %s);
+                """, (product_code, term_years, round(multiplier * factor, 4), customer_type))
+
+    for category, key, value, description in ADMIN_SETTINGS:
+        cursor.execute("""
+            INSERT INTO admin_settings (category, key, value, description)
+            VALUES (%s, %s, %s, %s);
+        """, (category, key, json.dumps(value), description))
+
+
+def seed_business_data(cursor, data: Dict[str, List[Dict[str, Any]]]):
+    """Insert generated customers, policies and transactions for the pagination benchmark"""
+    for customer in data['customers']:
+        cursor.execute("""
+            INSERT INTO customers (id, customer_type, personal_info, contact_info, status, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s);
+        """, (customer['id'], customer['customer_type'], json.dumps(customer['personal_info']),
+              json.dumps(customer['contact_info']), customer['status'], customer['created_at']))
+
+    for policy in data['policies']:
+        cursor.execute("""
+            INSERT INTO policies (id, policy_number, customer_id, product_type, status,
+                                  effective_date, expiration_date, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
+        """, (policy['id'], policy['policy_number'], policy['customer_id'], policy['product_type'],
+              policy['status'], policy['effective_date'], policy['expiration_date'][:10], policy['created_at']))
+
+    for transaction in data['transactions']:
+        cursor.execute("""
+            INSERT INTO transactions (id, transaction_number, customer_id, policy_id, type,
+                                      amount, status, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
+        """, (transaction['id'], transaction['transaction_number'], transaction['customer_id'],
+              transaction['policy_id'], transaction['type'], transaction['amount'],
+              transaction['status'], transaction['created_at']))
+
+
+def nhtsa_results(vin: str) -> List[Dict[str, Any]]:
+    """Build a vPIC DecodeVin 'Results' list for one of the sample VINs"""
+    make, model, year = 'Honda', 'Accord', 2018
+    for sample_vin, sample_make, sample_model, sample_year in SAMPLE_VINS:
+        if sample_vin == vin:
+            make, model, year = sample_make, sample_model, sample_year
+            break
+
+    variables = {
+        'Make': make.upper(),
+        'Model': model,
+        'Model Year': str(year),
+        'Trim': 'Base',
+        'Body Class': 'Sedan/Saloon',
+        'Vehicle Type': 'PASSENGER CAR',
+        'Fuel Type - Primary': 'Gasoline',
+        'Engine Number of Cylinders': '4',
+        'Displacement (L)': '2.4',
+        'Transmission Style': 'Automatic',
+        'Drive Type': 'FWD/Front-Wheel Drive',
+        'Number of Doors': '4',
+        'Plant Country': 'UNITED STATES (USA)',
+        'Manufacturer Name': f'{make.upper()} MANUFACTURING',
+        'Error Code': '0'
+    }
+    results = [{'Variable': name, 'Value': value, 'ValueId': '', 'VariableId': index}
+               for index, (name, value) in enumerate(variables.items())]
+    # vPIC returns ~140 variables per VIN, most of them empty
+    results.extend({'Variable': f'Unused Field {i}', 'Value': None, 'ValueId': '', 'VariableId': 100 + i}
+                   for i in range(120))
+    return results
+
+
+def sample_photo_jpeg(width: int = 4000, height: int = 3000, seed: int = 7) -> bytes:
+    """Camera-sized JPEG with enough detail that resizing and encoding do real work"""
+    import io
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    image = Image.new('RGB', (width, height), (90, 110, 130))
+    draw = ImageDraw.Draw(image)
+    for _ in range(2500):
+        x, y = rng.randrange(width), rng.randrange(height)
+        size = rng.randint(10, 320)
+        draw.ellipse((x, y, x + size, y + size),
+                     fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=92)
+    return output.getvalue()
@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+"""
+End-to-End HTTP Load Test
+Drives scripted user journeys against a running API (or one started here)
+with NHTSA, Helcim and Vercel Blob replaced by local fake servers, and reports
+throughput and latency percentiles per route.
+
+Scenarios:
+    quote_to_contract   reseller quote -> share -> customer view -> Helcim session
+                        -> accept -> contract generation -> contract download
+    reseller_dashboard  reseller dashboard, sales dashboard and quote list
+    public_quotes       anonymous VIN decode, VSC-by-VIN and Hero quotes
+    media_upload        admin video/thumbnail upload to (fake) Vercel Blob; opt-in,
+                        it replaces the landing page media settings of the target
+
+Usage:
+    python benchmarks/load_test.py --start-app --duration 60 \\
+        --reseller-email dealer@example.com --reseller-password ... \\
+        --scenario quote_to_contract=8 --scenario reseller_dashboard=16 \\
+        --latency-ms 120 --jitter-ms 60 --service helcim:error_rate=0.02
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Any, Optional
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fixtures
+from fake_services import FakeServices, DEFAULT_PORTS, add_fault_arguments, build_faults
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ScenarioAbort(Exception):
+    """A step failed; the rest of this journey iteration is skipped"""
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(percent / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class RouteStats:
+    """Thread-safe latency and status bookkeeping keyed by route template"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(list)
+        self._statuses = defaultdict(lambda: defaultdict(int))
+        self._errors = defaultdict(int)
+        self._last_error = {}
+
+    def record(self, route: str, elapsed: float, status, error: str = None):
+        with self._lock:
+            self._latencies[route].append(elapsed)
+            self._statuses[route][str(status)] += 1
+            if error:
+                self._errors[route] += 1
+                self._last_error[route] = error
+
+    def summary(self, wall_seconds: float) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            routes = list(self._latencies)
+            snapshot = {route: (sorted(self._latencies[route]), dict(self._statuses[route]),
+                                self._errors[route], self._last_error.get(route)) for route in routes}
+
+        report = {}
+        for route in sorted(snapshot):
+            latencies, statuses, errors, last_error = snapshot[route]
+            latencies_ms = [t * 1000 for t in latencies]
+            report[route] = {
+                'requests': len(latencies_ms),
+                'errors': errors,
+                'error_rate': round(errors / len(latencies_ms), 4) if latencies_ms else 0.0,
+                'throughput_rps': round(len(latencies_ms) / wall_seconds, 2) if wall_seconds else 0.0,
+                'mean_ms': round(sum(latencies_ms) / len(latencies_ms), 2) if latencies_ms else 0.0,
+                'p50_ms': round(_percentile(latencies_ms, 50), 2),
+                'p90_ms': round(_percentile(latencies_ms, 90), 2),
+                'p99_ms': round(_percentile(latencies_ms, 99), 2),
+                'max_ms': round(latencies_ms[-1], 2) if latencies_ms else 0.0,
+                'statuses': statuses,
+                'last_error': last_error
+            }
+        return report
+
+
+class LoadClient:
+    """One virtual user's HTTP session; every call is timed under its route template"""
+
+    def __init__(self, base_url: str, route_stats: RouteStats, timeout: float):
+        self.base_url = base_url.rstrip('/')
+        self.route_stats = route_stats
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.token = None
+
+    def request(self, method: str, route: str, path: str, expect=(200,), **kwargs) -> requests.Response:
+        headers = kwargs.pop('headers', {})
+        if self.token:
+            headers.setdefault('Authorization', f'Bearer {self.token}')
+
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", headers=headers,
+                                            timeout=self.timeout, **kwargs)
+            # Include body transfer in the timing, as a browser would
+            _ = response.content
+        except requests.RequestException as e:
+            self.route_stats.record(f"{method} {route}", time.perf_counter() - start,
+                                    'connection_error', f"{type(e).__name__}: {e}")
+            raise ScenarioAbort(f"{method} {route}: {e}")
+
+        elapsed = time.perf_counter() - start
+        error = None
+        if response.status_code not in expect:
+            error = f"HTTP {response.status_code}: {response.text[:200]}"
+        self.route_stats.record(f"{method} {route}", elapsed, response.status_code, error)
+        if error:
+            raise ScenarioAbort(f"{method} {route}: {error}")
+        return response
+
+    def login(self, email: str, password: str):
+        response = self.request('POST', '/api/auth/login', '/api/auth/login',
+                                json={'email': email, 'password': password})
+        self.token = response.json().get('token')
+        if not self.token:
+            raise ScenarioAbort('Login response did not include a token')
+
+
+# ================================
+# SCENARIOS
+# ================================
+
+HERO_QUOTE_PRODUCTS = [
+    ('home_protection', 1), ('home_protection', 3), ('comprehensive_auto_protection', 2),
+    ('all_vehicle_deductible_reimbursement_500', 1), ('auto_rv_deductible_reimbursement', 3)
+]
+
+
+def _customer(rng: random.Random) -> Dict[str, str]:
+    suffix = uuid.uuid4().hex[:10]
+    return {
+        'first_name': rng.choice(['Alex', 'Jordan', 'Sam', 'Taylor', 'Morgan']),
+        'last_name': f'Load{suffix[:4].title()}',
+        'email': f'loadtest+{suffix}@example.com',
+        'phone': f'555{rng.randint(1000000, 9999999)}',
+        'address': '100 Main St',
+        'city': 'Miami',
+        'state': 'FL',
+        'zip_code': '33101'
+    }
+
+
+def scenario_quote_to_contract(client: LoadClient, context: Dict[str, Any]):
+    rng = context['rng']
+    customer = _customer(rng)
+
+    if rng.random() < 0.3:
+        vin, make, model, year = rng.choice(fixtures.SAMPLE_VINS)
+        quote_request = {'product_type': 'vsc', 'make': make, 'model': model, 'year': year,
+                         'mileage': rng.randint(10000, 120000), 'coverage_level': 'gold',
+                         'term_months': 36}
+    else:
+        product_type, term_years = rng.choice(HERO_QUOTE_PRODUCTS)
+        quote_request = {'product_type': 'hero', 'hero_product_type': product_type, 'term_years': term_years}
+    quote_request.update({'customer_info': customer, 'create_shareable': True})
+
+    quote = client.request('POST', '/api/resellers/quotes/generate', '/api/resellers/quotes/generate',
+                           json=quote_request).json()
+    quote_id = quote['quote_id']
+    share_token = (quote.get('sharing') or {}).get('share_token')
+
+    shared = client.request('POST', '/api/resellers/quotes/<quote_id>/share',
+                            f'/api/resellers/quotes/{quote_id}/share').json()
+    share_token = share_token or shared.get('share_token')
+    if not share_token:
+        raise ScenarioAbort('Quote has no share token')
+
+    # The customer opens the link in a fresh, unauthenticated session
+    customer_client = LoadClient(client.base_url, client.route_stats, client.timeout)
+    viewed = customer_client.request('GET', '/quote/shared/<share_token>', f'/quote/shared/{share_token}').json()
+    amount = float(quote.get('pricing_breakdown', {}).get('total_price')
+                   or viewed.get('total_price') or 100)
+
+    session = customer_client.request('POST', '/api/payments/create-helcim-session',
+                                      '/api/payments/create-helcim-session', json={
+                                          'amount': amount,
+                                          'currency': 'USD',
+                                          'payment_type': 'purchase',
+                                          'customer_info': customer,
+                                          'description': f'Load test {quote_id}'
+                                      }).json()
+    session_data = session.get('data', {})
+
+    accepted = customer_client.request('POST', '/quote/<share_token>/accept', f'/quote/{share_token}/accept', json={
+        'payment_data': {
+            'amount': amount,
+            'payment_method': 'credit_card',
+            'customer_info': customer,
+            'billing_info': {'address': customer['address'], 'city': customer['city'],
+                             'state': customer['state'], 'zip_code': customer['zip_code']},
+            'helcim_response': {
+                'transactionId': session_data.get('transactionId') or rng.randint(10_000_000, 99_999_999),
+                'approved': True,
+                'approvalCode': f'T{rng.randint(10000, 99999)}',
+                'cardType': 'VI',
+                'cardNumber': '4111********1111',
+                'amount': amount,
+                'currency': 'USD',
+                'invoiceNumber': f"INV{session_data.get('invoiceId') or rng.randint(10000, 99999)}"
+            }
+        }
+    }).json()
+
+    transaction_id = (accepted.get('transaction_data') or {}).get('transaction_id')
+    if not transaction_id:
+        raise ScenarioAbort('Accepted quote did not return a transaction id')
+
+    customer_client.request('POST', '/api/payments/<transaction_id>/generate-contract',
+                            f'/api/payments/{transaction_id}/generate-contract', expect=(200, 201))
+    customer_client.request('GET', '/api/payments/<transaction_id>/download-contract',
+                            f'/api/payments/{transaction_id}/download-contract')
+
+
+def scenario_reseller_dashboard(client: LoadClient, context: Dict[str, Any]):
+    client.request('GET', '/api/resellers/dashboard', '/api/resellers/dashboard')
+    client.request('GET', '/api/resellers/sales/dashboard', '/api/resellers/sales/dashboard')
+    client.request('GET', '/api/resellers/quotes', '/api/resellers/quotes', params={'page': 1, 'per_page': 20})
+
+
+def scenario_public_quotes(client: LoadClient, context: Dict[str, Any]):
+    rng = context['rng']
+    vin = rng.choice(fixtures.SAMPLE_VINS)[0]
+    client.request('POST', '/api/vin/enhanced/decode', '/api/vin/enhanced/decode', json={'vin': vin})
+    client.request('POST', '/api/vsc/quote/vin', '/api/vsc/quote/vin', json={
+        'vin': vin, 'mileage': rng.randint(10000, 140000),
+        'coverage_level': rng.choice(['silver', 'gold', 'platinum']), 'term_months': 36
+    })
+    product_type, term_years = rng.choice(HERO_QUOTE_PRODUCTS[:3])
+    client.request('POST', '/api/hero/quote', '/api/hero/quote', json={
+        'product_type': product_type, 'term_years': term_years, 'state': 'FL'
+    })
+
+
+def scenario_media_upload(client: LoadClient, context: Dict[str, Any]):
+    video = os.urandom(context['upload_bytes'])
+    client.request('POST', '/api/admin/video/upload', '/api/admin/video/upload', files={
+        'video': ('loadtest.mp4', video, 'video/mp4')
+    })
+
+
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    'quote_to_contract': {'run': scenario_quote_to_contract, 'login': 'reseller', 'default_users': 4},
+    'reseller_dashboard': {'run': scenario_reseller_dashboard, 'login': 'reseller', 'default_users': 4},
+    'public_quotes': {'run': scenario_public_quotes, 'login': None, 'default_users': 2},
+    'media_upload': {'run': scenario_media_upload, 'login': 'admin', 'default_users': 0},
+}
+
+
+# ================================
+# RUNNER
+# ================================
+
+class VirtualUser(threading.Thread):
+    """Closed-loop user: runs its scenario back to back (plus think time) until the deadline"""
+
+    def __init__(self, index: int, scenario: str, args, route_stats: RouteStats,
+                 scenario_stats: RouteStats, start_at: float, deadline: float):
+        super().__init__(name=f"vu-{scenario}-{index}", daemon=True)
+        self.scenario = scenario
+        self.args = args
+        self.route_stats = route_stats
+        self.scenario_stats = scenario_stats
+        self.start_at = start_at
+        self.deadline = deadline
+        self.context = {
+            'rng': random.Random(None if args.seed is None else args.seed + index),
+            'upload_bytes': args.upload_kb * 1024
+        }
+
+    def _login(self, client: LoadClient, role: str) -> bool:
+        email = getattr(self.args, f'{role}_email')
+        password = getattr(self.args, f'{role}_password')
+        try:
+            client.login(email, password)
+            return True
+        except (ScenarioAbort, ValueError):
+            return False
+
+    def run(self):
+        time.sleep(max(0.0, self.start_at - time.time()))
+        spec = SCENARIOS[self.scenario]
+        client = LoadClient(self.args.base_url, self.route_stats, self.args.timeout)
+
+        if spec['login'] and not self._login(client, spec['login']):
+            self.scenario_stats.record(self.scenario, 0.0, 'login_failed', 'login failed')
+            return
+
+        while time.time() < self.deadline:
+            start = time.perf_counter()
+            try:
+                spec['run'](client, self.context)
+                self.scenario_stats.record(self.scenario, time.perf_counter() - start, 'completed')
+            except ScenarioAbort as e:
+                self.scenario_stats.record(self.scenario, time.perf_counter() - start, 'aborted', str(e))
+            except Exception as e:
+                self.scenario_stats.record(self.scenario, time.perf_counter() - start, 'crashed',
+                                           f"{type(e).__name__}: {e}")
+            if self.args.think_ms:
+                time.sleep(self.context['rng'].uniform(0.5, 1.5) * self.args.think_ms / 1000)
+
+
+def start_app(args, service_env: Dict[str, str]) -> subprocess.Popen:
+    """Start api/index.py on --app-port with the fake service URLs in its environment"""
+    env = dict(os.environ, **service_env, PORT=str(args.app_port), FLASK_DEBUG='False')
+    log = open(args.app_log, 'w') if args.app_log else subprocess.DEVNULL
+    process = subprocess.Popen([sys.executable, os.path.join(REPO_ROOT, 'api', 'index.py')],
+                               cwd=os.path.join(REPO_ROOT, 'api'), env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    deadline = time.time() + args.app_start_timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"❌ API exited during startup (code {process.returncode}); see --app-log")
+        try:
+            if requests.get(f"{args.base_url}/health", timeout=2).status_code == 200:
+                return process
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+
+    process.terminate()
+    raise SystemExit(f"❌ API did not become healthy within {args.app_start_timeout}s")
+
+
+def parse_scenarios(specs: Optional[List[str]]) -> Dict[str, int]:
+    if not specs:
+        return {name: spec['default_users'] for name, spec in SCENARIOS.items() if spec['default_users']}
+    users = {}
+    for item in specs:
+        name, _, count = item.partition('=')
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}' (expected one of {', '.join(SCENARIOS)})")
+        users[name] = int(count or 1)
+    return users
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"\nDuration {report['duration_s']}s, {report['total_requests']} requests, "
+          f"{report['throughput_rps']} req/s overall")
+
+    print(f"\n{'scenario':<22}{'runs':>7}{'ok':>7}{'aborted':>9}{'p50 ms':>10}{'p99 ms':>10}")
+    print('-' * 65)
+    for name, s in report['scenarios'].items():
+        print(f"{name:<22}{s['requests']:>7}{s['statuses'].get('completed', 0):>7}{s['errors']:>9}"
+              f"{s['p50_ms']:>10.1f}{s['p99_ms']:>10.1f}")
+
+    print(f"\n{'route':<56}{'reqs':>7}{'rps':>8}{'err%':>7}{'p50':>9}{'p90':>9}{'p99':>9}")
+    print('-' * 105)
+    for route, r in report['routes'].items():
+        print(f"{route:<56}{r['requests']:>7}{r['throughput_rps']:>8.1f}{r['error_rate'] * 100:>6.1f}%"
+              f"{r['p50_ms']:>9.1f}{r['p90_ms']:>9.1f}{r['p99_ms']:>9.1f}")
+        if r['last_error']:
+            print(f"  ⚠️ {r['last_error'][:150]}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='End-to-end HTTP load test with fake external services')
+    parser.add_argument('--base-url', help='API under test (default: http://127.0.0.1:<app-port>)')
+    parser.add_argument('--start-app', action='store_true', help='Start api/index.py wired to the fake services')
+    parser.add_argument('--app-port', type=int, default=5055)
+    parser.add_argument('--app-log', help='File for the started API output')
+    parser.add_argument('--app-start-timeout', type=float, default=60.0)
+    parser.add_argument('--no-fakes', action='store_true', help='Do not start fake services (already running)')
+    parser.add_argument('--scenario', action='append', metavar='NAME=USERS',
+                        help=f"Scenario and concurrent users ({', '.join(SCENARIOS)}); repeatable")
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds of load after ramp-up starts')
+    parser.add_argument('--ramp-up', type=float, default=5.0, help='Seconds over which users are started')
+    parser.add_argument('--think-ms', type=float, default=0.0, help='Mean pause between journeys per user')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Per-request client timeout')
+    parser.add_argument('--seed', type=int, help='Seed scenario choices and fault injection')
+    parser.add_argument('--upload-kb', type=int, default=512, help='Video size for media_upload')
+    parser.add_argument('--reseller-email', default=os.environ.get('LOADTEST_RESELLER_EMAIL'))
+    parser.add_argument('--reseller-password', default=os.environ.get('LOADTEST_RESELLER_PASSWORD'))
+    parser.add_argument('--admin-email', default=os.environ.get('LOADTEST_ADMIN_EMAIL'))
+    parser.add_argument('--admin-password', default=os.environ.get('LOADTEST_ADMIN_PASSWORD'))
+    parser.add_argument('--output', help='Write the JSON report here')
+    add_fault_arguments(parser)
+    args = parser.parse_args(argv)
+    args.base_url = (args.base_url or f"http://127.0.0.1:{args.app_port}").rstrip('/')
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    try:
+        users = parse_scenarios(args.scenario)
+        faults = build_faults(args)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+
+    for name in list(users):
+        role = SCENARIOS[name]['login']
+        if role and not (getattr(args, f'{role}_email') and getattr(args, f'{role}_password')):
+            print(f"⚠️ Skipping {name}: --{role}-email/--{role}-password (or LOADTEST_{role.upper()}_*) not set")
+            del users[name]
+    if not users:
+        print("❌ No runnable scenarios")
+        return 2
+
+    fakes = None
+    app_process = None
+    if not args.no_fakes:
+        fakes = FakeServices(ports={} if args.start_app else DEFAULT_PORTS, faults=faults, seed=args.seed).start()
+        print("✅ Fake services: " + ', '.join(f"{n}={s.base_url}" for n, s in fakes.servers.items()))
+        if not args.start_app:
+            print("   The API under test must be started with:")
+            for key, value in fakes.service_environment().items():
+                print(f"   {key}={value}")
+
+    try:
+        if args.start_app:
+            if fakes is None:
+                print("❌ --start-app needs the fake services (drop --no-fakes)")
+                return 2
+            print(f"🔄 Starting API on {args.base_url}")
+            app_process = start_app(args, fakes.service_environment())
+
+        route_stats = RouteStats()
+        scenario_stats = RouteStats()
+        total_users = sum(users.values())
+        began = time.time()
+        deadline = began + args.duration
+        threads = []
+        index = 0
+        for name, count in users.items():
+            for _ in range(count):
+                start_at = began + (args.ramp_up * index / max(total_users - 1, 1) if total_users > 1 else 0)
+                threads.append(VirtualUser(index, name, args, route_stats, scenario_stats, start_at, deadline))
+                index += 1
+
+        print(f"⏱️  {total_users} users ({', '.join(f'{n}={c}' for n, c in users.items())}) for {args.duration}s")
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.time() - began
+
+        routes = route_stats.summary(wall)
+        total_requests = sum(r['requests'] for r in routes.values())
+        report = {
+            'recorded_at': datetime.now(timezone.utc).isoformat(),
+            'base_url': args.base_url,
+            'duration_s': round(wall, 2),
+            'users': users,
+            'total_requests': total_requests,
+            'throughput_rps': round(total_requests / wall, 2) if wall else 0.0,
+            'scenarios': scenario_stats.summary(wall),
+            'routes': routes,
+            'fake_services': fakes.stats() if fakes else None
+        }
+        print_report(report)
+
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            print(f"\n✅ Report written to {args.output}")
+        return 0
+
+    finally:
+        if app_process is not None:
+            app_process.terminate()
+            try:
+                app_process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                app_process.kill()
+        if fakes is not None:
+            fakes.stop()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
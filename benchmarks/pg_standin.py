@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+In-Process Postgres Stand-In
+Routes psycopg2.connect to a shared in-memory SQLite database so the pricing,
+settings and pagination code paths run unmodified without a Postgres server.
+Only the SQL dialect used by those paths is translated.
+"""
+
+import re
+import sqlite3
+import threading
+from functools import lru_cache
+
+import psycopg2
+import psycopg2.extensions
+
+STANDIN_DSN = 'standin://benchmark'
+
+_TRANSLATIONS = [
+    (re.compile(r'SERIAL\s+PRIMARY\s+KEY', re.IGNORECASE), 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+    (re.compile(r'DEFAULT\s+gen_random_uuid\(\)', re.IGNORECASE), 'DEFAULT (lower(hex(randomblob(16))))'),
+    (re.compile(r'TIMESTAMP\s+WITH(?:OUT)?\s+TIME\s+ZONE', re.IGNORECASE), 'TIMESTAMP'),
+    (re.compile(r'\b(\w+)\[\]'), r'\1'),
+    (re.compile(r'::\w+(?:\[\])?'), ''),
+    (re.compile(r'\bILIKE\b', re.IGNORECASE), 'LIKE'),
+    (re.compile(r'\bNOW\(\)', re.IGNORECASE), 'CURRENT_TIMESTAMP'),
+    (re.compile(r'\bversion\(\)', re.IGNORECASE), 'sqlite_version()'),
+    (re.compile(r'information_schema\.tables', re.IGNORECASE),
+     "(SELECT name AS table_name, 'public' AS table_schema FROM sqlite_master WHERE type = 'table')"),
+    (re.compile(r'\bSELECT\s+FROM\b', re.IGNORECASE), 'SELECT 1 FROM'),
+]
+_PLACEHOLDER = re.compile(r'%(s|%)')
+
+
+@lru_cache(maxsize=1024)
+def translate(query: str) -> str:
+    """Rewrite a psycopg2/Postgres statement into SQLite syntax"""
+    for pattern, replacement in _TRANSLATIONS:
+        query = pattern.sub(replacement, query)
+    return _PLACEHOLDER.sub(lambda m: '?' if m.group(1) == 's' else '%', query)
+
+
+class _TransactionInfo:
+    transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+
+class StandInCursor:
+    """Subset of the psycopg2 cursor API backed by sqlite3"""
+
+    def __init__(self, connection, dict_rows: bool = False):
+        self.connection = connection
+        self._dict_rows = dict_rows
+        self._rows = []
+        self._position = 0
+        self.rowcount = -1
+        self.description = None
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def execute(self, query, vars=None):
+        if isinstance(query, bytes):
+            query = query.decode('utf-8')
+        sql = translate(query)
+        with self.connection.database.lock:
+            try:
+                cursor = self.connection.database.sqlite.execute(sql, tuple(vars or ()))
+                rows = cursor.fetchall()
+            except sqlite3.Error as e:
+                raise psycopg2.DatabaseError(f"{e} (stand-in SQL: {sql.strip()[:200]})") from e
+
+        self.description = cursor.description
+        if self._dict_rows and self.description:
+            columns = [column[0] for column in self.description]
+            rows = [dict(zip(columns, row)) for row in rows]
+        self._rows = rows
+        self._position = 0
+        self.rowcount = len(rows) if self.description else cursor.rowcount
+
+    def executemany(self, query, vars_list):
+        for vars in vars_list:
+            self.execute(query, vars)
+
+    def fetchone(self):
+        if self._position >= len(self._rows):
+            return None
+        row = self._rows[self._position]
+        self._position += 1
+        return row
+
+    def fetchmany(self, size: int = 1):
+        rows = self._rows[self._position:self._position + size]
+        self._position += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._rows[self._position:]
+        self._position = len(self._rows)
+        return rows
+
+    def close(self):
+        self.closed = True
+
+
+class StandInConnection:
+    """Subset of the psycopg2 connection API; every connection shares one database"""
+
+    def __init__(self, database: 'StandInDatabase', cursor_factory=None):
+        self.database = database
+        self.cursor_factory = cursor_factory
+        self.closed = 0
+        self.autocommit = False
+        self.info = _TransactionInfo()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # psycopg2 semantics: the block ends the transaction, not the connection
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+    def cursor(self, name=None, cursor_factory=None, **kwargs):
+        factory = cursor_factory or self.cursor_factory
+        dict_rows = factory is not None and 'Dict' in getattr(factory, '__name__', '')
+        return StandInCursor(self, dict_rows=dict_rows)
+
+    def get_transaction_status(self):
+        return self.info.transaction_status
+
+    def commit(self):
+        with self.database.lock:
+            self.database.sqlite.commit()
+
+    def rollback(self):
+        with self.database.lock:
+            self.database.sqlite.rollback()
+
+    def close(self):
+        self.closed = 1
+
+
+class StandInDatabase:
+    def __init__(self):
+        self.sqlite = sqlite3.connect(':memory:', check_same_thread=False)
+        self.lock = threading.RLock()
+        self.connections = 0
+
+    def connect(self, dsn=None, connection_factory=None, cursor_factory=None, **kwargs):
+        self.connections += 1
+        return StandInConnection(self, cursor_factory=cursor_factory)
+
+
+_installed = None
+
+
+def install(database: StandInDatabase = None) -> StandInDatabase:
+    """Point psycopg2.connect (and therefore psycopg2.pool) at the stand-in"""
+    global _installed
+    if _installed is None:
+        _installed = database or StandInDatabase()
+        psycopg2.connect = _installed.connect
+    return _installed
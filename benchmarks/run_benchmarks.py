@@ -0,0 +1,569 @@
+#!/usr/bin/env python3
+"""
+Pricing and Decoding Micro-Benchmarks
+Times the quote, rating, VIN and analytics hot paths against seeded fixture
+data and appends ops/sec and p50/p99 latencies to a JSON history file so runs
+can be compared between commits.
+
+Usage:
+    python benchmarks/run_benchmarks.py                      # in-process Postgres stand-in
+    python benchmarks/run_benchmarks.py --dsn postgresql://localhost/cac_bench
+    python benchmarks/run_benchmarks.py --compare HEAD~1 --fail-on-regression
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Any, Optional
+from unittest import mock
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(REPO_ROOT, 'api')
+DEFAULT_HISTORY_PATH = os.path.join(REPO_ROOT, 'benchmarks', 'benchmark_history.json')
+BENCHMARK_SCHEMA = 'benchmark_fixtures'
+
+sys.path.insert(0, API_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fixtures
+
+
+class BenchmarkCase:
+    """A named hot path: setup() returns the callable timed once per iteration"""
+
+    def __init__(self, name: str, description: str, setup: Callable[[], Callable[[int], Any]]):
+        self.name = name
+        self.description = description
+        self.setup = setup
+
+
+def _is_failure(result) -> bool:
+    return isinstance(result, dict) and result.get('success') is False
+
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(percent / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run_case(case: BenchmarkCase, iterations: int, warmup: int, min_time: float) -> Dict[str, Any]:
+    """
+    Time one benchmark case
+
+    Args:
+        case: Case to run
+        iterations: Minimum timed iterations
+        warmup: Untimed iterations run first (fills caches, JIT-free warm state)
+        min_time: Keep iterating until at least this many seconds were measured
+
+    Returns:
+        dict: ops/sec, latency percentiles (ms) and error count
+    """
+    operation = case.setup()
+    errors = 0
+    last_error = None
+
+    for i in range(warmup):
+        operation(i)
+
+    timings = []
+    measured = 0.0
+    i = 0
+    while i < iterations or measured < min_time:
+        start = time.perf_counter()
+        try:
+            result = operation(i)
+            failed = _is_failure(result)
+            if failed:
+                last_error = result.get('error')
+        except Exception as e:
+            failed = True
+            last_error = f"{type(e).__name__}: {e}"
+        elapsed = time.perf_counter() - start
+        timings.append(elapsed)
+        measured += elapsed
+        errors += failed
+        i += 1
+
+    timings.sort()
+    timings_ms = [t * 1000 for t in timings]
+    return {
+        'iterations': len(timings),
+        'ops_per_sec': round(len(timings) / measured, 2) if measured else 0.0,
+        'mean_ms': round(sum(timings_ms) / len(timings_ms), 4),
+        'p50_ms': round(_percentile(timings_ms, 50), 4),
+        'p99_ms': round(_percentile(timings_ms, 99), 4),
+        'max_ms': round(timings_ms[-1], 4),
+        'errors': errors,
+        'last_error': last_error
+    }
+
+
+# ================================
+# BENCHMARK CASES
+# ================================
+
+VSC_INPUTS = [
+    (make, year, mileage, coverage, term, deductible)
+    for make, year in (('Honda', 2021), ('Ford', 2018), ('BMW', 2016), ('Toyota', 2012))
+    for mileage in (25000, 85000, 140000, 175000)
+    for coverage, term, deductible in (('silver', 24, 100), ('gold', 36, 100), ('platinum', 60, 500))
+]
+
+
+def _clear_rate_caches():
+    from data.vsc_rates_data import rate_manager
+    rate_manager._cached_data.clear()
+    rate_manager._cache_timestamps.clear()
+
+
+def setup_vsc_calculate_price():
+    from data.vsc_rates_data import calculate_vsc_price
+
+    def operation(i):
+        make, year, mileage, coverage, term, deductible = VSC_INPUTS[i % len(VSC_INPUTS)]
+        return calculate_vsc_price(make, year, mileage, coverage, term, deductible)
+    return operation
+
+
+def setup_vsc_calculate_price_cold():
+    from data.vsc_rates_data import calculate_vsc_price
+
+    def operation(i):
+        _clear_rate_caches()
+        make, year, mileage, coverage, term, deductible = VSC_INPUTS[i % len(VSC_INPUTS)]
+        return calculate_vsc_price(make, year, mileage, coverage, term, deductible)
+    return operation
+
+
+def setup_db_calculate_vsc_price():
+    from utils.database import calculate_vsc_price
+
+    def operation(i):
+        make, year, mileage, coverage, term, deductible = VSC_INPUTS[i % len(VSC_INPUTS)]
+        vehicle_class = dict(fixtures.VEHICLE_CLASSES).get(make, 'B')
+        return calculate_vsc_price(vehicle_class, coverage, term, mileage)
+    return operation
+
+
+def setup_vsc_generate_quote():
+    from services.vsc_rating_service import VSCRatingService
+    service = VSCRatingService()
+
+    def operation(i):
+        make, year, mileage, coverage, term, deductible = VSC_INPUTS[i % len(VSC_INPUTS)]
+        return service.generate_quote(make, year, mileage, coverage_level=coverage,
+                                      term_months=term, deductible=deductible,
+                                      customer_type='wholesale' if i % 4 == 0 else 'retail')
+    return operation
+
+
+def setup_hero_generate_quote():
+    from services.hero_rating_service import HeroRatingService
+    from data.hero_products_data import HERO_PRODUCTS_PRICING
+    service = HeroRatingService()
+    inputs = [
+        (product_type, term_years, coverage_limit, customer_type, state)
+        for product_type, config in HERO_PRODUCTS_PRICING.items()
+        for term_years in config['multipliers']
+        for coverage_limit, customer_type, state in ((500, 'retail', 'FL'), (1000, 'wholesale', 'CA'))
+    ]
+
+    def operation(i):
+        product_type, term_years, coverage_limit, customer_type, state = inputs[i % len(inputs)]
+        return service.generate_quote(product_type, term_years, coverage_limit=coverage_limit,
+                                      customer_type=customer_type, state=state)
+    return operation
+
+
+def setup_vin_validate():
+    from services.enhanced_vin_decoder_service import EnhancedVINDecoderService
+    service = EnhancedVINDecoderService()
+    vins = [vin for vin, _, _, _ in fixtures.SAMPLE_VINS] + ['1HGCM82633A00435', 'IHGCM82633A004352']
+
+    def operation(i):
+        result = service.validate_vin(vins[i % len(vins)])
+        # Invalid VINs are part of the workload, not benchmark failures
+        return {'success': True, 'valid': result.get('valid')}
+    return operation
+
+
+def setup_vin_decode():
+    from services.enhanced_vin_decoder_service import EnhancedVINDecoderService
+    service = EnhancedVINDecoderService()
+    vins = [vin for vin, _, _, _ in fixtures.SAMPLE_VINS]
+
+    def operation(i):
+        return service.decode_vin(vins[i % len(vins)])
+    return operation
+
+
+def setup_kpi_dashboard(data):
+    def setup():
+        from analytics.kpi_system import KPISystem
+        kpi_system = KPISystem()
+        return lambda i: kpi_system.generate_dashboard_data(data)
+    return setup
+
+
+def setup_paginate_transactions():
+    from utils.database import paginate_query
+    statuses = ['completed', 'pending', 'failed']
+
+    def operation(i):
+        return paginate_query(
+            "SELECT id, transaction_number, customer_id, amount, status, created_at FROM transactions WHERE status = %s",
+            (statuses[i % len(statuses)],),
+            page=(i % 5) + 1,
+            per_page=25,
+            order_by='created_at DESC'
+        )
+    return operation
+
+
+def setup_image_renditions():
+    from services.image_rendition_service import render_renditions
+    source = fixtures.sample_photo_jpeg()
+
+    def operation(i):
+        renditions = render_renditions(source)
+        return {'success': bool(renditions), 'bytes': sum(r.size for r in renditions)}
+    return operation
+
+
+def build_cases(business_data) -> List[BenchmarkCase]:
+    return [
+        BenchmarkCase('vsc_calculate_price', 'data.vsc_rates_data.calculate_vsc_price (warm rate cache)',
+                      setup_vsc_calculate_price),
+        BenchmarkCase('vsc_calculate_price_cold', 'calculate_vsc_price with the rate cache cleared every call',
+                      setup_vsc_calculate_price_cold),
+        BenchmarkCase('db_calculate_vsc_price', 'utils.database.calculate_vsc_price via the connection pool',
+                      setup_db_calculate_vsc_price),
+        BenchmarkCase('vsc_generate_quote', 'VSCRatingService.generate_quote', setup_vsc_generate_quote),
+        BenchmarkCase('hero_generate_quote', 'HeroRatingService.generate_quote', setup_hero_generate_quote),
+        BenchmarkCase('vin_validate', 'EnhancedVINDecoderService.validate_vin', setup_vin_validate),
+        BenchmarkCase('vin_decode', 'EnhancedVINDecoderService.decode_vin (mocked NHTSA)', setup_vin_decode),
+        BenchmarkCase('kpi_dashboard', 'KPISystem.generate_dashboard_data over the fixture data',
+                      setup_kpi_dashboard(business_data)),
+        BenchmarkCase('paginate_transactions', 'utils.database.paginate_query on transactions',
+                      setup_paginate_transactions),
+        BenchmarkCase('image_renditions', 'render_renditions: 4000x3000 JPEG to every width in WebP and JPEG',
+                      setup_image_renditions),
+    ]
+
+
+# ================================
+# ENVIRONMENT
+# ================================
+
+class _FakeNHTSAResponse:
+    status_code = 200
+
+    def __init__(self, vin: str):
+        self._payload = {
+            'Count': 136,
+            'Message': 'Results returned successfully (mocked)',
+            'SearchCriteria': f'VIN:{vin}',
+            'Results': fixtures.nhtsa_results(vin)
+        }
+
+    def json(self):
+        return self._payload
+
+
+def mock_nhtsa(latency_ms: float = 0.0):
+    """Patch requests.get so vPIC DecodeVin calls return canned results after latency_ms"""
+    import requests
+    real_get = requests.get
+
+    def fake_get(url, *args, **kwargs):
+        if 'vpic.nhtsa.dot.gov' not in str(url):
+            return real_get(url, *args, **kwargs)
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+        return _FakeNHTSAResponse(str(url).rstrip('/').rsplit('/', 1)[-1])
+
+    return mock.patch.object(requests, 'get', fake_get)
+
+
+def _is_local_dsn(dsn: str) -> bool:
+    from psycopg2.extensions import parse_dsn
+    host = parse_dsn(dsn).get('host', '')
+    return host in ('', 'localhost', '127.0.0.1', '::1') or host.startswith('/')
+
+
+def prepare_postgres(dsn: str, allow_remote: bool = False) -> str:
+    """
+    Recreate the benchmark schema on a local Postgres
+
+    Everything lives in its own schema (selected through search_path), so an
+    existing development database is left untouched.
+
+    Returns:
+        str: DSN that selects the benchmark schema
+    """
+    import psycopg2
+    from psycopg2.extensions import make_dsn
+
+    if not allow_remote and not _is_local_dsn(dsn):
+        raise SystemExit("❌ Refusing to seed a non-local database; pass --allow-remote to override")
+
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {BENCHMARK_SCHEMA} CASCADE;")
+        cursor.execute(f"CREATE SCHEMA {BENCHMARK_SCHEMA};")
+    conn.close()
+
+    return make_dsn(dsn, options=f'-c search_path={BENCHMARK_SCHEMA},public')
+
+
+def seed_database(business_data) -> Dict[str, Any]:
+    """Create the schema through create_tables_if_not_exist() and load fixtures"""
+    import psycopg2
+    from utils.database import create_tables_if_not_exist
+
+    if not create_tables_if_not_exist():
+        raise RuntimeError("create_tables_if_not_exist() failed - see output above")
+
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    try:
+        with conn.cursor() as cursor:
+            fixtures.create_extra_tables(cursor)
+            fixtures.seed_pricing_data(cursor)
+            fixtures.seed_business_data(cursor, business_data)
+        conn.commit()
+    finally:
+        conn.close()
+
+    return {key: len(rows) for key, rows in business_data.items()}
+
+
+def git_revision() -> Dict[str, Any]:
+    def git(*args):
+        try:
+            return subprocess.run(['git', *args], cwd=REPO_ROOT, capture_output=True,
+                                  text=True, timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ''
+
+    return {
+        'commit': git('rev-parse', 'HEAD') or None,
+        'branch': git('rev-parse', '--abbrev-ref', 'HEAD') or None,
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no'))
+    }
+
+
+def resolve_commit(ref: str) -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', ref], cwd=REPO_ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or ref
+    except (OSError, subprocess.SubprocessError):
+        return ref
+
+
+# ================================
+# HISTORY
+# ================================
+
+def load_history(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('runs', [])
+
+
+def append_history(path: str, run: Dict[str, Any]):
+    runs = load_history(path)
+    runs.append(run)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'format_version': 1, 'runs': runs}, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def find_baseline(runs: List[Dict[str, Any]], backend: str, ref: str = None) -> Optional[Dict[str, Any]]:
+    """Latest run on the same backend, optionally restricted to a commit"""
+    commit = resolve_commit(ref) if ref else None
+    for run in reversed(runs):
+        if run.get('backend') != backend:
+            continue
+        if commit and not (run.get('git', {}).get('commit') or '').startswith(commit[:12]):
+            continue
+        return run
+    return None
+
+
+def compare_runs(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """
+    Compare per-case p50 and ops/sec against a baseline run
+
+    Returns:
+        list: One row per shared case; 'regression' is True when p50 grew past threshold×
+    """
+    rows = []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if not base or not base.get('p50_ms'):
+            continue
+        p50_ratio = result['p50_ms'] / base['p50_ms']
+        rows.append({
+            'case': name,
+            'baseline_p50_ms': base['p50_ms'],
+            'p50_ms': result['p50_ms'],
+            'p50_ratio': round(p50_ratio, 2),
+            'ops_ratio': round(result['ops_per_sec'] / base['ops_per_sec'], 2) if base.get('ops_per_sec') else None,
+            'regression': p50_ratio >= threshold
+        })
+    return rows
+
+
+def print_results(results: Dict[str, Dict[str, Any]]):
+    print(f"\n{'case':<28}{'ops/sec':>12}{'p50 ms':>11}{'p99 ms':>11}{'iters':>8}{'errors':>8}")
+    print('-' * 78)
+    for name, r in results.items():
+        print(f"{name:<28}{r['ops_per_sec']:>12,.1f}{r['p50_ms']:>11.3f}{r['p99_ms']:>11.3f}"
+              f"{r['iterations']:>8}{r['errors']:>8}")
+        if r['errors']:
+            print(f"  ⚠️ {r['errors']} failed calls, last error: {r['last_error']}")
+
+
+def print_comparison(rows: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float):
+    commit = (baseline.get('git', {}).get('commit') or 'unknown')[:10]
+    print(f"\nCompared with {commit} ({baseline.get('recorded_at')}), regression threshold {threshold}× p50")
+    print(f"{'case':<28}{'base p50':>11}{'p50':>11}{'ratio':>8}")
+    print('-' * 58)
+    for row in rows:
+        marker = '  ❌ REGRESSION' if row['regression'] else ''
+        print(f"{row['case']:<28}{row['baseline_p50_ms']:>11.3f}{row['p50_ms']:>11.3f}{row['p50_ratio']:>7.2f}×{marker}")
+
+
+# ================================
+# MAIN
+# ================================
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Pricing and decoding micro-benchmarks')
+    parser.add_argument('--dsn', help='Local Postgres DSN (default: in-process stand-in)')
+    parser.add_argument('--allow-remote', action='store_true', help='Allow --dsn to point at a non-local host')
+    parser.add_argument('--only', help='Comma-separated case names to run')
+    parser.add_argument('--list', action='store_true', help='List cases and exit')
+    parser.add_argument('--iterations', type=int, default=200, help='Minimum timed iterations per case')
+    parser.add_argument('--warmup', type=int, default=20, help='Untimed warmup iterations per case')
+    parser.add_argument('--min-time', type=float, default=0.5, help='Minimum measured seconds per case')
+    parser.add_argument('--scale', type=int, default=2000, help='Fixture transactions (customers/policies scale with it)')
+    parser.add_argument('--seed', type=int, default=42, help='Fixture random seed')
+    parser.add_argument('--snapshot', help='Serve pricing from this pricing snapshot file')
+    parser.add_argument('--nhtsa-latency-ms', type=float, default=0.0, help='Simulated NHTSA round trip')
+    parser.add_argument('--history', default=DEFAULT_HISTORY_PATH, help='JSON history file')
+    parser.add_argument('--no-record', action='store_true', help='Do not append this run to the history')
+    parser.add_argument('--label', help='Free-form label stored with the run')
+    parser.add_argument('--compare', nargs='?', const='', metavar='REF',
+                        help='Compare with the latest recorded run (or the latest run for git REF)')
+    parser.add_argument('--threshold', type=float, default=2.0, help='p50 ratio that counts as a regression')
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit 1 when any case regresses')
+    parser.add_argument('--verbose', action='store_true', help='Show output from the code under test')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    business_data = fixtures.build_business_data(args.scale, args.seed)
+    cases = build_cases(business_data)
+
+    if args.list:
+        for case in cases:
+            print(f"{case.name:<28}{case.description}")
+        return 0
+
+    if args.only:
+        wanted = {name.strip() for name in args.only.split(',')}
+        unknown = wanted - {case.name for case in cases}
+        if unknown:
+            print(f"❌ Unknown cases: {', '.join(sorted(unknown))}")
+            return 2
+        cases = [case for case in cases if case.name in wanted]
+
+    # Statement instrumentation would be measured along with the code under test
+    os.environ.setdefault('DB_INSTRUMENTATION_ENABLED', 'false')
+
+    if args.dsn:
+        backend = 'postgres'
+        os.environ['DATABASE_URL'] = prepare_postgres(args.dsn, args.allow_remote)
+    else:
+        import pg_standin
+        backend = 'standin'
+        pg_standin.install()
+        os.environ['DATABASE_URL'] = pg_standin.STANDIN_DSN
+
+    devnull = open(os.devnull, 'w')
+
+    def quiet():
+        return contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull)
+
+    print(f"🔄 Seeding fixtures ({backend})...")
+    with quiet():
+        seeded = seed_database(business_data)
+        if args.snapshot:
+            from data.pricing_snapshot import initialize_snapshot
+            if initialize_snapshot(args.snapshot, verify=False) is None:
+                raise SystemExit(f"❌ Could not load pricing snapshot {args.snapshot}")
+
+    results = {}
+    with mock_nhtsa(args.nhtsa_latency_ms):
+        for case in cases:
+            print(f"⏱️  {case.name}")
+            with quiet():
+                results[case.name] = run_case(case, args.iterations, args.warmup, args.min_time)
+    devnull.close()
+
+    print_results(results)
+
+    run = {
+        'recorded_at': datetime.now(timezone.utc).isoformat(),
+        'label': args.label,
+        'backend': backend,
+        'git': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'min_time': args.min_time,
+            'scale': args.scale,
+            'seed': args.seed,
+            'snapshot': bool(args.snapshot),
+            'nhtsa_latency_ms': args.nhtsa_latency_ms
+        },
+        'fixtures': seeded,
+        'results': results
+    }
+
+    exit_code = 0
+    if args.compare is not None:
+        baseline = find_baseline(load_history(args.history), backend, args.compare or None)
+        if baseline is None:
+            print(f"\n⚠️ No recorded {backend} run to compare with")
+        else:
+            rows = compare_runs(run, baseline, args.threshold)
+            print_comparison(rows, baseline, args.threshold)
+            if args.fail_on_regression and any(row['regression'] for row in rows):
+                exit_code = 1
+
+    if not args.no_record:
+        append_history(args.history, run)
+        print(f"\n✅ Run recorded in {os.path.relpath(args.history, REPO_ROOT)}")
+
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())